@@ -0,0 +1,3 @@
+"""
+Benchmarks of the generator, run as modules from the repository root (e.g. `python -m benchmarks.suite run`).
+"""
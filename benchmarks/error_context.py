@@ -0,0 +1,51 @@
+"""
+Microbenchmark of the per-call overhead of `catch_exception_in_all_methods` in render-heavy loops.
+
+Compares rendering dependencies whose hot methods (`__str__`, `provide_metadata`) are wrapped, as every method was
+before, with the default that only wraps the `generate_to_file` / `from_file` entry points.
+
+Run from the repository root:
+
+    python -m benchmarks.error_context [dependencies]
+"""
+import sys
+import timeit
+from typing import Optional
+
+from src.core import ENTRY_POINTS, catch_exception_in_all_methods
+from src.gradle.dependency import Dependency, DependencyType
+from src.metadata import ModuleMetadata, ProjectMetadata
+
+class BenchmarkError(Exception):
+    pass
+
+def _subclass(name : str,methods : Optional[tuple[str,...]] = (),decorate : bool = True) -> type :
+    # Hot methods are copied into the subclass so the decorator sees them in `__dict__`
+    namespace = {"__slots__" : (), "__str__" : Dependency.__str__, "provide_metadata" : Dependency.provide_metadata}
+    cls = type(name,(Dependency,),namespace)
+    return catch_exception_in_all_methods(BenchmarkError,methods)(cls) if decorate else cls
+
+def _render(dependencies : list[Dependency],metadata : ModuleMetadata) -> None :
+    for dependency in dependencies :
+        dependency.provide_metadata(metadata)
+        str(dependency)
+
+if __name__ == "__main__" :
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    project = ProjectMetadata("benchmark","com.benchmark","1.0.0","com.benchmark")
+    metadata = ModuleMetadata(":app","com.benchmark.app",project)
+
+    results = {}
+    variants = (
+        ("unwrapped",_subclass("Plain",decorate=False)),
+        ("entry points only",_subclass("EntryPoints",ENTRY_POINTS)),
+        ("all methods",_subclass("AllMethods",None)),
+    )
+    for name, cls in variants :
+        dependencies = [cls(DependencyType.Implementation,f"com.example:artifact{i}:1.0.{i % 10}") for i in range(count)]
+        results[name] = min(timeit.repeat(lambda : _render(dependencies,metadata),number=1,repeat=5))
+
+    baseline = results["unwrapped"]
+    for name, elapsed in results.items() :
+        overhead = (elapsed - baseline) / (2 * count) * 1e9
+        print(f"{name:<20} {elapsed * 1000:8.1f} ms  {overhead:+7.1f} ns/call")
@@ -0,0 +1,72 @@
+"""
+Benchmarks the gradle.properties parser (`src.gradle.properties.load_properties`) against the previous
+`GradleProperties.from_file` implementation on large generated properties files.
+
+Run from the repository root:
+
+    python -m benchmarks.properties_parser [size in MB ...]
+"""
+import os
+import sys
+import tempfile
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from src.gradle import properties
+from src.gradle.properties import load_properties
+
+def legacy_parse(filepath : Path) -> OrderedDict[str,str] :
+    # The previous implementation, opened for reading (it used mode "w", which truncated the file)
+    values : OrderedDict[str,str] = OrderedDict()
+    with filepath.open("r") as file:
+        for line in file.readlines() :
+            if all([c.isspace() for c in line]) :
+                continue
+            key , value = line.split("=",1)
+            values[key.strip()] = value.strip()
+    return values
+
+def write_properties(filepath : Path,size : int) -> None :
+    """
+    Writes a `key=value` file of roughly `size` bytes, the shape of the files our CI injects.
+
+    It has no comments or continuations, which the legacy implementation cannot parse.
+    """
+    written = 0
+    index = 0
+    with open(filepath,"w",encoding="iso-8859-1") as file :
+        while written < size :
+            line = f"ci.build.injected.property.{index}=value-{index}-{'x' * (index % 40)}\n"
+            if index % 50 == 0 :
+                line = "\n" + line
+            file.write(line)
+            written += len(line)
+            index += 1
+
+def measure(name : str,function,*args) -> float :
+    start = time.perf_counter()
+    result = function(*args)
+    elapsed = time.perf_counter() - start
+    print(f"  {name:<24} {elapsed * 1000:9.1f} ms  ({len(result)} keys)")
+    return elapsed
+
+if __name__ == "__main__" :
+    sizes = [int(argument) for argument in sys.argv[1:]] or [10, 50]
+
+    with tempfile.TemporaryDirectory() as directory :
+        for size in sizes :
+            filepath = Path(directory) / "gradle.properties"
+            write_properties(filepath,size * 1024 * 1024)
+            print(f"{size} MB ({os.path.getsize(filepath)} bytes)")
+
+            legacy = measure("legacy",legacy_parse,filepath)
+
+            threshold = properties.MMAP_THRESHOLD
+            properties.MMAP_THRESHOLD = sys.maxsize
+            streamed = measure("streaming",load_properties,filepath)
+            properties.MMAP_THRESHOLD = 0
+            mapped = measure("memory-mapped",load_properties,filepath)
+            properties.MMAP_THRESHOLD = threshold
+
+            print(f"  speedup {legacy / streamed:.2f}x (streaming), {legacy / mapped:.2f}x (memory-mapped)")
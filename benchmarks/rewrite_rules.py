@@ -0,0 +1,47 @@
+"""
+Benchmarks compiling large rewrite rule tables (`src.gradle.rules.RewriteRules.from_table`) and matching
+coordinates against them.
+
+The generated tables mix every pattern shape: exact modules, artifact prefixes under one group (the shape that
+used to make compiling quadratic), group prefixes and group-wide rules.
+
+Run from the repository root:
+
+    python -m benchmarks.rewrite_rules [rules ...]
+"""
+import sys
+import time
+from typing import Any
+
+from src.gradle.rules import RewriteRules, RuleTarget
+
+def rule_table(count : int) -> list[dict[str,Any]] :
+    rows = []
+    for index in range(count) :
+        shape = index % 4
+        if shape == 0 :
+            match = f"com.example.g{index % 500}:artifact{index}"
+        elif shape == 1 :
+            match = f"com.example:artifact{index}-*"
+        elif shape == 2 :
+            match = f"org.example{index}.*"
+        else :
+            match = f"io.example.g{index}"
+        rows.append({"match" : match,"action" : "version","value" : "1.0"})
+    return rows
+
+if __name__ == "__main__" :
+    counts = [int(argument) for argument in sys.argv[1:]] or [10_000, 50_000]
+    for count in counts :
+        rows = rule_table(count)
+        start = time.perf_counter()
+        rules = RewriteRules.from_table(rows)
+        compiled = time.perf_counter() - start
+
+        coordinates = [(f"com.example.g{index % 500}", f"artifact{index}") for index in range(0,count,4)]
+        coordinates += [("com.example",f"artifact{index}-core") for index in range(1,count,4)]
+        start = time.perf_counter()
+        for group, artifact in coordinates :
+            rules.match(RuleTarget.Dependency,group,artifact)
+        matched = time.perf_counter() - start
+        print(f"{count:>8} rules  compile {compiled * 1000:8.1f} ms  match {matched / len(coordinates) * 1e6:6.2f} us/coordinate")
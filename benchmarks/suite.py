@@ -0,0 +1,249 @@
+"""
+Stage-by-stage benchmark suite of project generation on synthetic projects (see `benchmarks.synthetic`).
+
+Every scenario is timed per stage: construction of the project, `provide_metadata`, rendering of the
+`PluginGroup`s, `DependencyGroup`s and whole `ModuleBuildGradle`s, and writing the project to disk. Timings keep the
+best and the median of the repetitions; the peak memory of every stage is measured in a separate pass with
+`tracemalloc`, which would otherwise distort the timings.
+
+Results are stored as JSON baselines, and `compare` re-runs the scenarios of a baseline and fails (exit status 1)
+when a stage got slower than the allowed percentage.
+
+Run from the repository root:
+
+    python -m benchmarks.suite run [--scenario NAME ...] [--repeat N] [--output baseline.json]
+    python -m benchmarks.suite compare baseline.json [--threshold 10] [--memory-threshold PERCENT] [--output current.json]
+"""
+import argparse
+import gc
+import json
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+from benchmarks.synthetic import SyntheticParameters, provide_project_metadata, synthetic_project
+from src.project import GenericProject
+from src.utils import render_to_string
+
+BASELINE_VERSION = 1
+
+SCENARIOS : dict[str,SyntheticParameters] = {
+    "small" : SyntheticParameters(modules=10,dependencies=10,plugin_block_lines=10,metadata_depth=1),
+    "many-modules" : SyntheticParameters(modules=500,dependencies=20,plugin_block_lines=20,metadata_depth=2),
+    "many-dependencies" : SyntheticParameters(modules=20,dependencies=1000,plugin_block_lines=0,metadata_depth=1),
+    "large-plugin-blocks" : SyntheticParameters(modules=100,dependencies=10,plugin_block_lines=2000,metadata_depth=1),
+    "deep-metadata" : SyntheticParameters(modules=100,dependencies=50,plugin_block_lines=10,metadata_depth=32),
+}
+
+STAGES = ("construct","provide_metadata","render_plugins","render_dependencies","render_build_gradle","write")
+
+def _render_plugins(project : GenericProject) -> None :
+    for module in project.modules :
+        render_to_string(module.build_gradle.plugins)
+
+def _render_dependencies(project : GenericProject) -> None :
+    for module in project.modules :
+        render_to_string(module.build_gradle.dependencies)
+
+def _render_build_gradle(project : GenericProject) -> None :
+    for module in project.modules :
+        render_to_string(module.build_gradle)
+
+def _run_once(parameters : SyntheticParameters,directory : Path,measure : Callable[[str,Callable[[],Any]],Any]) -> None :
+    project = measure("construct",lambda : synthetic_project(parameters))
+    measure("provide_metadata",lambda : provide_project_metadata(project))
+    measure("render_plugins",lambda : _render_plugins(project))
+    measure("render_dependencies",lambda : _render_dependencies(project))
+    measure("render_build_gradle",lambda : _render_build_gradle(project))
+    measure("write",lambda : project.extend_generate_to_file(directory))
+
+def run_scenario(parameters : SyntheticParameters,repeat : int = 5,memory : bool = True) -> dict[str,dict[str,float]] :
+    """
+    Benchmarks every stage of generating a project shaped by `parameters`.
+
+    Returns:
+        dict: stage -> `{"min_s", "median_s", "peak_bytes"}` (`peak_bytes` only when `memory` is set).
+    """
+    timings : dict[str,list[float]] = {stage : [] for stage in STAGES}
+    peaks : dict[str,int] = {}
+
+    def timed(stage : str,function : Callable[[],Any]) -> Any :
+        start = time.perf_counter()
+        result = function()
+        timings[stage].append(time.perf_counter() - start)
+        return result
+
+    def traced(stage : str,function : Callable[[],Any]) -> Any :
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        result = function()
+        peaks[stage] = tracemalloc.get_traced_memory()[1] - baseline
+        return result
+
+    directory = Path(tempfile.mkdtemp(prefix="gradle-generator-benchmark-"))
+    try :
+        for _ in range(repeat) :
+            gc.collect()
+            _run_once(parameters,directory,timed)
+
+        if memory :
+            gc.collect()
+            tracemalloc.start()
+            try :
+                _run_once(parameters,directory,traced)
+            finally :
+                tracemalloc.stop()
+    finally :
+        shutil.rmtree(directory,ignore_errors=True)
+
+    results = {}
+    for stage in STAGES :
+        results[stage] = {"min_s" : min(timings[stage]),"median_s" : statistics.median(timings[stage])}
+        if stage in peaks :
+            results[stage]["peak_bytes"] = peaks[stage]
+    return results
+
+def run_suite(scenarios : dict[str,SyntheticParameters],repeat : int = 5,memory : bool = True) -> dict[str,Any] :
+    """
+    Runs every scenario and returns the results in the baseline format.
+    """
+    return {
+        "version" : BASELINE_VERSION,
+        "python" : platform.python_version(),
+        "platform" : platform.platform(),
+        "repeat" : repeat,
+        "scenarios" : {
+            name : {"parameters" : parameters.to_json(),"stages" : run_scenario(parameters,repeat,memory)}
+            for name, parameters in scenarios.items()
+        },
+    }
+
+def load_baseline(filepath : Path) -> dict[str,Any] :
+    with open(filepath,encoding="utf-8") as file :
+        baseline = json.load(file)
+    if baseline.get("version") != BASELINE_VERSION :
+        raise ValueError(f"{filepath} is not a version {BASELINE_VERSION} benchmark baseline")
+    return baseline
+
+def save_results(results : dict[str,Any],filepath : Path) -> None :
+    with open(filepath,"w",encoding="utf-8") as file :
+        json.dump(results,file,indent=2)
+        file.write("\n")
+
+class Regression :
+    """
+    A stage of a scenario that got slower (or bigger) than allowed.
+    """
+    scenario : str
+    stage : str
+    metric : str
+    baseline : float
+    current : float
+
+    def __init__(self,scenario : str,stage : str,metric : str,baseline : float,current : float) -> None:
+        self.scenario = scenario
+        self.stage = stage
+        self.metric = metric
+        self.baseline = baseline
+        self.current = current
+
+    def change(self) -> float :
+        return (self.current - self.baseline) / self.baseline * 100
+
+    def __str__(self) -> str :
+        return f"{self.scenario}/{self.stage}: {self.metric} {self.baseline:.6g} -> {self.current:.6g} ({self.change():+.1f}%)"
+
+def compare(baseline : dict[str,Any],current : dict[str,Any],threshold : float = 10.0,memory_threshold : Optional[float] = None,metric : str = "min_s") -> list[Regression] :
+    """
+    Compares `current` results with a `baseline`, scenario by scenario and stage by stage.
+
+    Args:
+        threshold (float): Allowed slowdown of `metric` in percent.
+        memory_threshold (Optional[float]): Allowed growth of the peak memory in percent, `None` to ignore memory.
+        metric (str): The timing compared, `"min_s"` (least noisy) or `"median_s"`.
+
+    Returns:
+        list[Regression]: The regressions beyond the thresholds, empty if there are none.
+    """
+    checks = [(metric,threshold)]
+    if memory_threshold is not None :
+        checks.append(("peak_bytes",memory_threshold))
+
+    regressions = []
+    for name, scenario in current["scenarios"].items() :
+        stages = baseline["scenarios"].get(name,{}).get("stages",{})
+        for stage, values in scenario["stages"].items() :
+            for key, allowed in checks :
+                before = stages.get(stage,{}).get(key)
+                after = values.get(key)
+                if not before or after is None :
+                    continue
+                if (after - before) / before * 100 > allowed :
+                    regressions.append(Regression(name,stage,key,before,after))
+    return regressions
+
+def format_results(results : dict[str,Any],baseline : Optional[dict[str,Any]] = None) -> str :
+    lines = [f"{'scenario':<22} {'stage':<22} {'min ms':>10} {'median ms':>10} {'peak KiB':>10} {'change':>8}"]
+    for name, scenario in results["scenarios"].items() :
+        previous = {} if baseline is None else baseline["scenarios"].get(name,{}).get("stages",{})
+        for stage, values in scenario["stages"].items() :
+            before = previous.get(stage,{}).get("min_s")
+            change = f"{(values['min_s'] - before) / before * 100:+.1f}%" if before else ""
+            peak = values.get("peak_bytes")
+            lines.append(
+                f"{name:<22} {stage:<22} {values['min_s'] * 1000:>10.2f} {values['median_s'] * 1000:>10.2f} "
+                f"{'' if peak is None else f'{peak / 1024:.0f}':>10} {change:>8}"
+            )
+    return "\n".join(lines)
+
+def _arguments(arguments : Optional[list[str]] = None) -> argparse.Namespace :
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.suite",description="Benchmarks project generation stage by stage.")
+    commands = parser.add_subparsers(dest="command",required=True)
+
+    run = commands.add_parser("run",help="Run the scenarios and optionally store the results as a baseline.")
+    run.add_argument("--scenario",action="append",choices=sorted(SCENARIOS),help="Scenario to run (default: all).")
+
+    check = commands.add_parser("compare",help="Re-run the scenarios of a baseline and fail on regressions.")
+    check.add_argument("baseline",type=Path)
+    check.add_argument("--threshold",type=float,default=10.0,help="Allowed slowdown per stage in percent (default: 10).")
+    check.add_argument("--memory-threshold",type=float,default=None,help="Allowed peak memory growth per stage in percent.")
+    check.add_argument("--metric",choices=("min_s","median_s"),default="min_s")
+
+    for command in (run,check) :
+        command.add_argument("--repeat",type=int,default=5)
+        command.add_argument("--no-memory",action="store_true",help="Skip the peak memory pass.")
+        command.add_argument("--output",type=Path,help="Write the results to this JSON file.")
+
+    return parser.parse_args(arguments)
+
+def main(arguments : Optional[list[str]] = None) -> int :
+    options = _arguments(arguments)
+
+    if options.command == "run" :
+        names = options.scenario or list(SCENARIOS)
+        results = run_suite({name : SCENARIOS[name] for name in names},options.repeat,not options.no_memory)
+        print(format_results(results))
+        if options.output is not None :
+            save_results(results,options.output)
+        return 0
+
+    baseline = load_baseline(options.baseline)
+    scenarios = {name : SyntheticParameters.from_json(scenario["parameters"]) for name, scenario in baseline["scenarios"].items()}
+    results = run_suite(scenarios,options.repeat,not options.no_memory)
+    print(format_results(results,baseline))
+    if options.output is not None :
+        save_results(results,options.output)
+
+    regressions = compare(baseline,results,options.threshold,options.memory_threshold,options.metric)
+    for regression in regressions :
+        print(f"REGRESSION {regression}",file=sys.stderr)
+    return 1 if regressions else 0
+
+if __name__ == "__main__" :
+    sys.exit(main())
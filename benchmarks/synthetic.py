@@ -0,0 +1,151 @@
+"""
+Generators of synthetic `GenericProject`s used by the benchmark suite (see `benchmarks.suite`).
+
+Projects are fully deterministic for a given set of parameters, so timings of two runs (or of a run and a stored
+baseline) measure the same work.
+"""
+from pathlib import Path
+from typing import Any, Iterator
+
+from src.core import FileConvertible
+from src.gradle.buildgradle import ModuleBuildGradle
+from src.gradle.dependency import Dependency, DependencyGroup, DependencyType
+from src.gradle.plugin import Plugin, PluginGroup, PluginWithCodeBlock, id, kotlin
+from src.gradle.properties import GradleProperties
+from src.gradle.repository import MavenCentral, MavenLocal, Repositories
+from src.gradle.settingsgradle import DependencyResolutionManagement, PluginManagement, SettingsGradle
+from src.metadata import GradleMetadata, ModuleMetadata, ProjectMetadata
+from src.module import Module
+from src.project import GenericProject
+from src.project.local import LocalProperties
+
+class SyntheticParameters :
+    """
+    Shape of a synthetic project.
+
+    Attributes:
+        modules (int): Number of modules.
+        dependencies (int): Dependencies declared by every module.
+        plugin_block_lines (int): Lines of the code block attached to the Kotlin plugin of every module, `0` to not
+            attach one.
+        metadata_depth (int): Number of metadata layers between the project and every module. The outermost layer
+            carries the `dependencies/...` overrides looked up by `provide_metadata`, so deeper hierarchies make
+            every lookup walk a longer parent chain.
+    """
+    modules : int
+    dependencies : int
+    plugin_block_lines : int
+    metadata_depth : int
+
+    def __init__(self,modules : int = 10,dependencies : int = 10,plugin_block_lines : int = 10,metadata_depth : int = 1) -> None:
+        self.modules = modules
+        self.dependencies = dependencies
+        self.plugin_block_lines = plugin_block_lines
+        self.metadata_depth = max(1,metadata_depth)
+
+    def to_json(self) -> dict[str,int] :
+        return {
+            "modules" : self.modules,
+            "dependencies" : self.dependencies,
+            "plugin_block_lines" : self.plugin_block_lines,
+            "metadata_depth" : self.metadata_depth,
+        }
+
+    @classmethod
+    def from_json(cls,data : dict[str,Any]) -> 'SyntheticParameters' :
+        return cls(**{key : int(value) for key, value in data.items()})
+
+class LayerMetadata(GradleMetadata) :
+    """
+    An intermediate metadata scope (e.g. a group of modules) of a synthetic project.
+    """
+    def __init__(self,identifier : str,parent : GradleMetadata) -> None:
+        super().__init__(parent)
+        self.identifier = identifier
+
+    def get_identifier(self) -> str:
+        return self.identifier
+
+class SyntheticModule(Module) :
+    """
+    A module consisting of a single `build.gradle.kts`.
+    """
+    def __init__(self,metadata : ModuleMetadata,build_gradle : ModuleBuildGradle) -> None:
+        self.metadata = metadata
+        self.build_gradle = build_gradle
+
+    def get_identifier(self) -> str:
+        return self.metadata.get_identifier()
+
+    def provide_metadata(self, metadata: GradleMetadata) -> None:
+        self.build_gradle.provide_metadata(metadata)
+
+    def output_files(self, filepath: Path) -> Iterator[tuple[Path, FileConvertible]]:
+        yield from self.build_gradle.output_files(filepath)
+
+    def generate_to_file(self, filepath: Path) -> None:
+        self.build_gradle.generate_to_file(filepath)
+
+def _pin_version(dependency : Dependency,metadata : GradleMetadata,version : str) -> None :
+    coordinate = dependency.coordinate
+    dependency.dependency = f"{coordinate.group}:{coordinate.artifact}:{version}"
+
+def _plugin_block(lines : int) -> str :
+    body = "\n".join(f"        option{line} = \"value{line}\"" for line in range(lines))
+    return f"kotlin {{\n    jvmToolchain(17)\n    sourceSets {{\n{body}\n    }}\n}}\n"
+
+def _dependencies(index : int,count : int) -> list[Dependency] :
+    # Half of the artifacts are shared by every module, like common libraries in real projects
+    dependencies = []
+    for number in range(count) :
+        artifact = f"common{number}" if number % 2 == 0 else f"module{index}-lib{number}"
+        type = DependencyType.Api if number % 5 == 0 else DependencyType.Implementation
+        dependencies.append(Dependency(type,f"com.synthetic:{artifact}:1.{number}.0",_pin_version))
+    return dependencies
+
+def synthetic_project(parameters : SyntheticParameters) -> GenericProject :
+    """
+    Builds a project shaped by `parameters`, without providing metadata to it.
+    """
+    project_metadata = ProjectMetadata("synthetic","com.synthetic","1.0.0","com.synthetic")
+
+    overrides = LayerMetadata("dependencies",project_metadata)
+    for number in range(0,parameters.dependencies,2) :
+        overrides.metadata[f"com.synthetic:common{number}:1.{number}.0"] = f"1.{number}.1"
+
+    parent : GradleMetadata = overrides
+    for layer in range(1,parameters.metadata_depth) :
+        parent = LayerMetadata(f"layer-{layer}",parent)
+
+    block = _plugin_block(parameters.plugin_block_lines) if parameters.plugin_block_lines > 0 else None
+    modules = []
+    for index in range(parameters.modules) :
+        name = f":module{index}"
+        metadata = ModuleMetadata(name,ModuleMetadata.namespace_from(project_metadata,name),parent)
+
+        plugins : list[Plugin] = [id("com.android.library"),id("org.jetbrains.kotlin.android","2.0.0")]
+        if block is not None :
+            multiplatform = PluginWithCodeBlock(kotlin("multiplatform"))
+            multiplatform.code = block
+            plugins.append(multiplatform)
+
+        build_gradle = ModuleBuildGradle(PluginGroup(plugins),DependencyGroup(_dependencies(index,parameters.dependencies)))
+        build_gradle.module_metadata = metadata
+        modules.append(SyntheticModule(metadata,build_gradle))
+
+    settings_gradle = SettingsGradle(
+        PluginManagement(Repositories([MavenCentral()])),
+        DependencyResolutionManagement(Repositories([MavenCentral(),MavenLocal()])),
+        [module.metadata for module in modules],
+        project_metadata,
+    )
+    properties = GradleProperties({"org.gradle.jvmargs" : "-Xmx2048m","kotlin.code.style" : "official"})
+
+    return GenericProject(project_metadata,settings_gradle,properties,LocalProperties(),modules)
+
+def provide_project_metadata(project : GenericProject) -> None :
+    """
+    Provides every module of `project` with its metadata, the way generators do before rendering.
+    """
+    for module in project.modules :
+        module.provide_metadata(module.metadata)
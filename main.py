@@ -0,0 +1,361 @@
+"""
+Command-line entry point of the generator.
+
+    python main.py generate SPEC OUTPUT [--mode plain|parallel|incremental|transactional] [--trace trace.json] [--plan-cache DIRECTORY] [--fill-versions [REPOSITORY]]
+    python main.py generate SPEC ARCHIVE|- --archive zip|tar|tar.gz [--prefix NAME]
+    python main.py validate SPEC [--file gradle.properties ...]
+    python main.py diff SPEC DIRECTORY [--stat]
+    python main.py batch SPEC_FILE [--root DIRECTORY] [--jobs N] [--chunksize N] [--plan-cache DIRECTORY]
+    python main.py serve BUILDER [--template REFERENCE] [--host 127.0.0.1] [--port 8080] [--cache-mb 256] [--plan-cache DIRECTORY]
+    python main.py bench ...
+    python main.py startup [--budget-ms 25]
+
+`SPEC` points at a `GenericProject` (or a function without arguments returning one) as `path/to/script.py[:name]` or
+`package.module[:name]`, `name` defaulting to `project`.
+
+The CLI is called from CI loops and editor hooks, so start-up time matters: importing this module only costs `sys`,
+while `argparse`, `pathlib`, `typing`, `src.gradle.*`, `src.project`, the tracing and the benchmarks are imported by
+the code that uses them (annotations are quoted for that reason). `startup` checks that this stays true and that
+importing the CLI fits in a budget.
+"""
+import sys
+
+TYPE_CHECKING = False
+if TYPE_CHECKING :
+    import argparse
+    from pathlib import Path
+    from typing import Any, Optional
+
+# Start-up budget of `import main` in milliseconds, excluding the interpreter's own start-up
+IMPORT_BUDGET_MS = 25.0
+
+# Packages and modules that must not be imported before a subcommand needs them
+LAZY_PACKAGES = ("src", "benchmarks", "argparse", "pathlib", "typing")
+
+class CliError(Exception):
+    """Exception raised for invalid command-line input, reported without a traceback."""
+    pass
+
+def load_project(spec : str) -> 'Any' :
+    """
+    Loads the project `spec` points at (see the module documentation).
+
+    Raises:
+        CliError: If the script or module cannot be found, or does not define the project.
+    """
+    from src.utils import load_reference
+
+    try :
+        project = load_reference(spec,"project")
+    except ImportError as error :
+        raise CliError(str(error)) from error
+    if callable(project) :
+        project = project()
+
+    from src.project import GenericProject
+    if not isinstance(project,GenericProject) :
+        raise CliError(f"{spec} is a {type(project).__name__}, not a GenericProject")
+    return project
+
+def render_project(project : 'Any',root : 'Path') -> 'tuple[dict[Path,str],list[tuple[str,Exception]]]' :
+    """
+    Renders every file of `project` in memory, as if it was generated into `root`.
+
+    Returns:
+        The rendered files (path -> content) and the `(target, error)` pairs of the targets that failed.
+    """
+    from pathlib import Path
+    from src.project.graph import ModuleGraphError
+    from src.utils import render_to_string
+
+    files : dict[Path,str] = {}
+    errors : list[tuple[str,Exception]] = []
+    try :
+        targets = list(project.generation_targets(root))
+    except ModuleGraphError as error :
+        return files, [("module graph",error)]
+
+    for target, directory in targets :
+        try :
+            for path, node in target.output_files(directory) :
+                files[Path(path)] = render_to_string(node)
+        except Exception as error :
+            errors.append((getattr(target,"FILE_NAME",None) or type(target).__name__,error))
+    return files, errors
+
+def _generate(options : 'argparse.Namespace') -> int :
+    tracer = None
+    if options.trace is not None :
+        from src.tracing import enable_tracing
+        tracer = enable_tracing()
+
+    index = None
+    try :
+        if options.fill_versions is not None :
+            from src.gradle.localrepository import LocalRepositoryIndex
+            index = LocalRepositoryIndex(options.fill_versions or None)
+
+        if options.plan_cache is not None :
+            from src.plan import PlanCache, reference_digest
+            spec = {"spec" : options.spec,"source" : reference_digest(options.spec)}
+            if index is not None :
+                # Plans are compiled with the filled-in versions, a change of the local repository recompiles them
+                spec["maven"] = [str(index.repository),index.revision()]
+            project = PlanCache(options.plan_cache).get_or_compile(spec,lambda : _load_with_index(options.spec,index))
+        else :
+            project = _load_with_index(options.spec,index)
+
+        # Plans have no object tree left to render in parallel, they are written sequentially
+        if options.archive is not None :
+            _write_archive(project,options)
+        elif options.mode == "parallel" and options.plan_cache is None :
+            project.parallel_generate_to_file(options.output,max_workers=options.jobs).raise_for_errors()
+        elif options.mode == "incremental" :
+            print(project.incremental_generate_to_file(options.output))
+        elif options.mode == "transactional" :
+            project.transactional_generate_to_file(options.output)
+        else :
+            project.extend_generate_to_file(options.output)
+    finally :
+        if index is not None :
+            index.close()
+        if tracer is not None :
+            from src.tracing import disable_tracing
+            disable_tracing()
+            tracer.write_chrome_trace(options.trace)
+            print(tracer.format_summary(limit=20),file=sys.stderr)
+
+    return 0
+
+def _load_with_index(spec : str,index : 'Any') -> 'Any' :
+    project = load_project(spec)
+    if index is not None :
+        project.version_index = index
+    return project
+
+def _write_archive(project : 'Any',options : 'argparse.Namespace') -> None :
+    if str(options.output) == "-" :
+        project.write_archive(sys.stdout.buffer,options.archive,options.prefix)
+        sys.stdout.buffer.flush()
+        return
+    with open(options.output,"wb") as sink :
+        project.write_archive(sink,options.archive,options.prefix)
+
+def _validate(options : 'argparse.Namespace') -> int :
+    from pathlib import Path
+
+    failures = 0
+
+    if options.spec is not None :
+        project = load_project(options.spec)
+        files, errors = render_project(project,Path(options.root))
+        for target, error in errors :
+            print(f"{target}: {error}",file=sys.stderr)
+        failures += len(errors)
+        print(f"{len(files)} files rendered, {len(errors)} failed")
+
+    for path in options.file :
+        try :
+            _parse_file(Path(path))
+        except Exception as error :
+            print(f"{path}: {error}",file=sys.stderr)
+            failures += 1
+
+    return 1 if failures else 0
+
+def _parse_file(path : 'Path') -> None :
+    if path.name == "libs.versions.toml" or path.suffix == ".toml" :
+        from src.gradle.catalog import VersionCatalog
+        VersionCatalog.from_file(path)
+    elif path.suffix == ".properties" :
+        from src.gradle.properties import load_properties
+        load_properties(path)
+    elif path.name == "settings.gradle.kts" :
+        from src.gradle.settingsgradle import SettingsGradle
+        SettingsGradle.from_file(path)
+    elif path.name.endswith(".gradle.kts") :
+        from src.gradle.buildgradle import ModuleBuildGradle
+        ModuleBuildGradle.from_file(path)
+    else :
+        raise CliError(f"Do not know how to validate {path.name}")
+
+def _diff(options : 'argparse.Namespace') -> int :
+    import difflib
+    from pathlib import Path
+
+    root = Path(options.directory)
+    project = load_project(options.spec)
+    files, errors = render_project(project,root)
+    for target, error in errors :
+        print(f"{target}: {error}",file=sys.stderr)
+
+    changed = 0
+    for path, content in files.items() :
+        relative = path.relative_to(root).as_posix()
+        try :
+            current = path.read_text(encoding="utf-8")
+        except FileNotFoundError :
+            current = None
+
+        if current == content :
+            continue
+        changed += 1
+        if options.stat :
+            print(f"{'added' if current is None else 'changed':<8} {relative}")
+            continue
+        sys.stdout.writelines(difflib.unified_diff(
+            [] if current is None else current.splitlines(keepends=True),
+            content.splitlines(keepends=True),
+            "/dev/null" if current is None else f"a/{relative}",
+            f"b/{relative}",
+        ))
+
+    return 1 if changed or errors else 0
+
+def _batch(options : 'argparse.Namespace') -> int :
+    from src.project.batch import BatchSpec, BatchSpecError, generate_batch
+
+    try :
+        spec = BatchSpec.from_file(options.spec)
+        report = generate_batch(spec,options.root,options.jobs,options.chunksize,options.mode,options.plan_cache)
+    except BatchSpecError as error :
+        raise CliError(str(error)) from error
+
+    print(report)
+    if options.verbose :
+        for result in report.failures() :
+            print(f"[{result.index}] {result.output}\n{result.error}",file=sys.stderr)
+    return 0 if report.succeeded() else 1
+
+def _serve(options : 'argparse.Namespace') -> int :
+    from src.service import serve
+
+    try :
+        print(f"Serving {options.builder} on http://{options.host}:{options.port}",file=sys.stderr)
+        serve(options.builder,options.template,options.host,options.port,int(options.cache_mb * (1 << 20)),options.plan_cache)
+    except ImportError as error :
+        raise CliError(str(error)) from error
+    return 0
+
+def _bench(options : 'argparse.Namespace') -> int :
+    from benchmarks.suite import main as bench
+    return bench(options.arguments)
+
+def measure_startup(repeat : int = 5) -> tuple[float,list[str]] :
+    """
+    Measures the time `import main` takes in fresh interpreters with `-X importtime`.
+
+    Only the CLI's own imports are counted: the modules the interpreter loads before running any code (`encodings`,
+    `site` and what it imports) are not, whatever the platform.
+
+    Returns:
+        The best import time in milliseconds and the lazily loaded packages that were nevertheless imported.
+    """
+    import os
+    import subprocess
+
+    best = None
+    eager : list[str] = []
+    for _ in range(repeat) :
+        completed = subprocess.run(
+            [sys.executable,"-X","importtime","-c","import main"],
+            capture_output=True,text=True,check=True,cwd=os.path.dirname(os.path.abspath(__file__)),
+        )
+        # A module is reported once it is imported, after the modules it imports
+        nested : list[str] = []
+        for line in completed.stderr.splitlines() :
+            if not line.startswith("import time:") or "|" not in line :
+                continue
+            _, cumulative, module = line.split("|")
+            if not cumulative.strip().isdigit() :
+                continue
+            if module.startswith("   ") :
+                nested.append(module.strip())
+                continue
+            if module.strip() == "main" :
+                best = int(cumulative) if best is None else min(best,int(cumulative))
+                eager += [name for name in nested if name.split(".")[0] in LAZY_PACKAGES]
+            nested = []
+
+    if best is None :
+        raise CliError("`import main` was not reported by -X importtime")
+    return best / 1000, sorted(set(eager))
+
+def _startup(options : 'argparse.Namespace') -> int :
+    milliseconds, eager = measure_startup(options.repeat)
+    print(f"CLI import time: {milliseconds:.2f} ms (budget {options.budget_ms:.2f} ms)")
+    for module in eager :
+        print(f"{module} is imported at start-up, it must be loaded lazily",file=sys.stderr)
+    return 1 if eager or milliseconds > options.budget_ms else 0
+
+def _arguments(arguments : 'Optional[list[str]]' = None) -> 'argparse.Namespace' :
+    import argparse
+    from pathlib import Path
+
+    parser = argparse.ArgumentParser(prog="main.py",description="Generates Gradle projects.")
+    commands = parser.add_subparsers(dest="command",required=True)
+
+    generate = commands.add_parser("generate",help="Generate a project into a directory.")
+    generate.add_argument("spec",help="path/to/script.py[:name] or package.module[:name] of the project.")
+    generate.add_argument("output",type=Path)
+    generate.add_argument("--mode",choices=("plain","parallel","incremental","transactional"),default="plain")
+    generate.add_argument("--jobs",type=int,default=None,help="Workers of --mode parallel.")
+    generate.add_argument("--trace",type=Path,default=None,help="Write a Chrome trace of the generation to this file.")
+    generate.add_argument("--plan-cache",type=Path,default=None,help="Reuse the compiled project from this cache directory while the spec script is unchanged.")
+    generate.add_argument("--archive",choices=("zip","tar","tar.gz"),default=None,help="Stream the project into an archive written to OUTPUT (- for stdout) instead of a directory.")
+    generate.add_argument("--prefix",default="",help="Directory the project is put in inside the archive (default: none).")
+    generate.add_argument("--fill-versions",nargs="?",const="",default=None,metavar="REPOSITORY",help="Fill in dependency versions left out or declared as latest from a local Maven repository (default: ~/.m2/repository).")
+    generate.set_defaults(handler=_generate)
+
+    validate = commands.add_parser("validate",help="Render a project in memory and/or parse existing files.")
+    validate.add_argument("spec",nargs="?",default=None)
+    validate.add_argument("--root",type=Path,default=Path("."),help="Directory the project is rendered for (default: .).")
+    validate.add_argument("--file",action="append",default=[],help="A .properties, .toml or .gradle.kts file to parse.")
+    validate.set_defaults(handler=_validate)
+
+    diff = commands.add_parser("diff",help="Show how generating the project would change a directory.")
+    diff.add_argument("spec")
+    diff.add_argument("directory",type=Path)
+    diff.add_argument("--stat",action="store_true",help="Only list the added and changed files.")
+    diff.set_defaults(handler=_diff)
+
+    batch = commands.add_parser("batch",help="Generate the projects of a JSON or Python batch spec across processes.")
+    batch.add_argument("spec",type=Path)
+    batch.add_argument("--root",type=Path,default=Path("."),help="Directory the project outputs are relative to (default: .).")
+    batch.add_argument("--mode",choices=("plain","incremental","transactional"),default="plain")
+    batch.add_argument("--jobs",type=int,default=None,help="Worker processes (default: one per CPU).")
+    batch.add_argument("--chunksize",type=int,default=None,help="Projects sent to a worker at once.")
+    batch.add_argument("--plan-cache",type=Path,default=None,help="Reuse the compiled projects from this cache directory.")
+    batch.add_argument("--verbose",action="store_true",help="Print the traceback of every failed project.")
+    batch.set_defaults(handler=_batch)
+
+    serve = commands.add_parser("serve",help="Serve archived projects over HTTP, built from JSON specs by a builder function.")
+    serve.add_argument("builder",help="path/to/script.py:name or package.module:name of a builder(spec, template) function.")
+    serve.add_argument("--template",default=None,help="Reference of a function loading the template shared by every project.")
+    serve.add_argument("--host",default="127.0.0.1")
+    serve.add_argument("--port",type=int,default=8080)
+    serve.add_argument("--cache-mb",type=float,default=256.0,help="Memory the cached plans and archives may take (default: 256).")
+    serve.add_argument("--plan-cache",type=Path,default=None,help="Also load and store the compiled projects in this cache directory.")
+    serve.set_defaults(handler=_serve)
+
+    bench = commands.add_parser("bench",help="Run the benchmark suite (see benchmarks/suite.py).")
+    bench.add_argument("arguments",nargs=argparse.REMAINDER)
+    bench.set_defaults(handler=_bench)
+
+    startup = commands.add_parser("startup",help="Check the start-up time of this CLI against a budget.")
+    startup.add_argument("--budget-ms",type=float,default=IMPORT_BUDGET_MS)
+    startup.add_argument("--repeat",type=int,default=5)
+    startup.set_defaults(handler=_startup)
+
+    return parser.parse_args(arguments)
+
+def main(arguments : 'Optional[list[str]]' = None) -> int :
+    options = _arguments(arguments)
+    try :
+        return options.handler(options)
+    except CliError as error :
+        print(f"error: {error}",file=sys.stderr)
+        return 2
+
+if __name__ == "__main__" :
+    sys.exit(main())
@@ -0,0 +1,99 @@
+import asyncio
+import os
+from concurrent.futures import Executor
+from pathlib import Path
+from typing import Any, Callable, Iterable, Optional
+
+from src.core import lists_output_files
+from src.utils import open_output, render_to_string
+
+def _write_file(path : Path,data : str) -> None :
+    os.makedirs(os.path.dirname(path) or ".",exist_ok=True)
+    with open_output(path) as file :
+        file.write(data)
+
+def _generate_to_file(target : Any,directory : Path) -> None :
+    os.makedirs(directory,exist_ok=True)
+    target.generate_to_file(directory)
+
+class AsyncWriter :
+    """
+    Runs the blocking side of async generation (file writes, `generate_to_file` of nodes that cannot be rendered on
+    the event loop) on an executor, with at most `max_pending` operations submitted at a time.
+
+    `submit` waits for a free slot before handing an operation to the executor, so a producer rendering faster than
+    the disk writes is slowed down instead of queueing every file of a project in memory. Share one writer between
+    concurrent generations to bound the total number of writes in flight; a writer belongs to one event loop.
+
+    Attributes:
+        max_pending (int): Operations submitted to the executor and not finished yet.
+        executor (Optional[Executor]): Where the operations run, the loop's default executor if `None`.
+    """
+    max_pending : int
+    executor : Optional[Executor]
+
+    def __init__(self,max_pending : int = 16,executor : Optional[Executor] = None) -> None:
+        if max_pending < 1 :
+            raise ValueError("max_pending must be at least 1")
+        self.max_pending = max_pending
+        self.executor = executor
+        self._slots = asyncio.Semaphore(max_pending)
+
+    async def submit(self,function : Callable[...,Any],*args : Any) -> asyncio.Future :
+        """
+        Waits for a free slot and runs `function(*args)` on the executor.
+
+        Returns:
+            asyncio.Future: The running operation, the slot is released when it finishes.
+        """
+        await self._slots.acquire()
+        try :
+            future = asyncio.get_running_loop().run_in_executor(self.executor,function,*args)
+        except BaseException :
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _ : self._slots.release())
+        return future
+
+    async def write(self,path : Path,data : str) -> asyncio.Future :
+        """
+        Waits for a free slot and writes `data` to `path` (creating its directory) on the executor.
+        """
+        return await self.submit(_write_file,path,data)
+
+async def wait_all(pending : list[asyncio.Future]) -> None :
+    """
+    Waits for every operation of `pending`. If one fails or the caller is cancelled, the operations that did not
+    start yet are cancelled (those already running on the executor finish, but no new one starts).
+    """
+    try :
+        await asyncio.gather(*pending)
+    except BaseException :
+        for future in pending :
+            future.cancel()
+        raise
+
+async def generate_async(targets : Iterable[tuple[Any,Path]],writer : AsyncWriter) -> None :
+    """
+    Generates `(FileConvertible, directory)` pairs (see `GenericProject.generation_targets`): the files listed by
+    `output_files` are rendered on the event loop, one at a time with a pause in between so other tasks keep
+    running, and written through `writer`; targets that do not list their files (see `lists_output_files`) are
+    generated with `generate_to_file` on the writer's executor.
+
+    Cancelling the call stops it from submitting more work, operations already running on the executor finish.
+    """
+    pending : list[asyncio.Future] = []
+    try :
+        for target, directory in targets :
+            if not lists_output_files(target) :
+                # Listing would generate the files into a staging directory on the loop, generate them directly instead
+                pending.append(await writer.submit(_generate_to_file,target,directory))
+                continue
+            for path, node in target.output_files(directory) :
+                pending.append(await writer.write(path,render_to_string(node)))
+                await asyncio.sleep(0)
+    except BaseException :
+        for future in pending :
+            future.cancel()
+        raise
+    await wait_all(pending)
@@ -0,0 +1,163 @@
+import io
+import re
+import shutil
+import tarfile
+import time
+import zipfile
+from pathlib import Path
+from typing import Any, BinaryIO, Iterable, Literal, Optional
+
+from src.tracing import trace
+from src.utils import render_to
+
+ArchiveFormat = Literal["zip", "tar", "tar.gz"]
+
+ARCHIVE_FORMATS = ("zip", "tar", "tar.gz")
+
+# Characters an extracting tool could read as something else than a path, control characters break HTTP headers too
+_UNSAFE = re.compile(r'[\x00-\x1f\x7f\\]')
+
+class ArchiveError(Exception):
+    pass
+
+def check_prefix(prefix : str) -> str :
+    """
+    Returns `prefix` without its trailing `/`, the directory entries are put in.
+
+    Raises:
+        ArchiveError: If `prefix` is absolute, has a `..` segment or a control character or backslash, entries
+            would be extracted outside of the extraction directory.
+    """
+    prefix = prefix.rstrip("/")
+    if prefix.startswith("/") or re.match(r'[A-Za-z]:',prefix) :
+        raise ArchiveError(f"The archive prefix {prefix!r} must be a relative path")
+    _check_path(prefix)
+    return prefix
+
+def _check_path(path : str) -> None :
+    if _UNSAFE.search(path) :
+        raise ArchiveError(f"The archive path {path!r} has a control character or backslash")
+    if ".." in path.split("/") :
+        raise ArchiveError(f"The archive path {path!r} leaves the archive root")
+
+class ArchiveWriter :
+    """
+    Streams files into a zip or tar archive written to `sink`, any binary file object: an open file, `io.BytesIO`,
+    a pipe or an HTTP response body. Nothing is written to the file system and `sink` does not need to be seekable.
+
+    Zip entries are rendered straight into the compressor (`render_to` through the entry stream), so the first bytes
+    reach `sink` while the first file is still being rendered. Tar headers need the size of the entry up front, so
+    every tar entry is rendered in memory first; memory use is bounded by the largest file, not the project.
+
+    Example:
+        >>> with ArchiveWriter(response,"zip",prefix="demo") as archive :
+        ...     for path, node in project.output_files(Path()) :
+        ...         archive.add(path.as_posix(),node)
+
+    Attributes:
+        format (ArchiveFormat): `"zip"`, `"tar"` or `"tar.gz"`.
+        prefix (str): Directory every entry is put in (e.g. the project name), `""` for none. It must be a relative
+            path without `..` segments (see `check_prefix`).
+        timestamp (float): Modification time of every entry, the current time by default.
+        count (int): Entries written so far.
+    """
+    format : ArchiveFormat
+    prefix : str
+    timestamp : float
+    count : int
+
+    def __init__(self,sink : BinaryIO,format : ArchiveFormat = "zip",prefix : str = "",timestamp : Optional[float] = None) -> None:
+        if format not in ARCHIVE_FORMATS :
+            raise ArchiveError(f"Unknown archive format {format!r}, expected one of {', '.join(ARCHIVE_FORMATS)}")
+        self.format = format
+        self.prefix = check_prefix(prefix)
+        # Zip timestamps cannot predate 1980
+        self.timestamp = max(timestamp if timestamp is not None else time.time(),315532800.0)
+        self.count = 0
+
+        if format == "zip" :
+            self._zip = zipfile.ZipFile(sink,"w",compression=zipfile.ZIP_DEFLATED)
+            self._tar = None
+        else :
+            self._zip = None
+            self._tar = tarfile.open(fileobj=sink,mode="w|gz" if format == "tar.gz" else "w|",format=tarfile.PAX_FORMAT)
+
+    def _name(self,path : str) -> str :
+        path = path.lstrip("/")
+        _check_path(path)
+        return f"{self.prefix}/{path}" if self.prefix else path
+
+    def add(self,path : str,node : Any,mode : int = 0o644) -> None :
+        """
+        Renders `node` (a `FileConvertible`, any node `render_to` accepts, or a string) as the entry `path`.
+        """
+        name = self._name(path)
+        if self._zip is not None :
+            with self._zip.open(self._zip_info(name,mode),"w") as entry :
+                with io.TextIOWrapper(entry,encoding="utf-8",newline="") as text :
+                    render_to(node,text)
+        else :
+            text = io.StringIO()
+            render_to(node,text)
+            self._add_tar(name,mode,io.BytesIO(text.getvalue().encode("utf-8")))
+        self.count += 1
+
+    def add_file(self,path : str,source : Path,mode : int = 0o644) -> None :
+        """
+        Copies the file at `source` as the entry `path` (e.g. the Gradle wrapper scripts, with `mode=0o755`).
+        """
+        name = self._name(path)
+        with open(source,"rb") as file :
+            if self._zip is not None :
+                with self._zip.open(self._zip_info(name,mode),"w") as entry :
+                    shutil.copyfileobj(file,entry)
+            else :
+                self._add_tar(name,mode,file)
+        self.count += 1
+
+    def _zip_info(self,name : str,mode : int) -> zipfile.ZipInfo :
+        info = zipfile.ZipInfo(name,time.localtime(self.timestamp)[:6])
+        info.compress_type = zipfile.ZIP_DEFLATED
+        # Unix permissions of a regular file, read by `unzip` and Gradle's own unzipping
+        info.external_attr = (0o100000 | mode) << 16
+        info.create_system = 3
+        return info
+
+    def _add_tar(self,name : str,mode : int,content : BinaryIO) -> None :
+        info = tarfile.TarInfo(name)
+        content.seek(0,io.SEEK_END)
+        info.size = content.tell()
+        content.seek(0)
+        info.mode = mode
+        info.mtime = int(self.timestamp)
+        self._tar.addfile(info,content)
+
+    def close(self) -> None :
+        if self._zip is not None :
+            self._zip.close()
+        else :
+            self._tar.close()
+
+    def __enter__(self) -> 'ArchiveWriter' :
+        return self
+
+    def __exit__(self,*exc_info) -> None :
+        self.close()
+
+def write_archive(files : Iterable[tuple[Path,Any]],assets : Iterable[Any],sink : BinaryIO,format : ArchiveFormat = "zip",prefix : str = "",timestamp : Optional[float] = None) -> int :
+    """
+    Streams `files` (`(relative path, node)` pairs, e.g. `output_files(Path())`) and static `assets` (see
+    `src.assets.StaticAsset`, executable ones get mode `0o755`) into an archive written to `sink`.
+
+    Returns:
+        int: The number of entries written.
+    """
+    with trace("write_archive","io",format=format) as span :
+        with ArchiveWriter(sink,format,prefix,timestamp) as archive :
+            for path, node in files :
+                archive.add(Path(path).as_posix(),node)
+            for asset in assets :
+                archive.add_file(asset.target,asset.source,0o755 if asset.executable else 0o644)
+        if span :
+            span.set(objects=archive.count)
+    return archive.count
@@ -0,0 +1,253 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Iterable, Literal, Optional
+
+from src.tracing import trace
+from src.utils import cache_directory
+
+Materialization = Literal["linked", "copied", "unchanged"]
+
+_PROJECT_FILES = Path(__file__).parent / "project"
+
+class AssetStoreError(Exception):
+    pass
+
+class StaticAsset :
+    """
+    A file copied as-is into every generated project, e.g. the Gradle wrapper scripts.
+
+    Attributes:
+        source (Path): The file to copy.
+        target (str): Its path relative to the project root, with forward slashes.
+        executable (bool): Whether the file must be executable (e.g. `gradlew`).
+    """
+    __slots__ = ("source","target","executable")
+
+    source : Path
+    target : str
+    executable : bool
+
+    def __init__(self,source : Path,target : str,executable : bool = False) -> None:
+        self.source = Path(source)
+        self.target = target
+        self.executable = executable
+
+    def to_json(self) -> list :
+        return [str(self.source),self.target,self.executable]
+
+    @classmethod
+    def from_json(cls,data : list) -> 'StaticAsset' :
+        return cls(Path(data[0]),data[1],data[2])
+
+# The Gradle wrapper scripts shipped with the generator
+WRAPPER_ASSETS = (
+    StaticAsset(_PROJECT_FILES / "gradlew","gradlew",executable=True),
+    StaticAsset(_PROJECT_FILES / "gradlew.bat","gradlew.bat"),
+)
+
+def default_asset_directory() -> Path :
+    return cache_directory("assets")
+
+def _copy(source : Path,destination : Path) -> None :
+    """
+    Copies `source` to `destination` in the kernel when possible: `copy_file_range` (which shares the extents on
+    file systems with reflinks, e.g. btrfs and XFS), then `sendfile`, then a plain read/write loop.
+    """
+    with open(source,"rb") as source_file, open(destination,"wb") as destination_file :
+        source_fd = source_file.fileno()
+        destination_fd = destination_file.fileno()
+        size = os.fstat(source_fd).st_size
+        offset = 0
+
+        def copy_file_range(count : int) -> int :
+            return os.copy_file_range(source_fd,destination_fd,count,offset,offset)
+
+        def sendfile(count : int) -> int :
+            return os.sendfile(destination_fd,source_fd,offset,count)
+
+        for copy in (copy_file_range if hasattr(os,"copy_file_range") else None,sendfile if hasattr(os,"sendfile") else None) :
+            if copy is None :
+                continue
+            os.lseek(destination_fd,offset,os.SEEK_SET)
+            try :
+                while offset < size :
+                    copied = copy(size - offset)
+                    if copied == 0 :
+                        break
+                    offset += copied
+            except OSError :
+                # Not supported between these files (e.g. macOS `sendfile` only writes to sockets)
+                continue
+            if offset >= size :
+                return
+
+        source_file.seek(offset)
+        destination_file.seek(offset)
+        shutil.copyfileobj(source_file,destination_file)
+
+def _same_content(first : Path,second : Path) -> bool :
+    with open(first,"rb") as first_file, open(second,"rb") as second_file :
+        while True :
+            first_chunk = first_file.read(1 << 16)
+            if first_chunk != second_file.read(1 << 16) :
+                return False
+            if not first_chunk :
+                return True
+
+def _materialize(source : Path,asset : StaticAsset,root : Path,link : bool) -> Materialization :
+    # Puts the file `source` at the target of `asset` in `root`, see `AssetStore.materialize`
+    target = Path(root) / asset.target
+    try :
+        stored = os.stat(source)
+        try :
+            current = os.stat(target)
+        except FileNotFoundError :
+            current = None
+
+        if current is not None :
+            if os.path.samestat(current,stored) :
+                # A copy must not stay a (read-only) link to the source
+                if link :
+                    return "unchanged"
+            else :
+                executable_ok = not asset.executable or os.access(target,os.X_OK)
+                if current.st_size == stored.st_size and executable_ok and _same_content(target,source) :
+                    return "unchanged"
+
+        os.makedirs(target.parent,exist_ok=True)
+        # Linked or copied next to the target and renamed over it, so the target is never missing or partial
+        temporary = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+        try :
+            method : Optional[Materialization] = None
+            if link :
+                try :
+                    os.link(source,temporary)
+                    method = "linked"
+                except OSError :
+                    pass
+            if method is None :
+                _copy(source,temporary)
+                if os.name == "posix" :
+                    os.chmod(temporary,0o755 if asset.executable else 0o644)
+                method = "copied"
+            os.replace(temporary,target)
+        except BaseException :
+            try :
+                os.remove(temporary)
+            except OSError :
+                pass
+            raise
+    except OSError as error :
+        raise AssetStoreError(f"Could not materialize {asset.target} into {root}: {error}") from error
+    return method
+
+def copy_assets(assets : Iterable[StaticAsset],root : Path) -> dict[str,Materialization] :
+    """
+    Copies every asset straight from its source into the project at `root`, skipping the ones already there.
+    Nothing is stored outside of `root` (compare `AssetStore`).
+
+    Returns:
+        dict[str,Materialization]: Target -> `"copied"` or `"unchanged"`.
+
+    Raises:
+        AssetStoreError: If an asset cannot be read or written into the project.
+    """
+    with trace("materialize_assets","io",path=str(root)) as span :
+        results = {asset.target : _materialize(asset.source,asset,root,False) for asset in assets}
+        if span :
+            span.set(objects=len(results),copied=sum(1 for method in results.values() if method == "copied"))
+    return results
+
+class AssetStore :
+    """
+    Content-addressed store of static files, materialized into projects.
+
+    Every asset is stored once under the SHA-256 of its content (and whether it is executable, as hard links share
+    their permissions). By default materializing an asset copies the stored object with `copy_file_range` /
+    `sendfile`, which shares the extents on file systems with reflinks (btrfs, XFS). With `link=True` the object is
+    hard linked instead, so thousands of projects share one copy of each file on disk and generating them writes no
+    bytes; when the project is on another file system (or links are not supported) it is copied.
+
+    On POSIX systems objects are read-only (`0o555` / `0o444`), and so are the files linked to them: a tool editing
+    a linked file in place fails instead of silently changing the file in every project. Copies are writable
+    (`0o755` / `0o644`). Only link into projects that are not edited, e.g. the output of a batch or CI job.
+
+    Attributes:
+        directory (Path): Where the objects are stored, by default in the user's cache directory.
+        link (bool): Whether assets are hard linked into projects rather than copied.
+    """
+    directory : Path
+    link : bool
+
+    def __init__(self,directory : Optional[Path] = None,link : bool = False) -> None:
+        self.directory = Path(directory) if directory is not None else default_asset_directory()
+        self.link = link
+        # (source, size, mtime_ns) -> digest, so unchanged sources are only hashed once
+        self._digests : dict[tuple[str,int,int],str] = {}
+
+    def object_path(self,digest : str,executable : bool) -> Path :
+        return self.directory / digest[:2] / (f"{digest}.x" if executable else digest)
+
+    def add(self,source : Path,executable : bool = False) -> Path :
+        """
+        Stores `source` (if it is not stored yet) and returns the path of its object.
+
+        Raises:
+            AssetStoreError: If `source` cannot be read or the store cannot be written.
+        """
+        try :
+            stat = os.stat(source)
+            key = (str(source),stat.st_size,stat.st_mtime_ns)
+            digest = self._digests.get(key)
+            if digest is None :
+                with open(source,"rb") as file :
+                    digest = self._digests[key] = hashlib.file_digest(file,"sha256").hexdigest()
+
+            path = self.object_path(digest,executable)
+            if not os.path.exists(path) :
+                path.parent.mkdir(parents=True,exist_ok=True)
+                # Copied next to the object and renamed, concurrent writers (e.g. batch workers) never expose a partial object
+                fd, temporary = tempfile.mkstemp(prefix=f".{digest[:8]}-",suffix=".tmp",dir=path.parent)
+                os.close(fd)
+                try :
+                    _copy(Path(source),Path(temporary))
+                    if os.name == "posix" :
+                        os.chmod(temporary,0o555 if executable else 0o444)
+                    os.replace(temporary,path)
+                except BaseException :
+                    try :
+                        os.remove(temporary)
+                    except OSError :
+                        pass
+                    raise
+        except OSError as error :
+            raise AssetStoreError(f"Could not store {source}: {error}") from error
+        return path
+
+    def materialize(self,asset : StaticAsset,root : Path) -> Materialization :
+        """
+        Puts `asset` into the project at `root`, replacing any other file at its target.
+
+        Returns:
+            `"linked"`, `"copied"`, or `"unchanged"` if the target already was the asset.
+
+        Raises:
+            AssetStoreError: If the asset cannot be stored or written into the project.
+        """
+        return _materialize(self.add(asset.source,asset.executable),asset,root,self.link)
+
+    def materialize_all(self,assets : Iterable[StaticAsset],root : Path) -> dict[str,Materialization] :
+        """
+        Materializes every asset into the project at `root` (see `materialize`).
+
+        Returns:
+            dict[str,Materialization]: Target -> how it was materialized.
+        """
+        with trace("materialize_assets","io",path=str(root)) as span :
+            results = {asset.target : self.materialize(asset,root) for asset in assets}
+            if span :
+                span.set(objects=len(results),linked=sum(1 for method in results.values() if method == "linked"),copied=sum(1 for method in results.values() if method == "copied"))
+        return results
@@ -1,14 +1,22 @@
+import os
+import tempfile
 from abc import ABC, abstractmethod
 from functools import wraps
+from inspect import isfunction
 from pathlib import Path
-from typing import Generic, TypeVar
+from typing import TYPE_CHECKING, Any, Generic, Iterable, Iterator, Optional, TextIO, TypeVar
 
-from .metadata import GradleMetadata
+from .metadata import GradleMetadata, ProjectMetadata
+
+if TYPE_CHECKING :
+  from src.aio import AsyncWriter
 
 class ProvideMetadata(ABC):
   """
   This trait adds an abstract method for providing metadata.
   """
+  # Keeps `__slots__` of implementing classes effective (see `Dependency`, `Plugin`)
+  __slots__ = ()
 
   @abstractmethod
   def provide_metadata(self, metadata: 'GradleMetadata'):
@@ -20,35 +28,104 @@ class ProvideMetadata(ABC):
     pass
 
 
-def catch_exception_in_all_methods(exception : Exception) :
+ENTRY_POINTS = ("generate_to_file", "from_file")
+
+class ErrorContext :
+    """
+    Where an error happened: the node whose method failed, the method, the file it was working on and the Gradle
+    module it belongs to (when known).
+
+    Attached as `context` to the exceptions raised by methods decorated with `catch_exception_in_all_methods`,
+    see `error_contexts` to collect them along an exception chain.
+    """
+    node : object
+    method : str
+    filepath : Optional[Path]
+    module : Optional[str]
+
+    def __init__(self,node : object,method : str,filepath : Optional[Path],module : Optional[str]) -> None:
+        self.node = node
+        self.method = method
+        self.filepath = filepath
+        self.module = module
+
+    def __str__(self) -> str:
+        owner = self.node if isinstance(self.node,type) else type(self.node)
+        message = f"{owner.__name__}.{self.method}"
+        if self.module is not None :
+            message += f" of module {self.module}"
+        if self.filepath is not None :
+            message += f" ({self.filepath})"
+        return message
+
+def error_contexts(error : BaseException) -> list[ErrorContext] :
+    """
+    Returns the `ErrorContext` of `error` and of every exception it was raised from, outermost first.
     """
-    This function defines a decorator `catch` that wraps a given function.
-    The `catch` decorator catches exceptions, prints an error message, and re-raises the exception with a custom error message.
-    It then applies this decorator to all methods of a given class.
-    This function is used to catch exceptions in all methods of a class and handle them uniformly.
+    contexts = []
+    while error is not None :
+        context = getattr(error,"context",None)
+        if isinstance(context,ErrorContext) :
+            contexts.append(context)
+        error = error.__cause__
+    return contexts
+
+def _module_name(node : object) -> Optional[str] :
+    for attribute in ("module_metadata", "metadata") :
+        metadata = getattr(node,attribute,None)
+        if isinstance(metadata,GradleMetadata) and not isinstance(metadata,ProjectMetadata) and "name" in metadata.metadata :
+            return metadata.metadata["name"]
+    return None
+
+def _error_context(node : object,method : str,args : tuple,kwargs : dict) -> ErrorContext :
+    filepath = kwargs.get("filepath",args[0] if args else None)
+    if not isinstance(filepath,(str,Path)) :
+        filepath = None
+    elif method == "generate_to_file" and isinstance(getattr(node,"FILE_NAME",None),str) :
+        filepath = Path(filepath) / node.FILE_NAME
+    return ErrorContext(node,method,filepath,_module_name(node))
+
+def catch_exception_in_all_methods(exception : type[Exception],methods : Optional[Iterable[str]] = ENTRY_POINTS) :
+    """
+    This function defines a decorator `catch` that wraps the public entry points of a class.
+    The `catch` decorator re-raises any exception (except `TypeError`) as `exception`, chained to the original one and
+    carrying an `ErrorContext` (node, method, file and module) in its `context` attribute and message. Exceptions that
+    already are instances of `exception` are re-raised unchanged, only gaining a context if they have none.
+
+    Only `generate_to_file` and `from_file` are wrapped by default, so hot methods such as `__str__` or
+    `provide_metadata` run without an extra frame; since Python 3.11 the `try` itself costs nothing until an
+    exception is raised. Pass `methods=None` to wrap every method of the class.
 
     Returns:
-        apply_decorator (function): A decorator that applies the `catch` decorator to all methods of a class.
+        apply_decorator (function): A decorator that applies the `catch` decorator to the methods of a class.
     """
     #https://stackoverflow.com/a/24025175
-    def catch(func):
-        import functools;
-        @functools.wraps(func)
-        def wrapper(*a, **kw):
+    def catch(func, name : str):
+        @wraps(func)
+        def wrapper(node, *args, **kwargs):
             try:
-                return func(*a, **kw)
-            except TypeError as e:
-               raise e
-            except Exception as e:
-                # TODO: Display the message below instead of the base exception message
-                raise exception(f"Error from {e.__class__.__name__}") from e
+                return func(node, *args, **kwargs)
+            except TypeError:
+                raise
+            except exception as error:
+                if getattr(error,"context",None) is None :
+                    error.context = _error_context(node,name,args,kwargs)
+                raise
+            except Exception as error:
+                context = _error_context(node,name,args,kwargs)
+                wrapped = exception(f"{context} failed: {error.__class__.__name__}: {error}")
+                wrapped.context = context
+                raise wrapped from error
         return wrapper
 
     def apply_decorator(cls):
-        for k, f in cls.__dict__.items():
-            import inspect;
-            if inspect.isfunction(f):
-                setattr(cls, k, catch(f))
+        for name, attribute in list(cls.__dict__.items()):
+            if methods is not None and name not in methods :
+                continue
+            if isinstance(attribute,classmethod) :
+                setattr(cls, name, classmethod(catch(attribute.__func__,name)))
+            elif isfunction(attribute):
+                setattr(cls, name, catch(attribute,name))
         return cls
    
     return apply_decorator
@@ -69,6 +146,49 @@ class FileConvertible(ProvideMetadata):
         Exception of type E if an error occurs during the file operations.
     """
     pass
+
+  def write_to(self, sink: TextIO) -> None:
+    """
+    Streams the content of the file generated for this object into `sink`.
+
+    Objects generating a single file named `FILE_NAME` should override this to render straight into `sink`. The
+    default runs `generate_to_file` into a staging directory and copies the file it wrote.
+
+    Raises:
+        ValueError: If `generate_to_file` does not write exactly one file (or no `FILE_NAME` when it is defined).
+    """
+    files = staged_files(self)
+    name = getattr(self,"FILE_NAME",None)
+    if isinstance(name,str) :
+      files = [(relative, content) for relative, content in files if relative == Path(name)]
+    if len(files) != 1 :
+      raise ValueError(f"{type(self).__name__}.generate_to_file writes {len(files)} matching files, use output_files")
+    sink.write(files[0][1])
+
+  async def generate_to_file_async(self, filepath: Path, writer: Optional['AsyncWriter'] = None) -> None:
+    """
+    Asynchronous counterpart of `generate_to_file` for asyncio applications: the content is rendered on the event
+    loop and the files are written on an executor through `writer` (see `src.aio.AsyncWriter`, a new writer with
+    the default limits if `None`), so the loop is never blocked on disk I/O.
+    """
+    from src.aio import AsyncWriter, generate_async
+    await generate_async([(self, Path(filepath))], writer if writer is not None else AsyncWriter())
+
+  def output_files(self, filepath: Path) -> Iterator[tuple[Path, Any]]:
+    """
+    Yields every file `generate_to_file(filepath)` would write, as `(path, node)` pairs where `render_to(node)`
+    produces the content.
+
+    This lets writers other than `generate_to_file` (e.g. incremental or archive output) render the same files.
+    Objects with a `FILE_NAME` yield that single file. Others get the files `generate_to_file` writes into a staging
+    directory, with their content; override this to list the files without writing them (see `lists_output_files`).
+    """
+    name = getattr(self,"FILE_NAME",None)
+    if isinstance(name,str) :
+      yield Path(filepath) / name, self
+      return
+    for relative, content in staged_files(self) :
+      yield Path(filepath) / relative, content
   
  # from warnings import deprecated
     
@@ -78,4 +198,26 @@ class FileConvertible(ProvideMetadata):
     """
     This method creates a new object of the implementing class by reading data from a file.
     """
-    raise NotImplementedError
\ No newline at end of file
+    raise NotImplementedError
+
+def lists_output_files(node : FileConvertible) -> bool :
+  """
+  Returns whether `node.output_files` lists the files of `node` without generating them, i.e. it has a `FILE_NAME` or
+  overrides `output_files`, rather than going through a staging directory.
+  """
+  return type(node).output_files is not FileConvertible.output_files or isinstance(getattr(node,"FILE_NAME",None),str)
+
+def staged_files(node : FileConvertible) -> list[tuple[Path,str]] :
+  """
+  Runs `node.generate_to_file` into a temporary directory and returns the `(relative path, content)` of every file it
+  wrote, sorted by path. Files are read as UTF-8 with their newlines kept.
+  """
+  with tempfile.TemporaryDirectory(prefix="gradle-generator-") as staging :
+    node.generate_to_file(Path(staging))
+    files = []
+    for directory, _, names in os.walk(staging) :
+      for name in names :
+        path = Path(directory) / name
+        with open(path,encoding="utf-8",newline="") as file :
+          files.append((path.relative_to(staging),file.read()))
+  return sorted(files)
@@ -1,44 +1,101 @@
+import copy
 from pathlib import Path
-from typing import Any, Optional
-from os.path import join as join_path;
+from typing import Any, Optional, TextIO
+from os.path import getsize, join as join_path;
 from src.core import FileConvertible, catch_exception_in_all_methods
 from src.gradle.dependency import DependencyGroup
 from src.gradle.plugin import PluginGroup
 from src.metadata import GradleMetadata, ModuleMetadata
+from src.tracing import trace
+from src.utils import open_output, render_to, render_to_string
 
 class ModuleBuildGradleError(Exception):
     pass
 
 @catch_exception_in_all_methods(ModuleBuildGradleError)
 class ModuleBuildGradle(FileConvertible) :
-    def __init__(self,plugins : PluginGroup,dependencies : DependencyGroup,other : Optional[list[Any]] = None,module_metadata : Optional[ModuleMetadata] = None) -> None:
+    FILE_NAME = "build.gradle.kts"
+
+    def __init__(self,plugins : PluginGroup,dependencies : DependencyGroup,other : Optional[list[Any]] = None,module_metadata : Optional[ModuleMetadata] = None,header : Optional[list[Any]] = None) -> None:
         self.plugins = plugins
         self.dependencies = dependencies
         self.module_metadata = module_metadata
         self.other = other
+        # Written verbatim before `plugins {}` (e.g. imports), usually only set for scripts read with `from_file`
+        self.header = header
+        # id(node) -> (node, copy as declared) of the declarations with a replace callback, see `declared`
+        self._declared : Optional[dict[int,tuple[Any,Any]]] = None
 
         if module_metadata is not None :
-            self.plugins.provide_metadata(module_metadata)
-            self.dependencies.provide_metadata(module_metadata)
+            self.provide_metadata(module_metadata)
+
+    def module_name(self) -> Optional[str]:
+        return None if self.module_metadata is None else self.module_metadata.name()
+
+    def object_count(self) -> int:
+        return len(self.plugins.code) + len(self.dependencies.code)
+
+    def declared(self,node : Any) -> Any:
+        """
+        Returns a declaration of this file as it was declared, before metadata was first provided and its replace
+        callback rewrote it in place, so that `src.metadata.propagation.MetadataPropagator` can resolve it again.
+        Declarations added after metadata was first provided are returned as they are.
+        """
+        entry = None if self._declared is None else self._declared.get(id(node))
+        return node if entry is None or entry[0] is not node else entry[1]
 
     def provide_metadata(self, metadata: GradleMetadata) -> None:
-        self.plugins.provide_metadata(metadata)
-        self.dependencies.provide_metadata(metadata)
+        if self._declared is None :
+            self._declared = {id(node) : (node,copy.copy(node)) for node in (*self.plugins.code,*self.dependencies.code) if getattr(node,"replace",None) is not None}
+        with trace("provide_metadata","metadata") as span :
+            self.plugins.provide_metadata(metadata)
+            self.dependencies.provide_metadata(metadata)
+            if span :
+                span.set(module=self.module_name(),objects=self.object_count())
     
 
-    def __str__(self) -> str:
-        representation = f"{self.plugins}\n{self.dependencies}"
+    def write_to(self,sink : TextIO) -> None:
+        if self.header is not None :
+            for header in self.header :
+                render_to(header,sink)
+        render_to(self.plugins,sink)
+        sink.write("\n")
+        render_to(self.dependencies,sink)
         if self.other is not None:
-            representation += f"{self.other}"
-            
+            for other in self.other :
+                sink.write("\n")
+                render_to(other,sink)
+
+    def __str__(self) -> str:
+        with trace(self.FILE_NAME,"render") as span :
+            representation = render_to_string(self)
+            if span :
+                span.set(module=self.module_name(),objects=self.object_count(),bytes=len(representation))
         return representation
     
     def generate_to_file(self, filepath: Path) -> None:
-        file_directory = join_path(filepath,"build.gradle.kts")
-
-        with open(file_directory,"w") as file :
-            file.write(str(self.plugins))
-            file.write(str(self.dependencies))
-            if self.other is not None:
-                file.write(str(self.other))
-  
\ No newline at end of file
+        file_directory = join_path(filepath,self.FILE_NAME)
+
+        with trace(self.FILE_NAME,"write") as span :
+            with open_output(file_directory) as file :
+                self.write_to(file)
+            if span :
+                span.set(module=self.module_name(),path=file_directory,objects=self.object_count(),bytes=getsize(file_directory))
+
+    @classmethod
+    def from_file(cls, filepath: Path,module_metadata : Optional[ModuleMetadata] = None) -> 'ModuleBuildGradle':
+        """
+        Reads an existing `build.gradle.kts`, see `src.gradle.kotlindsl.parse_build_gradle`.
+        """
+        with open(filepath,encoding="utf-8") as file :
+            source = file.read()
+        with trace(cls.FILE_NAME,"parse") as span :
+            build_gradle = cls.from_string(source,module_metadata)
+            if span :
+                span.set(path=str(filepath),bytes=len(source),objects=build_gradle.object_count())
+        return build_gradle
+
+    @classmethod
+    def from_string(cls,source : str,module_metadata : Optional[ModuleMetadata] = None) -> 'ModuleBuildGradle':
+        from src.gradle.kotlindsl import parse_build_gradle
+        return parse_build_gradle(source,module_metadata)
@@ -0,0 +1,309 @@
+import os
+import re
+import tomllib
+from pathlib import Path
+from typing import Any, Iterator, Optional, TextIO
+
+from src.core import FileConvertible, catch_exception_in_all_methods
+from src.gradle.dependency import CatalogDependency, Dependency, DependencyGroup
+from src.gradle.plugin import Plugin, PluginGroup, PluginType, PluginWithCodeBlock
+from src.metadata import GradleMetadata
+from src.utils import open_output, render_to_string
+
+class VersionCatalogError(Exception):
+    pass
+
+# https://docs.gradle.org/current/userguide/platforms.html#sub:mapping-aliases-to-accessors
+_ALIAS_SEPARATORS = re.compile(r"[-_.]")
+_BARE_KEY = re.compile(r"^[A-Za-z0-9_-]+$")
+
+def _toml_string(value : str) -> str :
+    return '"' + value.replace("\\","\\\\").replace('"','\\"').replace("\n","\\n") + '"'
+
+def _toml_key(key : str) -> str :
+    return key if _BARE_KEY.match(key) else _toml_string(key)
+
+def _toml_value(value : Any) -> str :
+    if isinstance(value,bool) :
+        return "true" if value else "false"
+    if isinstance(value,(int,float)) :
+        return str(value)
+    if isinstance(value,dict) :
+        return "{ " + ", ".join(f"{_toml_key(key)} = {_toml_value(item)}" for key, item in value.items()) + " }"
+    if isinstance(value,(list,tuple)) :
+        return "[" + ", ".join(_toml_value(item) for item in value) + "]"
+    return _toml_string(str(value))
+
+class CatalogLibrary :
+    """
+    A `[libraries]` entry of a version catalog.
+
+    Attributes:
+        module (str): `group:artifact` of the library.
+        version (Optional[str | dict]): A literal version, or a rich version table (e.g. `{ strictly = "1.0" }`).
+        version_ref (Optional[str]): The name of an entry of `[versions]` used as the version.
+    """
+    module : str
+    version : Optional[str | dict]
+    version_ref : Optional[str]
+
+    def __init__(self,module : str,version : Optional[str | dict] = None,version_ref : Optional[str] = None) -> None:
+        self.module = module
+        self.version = version
+        self.version_ref = version_ref
+
+    def to_toml(self) -> dict[str,Any] :
+        table : dict[str,Any] = {"module" : self.module}
+        if self.version_ref is not None :
+            table["version.ref"] = self.version_ref
+        elif self.version is not None :
+            table["version"] = self.version
+        return table
+
+class CatalogPlugin :
+    """
+    A `[plugins]` entry of a version catalog.
+
+    Attributes:
+        id (str): The plugin id.
+        version (Optional[str | dict]): A literal or rich version.
+        version_ref (Optional[str]): The name of an entry of `[versions]` used as the version.
+    """
+    id : str
+    version : Optional[str | dict]
+    version_ref : Optional[str]
+
+    def __init__(self,id : str,version : Optional[str | dict] = None,version_ref : Optional[str] = None) -> None:
+        self.id = id
+        self.version = version
+        self.version_ref = version_ref
+
+    def to_toml(self) -> dict[str,Any] :
+        table : dict[str,Any] = {"id" : self.id}
+        if self.version_ref is not None :
+            table["version.ref"] = self.version_ref
+        elif self.version is not None :
+            table["version"] = self.version
+        return table
+
+def _same_version(version : Optional[str | dict],declared : str) -> bool :
+    if isinstance(version,dict) :
+        # A rich version matches the version it requires or prefers
+        return declared in (version.get("strictly"),version.get("require"),version.get("prefer"))
+    return version == declared
+
+def _version_of(entry : dict[str,Any]) -> tuple[Optional[str | dict],Optional[str]] :
+    version = entry.get("version")
+    if isinstance(version,dict) and "ref" in version :
+        return None, version["ref"]
+    return version, None
+
+@catch_exception_in_all_methods(VersionCatalogError)
+class VersionCatalog(FileConvertible) :
+    """
+    A Gradle version catalog (`gradle/libs.versions.toml`).
+
+    Besides generating and parsing the TOML file, the catalog keeps an index in both directions, alias -> entry and
+    `group:artifact` / plugin id -> alias, so dependencies and plugins can be rewritten to their catalog accessors
+    (e.g. `libs.androidx.core.ktx`) with a single dictionary lookup, see `Dependency.use_catalog`,
+    `Plugin.use_catalog` and `apply`.
+
+    Example:
+        >>> catalog = VersionCatalog()
+        >>> catalog.add_library("retrofit","com.squareup.retrofit2:retrofit","2.9.0")
+        >>> str(Dependency(DependencyType.Implementation,"com.squareup.retrofit2:retrofit:2.9.0").use_catalog(catalog))
+        'implementation(libs.retrofit)'
+    """
+    FILE_NAME = "libs.versions.toml"
+    DIRECTORY = "gradle"
+
+    name : str
+    versions : dict[str,str | dict]
+    libraries : dict[str,CatalogLibrary]
+    bundles : dict[str,list[str]]
+    plugins : dict[str,CatalogPlugin]
+
+    def __init__(self,name : str = "libs") -> None:
+        self.name = name
+        self.versions = {}
+        self.libraries = {}
+        self.bundles = {}
+        self.plugins = {}
+        self._library_aliases : dict[str,str] = {}
+        self._plugin_aliases : dict[str,str] = {}
+        # alias -> accessor, computed once when the entry is added
+        self._accessors : dict[str,str] = {}
+        self._plugin_accessors : dict[str,str] = {}
+
+    def get_identifier(self) -> str:
+        return "version-catalog"
+
+    def provide_metadata(self, metadata: 'GradleMetadata') -> None:
+        pass
+
+    def add_version(self,name : str,version : str | dict) -> None :
+        self.versions[name] = version
+
+    def add_library(self,alias : str,module : str,version : Optional[str | dict] = None,version_ref : Optional[str] = None) -> None :
+        library = CatalogLibrary(module,version,version_ref)
+        previous = self.libraries.get(alias)
+        if previous is not None and self._library_aliases.get(previous.module) == alias :
+            del self._library_aliases[previous.module]
+        self.libraries[alias] = library
+        self._library_aliases.setdefault(module,alias)
+        self._accessors[alias] = f"{self.name}.{_ALIAS_SEPARATORS.sub('.',alias)}"
+
+    def add_plugin(self,alias : str,id : str,version : Optional[str | dict] = None,version_ref : Optional[str] = None) -> None :
+        plugin = CatalogPlugin(id,version,version_ref)
+        previous = self.plugins.get(alias)
+        if previous is not None and self._plugin_aliases.get(previous.id) == alias :
+            del self._plugin_aliases[previous.id]
+        self.plugins[alias] = plugin
+        self._plugin_aliases.setdefault(id,alias)
+        self._plugin_accessors[alias] = f"{self.name}.plugins.{_ALIAS_SEPARATORS.sub('.',alias)}"
+
+    def add_bundle(self,name : str,aliases : list[str]) -> None :
+        self.bundles[name] = list(aliases)
+
+    def library_alias(self,module : str) -> Optional[str] :
+        """
+        Returns the alias of the library with the given `group:artifact`, if it is in the catalog.
+        """
+        return self._library_aliases.get(module)
+
+    def plugin_alias(self,id : str) -> Optional[str] :
+        """
+        Returns the alias of the plugin with the given id, if it is in the catalog.
+        """
+        return self._plugin_aliases.get(id)
+
+    def library_accessor(self,module : str) -> Optional[str] :
+        """
+        Returns the accessor (e.g. `libs.androidx.core.ktx`) of the library with the given `group:artifact`.
+        """
+        alias = self._library_aliases.get(module)
+        return None if alias is None else self._accessors[alias]
+
+    def plugin_accessor(self,id : str) -> Optional[str] :
+        """
+        Returns the accessor (e.g. `libs.plugins.kotlin.jvm`) of the plugin with the given id.
+        """
+        alias = self._plugin_aliases.get(id)
+        return None if alias is None else self._plugin_accessors[alias]
+
+    def resolve_version(self,version : Optional[str | dict],version_ref : Optional[str]) -> Optional[str | dict] :
+        return self.versions.get(version_ref) if version_ref is not None else version
+
+    def library_matches(self,module : str,version : Optional[str]) -> bool :
+        """
+        Returns whether declaring the library `module` through its accessor keeps `version`: the declaration has no
+        version, or the catalog declares the same one.
+        """
+        library = self.libraries[self._library_aliases[module]]
+        return version is None or _same_version(self.resolve_version(library.version,library.version_ref),version)
+
+    def plugin_matches(self,id : str,version : Optional[str]) -> bool :
+        """
+        Returns whether applying the plugin `id` through its accessor keeps `version`, see `library_matches`.
+        """
+        plugin = self.plugins[self._plugin_aliases[id]]
+        return version is None or _same_version(self.resolve_version(plugin.version,plugin.version_ref),version)
+
+    def apply(self,group : DependencyGroup | PluginGroup) -> list[Dependency | Plugin] :
+        """
+        Rewrites every dependency or plugin of `group` that is in the catalog to its accessor, in place.
+
+        Returns:
+            list: The declarations of catalog entries left as they are because the accessor would change them
+            (another version, a classifier), so they can be reported or added to the catalog.
+        """
+        kept : list[Dependency | Plugin] = []
+        code = []
+        for item in group.code :
+            rewritten = item.use_catalog(self)
+            if rewritten is item and self._lists(item) :
+                kept.append(item)
+            code.append(rewritten)
+        group.code = code
+        return kept
+
+    def _lists(self,item : Any) -> bool :
+        if isinstance(item,CatalogDependency) :
+            return False
+        if isinstance(item,Dependency) :
+            return item.coordinate.module in self._library_aliases
+        if isinstance(item,Plugin) :
+            return item.plugin_id() in self._plugin_aliases
+        return False
+
+    def write_to(self,sink : TextIO) -> None :
+        write = sink.write
+        sections = (
+            ("versions", self.versions),
+            ("libraries", {alias : library.to_toml() for alias, library in self.libraries.items()}),
+            ("bundles", self.bundles),
+            ("plugins", {alias : plugin.to_toml() for alias, plugin in self.plugins.items()}),
+        )
+        first = True
+        for section, entries in sections :
+            if not entries :
+                continue
+            if not first :
+                write("\n")
+            first = False
+            write(f"[{section}]\n")
+            for key, value in entries.items() :
+                if isinstance(value,dict) :
+                    # `version.ref` is a dotted key, it must not be quoted
+                    write(f"{_toml_key(key)} = {{ " + ", ".join(f"{name if name == 'version.ref' else _toml_key(name)} = {_toml_value(item)}" for name, item in value.items()) + " }\n")
+                else :
+                    write(f"{_toml_key(key)} = {_toml_value(value)}\n")
+
+    def __str__(self) -> str:
+        return render_to_string(self)
+
+    def output_files(self, filepath: Path) -> Iterator[tuple[Path,FileConvertible]]:
+        yield Path(filepath) / self.DIRECTORY / self.FILE_NAME, self
+
+    def generate_to_file(self, filepath: Path) -> None:
+        file_directory = os.path.join(filepath,self.DIRECTORY)
+        os.makedirs(file_directory,exist_ok=True)
+
+        with open_output(os.path.join(file_directory,self.FILE_NAME)) as file :
+            self.write_to(file)
+
+    @classmethod
+    def from_file(cls, filepath: Path,name : str = "libs") -> 'VersionCatalog':
+        with open(filepath,"rb") as file :
+            return cls.from_toml(tomllib.load(file),name)
+
+    @classmethod
+    def from_string(cls,content : str,name : str = "libs") -> 'VersionCatalog' :
+        return cls.from_toml(tomllib.loads(content),name)
+
+    @classmethod
+    def from_toml(cls,data : dict[str,Any],name : str = "libs") -> 'VersionCatalog' :
+        catalog = cls(name)
+
+        for version_name, version in data.get("versions",{}).items() :
+            catalog.add_version(version_name,version)
+
+        for alias, entry in data.get("libraries",{}).items() :
+            if isinstance(entry,str) :
+                group, artifact, version = (entry.split(":",2) + [None])[:3]
+                catalog.add_library(alias,f"{group}:{artifact}",version)
+                continue
+            module = entry.get("module") or f"{entry['group']}:{entry['name']}"
+            catalog.add_library(alias,module,*_version_of(entry))
+
+        for bundle, aliases in data.get("bundles",{}).items() :
+            catalog.add_bundle(bundle,aliases)
+
+        for alias, entry in data.get("plugins",{}).items() :
+            if isinstance(entry,str) :
+                id, _, version = entry.partition(":")
+                catalog.add_plugin(alias,id,version or None)
+                continue
+            catalog.add_plugin(alias,entry["id"],*_version_of(entry))
+
+        return catalog
@@ -1,6 +1,8 @@
 from collections import UserList
 from enum import Enum
-from typing import Any, Callable, Optional, Self, TypeAlias
+from sys import intern
+from typing import Any, Callable, Iterable, Optional, Self, Sequence, TypeAlias
+from weakref import WeakValueDictionary
 
 from src.core import ProvideMetadata
 from src.metadata import GradleMetadata
@@ -36,6 +38,38 @@ class DependencyType(DependencyTypeBase,Enum) :
     def __str__(self) -> str :
         return str(self.value)
 
+class Configuration(DependencyTypeBase) :
+    """
+    Any other dependency configuration (e.g. `testImplementation`, `ksp`), see `Configuration.of`.
+    """
+    __slots__ = ("name",)
+
+    _cache : dict[str,'Configuration'] = {}
+
+    def __init__(self,name : str) -> None :
+        self.name = intern(name)
+
+    @classmethod
+    def of(cls,name : str) -> 'DependencyTypeBase' :
+        """
+        Returns the shared configuration named `name`, or the `DependencyType` member if there is one, so equal
+        configurations are always the same object (dependency resolution compares types by identity).
+        """
+        configuration = cls._cache.get(name)
+        if configuration is None :
+            try :
+                configuration = DependencyType(name)
+            except ValueError :
+                configuration = cls(name)
+            configuration = cls._cache.setdefault(name,configuration)
+        return configuration
+
+    def __str__(self) -> str :
+        return self.name
+
+    def __repr__(self) -> str :
+        return f"Configuration({self.name!r})"
+
 def api(dependency : str) -> 'Dependency' :
     return Dependency(DependencyType.Api,dependency)
 
@@ -50,6 +84,88 @@ def implementation(group_id: str, artifact_id: str, version: str,replace : 'Repl
 
 ReplaceAlias :TypeAlias = Optional[Callable[[Self,GradleMetadata,Any],None]]
 
+def _intern(value : Optional[str]) -> Optional[str] :
+    return None if value is None else intern(value)
+
+class Coordinate :
+    """
+    Immutable, shared (flyweight) representation of a dependency notation such as `group:artifact:version`.
+
+    Identical notations resolve to the same `Coordinate` instance while it is in use, and all of its strings are
+    interned, so thousands of modules declaring the same dependency only keep a single copy of it in memory.
+    Notations that are not Maven coordinates (e.g. version catalog accessors like `libs.datastore`) are kept
+    as-is in `group`.
+
+    Attributes:
+        notation (str): The full notation, exactly as rendered.
+        group (str): The group id (or the whole notation if it has no `:`).
+        artifact (Optional[str]): The artifact id.
+        version (Optional[str]): The version, without the classifier or extension following it.
+        classifier (Optional[str]): The classifier of `group:artifact:version:classifier`.
+        extension (Optional[str]): The extension of `group:artifact:version@extension`.
+        module (Optional[str]): `group:artifact`, or `None` if the notation has no artifact.
+    """
+    __slots__ = ("notation","group","artifact","version","classifier","extension","module","__weakref__")
+
+    _cache : 'WeakValueDictionary[str,Coordinate]' = WeakValueDictionary()
+
+    def __init__(self,notation : str,group : str,artifact : Optional[str],version : Optional[str],classifier : Optional[str] = None,extension : Optional[str] = None) -> None :
+        # Past the immutability check of `__setattr__`, a coordinate is created for every distinct parsed notation
+        assign = object.__setattr__
+        assign(self,"notation",notation)
+        assign(self,"group",group)
+        assign(self,"artifact",artifact)
+        assign(self,"version",version)
+        assign(self,"classifier",classifier)
+        assign(self,"extension",extension)
+        assign(self,"module",None if artifact is None else intern(f"{group}:{artifact}"))
+
+    @classmethod
+    def parse(cls,notation : str) -> 'Coordinate' :
+        """
+        Returns the shared `Coordinate` for `notation`.
+        """
+        coordinate = cls._cache.get(notation)
+        if coordinate is None :
+            notation = intern(notation)
+            body, extension = notation, None
+            if ":" in notation and "@" in notation :
+                body, _, extension = notation.rpartition("@")
+            parts : list[Optional[str]] = [intern(part) for part in body.split(":",3)]
+            parts += [None] * (4 - len(parts))
+            coordinate = cls(notation,*parts,_intern(extension))
+            # setdefault keeps a single instance if another thread raced us
+            coordinate = cls._cache.setdefault(notation,coordinate)
+        return coordinate
+
+    @classmethod
+    def of(cls,group : str,artifact : Optional[str] = None,version : Optional[str] = None,classifier : Optional[str] = None,extension : Optional[str] = None) -> 'Coordinate' :
+        notation = ":".join(part for part in (group,artifact,version,classifier) if part is not None)
+        return cls.parse(notation if extension is None else f"{notation}@{extension}")
+
+    def with_version(self,version : Optional[str]) -> 'Coordinate' :
+        """
+        Returns this coordinate with another version, keeping its classifier and extension.
+        """
+        return Coordinate.of(self.group,self.artifact,version,self.classifier,self.extension)
+
+    def with_group(self,group : str) -> 'Coordinate' :
+        """
+        Returns this coordinate relocated to another group, keeping everything else.
+        """
+        return Coordinate.of(group,self.artifact,self.version,self.classifier,self.extension)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        if hasattr(self,name) :
+            raise AttributeError(f"{type(self).__name__} is immutable")
+        object.__setattr__(self,name,value)
+
+    def __str__(self) -> str:
+        return self.notation
+
+    def __repr__(self) -> str:
+        return f"Coordinate({self.notation!r})"
+
 class Dependency(ProvideMetadata):
     """
     Class representing a Gradle dependency.
@@ -59,10 +175,20 @@ class Dependency(ProvideMetadata):
     1. By providing the dependency type, group ID, artifact ID, and version. In this case, the dependency string is constructed by combining the group ID, artifact ID, and version.
     2. By providing the dependency type and the dependency string.
 `
+    Instances use `__slots__` and keep their notation as a shared `Coordinate`. Declarations of a notation used
+    elsewhere cost about 65 bytes (160 with a `__dict__` and a string of their own), but a notation seen once pays
+    for its parsed parts and its cache entry, about 430 bytes. Large graphs declaring the same dependencies in many
+    modules should share the declarations themselves: `DependencyGroup.from_columns` and
+    `DependencyGroup(..., share=True)` use one immutable `SharedDependency` per distinct declaration (see
+    `Dependency.shared`), a repeated declaration then only costs its list slot.
+
     Attributes:
         type (DependencyTypeBase): The type of the dependency.
+        coordinate (Coordinate): The shared, parsed notation of the dependency.
         dependency (str): The dependency string.
     """
+    __slots__ = ("type","coordinate","replace")
+
     def from_seperated(type : DependencyTypeBase ,group_id: str, artifact_id: str, version: str,replace : ReplaceAlias = None) -> Self:
         """
         Initializes a new instance of the class.
@@ -86,15 +212,15 @@ class Dependency(ProvideMetadata):
             >>> print(dependency)
             api("com.example:my-library:1.0.0")
         """
-        return Dependency(type,f"{group_id}:{artifact_id}:{version}",replace)
+        return Dependency(type,Coordinate.of(group_id,artifact_id,version),replace)
 
-    def __init__(self,type : DependencyTypeBase,dependency : str,replace : ReplaceAlias = None) -> None :
+    def __init__(self,type : DependencyTypeBase,dependency : str | Coordinate,replace : ReplaceAlias = None) -> None :
         """
         Initializes a new instance of the class.
 
         Args:
             type (DependencyTypeBase): The type of the dependency.
-            dependency (str): The dependency string.
+            dependency (str | Coordinate): The dependency string or an already parsed `Coordinate`.
 
         Returns:
             None
@@ -102,26 +228,205 @@ class Dependency(ProvideMetadata):
         This method initializes a new instance of the class by setting the `dependency` attribute to the provided value.
         """
         self.type = type
-        self.dependency = dependency
+        self.coordinate = dependency if isinstance(dependency,Coordinate) else Coordinate.parse(dependency)
         self.replace = replace
 
+    @classmethod
+    def shared(cls,type : DependencyTypeBase,dependency : str | Coordinate) -> 'SharedDependency' :
+        """
+        Returns the flyweight instance shared by every identical `type("dependency")` declaration without a replace callback.
+
+        Shared instances are immutable, create a regular `Dependency` to modify a declaration.
+        """
+        coordinate = dependency if isinstance(dependency,Coordinate) else Coordinate.parse(dependency)
+        # Types are unique objects (see `Configuration.of`) keyed by identity, hashing enum members is comparatively slow
+        key = (id(type),coordinate.notation)
+        shared = SharedDependency._cache.get(key)
+        if shared is None :
+            shared = SharedDependency._cache.setdefault(key,SharedDependency(type,coordinate))
+        return shared
+
+    @property
+    def dependency(self) -> str :
+        return self.coordinate.notation
+
+    @dependency.setter
+    def dependency(self,dependency : str) -> None :
+        self.coordinate = Coordinate.parse(dependency)
+
+    def with_coordinate(self,coordinate : Coordinate) -> 'Dependency' :
+        """
+        Returns a copy of this declaration with another coordinate, shared if this declaration is shared (see
+        `Dependency.shared`), the declaration itself being left unchanged.
+        """
+        if isinstance(self,SharedDependency) :
+            return Dependency.shared(self.type,coordinate)
+        return Dependency(self.type,coordinate,self.replace)
+
+    def with_version(self,version : Optional[str]) -> 'Dependency' :
+        """
+        Returns a copy of this declaration with another version (see `with_coordinate`).
+        """
+        return self.with_coordinate(self.coordinate.with_version(version))
+
     def __str__(self) -> str:
-        return f"{self.type}({self.dependency if self.dependency.startswith("libs") else f"\"{self.dependency}\""})"
-  
+        coordinate = self.coordinate
+        # Accessors written as plain notations (`Dependency(type,"libs.retrofit")`) are still rendered unquoted
+        if coordinate.artifact is None and coordinate.notation.startswith("libs.") :
+            return f"{self.type}({coordinate.notation})"
+        return f"{self.type}(\"{coordinate.notation}\")"
+
+    def use_catalog(self,catalog : 'VersionCatalog') -> 'Dependency' :
+        """
+        Returns this dependency declared through its version catalog accessor (e.g. `implementation(libs.retrofit)`),
+        or itself if the catalog has no library for its `group:artifact`, or cannot express the declaration: the
+        catalog declares another version, or it has a classifier or extension.
+        """
+        coordinate = self.coordinate
+        module = coordinate.module
+        accessor = None if module is None else catalog.library_accessor(module)
+        if accessor is None or coordinate.classifier is not None or coordinate.extension is not None :
+            return self
+        if not catalog.library_matches(module,coordinate.version) :
+            return self
+        return CatalogDependency(self.type,accessor,self.replace)
+
     def provide_metadata(self, metadata: 'GradleMetadata') -> None:
         property = metadata.get_property(f"dependencies/{self.dependency}")
         if property is not None and self.replace is not None :
             self.replace(self,metadata,property)
     
 
+class RawDependency(Dependency):
+    """
+    A statement of a `dependencies {}` block that is not a plain `configuration("notation")` declaration (e.g.
+    `implementation(project(":core"))` or a declaration with a configuration block), kept verbatim.
+
+    Its coordinate has no artifact, so dependency resolution and version catalogs leave it untouched.
+    """
+    __slots__ = ()
+
+    def __init__(self,type : DependencyTypeBase,statement : str) -> None :
+        self.type = type
+        self.coordinate = Coordinate(statement,statement,None,None)
+        self.replace = None
+
+    def __str__(self) -> str :
+        return self.coordinate.notation
+
+class CatalogDependency(Dependency):
+    """
+    A dependency declared through a version catalog accessor, e.g. `implementation(libs.retrofit)`, whatever the
+    name of the catalog. The accessor is rendered unquoted.
+
+    Its coordinate has no artifact, so dependency resolution and version catalogs leave it untouched.
+    """
+    __slots__ = ()
+
+    def __init__(self,type : DependencyTypeBase,accessor : str,replace : ReplaceAlias = None) -> None :
+        self.type = type
+        self.coordinate = Coordinate(intern(accessor),intern(accessor),None,None)
+        self.replace = replace
+
+    @property
+    def accessor(self) -> str :
+        return self.coordinate.notation
+
+    def __str__(self) -> str :
+        return f"{self.type}({self.accessor})"
+
+class ProjectDependency(Dependency):
+    """
+    A dependency on another module of the same build, e.g. `implementation(project(":core"))`.
+
+    Its coordinate has no artifact, so dependency resolution and version catalogs leave it untouched; the module
+    graph (see `src.project.graph.ModuleGraph`) collects these to order and check the modules of a project.
+    """
+    __slots__ = ()
+
+    def __init__(self,type : DependencyTypeBase,path : str) -> None :
+        self.type = type
+        self.coordinate = Coordinate(intern(path),intern(path),None,None)
+        self.replace = None
+
+    @property
+    def path(self) -> str :
+        """
+        The Gradle path of the module depended on, as declared (`:core` or `core`).
+        """
+        return self.coordinate.notation
+
+    def __str__(self) -> str :
+        return f"{self.type}(project(\"{self.path}\"))"
+
+def project(path : str,type : DependencyTypeBase = DependencyType.Implementation) -> ProjectDependency :
+    return ProjectDependency(type,path)
+
+class SharedDependency(Dependency):
+    """
+    Immutable `Dependency` shared between identical declarations, see `Dependency.shared`.
+    """
+    __slots__ = ("__weakref__",)
+
+    _cache : 'WeakValueDictionary[tuple,SharedDependency]' = WeakValueDictionary()
+
+    def __init__(self,type : DependencyTypeBase,coordinate : Coordinate) -> None :
+        assign = object.__setattr__
+        assign(self,"type",type)
+        assign(self,"coordinate",coordinate)
+        assign(self,"replace",None)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        if hasattr(self,name) :
+            raise AttributeError("Shared dependencies are immutable, create a Dependency to modify it")
+        object.__setattr__(self,name,value)
+
+def _shared(dependency : Dependency) -> Dependency :
+    if type(dependency) is Dependency and dependency.replace is None :
+        return Dependency.shared(dependency.type,dependency.coordinate)
+    return dependency
+
 class DependencyGroup(CodeBlock[list[Dependency]],GradleMetadata,ProvideMetadata):
     """
     Class representing a group of Gradle dependencies.
 
     This class inherits from `CodeBlock` and provides a structured way to represent and manage a collection of `Dependency` objects in Gradle build scripts.
+
+    With `share=True`, plain `Dependency` declarations without a replace callback are replaced by the
+    `SharedDependency` every identical declaration uses, so they are immutable once added to the group. Sharing only
+    saves memory when declarations repeat, a shared declaration seen once costs more than a plain one.
     """
-    def __init__(self,dependencies : list[Dependency]) -> None :
+    def __init__(self,dependencies : list[Dependency],parent : Optional['GradleMetadata'] = None,share : bool = False) -> None :
+        if share :
+            dependencies = [_shared(dependency) for dependency in dependencies]
         CodeBlock.__init__(self,name="dependencies",arguments=None,code=dependencies)
+        GradleMetadata.__init__(self,parent)
+
+    @classmethod
+    def from_columns(cls,types : Sequence[DependencyTypeBase],groups : Sequence[str],artifacts : Sequence[Optional[str]],versions : Sequence[Optional[str]],parent : Optional['GradleMetadata'] = None) -> 'DependencyGroup' :
+        """
+        Builds a group from parallel sequences, the i-th dependency being `types[i]("groups[i]:artifacts[i]:versions[i]")`.
+
+        Useful to load large dependency tables (e.g. from CSV or a database). Identical rows share the same immutable
+        `SharedDependency` (see `Dependency.shared`), so repeated declarations only cost a list slot and rows are
+        not parsed twice.
+
+        Raises:
+            ValueError: If the sequences are not of the same length.
+        """
+        if not len(types) == len(groups) == len(artifacts) == len(versions) :
+            raise ValueError("types, groups, artifacts and versions must have the same length")
+
+        declarations : dict[tuple,SharedDependency] = {}
+        dependencies = []
+        for key in zip(types,groups,artifacts,versions) :
+            dependency = declarations.get(key)
+            if dependency is None :
+                type, group, artifact, version = key
+                dependency = declarations[key] = Dependency.shared(type,Coordinate.of(group,artifact,version))
+            dependencies.append(dependency)
+
+        return cls(dependencies,parent)
 
     def from_singluar(self,dependency : Dependency) -> None :
         return Self([dependency])
@@ -0,0 +1,458 @@
+import re
+from typing import Any, Iterator, Optional
+
+from src.gradle.buildgradle import ModuleBuildGradle
+from src.gradle.dependency import CatalogDependency, Configuration, Dependency, DependencyGroup, ProjectDependency, RawDependency
+from src.gradle.plugin import Plugin, PluginGroup, PluginType, RawPlugin
+from src.gradle.repository import Google, MavenCentral, MavenLocal, MavenUrl, Repositories, Repository
+from src.gradle.settingsgradle import DependencyResolutionManagement, PluginManagement, SettingsGradle
+from src.metadata import GradleMetadata, ModuleMetadata, ProjectMetadata
+from src.utils import RawCode
+
+class KotlinScriptSyntaxError(Exception):
+    """Exception raised when the structure of a Kotlin script (brackets, strings, comments) is broken."""
+    def __init__(self, line : str, line_number : int, column : int, reason : str):
+        self.line = line
+        self.line_number = line_number
+        self.column = column
+        self.reason = reason
+        super().__init__(f"{reason} at line {line_number}, column {column}: {line!r}")
+
+# Lexemes that matter to the structure of a script, everything in between is skipped by the regex engine. The
+# trailing alternatives only match unterminated strings and comments.
+_STRING = r'"""[\s\S]*?"""|"(?:[^"\\\n]|\\.)*"|\'(?:[^\'\\\n]|\\.)*\''
+_COMMENT = r'//[^\n]*|/\*[\s\S]*?\*/'
+_UNTERMINATED = r'"""|/\*|["\']'
+_LEXEME = re.compile(f'{_STRING}|{_COMMENT}|[{{}}()\\[\\]\\n;]|{_UNTERMINATED}')
+# Skips everything up to the next brace (or unterminated string or comment) in a single match. It is only used with
+# `match`, a search would retry from every position of a block without a closing brace.
+_BRACE = re.compile(f'(?:[^"\'/{{}}]++|{_STRING}|{_COMMENT}|/(?![/*]))*+([{{}}]|{_UNTERMINATED})')
+# A whole line holding a statement without blocks, comments or nested calls, e.g. `implementation("group:name:1.0")`
+_PLAIN = r'[^"\'/{}()\[\]\n;]++'
+_LINE_STRING = r'"[^"\\\n]*+(?:\\.[^"\\\n]*+)*+"'
+_SIMPLE_LINE = re.compile(rf'[ \t]*+([^\s"\'/{{}}()\[\];](?:{_PLAIN}|{_LINE_STRING}|\((?:{_PLAIN}|{_LINE_STRING})*+\))*+)\n')
+_NON_SPACE = re.compile(r'\S')
+
+# A line ending with one of these continues on the next one
+_CONTINUATION_ENDS = ("=", ",", ".", "+", "-", "*", "/", "&&", "||", "->", "?:")
+
+_IDENTIFIER = r'[A-Za-z_][A-Za-z0-9_]*'
+_QUOTED = r'"([^"\\$]*+(?:\\.[^"\\$]*+)*+)"'
+_PLUGIN = re.compile(
+    rf'^(id|kotlin|alias)\s*\(\s*(?:{_QUOTED}|({_IDENTIFIER}(?:\.{_IDENTIFIER})*))\s*\)'
+    rf'(?:\s+version\s+{_QUOTED})?(?:\s+apply\s+(true|false))?$'
+)
+_DEPENDENCY = re.compile(rf'^({_IDENTIFIER})\s*+\(\s*+(?:"([^"\\]*+(?:\\.[^"\\]*+)*+)"|({_IDENTIFIER}(?:\.{_IDENTIFIER})+))\s*+\)$')
+_PROJECT_DEPENDENCY = re.compile(rf'^({_IDENTIFIER})\s*\(\s*project\s*\(\s*{_QUOTED}\s*\)\s*\)$')
+_CALL = re.compile(rf'^({_IDENTIFIER})\s*\(')
+_REPOSITORY = re.compile(rf'^({_IDENTIFIER})\s*\(\s*(?:{_QUOTED})?\s*\)$')
+_ROOT_PROJECT_NAME = re.compile(rf'^rootProject\.name\s*=\s*{_QUOTED}$')
+_INCLUDE = re.compile(r'^include\s*\(([^()]*)\)$')
+_INCLUDE_ARGUMENT = re.compile(_QUOTED)
+_PROJECT_DIRECTORY = re.compile(rf'^project\s*\(\s*{_QUOTED}\s*\)\.projectDir\s*=\s*file\s*\(\s*{_QUOTED}\s*\)$')
+
+_REPOSITORIES : dict[str,type[Repository]] = {"mavenCentral" : MavenCentral,"google" : Google,"mavenLocal" : MavenLocal}
+
+class Statement :
+    """
+    A top-level statement of a region of a script: `source[start:end]` (trailing comments excluded) and, if it has
+    one, the span of its first block (`block` is the position of `{`, `block_end` the one of the matching `}`).
+    """
+    __slots__ = ("start","end","block","block_end","comment")
+
+    def __init__(self,start : int,end : int,block : Optional[int],block_end : Optional[int],comment : bool = False) -> None:
+        self.start = start
+        self.end = end
+        self.block = block
+        self.block_end = block_end
+        self.comment = comment
+
+class KotlinScript :
+    """
+    Single-pass structural scanner of a Kotlin DSL script.
+
+    Only the lexemes that shape the script are matched (strings, comments, brackets, newlines and `;`), the code in
+    between is skipped by the regex engine, and blocks the caller does not look into are jumped over with a scan
+    that only stops at braces. Parsing a build script therefore costs little more than one regex pass over it,
+    however large its opaque blocks (e.g. `android {}`) are.
+    """
+    source : str
+
+    def __init__(self,source : str) -> None:
+        self.source = source
+
+    def error(self,position : int,reason : str) -> KotlinScriptSyntaxError :
+        line_start = self.source.rfind("\n",0,position) + 1
+        line_end = self.source.find("\n",position)
+        line = self.source[line_start:line_end if line_end != -1 else len(self.source)]
+        return KotlinScriptSyntaxError(line,self.source.count("\n",0,position) + 1,position - line_start + 1,reason)
+
+    def _check(self,lexeme : str,position : int) -> None :
+        if lexeme in ('"','\'','"""') :
+            raise self.error(position,"Unterminated string")
+        if lexeme == "/*" :
+            raise self.error(position,"Unterminated comment")
+
+    def block_end(self,block : int) -> int :
+        """
+        Returns the position of the `}` closing the `{` at `block`.
+        """
+        depth = 1
+        position = block + 1
+        match = _BRACE.match
+        while (brace := match(self.source,position)) is not None :
+            lexeme = brace.group(1)
+            position = brace.end()
+            if lexeme == "{" :
+                depth += 1
+            elif lexeme == "}" :
+                depth -= 1
+                if depth == 0 :
+                    return position - 1
+            else :
+                self._check(lexeme,brace.start(1))
+        raise self.error(block,"Unclosed block")
+
+    def statements(self,start : int = 0,end : Optional[int] = None) -> Iterator[Statement] :
+        """
+        Yields the statements of `source[start:end]` (a whole script or the body of a block). Statements end at a
+        newline or `;` outside of brackets, unless the next line starts with `.` or `?.` or the line ends with an
+        operator. Comments between statements are yielded as comment statements, and so are comments ending the
+        line of a statement, right after it.
+        """
+        source = self.source
+        end = len(source) if end is None else end
+        search = _LEXEME.search
+        simple_line = _SIMPLE_LINE.match
+
+        position = start
+        statement_start = None
+        statement_end = start
+        depth = 0
+        block = block_end = None
+        trailing : list[Statement] = []
+
+        while True :
+            if statement_start is None :
+                # Fast path for the bulk of `dependencies {}` and `plugins {}`
+                line = simple_line(source,position,end)
+                if line is not None :
+                    line_start, line_end = line.span(1)
+                    line_end = line_start + len(source[line_start:line_end].rstrip())
+                    if not self._continues(line_start,line_end,line.end(),end) :
+                        yield Statement(line_start,line_end,None,None)
+                        position = line.end()
+                        continue
+
+            match = search(source,position,end)
+            gap_end = end if match is None else match.start()
+
+            # Code between lexemes (identifiers, operators, ...)
+            gap = _NON_SPACE.search(source,position,gap_end)
+            if gap is not None :
+                if statement_start is None :
+                    statement_start = gap.start()
+                statement_end = position + len(source[position:gap_end].rstrip())
+
+            if match is None :
+                break
+            lexeme = match.group()
+            position = match.end()
+            first = lexeme[0]
+
+            if first == "\n" or first == ";" :
+                if statement_start is None or depth > 0 :
+                    continue
+                if first == "\n" and self._continues(statement_start,statement_end,position,end) :
+                    continue
+                yield Statement(statement_start,statement_end,block,block_end)
+                if trailing :
+                    yield from trailing
+                    trailing = []
+                statement_start = None
+                block = block_end = None
+            elif lexeme.startswith("//") or (lexeme.startswith("/*") and len(lexeme) >= 4) :
+                comment = Statement(match.start(),match.end(),None,None,comment=True)
+                if statement_start is None :
+                    yield comment
+                elif depth == 0 :
+                    # Inside brackets a comment is part of the statement text
+                    trailing.append(comment)
+            elif first == "{" :
+                closing = self.block_end(match.start())
+                if statement_start is None :
+                    statement_start = match.start()
+                if block is None and depth == 0 :
+                    block, block_end = match.start(), closing
+                position = closing + 1
+                statement_end = position
+            elif first == "}" :
+                raise self.error(match.start(),"Unexpected '}'")
+            elif first in "([" :
+                if statement_start is None :
+                    statement_start = match.start()
+                depth += 1
+                statement_end = position
+            elif first in ")]" :
+                depth -= 1
+                if depth < 0 :
+                    raise self.error(match.start(),f"Unexpected '{first}'")
+                statement_end = position
+            else :
+                self._check(lexeme,match.start())
+                if statement_start is None :
+                    statement_start = match.start()
+                statement_end = position
+
+        if depth > 0 :
+            raise self.error(statement_start,"Unclosed bracket")
+        if statement_start is not None :
+            yield Statement(statement_start,statement_end,block,block_end)
+            yield from trailing
+
+    def _continues(self,statement_start : int,statement_end : int,position : int,end : int) -> bool :
+        if self.source[statement_start:statement_end].endswith(_CONTINUATION_ENDS) :
+            return True
+        following = _NON_SPACE.search(self.source,position,end)
+        if following is None :
+            return False
+        character = self.source[following.start()]
+        return character == "." or (character == "?" and self.source.startswith("?.",following.start()))
+
+    def text(self,statement : Statement) -> str :
+        return self.source[statement.start:statement.end]
+
+    def block_name(self,statement : Statement) -> Optional[str] :
+        """
+        Returns the name of a `name {}` block statement, `None` for any other statement.
+        """
+        if statement.block is None or statement.block_end + 1 != statement.end :
+            return None
+        name = self.source[statement.start:statement.block].strip()
+        return name if re.fullmatch(_IDENTIFIER,name) else None
+
+    def body(self,statement : Statement) -> Iterator[Statement] :
+        return self.statements(statement.block + 1,statement.block_end)
+
+    def find_blocks(self,*names : str) -> dict[str,Statement] :
+        """
+        Returns the first top-level block of every name in `names`.
+        """
+        found : dict[str,Statement] = {}
+        for statement in self.statements() :
+            name = self.block_name(statement)
+            if name in names and name not in found :
+                found[name] = statement
+                if len(found) == len(names) :
+                    break
+        return found
+
+def _unescape(value : str) -> str :
+    return value.replace('\\"','"').replace("\\\\","\\")
+
+def parse_plugin(statement : str) -> Plugin :
+    match = _PLUGIN.match(statement)
+    if match is None :
+        return RawPlugin(statement)
+    type, quoted, accessor, version, apply = match.groups()
+    identifier = accessor if accessor is not None else _unescape(quoted)
+    if (type == "alias") != (accessor is not None) :
+        return RawPlugin(statement)
+    return Plugin(PluginType(type),identifier,None if version is None else _unescape(version),None if apply is None else apply == "true")
+
+def parse_dependency(statement : str) -> Dependency :
+    match = _DEPENDENCY.match(statement)
+    if match is None :
+        project = _PROJECT_DEPENDENCY.match(statement)
+        if project is not None :
+            return ProjectDependency(Configuration.of(project.group(1)),_unescape(project.group(2)))
+        call = _CALL.match(statement)
+        return RawDependency(Configuration.of(call.group(1) if call is not None else ""),statement)
+    configuration, notation, accessor = match.groups()
+    if accessor is not None :
+        return CatalogDependency(Configuration.of(configuration),accessor)
+    return Dependency(Configuration.of(configuration),_unescape(notation))
+
+def parse_repository(statement : str) -> Repository | RawCode :
+    match = _REPOSITORY.match(statement)
+    if match is not None :
+        name, url = match.groups()
+        if name == "maven" and url is not None :
+            return MavenUrl(_unescape(url))
+        if name in _REPOSITORIES and url is None :
+            return _REPOSITORIES[name]()
+    return RawCode(statement)
+
+def _code(script : KotlinScript,statements : Iterator[Statement]) -> Iterator[str] :
+    # Comments included, they end up verbatim like any statement that is not a declaration
+    for statement in statements :
+        yield script.text(statement)
+
+def _plugin_group(script : KotlinScript,statement : Optional[Statement],parent : Optional[GradleMetadata] = None) -> PluginGroup :
+    plugins = [] if statement is None else [parse_plugin(text) for text in _code(script,script.body(statement))]
+    return PluginGroup(plugins,parent)
+
+def _declaration(text : str) -> Dependency :
+    # `parse_dependency` going straight to the shared declaration for the plain ones, the bulk of large blocks
+    match = _DEPENDENCY.match(text)
+    if match is None or match.group(2) is None :
+        return parse_dependency(text)
+    notation = match.group(2)
+    return Dependency.shared(Configuration.of(match.group(1)),_unescape(notation) if "\\" in notation else notation)
+
+def _dependency_group(script : KotlinScript,statement : Optional[Statement],parent : Optional[GradleMetadata] = None) -> DependencyGroup :
+    dependencies = [] if statement is None else [_declaration(text) for text in _code(script,script.body(statement))]
+    return DependencyGroup(dependencies,parent)
+
+def _repositories(script : KotlinScript,statement : Optional[Statement]) -> Repositories :
+    return Repositories([] if statement is None else [parse_repository(text) for text in _code(script,script.body(statement))])
+
+def _after_block(source : str,statement : Statement) -> int :
+    # The renderer ends blocks with a newline of its own
+    position = statement.end
+    return position + 1 if source.startswith("\n",position) else position
+
+def _verbatim(text : str,separator : bool) -> Optional[RawCode] :
+    """
+    Returns the raw content of a region, without the newline the renderer writes in front of it (`separator`).
+    """
+    if separator and text.startswith("\n") :
+        text = text[1:]
+    return RawCode(text) if text else None
+
+def parse_build_gradle(source : str,module_metadata : Optional[ModuleMetadata] = None) -> ModuleBuildGradle :
+    """
+    Parses a `build.gradle.kts` script into a `ModuleBuildGradle`.
+
+    The `plugins {}` and `dependencies {}` blocks are parsed into a `PluginGroup` and a `DependencyGroup`
+    (`configuration(project("..."))` becomes a `ProjectDependency`, comments and other statements that are not
+    plain declarations are kept verbatim as `RawPlugin` / `RawDependency`, and plain declarations are shared, see
+    `Dependency.shared`). Everything else is kept verbatim, in place: code before `plugins {}` as the `header`,
+    code between the two blocks (e.g. the configuration blocks of the plugins) at the end of the `PluginGroup`,
+    and the rest of the script as `other`. Scripts written by `ModuleBuildGradle` are read back to an identical
+    object model.
+
+    Raises:
+        KotlinScriptSyntaxError: If brackets, strings or comments of the script are not terminated.
+    """
+    script = KotlinScript(source)
+    blocks = script.find_blocks("plugins","dependencies")
+    plugins_block = blocks.get("plugins")
+    dependencies_block = blocks.get("dependencies")
+    if plugins_block is not None and dependencies_block is not None and dependencies_block.start < plugins_block.start :
+        raise script.error(dependencies_block.start,"dependencies {} must follow plugins {}")
+
+    plugins = _plugin_group(script,plugins_block)
+    dependencies = _dependency_group(script,dependencies_block)
+
+    header = None
+    position = 0
+    if plugins_block is not None :
+        header = _verbatim(source[:plugins_block.start],False)
+        position = _after_block(source,plugins_block)
+
+    other = None
+    if dependencies_block is not None :
+        middle = _verbatim(source[position:dependencies_block.start],False)
+        if middle is not None :
+            # `ModuleBuildGradle` writes a newline between the plugins and the dependencies
+            if middle.text.endswith("\n") :
+                middle.text = middle.text[:-1]
+            if middle.text :
+                plugins.code.append(middle)
+        tail = source[dependencies_block.end:]
+        if tail :
+            other = [RawCode(tail[1:] if tail.startswith("\n") else tail)]
+    elif source[position:] :
+        other = [_verbatim(source[position:],True) or RawCode("")]
+
+    build_gradle = ModuleBuildGradle(plugins,dependencies,other,module_metadata,[header] if header is not None else None)
+    return build_gradle
+
+def parse_settings_gradle(source : str,project_metadata : Optional[ProjectMetadata] = None) -> SettingsGradle :
+    """
+    Parses a `settings.gradle.kts` script into a `SettingsGradle`.
+
+    `pluginManagement {}` (its `repositories {}` and `plugins {}`), the script's own `plugins {}`,
+    `dependencyResolutionManagement {}` (its `repositories {}`), `rootProject.name`, `include(...)` and
+    `project("...").projectDir = file("...")` are parsed; other statements and comments inside the management
+    blocks are kept verbatim in them, code before `pluginManagement {}` is kept as the `header` and any other
+    top-level statement (in order) as `other`.
+
+    Args:
+        project_metadata (Optional[ProjectMetadata]): Metadata of the project. When it is not given and the script
+            sets `rootProject.name`, a `ProjectMetadata` only knowing the name is created.
+
+    Raises:
+        KotlinScriptSyntaxError: If brackets, strings or comments of the script are not terminated.
+    """
+    script = KotlinScript(source)
+
+    header = None
+    plugin_management = None
+    settings_plugins = None
+    resolution_management = None
+    name = None
+    modules : list[str] = []
+    project_directories : dict[str,str] = {}
+
+    unknown : list[Statement] = []
+    for statement in script.statements() :
+        block = script.block_name(statement)
+        text = script.text(statement)
+
+        if block == "pluginManagement" and plugin_management is None :
+            header = _verbatim(source[:statement.start],False)
+            plugin_management = _management(script,statement,True)
+            # Anything before `pluginManagement {}` is part of the header
+            unknown.clear()
+        elif block == "plugins" and settings_plugins is None :
+            settings_plugins = _plugin_group(script,statement)
+        elif block == "dependencyResolutionManagement" and resolution_management is None :
+            resolution_management = _management(script,statement,False)
+        elif (match := _ROOT_PROJECT_NAME.match(text)) is not None :
+            name = _unescape(match.group(1))
+        elif (match := _INCLUDE.match(text)) is not None :
+            modules.extend(_unescape(argument) for argument in _INCLUDE_ARGUMENT.findall(match.group(1)))
+        elif (match := _PROJECT_DIRECTORY.match(text)) is not None :
+            project_directories[_unescape(match.group(1))] = _unescape(match.group(2))
+        else :
+            unknown.append(statement)
+    other = [RawCode(script.text(statement)) for statement in unknown]
+
+    if project_metadata is None and name is not None :
+        project_metadata = ProjectMetadata(name,"","","")
+
+    return SettingsGradle(
+        plugin_management if plugin_management is not None else PluginManagement(Repositories([])),
+        resolution_management if resolution_management is not None else DependencyResolutionManagement(Repositories([])),
+        modules,
+        project_metadata,
+        other or None,
+        [header] if header is not None else None,
+        project_directories or None,
+        settings_plugins,
+    )
+
+def _management(script : KotlinScript,statement : Statement,plugins_allowed : bool) -> PluginManagement | DependencyResolutionManagement :
+    repositories = None
+    plugins = None
+    # Statements keep their position, e.g. `repositoriesMode.set(...)` before `repositories {}`
+    code : list[Any] = []
+    for inner in script.body(statement) :
+        name = script.block_name(inner)
+        if name == "repositories" and repositories is None :
+            repositories = _repositories(script,inner)
+            code.append(repositories)
+        elif name == "plugins" and plugins_allowed and plugins is None :
+            plugins = _plugin_group(script,inner)
+            code.append(plugins)
+        else :
+            code.append(RawCode(script.text(inner)))
+
+    if repositories is None :
+        repositories = Repositories([])
+        code.insert(0,repositories)
+    management = PluginManagement(repositories,plugins) if plugins_allowed else DependencyResolutionManagement(repositories)
+    management.code = code
+    return management
@@ -0,0 +1,328 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Iterable, Optional
+
+from src.gradle.dependency import DependencyGroup
+from src.gradle.resolution import version_key
+from src.tracing import trace
+from src.utils import cache_directory
+
+# Version of declarations that take the highest version of the local repository
+LATEST = "latest"
+
+# Files of a version directory that make it an installed version, `.lastUpdated` markers of failed downloads do not
+_ARTIFACT_SUFFIXES = (".pom", ".jar", ".aar", ".module")
+
+# Directory mtimes this close to the scan may still change within the same timestamp tick, they are not recorded
+_RACY_NS = 2_000_000_000
+
+_DIRECTORY, _VERSION = 0, 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS directories (path TEXT PRIMARY KEY, mtime_ns INTEGER NOT NULL, kind INTEGER NOT NULL) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS versions (path TEXT PRIMARY KEY, grp TEXT NOT NULL, artifact TEXT NOT NULL, version TEXT NOT NULL) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS versions_module ON versions (grp, artifact);
+"""
+
+class LocalRepositoryError(Exception):
+    pass
+
+def default_local_repository() -> Path :
+    return Path.home() / ".m2" / "repository"
+
+def default_index_path(repository : Path) -> Path :
+    """
+    Returns the index file of `repository` in the generator's cache, one per repository.
+    """
+    digest = hashlib.sha256(str(Path(repository).resolve()).encode("utf-8")).hexdigest()
+    return cache_directory("maven") / f"{digest[:16]}.sqlite"
+
+class RefreshReport :
+    """
+    What `LocalRepositoryIndex.refresh` looked at and changed.
+
+    Attributes:
+        checked (int): Directories whose mtime was compared with the index.
+        listed (int): Directories listed because they are new or changed.
+        added (int): Versions added to the index.
+        removed (int): Versions removed from the index.
+    """
+    checked : int
+    listed : int
+    added : int
+    removed : int
+
+    def __init__(self) -> None:
+        self.checked = 0
+        self.listed = 0
+        self.added = 0
+        self.removed = 0
+
+    def __str__(self) -> str :
+        return f"{self.checked} directories checked, {self.listed} listed, {self.added} versions added, {self.removed} removed"
+
+class VersionFill :
+    """
+    Result of `LocalRepositoryIndex.fill_versions`.
+
+    Attributes:
+        filled (dict[str,str]): `group:artifact` -> version filled in.
+        missing (dict[str,None]): `group:artifact` of declarations left as they were, the local repository having no
+            version of them (in declaration order).
+    """
+    filled : dict[str,str]
+    missing : dict[str,None]
+
+    def __init__(self) -> None:
+        self.filled = {}
+        self.missing = {}
+
+    def __str__(self) -> str :
+        missing = f", missing: {', '.join(self.missing)}" if self.missing else ""
+        return f"{len(self.filled)} versions filled in{missing}"
+
+class LocalRepositoryIndex :
+    """
+    Persistent SQLite index of the versions installed in a local Maven repository (`~/.m2/repository` by default),
+    so declarations can be completed without walking the repository.
+
+    The repository uses the Maven layout, `group/as/path/artifact/version/artifact-version.pom`; a directory is a
+    version when it contains a `.pom`, `.jar`, `.aar` or `.module` of its artifact. The first `refresh` lists every
+    directory. The index keeps the mtime of each directory, and as adding or removing an entry changes the mtime of
+    the directory holding it, later refreshes only `stat` the known directories and list the ones that changed
+    (a new version of an artifact, a new artifact of a group, files added to a version). Lookups are indexed queries.
+
+    Lookups refresh the index the first time they run, call `refresh` to pick up later changes. An index may be
+    shared between threads.
+
+    Example:
+        >>> with LocalRepositoryIndex() as index :
+        ...     index.latest("com.squareup.retrofit2","retrofit")
+        '2.11.0'
+
+    Attributes:
+        repository (Path): The root of the local repository.
+        path (Path): The index file, see `default_index_path`.
+    """
+    FORMAT = 1
+
+    repository : Path
+    path : Path
+
+    def __init__(self,repository : Optional[Path] = None,path : Optional[Path] = None) -> None:
+        self.repository = Path(repository) if repository is not None else default_local_repository()
+        self.path = Path(path) if path is not None else default_index_path(self.repository)
+        self._lock = threading.Lock()
+        self._refreshed = False
+        # (group, artifact, include_snapshots) -> latest version, cleared by `refresh`
+        self._latest : dict[tuple[str,str,bool],Optional[str]] = {}
+        try :
+            self.path.parent.mkdir(parents=True,exist_ok=True)
+            self._connection = sqlite3.connect(self.path,check_same_thread=False)
+            self._open()
+        except (OSError, sqlite3.Error) as error :
+            raise LocalRepositoryError(f"Could not open the index {self.path}: {error}") from error
+
+    def _open(self) -> None :
+        connection = self._connection
+        repository = str(self.repository.resolve())
+        with connection :
+            format = connection.execute("PRAGMA user_version").fetchone()[0]
+            if format != self.FORMAT :
+                connection.executescript("DROP TABLE IF EXISTS meta; DROP TABLE IF EXISTS directories; DROP TABLE IF EXISTS versions;")
+                connection.execute(f"PRAGMA user_version = {self.FORMAT}")
+            connection.executescript(_SCHEMA)
+            indexed = connection.execute("SELECT value FROM meta WHERE key = 'repository'").fetchone()
+            if indexed is None or indexed[0] != repository :
+                # An index file given explicitly for another repository starts over
+                connection.execute("DELETE FROM directories")
+                connection.execute("DELETE FROM versions")
+                connection.execute("INSERT OR REPLACE INTO meta VALUES ('repository', ?)",(repository,))
+                connection.execute("INSERT OR REPLACE INTO meta VALUES ('revision', '0')")
+
+    def close(self) -> None :
+        self._connection.close()
+
+    def __enter__(self) -> 'LocalRepositoryIndex' :
+        return self
+
+    def __exit__(self,*exc_info) -> None :
+        self.close()
+
+    def revision(self) -> int :
+        """
+        Returns a counter increased by every refresh that changed the indexed versions, e.g. to key caches of
+        projects whose versions were filled in from this index.
+        """
+        self._ensure_refreshed()
+        with self._lock :
+            return int(self._connection.execute("SELECT value FROM meta WHERE key = 'revision'").fetchone()[0])
+
+    def refresh(self) -> RefreshReport :
+        """
+        Brings the index up to date with the repository, listing only the directories that are new or changed since
+        the previous refresh. A missing repository indexes as empty.
+        """
+        with self._lock, trace("refresh_maven_index","maven",path=str(self.repository)) as span :
+            try :
+                report = self._refresh()
+            except sqlite3.Error as error :
+                raise LocalRepositoryError(f"Could not update the index {self.path}: {error}") from error
+            self._refreshed = True
+            self._latest = {}
+            if span :
+                span.set(objects=report.checked,listed=report.listed,added=report.added,removed=report.removed)
+        return report
+
+    def _refresh(self) -> RefreshReport :
+        connection = self._connection
+        report = RefreshReport()
+        known = {path : (mtime, kind) for path, mtime, kind in connection.execute("SELECT path, mtime_ns, kind FROM directories")}
+        children : dict[str,list[str]] = {}
+        for path in known :
+            if path :
+                children.setdefault(path.rpartition("/")[0],[]).append(path)
+
+        root = str(self.repository)
+        horizon = time.time_ns() - _RACY_NS
+        seen : set[str] = set()
+        directories : list[tuple[str,int,int]] = []
+        versions : list[tuple[str,str,str,str]] = []
+        unversioned : list[tuple[str]] = []
+
+        pending = [""]
+        while pending :
+            path = pending.pop()
+            try :
+                mtime = os.stat(os.path.join(root,path)).st_mtime_ns
+            except OSError :
+                continue
+            seen.add(path)
+            report.checked += 1
+
+            previous = known.get(path)
+            if previous is not None and previous[0] == mtime :
+                if previous[1] == _DIRECTORY :
+                    pending.extend(children.get(path,()))
+                continue
+
+            report.listed += 1
+            try :
+                entries = list(os.scandir(os.path.join(root,path)))
+            except OSError :
+                continue
+            recorded = mtime if mtime < horizon else -1
+            version = _version(path,entries)
+            if version is not None :
+                directories.append((path,recorded,_VERSION))
+                versions.append((path,*version))
+                continue
+            directories.append((path,recorded,_DIRECTORY))
+            if previous is not None and previous[1] == _VERSION :
+                unversioned.append((path,))
+            pending.extend(f"{path}/{entry.name}" if path else entry.name for entry in entries if entry.is_dir(follow_symlinks=False))
+
+        removed = [(path,) for path in known.keys() - seen]
+        with connection :
+            connection.executemany("DELETE FROM directories WHERE path = ?",removed)
+            deleted = connection.total_changes
+            connection.executemany("DELETE FROM versions WHERE path = ?",removed + unversioned)
+            report.removed = connection.total_changes - deleted
+            connection.executemany("INSERT OR REPLACE INTO directories VALUES (?, ?, ?)",directories)
+            added = [row for row in versions if known.get(row[0],(0,_DIRECTORY))[1] != _VERSION]
+            connection.executemany("INSERT OR REPLACE INTO versions VALUES (?, ?, ?, ?)",versions)
+            report.added = len(added)
+            if report.added or report.removed :
+                connection.execute("UPDATE meta SET value = CAST(value AS INTEGER) + 1 WHERE key = 'revision'")
+        return report
+
+    def _ensure_refreshed(self) -> None :
+        if not self._refreshed :
+            self.refresh()
+
+    def versions(self,group : str,artifact : str) -> list[str] :
+        """
+        Returns the versions of `group:artifact` in the repository, lowest first (see `version_key`).
+        """
+        self._ensure_refreshed()
+        with self._lock :
+            rows = self._connection.execute("SELECT version FROM versions WHERE grp = ? AND artifact = ?",(group,artifact)).fetchall()
+        return sorted((row[0] for row in rows),key=version_key)
+
+    def latest(self,group : str,artifact : str,include_snapshots : bool = False) -> Optional[str] :
+        """
+        Returns the highest version of `group:artifact` in the repository, `-SNAPSHOT` versions excepted unless
+        `include_snapshots` is set, or `None` if there is none.
+        """
+        self._ensure_refreshed()
+        key = (group,artifact,include_snapshots)
+        with self._lock :
+            # A refresh replaces the memo, so a version computed from the previous index is stored into the old one
+            memo = self._latest
+            if key in memo :
+                return memo[key]
+        candidates = [version for version in self.versions(group,artifact) if include_snapshots or not version.endswith("-SNAPSHOT")]
+        latest = candidates[-1] if candidates else None
+        with self._lock :
+            memo[key] = latest
+        return latest
+
+    def fill_versions(self,group : DependencyGroup,report : Optional[VersionFill] = None,include_snapshots : bool = False) -> VersionFill :
+        """
+        Gives the declarations of `group` without a version, or with the version `latest`, the highest version of
+        their `group:artifact` in the repository, in place. Declarations the repository has no version of are left
+        as they are and reported as missing.
+
+        Returns:
+            VersionFill: `report`, or a new one.
+        """
+        report = report if report is not None else VersionFill()
+        dependencies = []
+        changed = False
+        for dependency in group.code :
+            coordinate = dependency.coordinate
+            if coordinate.artifact is None or (coordinate.version is not None and coordinate.version != LATEST) :
+                dependencies.append(dependency)
+                continue
+            version = self.latest(coordinate.group,coordinate.artifact,include_snapshots)
+            if version is None :
+                report.missing[coordinate.module] = None
+                dependencies.append(dependency)
+                continue
+            report.filled[coordinate.module] = version
+            dependencies.append(dependency.with_version(version))
+            changed = True
+        if changed :
+            group.code = dependencies
+        return report
+
+    def fill_all(self,groups : Iterable[DependencyGroup],include_snapshots : bool = False) -> VersionFill :
+        """
+        Fills in the versions of every group of `groups` (see `fill_versions`).
+        """
+        report = VersionFill()
+        with trace("fill_versions","maven") as span :
+            for group in groups :
+                self.fill_versions(group,report,include_snapshots)
+            if span :
+                span.set(filled=len(report.filled),missing=len(report.missing))
+        return report
+
+def _version(path : str,entries : list[os.DirEntry]) -> Optional[tuple[str,str,str]] :
+    # `(group, artifact, version)` if `path` is `group/as/path/artifact/version` with files of that version
+    parts = path.split("/")
+    if len(parts) < 3 :
+        return None
+    artifact, version = parts[-2], parts[-1]
+    # Snapshots downloaded from a remote repository are timestamped: artifact-1.0-20240101.120000-1.jar
+    prefix = f"{artifact}-{version.removesuffix('SNAPSHOT')}"
+    for entry in entries :
+        name = entry.name
+        if name.startswith(prefix) and name.endswith(_ARTIFACT_SUFFIXES) and entry.is_file() :
+            return ".".join(parts[:-2]), artifact, version
+    return None
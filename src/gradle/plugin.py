@@ -2,12 +2,13 @@
 
 from abc import abstractmethod
 from enum import Enum
-from typing import Any, Callable, Optional, Self, TypeAlias, TypeVar
+from sys import intern
+from typing import Any, Callable, Optional, Self, TextIO, TypeAlias, TypeVar
 
 from src.core import ProvideMetadata
 
 from ..metadata import GradleMetadata
-from ..utils import CodeBlock
+from ..utils import CodeBlock, RawCode, render_to
 
 class PluginType(Enum) :
     """
@@ -43,12 +44,15 @@ class Plugin(ProvideMetadata) :
     * `id(identifier, version=None, apply=None)`: Creates a plugin of type `PluginType.Id`.
     * `kotlin(identifier, version=None, apply=None)`: Creates a plugin of type `PluginType.Kotlin`.
     * `alias(identifier, version=None, apply=None)`: Creates a plugin of type `PluginType.Alias`.
+
+    Instances use `__slots__` and intern their identifier and version, as the same plugins are applied in most modules.
     """
+    __slots__ = ("type","identifier","version","apply","replace")
 
     def __init__(self,type : PluginType ,identifier : str,version : Optional[str] = None,apply : Optional[bool] = None,replace : ReplaceAlias = None) -> None: 
         self.type = type
-        self.identifier = identifier
-        self.version = version
+        self.identifier = intern(identifier)
+        self.version = None if version is None else intern(version)
         self.apply = apply
         self.replace = replace
         
@@ -59,16 +63,55 @@ class Plugin(ProvideMetadata) :
             message += f" version \"{self.version}\""
 
         if self.apply is not None :
-            message += f" apply {self.apply}"
+            message += f" apply {"true" if self.apply else "false"}"
 
         return message
     
+    def plugin_id(self) -> Optional[str] :
+        """
+        Returns the id the plugin is applied with (`kotlin("jvm")` is `org.jetbrains.kotlin.jvm`), `None` for aliases.
+        """
+        if self.type is PluginType.Kotlin :
+            return f"org.jetbrains.kotlin.{self.identifier}"
+        if self.type is PluginType.Id :
+            return self.identifier
+        return None
+
+    def use_catalog(self,catalog : 'VersionCatalog') -> 'Plugin' :
+        """
+        Returns this plugin applied through its version catalog accessor (e.g. `alias(libs.plugins.kotlin.jvm)`),
+        or itself if the catalog has no plugin with its id or declares another version. The version then comes from
+        the catalog.
+        """
+        plugin_id = self.plugin_id()
+        accessor = None if plugin_id is None else catalog.plugin_accessor(plugin_id)
+        if accessor is None or not catalog.plugin_matches(plugin_id,self.version) :
+            return self
+        return Plugin(PluginType.Alias,accessor,None,self.apply,self.replace)
+
     def provide_metadata(self, metadata: 'GradleMetadata') -> None:
         property = metadata.get_property(f"plugins/{self.identifier}")
         if property is not None and self.replace is not None :
             self.replace(self,metadata,property)
 
 
+class RawPlugin(Plugin) :
+    """
+    A statement of a `plugins {}` block that is not an `id`, `kotlin` or `alias` declaration (e.g. `` `kotlin-dsl` ``
+    or `application`), kept verbatim. It has no plugin id, so version catalogs leave it untouched.
+    """
+    __slots__ = ()
+
+    def __init__(self,statement : str) -> None :
+        super().__init__(PluginType.Id,statement)
+
+    def __str__(self) -> str :
+        return self.identifier
+
+    def plugin_id(self) -> Optional[str] :
+        return None
+
+
 """
 Creates a Plugin object of type `PluginType.Id`.
 
@@ -171,7 +214,18 @@ class PluginWithCodeBlock(Plugin,CodeBlock[T]):
     def __init__(self,plugin : Plugin) :
         self.plugin = plugin
         super().__init__(plugin.type,plugin.identifier,plugin.version,plugin.apply,plugin.replace)    
-    pass
+
+    def use_catalog(self,catalog : 'VersionCatalog') -> 'PluginWithCodeBlock' :
+        plugin = Plugin.use_catalog(self,catalog)
+        if plugin is self :
+            return self
+        rewritten = PluginWithCodeBlock(plugin)
+        rewritten.code = self.code
+        return rewritten
+
+    def write_to(self,sink : TextIO) -> None :
+        # Rendered like a plain plugin, its code block is emitted by the owning `PluginGroup`
+        sink.write(Plugin.__str__(self))
 
 class PluginGroup(CodeBlock[list[Plugin|PluginWithCodeBlock[Any]]],GradleMetadata,ProvideMetadata):
     """
@@ -189,16 +243,30 @@ class PluginGroup(CodeBlock[list[Plugin|PluginWithCodeBlock[Any]]],GradleMetadat
     def get_identifier(self) -> str:
         return "plugins"
     
-    def __str__(self) -> str :
-        base_plugins = []
-        code_block : str = ""
+    def write_to(self,sink : TextIO) -> None :
+        """
+        Streams the `plugins {}` block followed by the code blocks of every `PluginWithCodeBlock` (and any `RawCode`
+        configuring the plugins, e.g. read from an existing script) into `sink`.
+        """
+        write = sink.write
+        write(self.name)
+        if self.arguments is not None and self.arguments :
+            write(','.join(self.arguments))
+        write(" {\n\t")
+        first = True
+        for plugin in self.code :
+            if isinstance(plugin,(PluginWithCodeBlock,RawCode)) :
+                continue
+            if not first :
+                write("\n\t")
+            first = False
+            render_to(plugin,sink)
+        write("\n}\n")
         for plugin in self.code :
-            if not isinstance(plugin,PluginWithCodeBlock) :
-                base_plugins.append(plugin)
-            else :
-                code_block += str(plugin.code)
-        _group = CodeBlock(self.name,base_plugins,self.arguments)
-        return f"{_group}\n{code_block}"
+            if isinstance(plugin,PluginWithCodeBlock) :
+                render_to(plugin.code,sink)
+            elif isinstance(plugin,RawCode) :
+                render_to(plugin,sink)
     
     def provide_metadata(self, metadata: 'GradleMetadata') -> None:
         for plugin in self.code :
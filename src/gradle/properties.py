@@ -1,9 +1,14 @@
 from pathlib import Path
-from typing import Optional, Self
+from typing import Iterable, Iterator, Optional, Self, TextIO
 from collections import OrderedDict
 from os.path import join as join_path;
+import mmap
+import os
+import re
 
 from ..core import FileConvertible, catch_exception_in_all_methods
+from ..tracing import trace
+from ..utils import open_output
 from ..metadata import GradleMetadata;
 
 
@@ -18,8 +23,15 @@ class FileNameNotGradlePropertiesError(GradlePropertiesError):
 
 class IncorrectFormatError(GradlePropertiesError):
     """Exception raised for incorrect format."""
-    def __init__(self,line : Optional[str] = None):
-        message = "Line is not the correct Gradle properties file format (key=value)"
+    def __init__(self,line : Optional[str] = None,line_number : Optional[int] = None,column : Optional[int] = None,reason : Optional[str] = None):
+        self.line = line
+        self.line_number = line_number
+        self.column = column
+
+        message = reason if reason is not None else "Line is not the correct Gradle properties file format (key=value)"
+
+        if line_number is not None :
+            message += f" at line {line_number}" + (f", column {column}" if column is not None else "")
 
         if line is not None :
             message += f": {line}"
@@ -32,49 +44,261 @@ class GradlePropertiesFileIOError(GradlePropertiesError):
         self.io_exception = io_exception
         super().__init__(f"Caused due to {self.io_exception}")
 
+# https://docs.oracle.com/en/java/javase/21/docs/api/java.base/java/util/Properties.html#load(java.io.Reader)
+_WHITESPACE = " \t\f"
+_ESCAPES = {"t" : "\t","n" : "\n","r" : "\r","f" : "\f"}
+# Lines without a backslash need neither escape nor continuation handling
+_SIMPLE_LINE = re.compile(r"([^=: \t\f]*)[ \t\f]*(?:[=:][ \t\f]*)?(.*)",re.DOTALL)
+_LINE_BREAK = re.compile(r"\r\n|\r|\n")
+
+# Files larger than this are memory-mapped instead of read through a buffered text stream
+MMAP_THRESHOLD = 8 * 1024 * 1024
+
+def _unescape(text : str,start : int,end : int,line_number : int,offsets : list[tuple[int,int,int]]) -> str :
+    """Processes the escapes of `text[start:end]`, a key or value of a logical line."""
+    if "\\" not in text[start:end] :
+        return text[start:end]
+
+    result = []
+    surrogates = False
+    index = start
+    while index < end :
+        backslash = text.find("\\",index,end)
+        if backslash < 0 :
+            result.append(text[index:end])
+            break
+        result.append(text[index:backslash])
+        if backslash + 1 >= end :
+            # A trailing backslash at the end of the file is dropped
+            break
+
+        escaped = text[backslash + 1]
+        if escaped == "u" :
+            digits = text[backslash + 2:backslash + 6]
+            if len(digits) != 4 or backslash + 6 > end or any(c not in "0123456789abcdefABCDEF" for c in digits) :
+                error_line, column = _position(backslash,line_number,offsets)
+                raise IncorrectFormatError(text[start:end],error_line,column,"Malformed \\uxxxx encoding")
+            code = int(digits,16)
+            surrogates = surrogates or 0xD800 <= code <= 0xDFFF
+            result.append(chr(code))
+            index = backslash + 6
+        else :
+            result.append(_ESCAPES.get(escaped,escaped))
+            index = backslash + 2
+
+    if surrogates :
+        # `\uD83D\uDE00` is one character, as the escapes are UTF-16 code units; unpaired surrogates are kept
+        return "".join(result).encode("utf-16-le","surrogatepass").decode("utf-16-le","surrogatepass")
+    return "".join(result)
+
+def _position(index : int,line_number : int,offsets : list[tuple[int,int,int]]) -> tuple[int,int] :
+    """Maps an index of a logical line back to the (1-based) line and column of the natural line it came from."""
+    for logical_start, natural_line, natural_column in reversed(offsets) :
+        if index >= logical_start :
+            return natural_line, natural_column + index - logical_start + 1
+    return line_number, index + 1
+
+def _parse_logical_line(text : str,line_number : int,offsets : list[tuple[int,int,int]]) -> tuple[str,str] :
+    length = len(text)
+    index = 0
+    while index < length and text[index] in _WHITESPACE :
+        index += 1
+
+    key_start = index
+    while index < length :
+        character = text[index]
+        if character == "\\" :
+            index += 2
+            continue
+        if character in "=:" or character in _WHITESPACE :
+            break
+        index += 1
+    key_end = min(index,length)
+
+    while index < length and text[index] in _WHITESPACE :
+        index += 1
+    if index < length and text[index] in "=:" :
+        index += 1
+        while index < length and text[index] in _WHITESPACE :
+            index += 1
+
+    key = _unescape(text,key_start,key_end,line_number,offsets)
+    value = _unescape(text,index,length,line_number,offsets)
+    return key, value
+
+def _ends_with_continuation(line : str) -> bool :
+    backslashes = len(line) - len(line.rstrip("\\"))
+    return backslashes % 2 == 1
+
+def parse_properties(lines : Iterable[str]) -> OrderedDict[str,str] :
+    """
+    Parses the Java `.properties` format used by `gradle.properties`, in a single streaming pass over `lines`.
+
+    Supports `#` and `!` comments, `=`, `:` and whitespace separators, line continuations with a trailing
+    backslash and the `\\t`, `\\n`, `\\r`, `\\f` and `\\uXXXX` escapes. Keys keep the order of their first
+    occurrence, a repeated key overrides the previous value.
+
+    Args:
+        lines (Iterable[str]): The lines of the file, with or without their line terminator.
+
+    Raises:
+        IncorrectFormatError: With the line and column of a malformed `\\uXXXX` escape.
+    """
+    properties : OrderedDict[str,str] = OrderedDict()
+    simple_line = _SIMPLE_LINE.match
+
+    pending : Optional[list[str]] = None
+    offsets : list[tuple[int,int,int]] = []
+    logical_length = 0
+    start_line = 0
+
+    for line_number, line in enumerate(lines,1) :
+        # A natural line cannot contain line breaks, only its terminator
+        line = line.rstrip("\r\n")
+
+        if pending is None :
+            stripped = line.lstrip(_WHITESPACE)
+            if not stripped or stripped[0] in "#!" :
+                continue
+
+            if "\\" not in stripped :
+                key, value = simple_line(stripped).groups()
+                properties[key] = value
+                continue
+
+            pending, offsets, logical_length, start_line = [], [], 0, line_number
+            column = 0
+        else :
+            stripped = line.lstrip(_WHITESPACE)
+            column = len(line) - len(stripped)
+            line = stripped
+
+        continued = _ends_with_continuation(line)
+        if continued :
+            line = line[:-1]
+
+        offsets.append((logical_length,line_number,column))
+        pending.append(line)
+        logical_length += len(line)
+
+        if not continued :
+            key, value = _parse_logical_line("".join(pending),start_line,offsets)
+            properties[key] = value
+            pending = None
+
+    if pending is not None :
+        key, value = _parse_logical_line("".join(pending),start_line,offsets)
+        properties[key] = value
+
+    return properties
+
+# Size of the slices of a memory-mapped file decoded at once
+_MMAP_CHUNK = 4 * 1024 * 1024
+
+def _mapped_lines(file,encoding : str) -> Iterator[str] :
+    with mmap.mmap(file.fileno(),0,access=mmap.ACCESS_READ) as mapped :
+        size = len(mapped)
+        start = 0
+        while start < size :
+            end = mapped.rfind(b"\n",start,min(start + _MMAP_CHUNK,size))
+            end = size if end < 0 or start + _MMAP_CHUNK >= size else end + 1
+            chunk = mapped[start:end].decode(encoding)
+            start = end
+
+            lines = _LINE_BREAK.split(chunk) if "\r" in chunk else chunk.split("\n")
+            if lines and not lines[-1] :
+                lines.pop()
+            yield from lines
+
+def load_properties(filepath : Path,encoding : str = "iso-8859-1") -> OrderedDict[str,str] :
+    """
+    Parses a `.properties` file (see `parse_properties`), streaming it, or memory-mapping it when it is larger than
+    `MMAP_THRESHOLD`. Like `java.util.Properties.load(InputStream)` the file is read as ISO-8859-1 by default.
+    """
+    with open(filepath,"rb") as file :
+        size = os.fstat(file.fileno()).st_size
+        if size >= MMAP_THRESHOLD :
+            return parse_properties(_mapped_lines(file,encoding))
+
+    with open(filepath,"r",encoding=encoding,newline=None) as file :
+        return parse_properties(file)
+
+_KEY_SPECIALS = {"\\" : "\\\\","\t" : "\\t","\n" : "\\n","\r" : "\\r","\f" : "\\f","=" : "\\=",":" : "\\:","#" : "\\#","!" : "\\!"," " : "\\ "}
+_VALUE_SPECIALS = {"\\" : "\\\\","\t" : "\\t","\n" : "\\n","\r" : "\\r","\f" : "\\f"}
+_NEEDS_ESCAPE = re.compile(r"[\\\t\n\r\f=:#! ]|[^\x20-\x7e]")
+
+def _escape_character(c : str) -> str :
+    code = ord(c)
+    if code <= 0xFFFF :
+        return f"\\u{code:04X}"
+    # Outside the BMP, escaped as a UTF-16 surrogate pair like `java.util.Properties.store`
+    code -= 0x10000
+    return f"\\u{0xD800 + (code >> 10):04X}\\u{0xDC00 + (code & 0x3FF):04X}"
+
+def _escape(text : str,specials : dict[str,str]) -> str :
+    if not _NEEDS_ESCAPE.search(text) :
+        return text
+    return "".join(specials.get(c) or (c if " " <= c <= "~" else _escape_character(c)) for c in text)
+
+def escape_property(key : str,value : str) -> str :
+    """
+    Returns the `key=value` line (without terminator) that `parse_properties` reads back as `key` and `value`.
+    """
+    escaped_value = _escape(value,_VALUE_SPECIALS)
+    if escaped_value[:1] == " " :
+        escaped_value = "\\" + escaped_value
+    return f"{_escape(key,_KEY_SPECIALS)}={escaped_value}"
+
 @catch_exception_in_all_methods(GradlePropertiesError)
 class GradleProperties(FileConvertible): 
     FILE_NAME= "gradle.properties"
-    values : OrderedDict[str,str] = OrderedDict()
+    values : OrderedDict[str,str]
+
+    def __init__(self,values : Optional[dict[str,str]] = None) -> None:
+        self.values = OrderedDict(values or {})
 
     def get_identifier(self) -> str:
         return "gradle-properties"
 
+    def write_to(self, sink: TextIO) -> None:
+        for key, value in self.values.items():
+            sink.write(escape_property(key,value))
+            sink.write("\n")
+
     def generate_to_file(self, filepath: Path) -> None:
-        file_directory = join_path(filepath,Self.FILE_NAME)
+        file_directory = join_path(filepath,self.FILE_NAME)
 
-        with open(file_directory,"w") as file:
-            for key, value in self.values.items():
-                file.write(f"{key}={value}\n")
-            
-        pass
+        with trace(self.FILE_NAME,"write") as span :
+            with open_output(file_directory) as file:
+                self.write_to(file)
+            if span :
+                span.set(path=file_directory,objects=len(self.values),bytes=os.path.getsize(file_directory))
         
-    def from_file(cls, filepath: Path) -> 'GradleProperties':
-        properties = GradleProperties()
+    @classmethod
+    def from_file(cls, filepath: Path,encoding : str = "iso-8859-1") -> 'GradleProperties':
+        filepath = Path(filepath)
 
-        if not filepath.is_file() and filepath.name != Self.FILE_NAME:
+        if filepath.name != cls.FILE_NAME:
             raise FileNameNotGradlePropertiesError
         
         try : 
-            with filepath.open("w") as file:
-                for line in file.readlines() :
-                    if all([c.isspace() for c in line]) :
-                        continue
-            
-                    try : 
-                        key , value = line.split("=",1)
-                    except ValueError as error :
-                        raise IncorrectFormatError(line=line) from error
-                    
-                    properties.values[key.strip()] = value.strip()
+            with trace(cls.FILE_NAME,"parse") as span :
+                properties = cls(load_properties(filepath,encoding))
+                if span :
+                    span.set(path=str(filepath),objects=len(properties.values),bytes=os.path.getsize(filepath))
+            return properties
         except OSError as error :
             raise GradlePropertiesFileIOError(error)
-        
-        return properties
+
+    @classmethod
+    def from_string(cls, content : str) -> 'GradleProperties':
+        # `str.splitlines` would also split on form feeds, which are whitespace in properties files
+        return cls(parse_properties(_LINE_BREAK.split(content)))
 
     def provide_metadata(self, metadata: 'GradleMetadata') -> None:
+        # Metadata overrides the properties the file declares, it does not add new ones
         for key, value in metadata.metadata.items():
-            if key in metadata :
+            if key in self.values :
                 self.values[key] = value
 
         pass
\ No newline at end of file
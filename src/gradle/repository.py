@@ -4,7 +4,8 @@ from src.metadata import GradleMetadata
 from src.utils import CodeBlock
 
 class Repository(ProvideMetadata) :
-    pass
+    def provide_metadata(self, metadata: 'GradleMetadata'):
+        pass
 
 class MavenCentral(Repository):
     def __str__(self) -> str:
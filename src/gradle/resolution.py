@@ -0,0 +1,208 @@
+import re
+from enum import Enum
+from functools import lru_cache
+from typing import Iterable, Optional
+
+from src.gradle.dependency import Dependency, DependencyGroup, DependencyTypeBase
+
+class DependencyConflictError(Exception):
+    """Exception raised when declarations disagree on a version and the strategy does not allow resolving it."""
+    def __init__(self,conflicts : list['Conflict']):
+        self.conflicts = conflicts
+        super().__init__("Conflicting versions for " + ", ".join(str(conflict) for conflict in conflicts))
+
+# Parts of a version are separated by `.`, `-`, `_` and `+`, and a change between digits and letters
+_VERSION_PART = re.compile(r"\d+|[^\d.\-_+]+")
+
+# https://docs.gradle.org/current/userguide/single_versions.html#version_ordering
+_SPECIAL_PARTS = {name : rank for rank, name in enumerate(("rc","snapshot","final","ga","release","sp"))}
+
+_DEV, _STRING, _SPECIAL, _END, _NUMERIC = range(5)
+
+@lru_cache(maxsize=65536)
+def version_key(version : str) -> tuple :
+    """
+    Returns a sort key ordering versions the way Gradle does.
+
+    * Numeric parts compare numerically and are higher than any non-numeric part.
+    * `dev` is lower than any other part, `rc` < `snapshot` < `final` < `ga` < `release` < `sp` (case insensitive)
+      are higher than any other non-numeric part, which compare alphabetically.
+    * An extra numeric part makes a version higher (`1.1.0` > `1.1`), an extra non-numeric part makes it lower
+      (`1.1-rc` < `1.1`).
+
+    Parsed keys are cached, as the same versions are compared over and over.
+    """
+    key = []
+    for part in _VERSION_PART.findall(version) :
+        if part.isdigit() :
+            key.append((_NUMERIC,int(part)))
+            continue
+        lowered = part.lower()
+        if lowered == "dev" :
+            key.append((_DEV,))
+        elif lowered in _SPECIAL_PARTS :
+            key.append((_SPECIAL,_SPECIAL_PARTS[lowered]))
+        else :
+            key.append((_STRING,part))
+    key.append((_END,))
+    return tuple(key)
+
+class ConflictStrategy(Enum) :
+    """
+    How to pick a version when several declarations of the same `group:artifact` disagree.
+
+    * `Highest`: The highest version (see `version_key`) wins, like Gradle's default conflict resolution.
+    * `Fail`: Any conflict raises a `DependencyConflictError`.
+    * `Pin`: Versions listed in the resolver's `pins` are forced, other conflicts fall back to `Highest`.
+    """
+    Highest = "highest"
+    Fail = "fail"
+    Pin = "pin"
+
+class Conflict :
+    """
+    A `group:artifact` declared with several versions, and the version chosen for it.
+    """
+    module : str
+    versions : list[str]
+    selected : Optional[str]
+
+    def __init__(self,module : str,versions : list[str],selected : Optional[str]) -> None:
+        self.module = module
+        self.versions = versions
+        self.selected = selected
+
+    def __str__(self) -> str:
+        return f"{self.module} ({', '.join(self.versions)})"
+
+class Resolution :
+    """
+    Result of `DependencyResolver.resolve`: the selected version of every `group:artifact` and the conflicts found.
+
+    `dropped` lists the declarations `apply` removed because the module is also declared with a stronger type
+    (see `DependencyResolver.subsumed_types`).
+    """
+    selected : dict[str,str]
+    conflicts : list[Conflict]
+    subsumed_types : dict[DependencyTypeBase,DependencyTypeBase]
+    dropped : list[Dependency]
+
+    def __init__(self,selected : dict[str,str],conflicts : list[Conflict],subsumed_types : dict[DependencyTypeBase,DependencyTypeBase]) -> None:
+        self.selected = selected
+        self.conflicts = conflicts
+        self.subsumed_types = subsumed_types
+        self.dropped = []
+
+    def apply(self,group : DependencyGroup) -> None :
+        """
+        Rewrites `group` in place: every versioned declaration gets its selected version (keeping its classifier
+        and extension), declarations without a version (managed by a BOM, `platform()` or a constraint) are left as
+        they are, exact duplicates are dropped (keeping the first occurrence) and, if the resolver was given
+        `subsumed_types`, declarations subsumed by a stronger type of the same module in this group are removed and
+        recorded in `dropped`.
+        """
+        # Types are keyed by identity, hashing enum members is comparatively slow
+        subsumed = {id(type) : id(stronger) for type, stronger in self.subsumed_types.items()}
+        declared = {(dependency.coordinate.module,id(dependency.type)) for dependency in group.code} if subsumed else set()
+        selected = self.selected
+
+        seen : set[tuple] = set()
+        dependencies = []
+        for dependency in group.code :
+            coordinate = dependency.coordinate
+            if coordinate.artifact is None :
+                dependencies.append(dependency)
+                continue
+
+            type = id(dependency.type)
+            stronger = subsumed.get(type)
+            if stronger is not None and (coordinate.module,stronger) in declared :
+                self.dropped.append(dependency)
+                continue
+
+            key = (coordinate.module,coordinate.classifier,coordinate.extension,type)
+            if key in seen :
+                continue
+            seen.add(key)
+
+            version = selected.get(coordinate.module) if coordinate.version is not None else None
+            if version is not None and version != coordinate.version :
+                dependency = dependency.with_version(version)
+            dependencies.append(dependency)
+
+        group.code = dependencies
+
+class DependencyResolver :
+    """
+    Deduplicates dependency declarations and resolves version conflicts before the build script is generated,
+    instead of leaving it to Gradle at configuration time.
+
+    Declarations are indexed by `group:artifact`; notations that are not Maven coordinates (e.g. version catalog
+    accessors) are left untouched, and declarations without a version neither take part in conflicts nor get a
+    version. Classifiers and extensions (`group:artifact:version:classifier@extension`) are not part of the version.
+
+    Attributes:
+        strategy (ConflictStrategy): How conflicts are resolved.
+        pins (dict[str,str]): `group:artifact` -> version, used by `ConflictStrategy.Pin`.
+        subsumed_types (dict): A declaration of a key type is dropped when the module is also declared with the
+            value type, e.g. `{DependencyType.Implementation : DependencyType.Api}`. Empty by default, as the
+            configurations of a module are not interchangeable in general; dropped declarations are reported in
+            `Resolution.dropped`.
+    """
+    strategy : ConflictStrategy
+    pins : dict[str,str]
+    subsumed_types : dict[DependencyTypeBase,DependencyTypeBase]
+
+    def __init__(self,strategy : ConflictStrategy = ConflictStrategy.Highest,pins : Optional[dict[str,str]] = None,subsumed_types : Optional[dict[DependencyTypeBase,DependencyTypeBase]] = None) -> None:
+        self.strategy = strategy
+        self.pins = pins if pins is not None else {}
+        self.subsumed_types = subsumed_types if subsumed_types is not None else {}
+
+    def resolve(self,groups : Iterable[DependencyGroup]) -> Resolution :
+        """
+        Resolves the declarations of all `groups` together (e.g. every module of a project).
+
+        Raises:
+            DependencyConflictError: If the strategy is `ConflictStrategy.Fail` and a module has conflicting versions.
+        """
+        versions : dict[str,dict[str,None]] = {}
+
+        for group in groups :
+            for dependency in group.code :
+                coordinate = dependency.coordinate
+                module = coordinate.module
+                if module is None :
+                    continue
+
+                declared = versions.get(module)
+                if declared is None :
+                    declared = versions[module] = {}
+                if coordinate.version is not None :
+                    declared[coordinate.version] = None
+
+        selected : dict[str,str] = {}
+        conflicts : list[Conflict] = []
+        for module, declared in versions.items() :
+            pinned = self.pins.get(module) if self.strategy is ConflictStrategy.Pin else None
+            if pinned is not None :
+                selected[module] = pinned
+            elif len(declared) == 1 :
+                selected[module] = next(iter(declared))
+            elif declared and self.strategy is not ConflictStrategy.Fail :
+                selected[module] = max(declared,key=version_key)
+
+            if len(declared) > 1 :
+                conflicts.append(Conflict(module,list(declared),selected.get(module)))
+
+        if self.strategy is ConflictStrategy.Fail and conflicts :
+            raise DependencyConflictError(conflicts)
+
+        return Resolution(selected,conflicts,self.subsumed_types)
+
+    def resolve_group(self,group : DependencyGroup) -> Resolution :
+        """
+        Resolves and deduplicates a single group in place.
+        """
+        resolution = self.resolve([group])
+        resolution.apply(group)
+        return resolution
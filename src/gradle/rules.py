@@ -0,0 +1,445 @@
+import tomllib
+from bisect import insort
+from enum import Enum
+from operator import neg
+from pathlib import Path
+from typing import Any, Iterable, Optional
+
+from src.gradle.dependency import CatalogDependency, Dependency, DependencyGroup
+from src.gradle.plugin import Plugin, PluginGroup, PluginType, PluginWithCodeBlock
+from src.metadata import GradleMetadata
+from src.tracing import trace
+
+class RewriteRuleError(Exception):
+    pass
+
+class RuleAction(Enum) :
+    """
+    What a `RewriteRule` does to the declarations it matches.
+
+    * `Catalog`: Declare them through their version catalog accessor, `value` being an accessor template (e.g.
+      `libs.squareup.{artifact}`) or `None` to look them up in the catalog given to `apply`.
+    * `Version`: Set their version to `value`.
+    * `MetadataVersion`: Set their version to the metadata property `value` (a key template such as
+      `versions/{group}`) of the metadata given to `apply`, if it is defined.
+    * `Relocate`: Move dependencies to the group `value`, keeping artifact and version.
+    * `Remove`: Drop them.
+
+    Templates may use `{group}`, `{artifact}` and `{module}` (`group:artifact`); for plugins `{group}` and `{module}`
+    are the plugin id and `{artifact}` is empty.
+    """
+    Catalog = "catalog"
+    Version = "version"
+    MetadataVersion = "metadata-version"
+    Relocate = "relocate"
+    Remove = "remove"
+
+class RuleTarget(Enum) :
+    Dependency = "dependency"
+    Plugin = "plugin"
+
+_MISSING = object()
+
+# Actions that need a value
+_VALUE_ACTIONS = (RuleAction.Version, RuleAction.MetadataVersion, RuleAction.Relocate)
+
+class RewriteRule :
+    """
+    A row of a rewrite rule table: which declarations it matches and what it does to them.
+
+    Patterns are `group[:artifact]` for dependencies and plugin ids for plugins. A group (or plugin id) is either
+    exact (`com.squareup.retrofit2`), a prefix over dot separated segments (`com.squareup.*` matches `com.squareup`
+    and every group below it) or `*`. An artifact is exact, a prefix (`compose-*`) or `*` (the default).
+
+    Attributes:
+        pattern (str): The pattern, as written.
+        action (RuleAction): What the rule does.
+        value (Optional[str]): The argument of the action, see `RuleAction`.
+        target (RuleTarget): Whether the rule applies to dependencies or plugins.
+        name (str): Reported when the rule fires, the pattern and action by default.
+        index (int): Position of the rule in its table, set by `RewriteRules`; earlier rules win ties.
+    """
+    __slots__ = ("pattern","action","value","target","name","index","group","group_prefix","artifact","artifact_prefix")
+
+    pattern : str
+    action : RuleAction
+    value : Optional[str]
+    target : RuleTarget
+    name : str
+    index : int
+
+    def __init__(self,pattern : str,action : RuleAction | str,value : Optional[str] = None,target : RuleTarget | str = RuleTarget.Dependency,name : Optional[str] = None) -> None:
+        try :
+            self.action = RuleAction(action)
+            self.target = RuleTarget(target)
+        except ValueError as error :
+            raise RewriteRuleError(f"Rule {pattern!r}: {error}") from error
+        if self.action in _VALUE_ACTIONS and not value :
+            raise RewriteRuleError(f"Rule {pattern!r}: {self.action.value} needs a value")
+        if self.action is RuleAction.Relocate and self.target is RuleTarget.Plugin :
+            raise RewriteRuleError(f"Rule {pattern!r}: plugins cannot be relocated")
+        self.pattern = pattern
+        self.value = value
+        self.name = name if name is not None else f"{pattern} {self.action.value}"
+        self.index = 0
+
+        group, separator, artifact = pattern.partition(":")
+        if self.target is RuleTarget.Plugin and separator :
+            raise RewriteRuleError(f"Rule {pattern!r}: plugin patterns are plugin ids")
+        # `None` for `*`, the segments before `.*` for prefixes
+        self.group, self.group_prefix = _group_pattern(pattern,group)
+        self.artifact, self.artifact_prefix = _artifact_pattern(pattern,artifact if separator else "*")
+
+    def __repr__(self) -> str :
+        return f"RewriteRule({self.pattern!r},{self.action.value!r},{self.value!r},{self.target.value!r})"
+
+def _group_pattern(pattern : str,group : str) -> tuple[Optional[str],bool] :
+    if group == "*" :
+        return None, True
+    if group.endswith(".*") :
+        group = group[:-2]
+        prefix = True
+    else :
+        prefix = False
+    if not group or "*" in group :
+        raise RewriteRuleError(f"Rule {pattern!r}: groups are exact, `prefix.*` or `*`")
+    return group, prefix
+
+def _artifact_pattern(pattern : str,artifact : str) -> tuple[Optional[str],bool] :
+    if artifact == "*" :
+        return None, True
+    prefix = artifact.endswith("*")
+    if prefix :
+        artifact = artifact[:-1]
+    if not artifact or "*" in artifact :
+        raise RewriteRuleError(f"Rule {pattern!r}: artifacts are exact, `prefix*` or `*`")
+    return artifact, prefix
+
+class _ArtifactIndex :
+    """
+    The rules sharing a group pattern, indexed by artifact: exact artifacts, prefixes by length, and `*`.
+    """
+    __slots__ = ("exact","prefixes","lengths","any")
+
+    def __init__(self) -> None:
+        self.exact : dict[str,RewriteRule] = {}
+        self.prefixes : dict[str,RewriteRule] = {}
+        self.lengths : list[int] = []
+        self.any : Optional[RewriteRule] = None
+
+    def add(self,rule : RewriteRule) -> None :
+        # Rules are added in table order, the first of equal patterns wins
+        if rule.artifact is None :
+            if self.any is None :
+                self.any = rule
+        elif not rule.artifact_prefix :
+            self.exact.setdefault(rule.artifact,rule)
+        elif rule.artifact not in self.prefixes :
+            self.prefixes[rule.artifact] = rule
+            # Few distinct lengths however many prefixes, so the list stays short and insertion cheap
+            length = len(rule.artifact)
+            if length not in self.lengths :
+                insort(self.lengths,length,key=neg)
+
+    def match(self,artifact : str) -> Optional[RewriteRule] :
+        rule = self.exact.get(artifact)
+        if rule is not None :
+            return rule
+        # Longest prefix first, one dictionary lookup per distinct prefix length
+        for length in self.lengths :
+            if length <= len(artifact) :
+                rule = self.prefixes.get(artifact[:length])
+                if rule is not None :
+                    return rule
+        return self.any
+
+class _RuleIndex :
+    """
+    The rules of one target, indexed by group: exact groups, a trie over the segments of group prefixes, and `*`.
+    """
+    __slots__ = ("exact","trie","any")
+
+    def __init__(self) -> None:
+        self.exact : dict[str,_ArtifactIndex] = {}
+        # segment -> (children, rules of the prefix ending at this segment)
+        self.trie : dict[str,list] = {}
+        self.any = _ArtifactIndex()
+
+    def add(self,rule : RewriteRule) -> None :
+        if rule.group is None :
+            self.any.add(rule)
+        elif not rule.group_prefix :
+            self.exact.setdefault(rule.group,_ArtifactIndex()).add(rule)
+        else :
+            children = self.trie
+            node = None
+            for segment in rule.group.split(".") :
+                node = children.get(segment)
+                if node is None :
+                    node = children[segment] = [{},None]
+                children = node[0]
+            if node[1] is None :
+                node[1] = _ArtifactIndex()
+            node[1].add(rule)
+
+    def match(self,group : str,artifact : str) -> Optional[RewriteRule] :
+        # The most specific group pattern with a matching artifact wins: exact, then the longest prefix, then `*`
+        index = self.exact.get(group)
+        if index is not None :
+            rule = index.match(artifact)
+            if rule is not None :
+                return rule
+
+        path = []
+        children = self.trie
+        for segment in group.split(".") :
+            node = children.get(segment)
+            if node is None :
+                break
+            if node[1] is not None :
+                path.append(node[1])
+            children = node[0]
+        for index in reversed(path) :
+            rule = index.match(artifact)
+            if rule is not None :
+                return rule
+        return self.any.match(artifact)
+
+class RuleMatch :
+    """
+    A rule that fired on a declaration.
+
+    Attributes:
+        rule (RewriteRule): The rule.
+        before (Dependency | Plugin): The declaration it matched.
+        after (Optional[Dependency | Plugin]): Its replacement, `None` if it was removed.
+    """
+    __slots__ = ("rule","before","after")
+
+    rule : RewriteRule
+    before : Any
+    after : Optional[Any]
+
+    def __init__(self,rule : RewriteRule,before : Any,after : Optional[Any]) -> None:
+        self.rule = rule
+        self.before = before
+        self.after = after
+
+    def __str__(self) -> str :
+        return f"{self.rule.name}: {self.before} -> {self.after if self.after is not None else '(removed)'}"
+
+class RewriteReport :
+    """
+    The rules that fired during `RewriteRules.apply`, one `RuleMatch` per rewritten declaration in visiting order.
+    Declarations a rule matched but left unchanged (e.g. already at the pinned version) are not reported.
+    """
+    matches : list[RuleMatch]
+
+    def __init__(self) -> None:
+        self.matches = []
+
+    def counts(self) -> dict[str,int] :
+        """
+        Returns rule name -> number of declarations it rewrote.
+        """
+        counts : dict[str,int] = {}
+        for match in self.matches :
+            counts[match.rule.name] = counts.get(match.rule.name,0) + 1
+        return counts
+
+    def __len__(self) -> int :
+        return len(self.matches)
+
+    def __str__(self) -> str :
+        return "\n".join(f"{name}: {count}" for name, count in self.counts().items())
+
+class RewriteRules :
+    """
+    A table of `RewriteRule`s compiled into indexes, applied to whole dependency and plugin groups in one pass.
+
+    Replace callbacks (`ReplaceAlias`) cost a Python call per declaration and cannot be shared across projects; a rule
+    table states organisation-wide rewrites once, e.g.:
+
+    ```toml
+    [[rules]]
+    match = "com.squareup.*"
+    action = "catalog"
+
+    [[rules]]
+    match = "androidx.*"
+    action = "metadata-version"
+    value = "versions/{group}"
+
+    [[rules]]
+    target = "plugin"
+    match = "org.jetbrains.kotlin.*"
+    action = "version"
+    value = "2.0.21"
+    ```
+
+    Every declaration gets at most one rule, the most specific one: an exact group beats a longer group prefix,
+    which beats a shorter one and then `*`; among those, an exact artifact beats a longer artifact prefix and then
+    `*`; equal patterns resolve to the earliest rule. Matching walks the segments of the group once, whatever the
+    number of rules, and results are cached per `group:artifact`, so large projects pay for each distinct module once.
+
+    Attributes:
+        rules (list[RewriteRule]): The rules, in table order.
+    """
+    rules : list[RewriteRule]
+
+    def __init__(self,rules : Iterable[RewriteRule]) -> None:
+        self.rules = list(rules)
+        self._indexes = {RuleTarget.Dependency : _RuleIndex(), RuleTarget.Plugin : _RuleIndex()}
+        for index, rule in enumerate(self.rules) :
+            rule.index = index
+            self._indexes[rule.target].add(rule)
+        # target -> `group:artifact` or plugin id -> rule or None, module strings are interned by `Coordinate`
+        self._cache : dict[RuleTarget,dict[str,Optional[RewriteRule]]] = {RuleTarget.Dependency : {}, RuleTarget.Plugin : {}}
+        self._dependencies = self._cache[RuleTarget.Dependency]
+
+    @classmethod
+    def from_table(cls,rows : Iterable[dict[str,Any]]) -> 'RewriteRules' :
+        """
+        Builds the rules from dictionaries with the keys `match`, `action` and optionally `value`, `target`
+        (`dependency` or `plugin`) and `name`.
+
+        Raises:
+            RewriteRuleError: If a row is invalid.
+        """
+        rules = []
+        for number, row in enumerate(rows) :
+            if "match" not in row or "action" not in row :
+                raise RewriteRuleError(f"Rule {number} needs a match and an action")
+            rules.append(RewriteRule(row["match"],row["action"],row.get("value"),row.get("target",RuleTarget.Dependency),row.get("name")))
+        return cls(rules)
+
+    @classmethod
+    def from_file(cls,filepath : Path) -> 'RewriteRules' :
+        """
+        Reads the `[[rules]]` of a TOML file.
+        """
+        try :
+            with open(filepath,"rb") as file :
+                data = tomllib.load(file)
+        except (OSError, tomllib.TOMLDecodeError) as error :
+            raise RewriteRuleError(f"Could not read {filepath}: {error}") from error
+        return cls.from_table(data.get("rules",[]))
+
+    def match(self,target : RuleTarget,group : str,artifact : str = "") -> Optional[RewriteRule] :
+        """
+        Returns the rule applying to `group:artifact` (or to the plugin id `group`), if any.
+        """
+        cache = self._cache[target]
+        key = f"{group}:{artifact}" if target is RuleTarget.Dependency else group
+        rule = cache.get(key,_MISSING)
+        if rule is _MISSING :
+            rule = cache[key] = self._indexes[target].match(group,artifact)
+        return rule
+
+    def apply(self,group : DependencyGroup | PluginGroup,metadata : Optional[GradleMetadata] = None,catalog : Optional[Any] = None,report : Optional[RewriteReport] = None) -> RewriteReport :
+        """
+        Rewrites every declaration of `group` matched by a rule, in place.
+
+        Args:
+            metadata (Optional[GradleMetadata]): Where `MetadataVersion` rules look their version up, e.g. the
+                metadata of the module owning the group; those rules do not fire without it.
+            catalog (Optional[VersionCatalog]): Where `Catalog` rules without a template look accessors up.
+            report (Optional[RewriteReport]): A report to add the matches to, e.g. when applying to a whole project.
+
+        Returns:
+            RewriteReport: `report`, or a new one.
+        """
+        report = report if report is not None else RewriteReport()
+        is_plugins = isinstance(group,PluginGroup)
+        with trace("apply_rules","rules",plugins=is_plugins) as span :
+            rewritten = []
+            matched = report.matches
+            count = len(matched)
+            for node in group.code :
+                replacement = self._plugin(node,metadata,catalog,matched) if is_plugins else self._dependency(node,metadata,catalog,matched)
+                if replacement is not None :
+                    rewritten.append(replacement)
+            if len(matched) != count :
+                group.code = rewritten
+            if span :
+                span.set(objects=len(rewritten),rewritten=len(matched) - count)
+        return report
+
+    def _dependency(self,dependency : Any,metadata : Optional[GradleMetadata],catalog : Optional[Any],matched : list[RuleMatch]) -> Optional[Any] :
+        coordinate = getattr(dependency,"coordinate",None)
+        if coordinate is None or coordinate.artifact is None :
+            return dependency
+        rule = self._dependencies.get(coordinate.module,_MISSING)
+        if rule is _MISSING :
+            rule = self._dependencies[coordinate.module] = self._indexes[RuleTarget.Dependency].match(coordinate.group,coordinate.artifact)
+        if rule is None :
+            return dependency
+
+        action = rule.action
+        if action is RuleAction.Remove :
+            matched.append(RuleMatch(rule,dependency,None))
+            return None
+        if action is RuleAction.Catalog :
+            if rule.value is not None :
+                replacement = CatalogDependency(dependency.type,_expand(rule.value,coordinate.group,coordinate.artifact),dependency.replace)
+            else :
+                # Left as it is when the catalog would change the declaration, see `Dependency.use_catalog`
+                replacement = dependency if catalog is None else dependency.use_catalog(catalog)
+                if replacement is dependency :
+                    return dependency
+        elif action is RuleAction.Relocate :
+            replacement = dependency.with_coordinate(coordinate.with_group(rule.value))
+        else :
+            version = _version(rule,coordinate.group,coordinate.artifact,metadata)
+            if version is None or version == coordinate.version :
+                return dependency
+            replacement = dependency.with_version(version)
+
+        matched.append(RuleMatch(rule,dependency,replacement))
+        return replacement
+
+    def _plugin(self,plugin : Any,metadata : Optional[GradleMetadata],catalog : Optional[Any],matched : list[RuleMatch]) -> Optional[Any] :
+        plugin_id = plugin.plugin_id() if isinstance(plugin,Plugin) else None
+        if plugin_id is None :
+            return plugin
+        rule = self.match(RuleTarget.Plugin,plugin_id)
+        if rule is None :
+            return plugin
+
+        action = rule.action
+        if action is RuleAction.Remove :
+            matched.append(RuleMatch(rule,plugin,None))
+            return None
+        if action is RuleAction.Catalog :
+            if rule.value is not None :
+                replacement = _with_plugin(plugin,Plugin(PluginType.Alias,_expand(rule.value,plugin_id,""),None,plugin.apply,plugin.replace))
+            else :
+                replacement = plugin if catalog is None else plugin.use_catalog(catalog)
+                if replacement is plugin :
+                    return plugin
+        else :
+            version = _version(rule,plugin_id,"",metadata)
+            if version is None or version == plugin.version :
+                return plugin
+            replacement = _with_plugin(plugin,Plugin(plugin.type,plugin.identifier,version,plugin.apply,plugin.replace))
+
+        matched.append(RuleMatch(rule,plugin,replacement))
+        return replacement
+
+def _expand(template : str,group : str,artifact : str) -> str :
+    return template.format(group=group,artifact=artifact,module=f"{group}:{artifact}" if artifact else group)
+
+def _version(rule : RewriteRule,group : str,artifact : str,metadata : Optional[GradleMetadata]) -> Optional[str] :
+    if rule.action is RuleAction.Version :
+        return rule.value
+    if metadata is None :
+        return None
+    version = metadata.get_property(_expand(rule.value,group,artifact))
+    return None if version is None else str(version)
+
+def _with_plugin(plugin : Plugin,replacement : Plugin) -> Plugin :
+    if not isinstance(plugin,PluginWithCodeBlock) :
+        return replacement
+    rewritten = PluginWithCodeBlock(replacement)
+    rewritten.code = plugin.code
+    return rewritten
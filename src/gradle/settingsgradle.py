@@ -1,12 +1,14 @@
+import copy
 
 
 from pathlib import Path
-from typing import Optional
+from typing import Any, Iterable, Optional, TextIO
 from src.core import FileConvertible, ProvideMetadata, catch_exception_in_all_methods
 from src.gradle.plugin import PluginGroup
 from src.gradle.repository import Repositories
 from src.metadata import GradleMetadata, ModuleMetadata
-from src.utils import CodeBlock
+from src.tracing import trace
+from src.utils import CodeBlock, open_output, render_to, render_to_string
 
 class PluginManagement(CodeBlock[list[Repositories | PluginGroup]],ProvideMetadata) :
     repositories : Repositories 
@@ -19,7 +21,7 @@ class PluginManagement(CodeBlock[list[Repositories | PluginGroup]],ProvideMetada
         if plugins is not None :
             _code.append(plugins)
 
-        CodeBlock.__init__(self,"pluginManagement",None,_code)
+        CodeBlock.__init__(self,name="pluginManagement",arguments=None,code=_code)
         pass
     
     def provide_metadata(self, metadata: 'GradleMetadata'):
@@ -33,7 +35,7 @@ class DependencyResolutionManagement(CodeBlock[Repositories],ProvideMetadata) :
 
     def __init__(self,repositories : Repositories) -> None :
         self.repositories = repositories
-        CodeBlock.__init__(self,"dependencyResolutionManagement",None,[repositories])
+        CodeBlock.__init__(self,name="dependencyResolutionManagement",arguments=None,code=[repositories])
         pass
 
     def provide_metadata(self, metadata: 'GradleMetadata'):
@@ -45,28 +47,110 @@ class SettingsGradleError(Exception):
 
 @catch_exception_in_all_methods(SettingsGradleError)
 class SettingsGradle(FileConvertible) :
-    def __init__(self,plugins : PluginManagement,dependencyResolutionManagement : DependencyResolutionManagement,modules : list[str | ModuleMetadata],project_metadata : Optional[ModuleMetadata] = None) -> None :
+    FILE_NAME = "settings.gradle.kts"
+
+    def __init__(self,plugins : PluginManagement,dependencyResolutionManagement : DependencyResolutionManagement,modules : list[str | ModuleMetadata],project_metadata : Optional[ModuleMetadata] = None,other : Optional[list[Any]] = None,header : Optional[list[Any]] = None,project_directories : Optional[dict[str,str]] = None,settings_plugins : Optional[PluginGroup] = None) -> None :
         self.plugins = plugins
         self.dependencyResolutionManagement = dependencyResolutionManagement
-        self.modules = [module if isinstance(module,str) else module.name for module in modules]
+        self.modules = [module if isinstance(module,str) else module.name() for module in modules]
         self.project_metadata = project_metadata
+        # Written after the `include(...)` lines, one per line
+        self.other = other
+        # Written verbatim before `pluginManagement {}`, usually only set for scripts read with `from_file`
+        self.header = header
+        # Module -> directory relative to the root, for modules not in the directory matching their path
+        self.project_directories = project_directories
+        # The script's own `plugins {}` (e.g. the foojay toolchain resolver), Gradle only accepts it right after
+        # `pluginManagement {}`
+        self.settings_plugins = settings_plugins
+
+    def order_modules(self,paths : Iterable[str]) -> None :
+        """
+        Reorders the `include(...)` lines (and `projectDir` lines) to follow `paths`, e.g. the topological order of
+        `src.project.graph.ModuleGraph`. `core` and `:core` are the same module; modules missing from `paths` keep
+        their relative order after the others.
+        """
+        position = {path.lstrip(":") : index for index, path in enumerate(paths)}
+        last = len(position)
+        self.modules.sort(key=lambda module : position.get(module.lstrip(":"),last))
+
+    def ordered(self,paths : Iterable[str]) -> 'SettingsGradle' :
+        """
+        Returns a copy of this script with its modules ordered like `order_modules`, leaving this one as it is.
+        """
+        settings = copy.copy(self)
+        settings.modules = list(self.modules)
+        settings.order_modules(paths)
+        return settings
 
     def provide_metadata(self, metadata: 'GradleMetadata'):
-        self.plugins.provide_metadata(metadata)
-        self.dependencyResolutionManagement.provide_metadata(metadata)
+        with trace("provide_metadata","metadata") as span :
+            self.plugins.provide_metadata(metadata)
+            if self.settings_plugins is not None :
+                self.settings_plugins.provide_metadata(metadata)
+            self.dependencyResolutionManagement.provide_metadata(metadata)
+            if span :
+                span.set(module=self.FILE_NAME)
+
+    def write_to(self,sink : TextIO) -> None :
+        if self.header is not None :
+            for header in self.header :
+                render_to(header,sink)
+        render_to(self.plugins,sink)
+        sink.write("\n")
+        if self.settings_plugins is not None :
+            render_to(self.settings_plugins,sink)
+            sink.write("\n")
+        render_to(self.dependencyResolutionManagement,sink)
+        sink.write("\n")
+
+        if self.project_metadata is not None :
+            sink.write(f"rootProject.name=\"{self.project_metadata.name()}\"\n")
+
+        for module in self.modules :
+            sink.write(f'include("{module}")\n')
+
+        if self.project_directories :
+            for module in self.modules :
+                directory = self.project_directories.get(module)
+                if directory is not None :
+                    sink.write(f'project("{module}").projectDir = file("{directory}")\n')
+
+        if self.other is not None :
+            for other in self.other :
+                render_to(other,sink)
+                sink.write("\n")
+
+    def __str__(self) -> str :
+        with trace(self.FILE_NAME,"render") as span :
+            representation = render_to_string(self)
+            if span :
+                span.set(objects=len(self.modules),bytes=len(representation))
+        return representation
 
     def generate_to_file(self, filepath: Path) -> None :
         import os
-        file_directory = os.path.join(filepath,"settings.gradle.kts")
-        with open(file_directory,"w") as file :
-            file.write(str(self.plugins))
-            file.write(str(self.dependencyResolutionManagement))
-
-            if self.project_metadata is not None :
-                file.write(f"rootProject.name=\"{self.project_metadata.name()}\"\n")
-
-            
-            for module in self.modules :
-                file.write(f'include("{module}")\n')
-
-    
\ No newline at end of file
+        file_directory = os.path.join(filepath,self.FILE_NAME)
+        with trace(self.FILE_NAME,"write") as span :
+            with open_output(file_directory) as file :
+                self.write_to(file)
+            if span :
+                span.set(path=file_directory,objects=len(self.modules),bytes=os.path.getsize(file_directory))
+
+    @classmethod
+    def from_file(cls, filepath: Path,project_metadata : Optional[ModuleMetadata] = None) -> 'SettingsGradle' :
+        """
+        Reads an existing `settings.gradle.kts`, see `src.gradle.kotlindsl.parse_settings_gradle`.
+        """
+        with open(filepath,encoding="utf-8") as file :
+            source = file.read()
+        with trace(cls.FILE_NAME,"parse") as span :
+            settings_gradle = cls.from_string(source,project_metadata)
+            if span :
+                span.set(path=str(filepath),bytes=len(source),objects=len(settings_gradle.modules))
+        return settings_gradle
+
+    @classmethod
+    def from_string(cls,source : str,project_metadata : Optional[ModuleMetadata] = None) -> 'SettingsGradle' :
+        from src.gradle.kotlindsl import parse_settings_gradle
+        return parse_settings_gradle(source,project_metadata)
@@ -1,5 +1,101 @@
 from abc import ABC, abstractmethod
-from typing import Optional, Dict, Any
+from itertools import count
+from typing import Optional, Dict, Any, Iterable, Protocol
+from weakref import WeakSet
+
+# Bumped when any hierarchy is restructured (a parent, a whole metadata dictionary or an identifier changes), see
+# `src.metadata.propagation.MetadataPropagator`
+_structures = count()
+_structure = next(_structures)
+
+def structure_version() -> int :
+    return _structure
+
+class MetadataWatcher(Protocol) :
+    def metadata_changed(self, metadata: 'MetadataDict', keys: Iterable[str]) -> None: ...
+
+class MetadataDict(Dict[str, Any]) :
+    """
+    Dictionary holding the key-value pairs of a `GradleMetadata`.
+
+    Every mutation, through any `dict` method or operator, tells the watchers registered with `watch` which keys
+    changed, and lets the objects using the dictionary check whether their identifier changed (e.g. the `name` of a
+    `ModuleMetadata`). Writing values does not invalidate resolution indexes, which map identifiers to dictionaries
+    and not to values.
+    """
+    # Only dictionaries that are watched, or used by a `GradleMetadata`, get their own sets
+    _watchers: Optional['WeakSet[MetadataWatcher]'] = None
+    _owners: Optional['WeakSet[GradleMetadata]'] = None
+
+    def watch(self, watcher: MetadataWatcher) -> None:
+        """
+        Calls `watcher.metadata_changed(self, keys)` after every mutation, until `watcher` is garbage collected.
+        """
+        if self._watchers is None:
+            self._watchers = WeakSet()
+        self._watchers.add(watcher)
+
+    def _own(self, owner: 'GradleMetadata') -> None:
+        if self._owners is None:
+            self._owners = WeakSet()
+        self._owners.add(owner)
+
+    def _disown(self, owner: 'GradleMetadata') -> None:
+        if self._owners is not None:
+            self._owners.discard(owner)
+
+    def _changed(self, keys: Iterable[str]) -> None:
+        if self._owners:
+            for owner in list(self._owners):
+                owner._check_identifier()
+        if self._watchers:
+            for watcher in list(self._watchers):
+                watcher.metadata_changed(self, keys)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        super().__setitem__(key, value)
+        self._changed((key,))
+
+    def __delitem__(self, key: str) -> None:
+        super().__delitem__(key)
+        self._changed((key,))
+
+    def update(self, *args, **kwargs) -> None:
+        items = dict(*args, **kwargs)
+        super().update(items)
+        self._changed(items.keys())
+
+    def setdefault(self, key: str, default: Any = None) -> Any:
+        if key in self:
+            return self[key]
+        value = super().setdefault(key, default)
+        self._changed((key,))
+        return value
+
+    def pop(self, key: str, *default) -> Any:
+        present = key in self
+        value = super().pop(key, *default)
+        if present:
+            self._changed((key,))
+        return value
+
+    def popitem(self) -> tuple[str, Any]:
+        item = super().popitem()
+        self._changed((item[0],))
+        return item
+
+    def clear(self) -> None:
+        keys = list(self)
+        super().clear()
+        self._changed(keys)
+
+    def __ior__(self, other: Any) -> 'MetadataDict':
+        self.update(other)
+        return self
+
+    def __getstate__(self) -> dict:
+        # Watchers and owners are weak references, owners register again when they are unpickled
+        return {}
 
 class GradleMetadata(ABC):
     """
@@ -37,8 +133,83 @@ class GradleMetadata(ABC):
         Args:
             parent (Optional[GradleMetadata]): The parent metadata object, if any.
         """
-        self.parent = parent
-        self.metadata: Dict[str, Any] = {}
+        self._index: Dict[str, Dict[str, Any]] = {}
+        # `_index` is valid while it was built at the current revision, which is bumped when this object or one of
+        # its ancestors is restructured
+        self._revision = 0
+        self._index_revision = -1
+        # Identifier when this object was last put in an index, checked when its metadata changes
+        self._identifier: Optional[str] = None
+        self._children: Optional['WeakSet[GradleMetadata]'] = None
+        # A new object is not part of any hierarchy yet, so this is not a restructuring
+        self._parent = None
+        self._attach(parent)
+        self._metadata = MetadataDict()
+        self._metadata._own(self)
+
+    @property
+    def parent(self) -> Optional['GradleMetadata']:
+        return self._parent
+
+    @parent.setter
+    def parent(self, parent: Optional['GradleMetadata']) -> None:
+        self._attach(parent)
+        self.restructure()
+
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        return self._metadata
+
+    @metadata.setter
+    def metadata(self, metadata: Dict[str, Any]) -> None:
+        self._metadata._disown(self)
+        self._metadata = metadata if isinstance(metadata, MetadataDict) else MetadataDict(metadata)
+        self._metadata._own(self)
+        self.restructure()
+
+    def _attach(self, parent: Optional['GradleMetadata']) -> None:
+        if self._parent is not None and self._parent._children is not None:
+            self._parent._children.discard(self)
+        self._parent = parent
+        if parent is not None:
+            # The parent may still be waiting for its state while a hierarchy is unpickled
+            if getattr(parent, "_children", None) is None:
+                parent._children = WeakSet()
+            parent._children.add(self)
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        del state["_children"]
+        state["_index"] = {}
+        state["_index_revision"] = -1
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        parent = state.pop("_parent")
+        self.__dict__.setdefault("_children", None)
+        self.__dict__.update(state)
+        self._parent = None
+        self._attach(parent)
+        self._metadata._own(self)
+
+    def restructure(self) -> None:
+        """
+        Invalidates the resolution indexes of this object and its descendants. Called when the parent, the metadata
+        dictionary or (through the metadata) the identifier changes; subclasses whose identifier depends on anything
+        else must call it when their identifier changes.
+        """
+        global _structure
+        _structure = next(_structures)
+        pending = [self]
+        while pending:
+            node = pending.pop()
+            node._revision += 1
+            if node._children:
+                pending.extend(node._children)
+
+    def _check_identifier(self) -> None:
+        if self._identifier is not None and self.get_identifier() != self._identifier:
+            self.restructure()
 
     @abstractmethod
     def get_identifier(self) -> str:
@@ -83,19 +254,37 @@ class GradleMetadata(ABC):
         Args:
             key (str): The metadata key to search for.
 
+        Scoped keys are resolved through an index mapping every identifier of the hierarchy to the metadata of the
+        closest object with that identifier, so a lookup costs a couple of hash lookups instead of a walk up the
+        parent chain. The index is rebuilt lazily when a parent, a metadata dictionary or an identifier of this
+        object or its ancestors changed; writing metadata values does not invalidate it.
+
         Returns:
             Optional[Any]: The value of the specified metadata key, or None if not found.
         """
-        if '/' in key:
-            identifier, actual_key = key.split('/', 1)
-            if identifier == self.get_identifier():
-                return self.metadata.get(actual_key)
-            elif self.parent is not None:
-                return self.parent.get_property(key)
-        else:
+        identifier, separator, actual_key = key.partition('/')
+        if not separator:
             return self.metadata.get(key)
-        
-        return None
+
+        index = self._index if self._index_revision == self._revision else self.resolution_index()
+        scope = index.get(identifier)
+        return None if scope is None else scope.get(actual_key)
+
+    def resolution_index(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Builds (and caches) the flattened lookup table of this hierarchy: identifier -> metadata of the closest
+        object in the parent chain with that identifier.
+        """
+        index: Dict[str, Dict[str, Any]] = {}
+        node: Optional[GradleMetadata] = self
+        while node is not None:
+            identifier = node._identifier = node.get_identifier()
+            index.setdefault(identifier, node.metadata)
+            node = node.parent
+
+        self._index = index
+        self._index_revision = self._revision
+        return index
     
 class ProjectMetadata(GradleMetadata):
     """
@@ -136,7 +325,8 @@ class ProjectMetadata(GradleMetadata):
             version (str): The version of the project.
             group_id (str): The group id of the project.
         """
-        self.metadata['name'] = base_namespace
+        super().__init__()
+        self.metadata['name'] = name
         self.metadata['base_namespace'] = base_namespace
         self.metadata['version'] = version
         self.metadata['group_id'] = group_id
@@ -162,15 +352,15 @@ class ProjectMetadata(GradleMetadata):
 
 class ModuleMetadata(GradleMetadata) :
     def __init__(self,name : str,namespace : str, parent: GradleMetadata | None = None):
+        super().__init__(parent)
         self.metadata['name'] = name
         self.metadata['namespace'] = namespace
-        super().__init__(parent)
 
     def namespace_from(project_metadata : ProjectMetadata,module_name : str) -> str:
         return f"{project_metadata.base_namespace()}.{module_name.replace("-",".").replace(":",".")}"
     
     def get_identifier(self) -> str:
-        return self.name
+        return self.name()
 
     def name(self) -> str:
         return self.metadata['name']
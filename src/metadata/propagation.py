@@ -0,0 +1,274 @@
+from functools import cache
+from operator import attrgetter
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Iterator, Optional
+
+from src.core import FileConvertible, lists_output_files
+from src.gradle.buildgradle import ModuleBuildGradle
+from src.gradle.dependency import Dependency
+from src.gradle.plugin import Plugin
+from src.gradle.settingsgradle import SettingsGradle
+from src.metadata import GradleMetadata, MetadataDict, structure_version
+from src.tracing import trace
+
+if TYPE_CHECKING :
+    from src.project import GenericProject
+
+@cache
+def _state(cls : type) -> tuple[tuple[str,...],Callable[[Any],tuple]] :
+    # The attributes a replace callback may rewrite (`replace` itself excepted) and a getter of their values
+    names : list[str] = []
+    for base in reversed(cls.__mro__) :
+        for name in base.__dict__.get("__slots__",()) :
+            if name not in names and name not in ("replace","__weakref__","__dict__") :
+                names.append(name)
+    getter = attrgetter(*names)
+    return tuple(names), (getter if len(names) > 1 else lambda node : (getter(node),))
+
+class MetadataBinding :
+    """
+    A `Dependency` or `Plugin` with a replace callback, bound to the metadata entry it is resolved from.
+
+    Attributes:
+        node (Dependency | Plugin): The declaration.
+        metadata (GradleMetadata): The metadata the declaration is provided with (e.g. its module's).
+        scope (Optional[MetadataDict]): The metadata dictionary `metadata.get_property` resolves the declaration's
+            scope (`dependencies` or `plugins`) to, `None` if no object of the hierarchy has that identifier.
+        key (str): The key of the declaration in `scope`: its notation or plugin identifier as declared.
+        state (Optional[tuple]): The declared values of the node's slots, restored before every resolution; `None`
+            until the replace callback first runs when the node is bound in its declared state.
+        path (str): The file the declaration is rendered into, relative to the project root.
+        owner (FileConvertible): The node rendering that file.
+    """
+    __slots__ = ("node","metadata","scope","key","state","path","owner")
+
+    node : Any
+    metadata : GradleMetadata
+    scope : Optional[MetadataDict]
+    key : str
+    state : Optional[tuple]
+    path : str
+    owner : FileConvertible
+
+    def __init__(self,node : Any,metadata : GradleMetadata,key : str,path : str,owner : FileConvertible,state : Optional[tuple] = None) -> None:
+        self.node = node
+        self.metadata = metadata
+        self.scope = None
+        self.key = key
+        self.state = state
+        self.path = path
+        self.owner = owner
+
+    def resolve(self) -> bool :
+        """
+        Restores the declared state of the node and runs its replace callback if its metadata entry exists, which is
+        what `provide_metadata` does to a freshly declared node.
+
+        Returns:
+            bool: Whether the node changed.
+        """
+        node = self.node
+        value = None if self.scope is None else self.scope.get(self.key)
+        if self.state is None :
+            if value is None :
+                return False
+            self.state = _state(type(node))[1](node)
+            node.replace(node,self.metadata,value)
+            return _state(type(node))[1](node) != self.state
+
+        names, get = _state(type(node))
+        before = get(node)
+        if before != self.state :
+            for name, attribute in zip(names,self.state) :
+                setattr(node,name,attribute)
+        if value is None :
+            return before != self.state
+        node.replace(node,self.metadata,value)
+        return get(node) != before
+
+class PropagationReport :
+    """
+    What a propagation pass re-resolved.
+
+    Attributes:
+        full (bool): Whether every binding was resolved (first pass or restructured hierarchy) or only dirty ones.
+        resolved (int): Bindings resolved.
+        changed (int): Declarations whose rendering changed.
+        files (dict[str,FileConvertible]): Relative path -> node of the files containing a changed declaration.
+    """
+    full : bool
+    resolved : int
+    changed : int
+    files : dict[str,FileConvertible]
+
+    def __init__(self,full : bool) -> None:
+        self.full = full
+        self.resolved = 0
+        self.changed = 0
+        self.files = {}
+
+    def __str__(self) -> str :
+        return f"{self.resolved} declarations resolved ({'full' if self.full else 'incremental'}), {self.changed} changed in {len(self.files)} files"
+
+class MetadataPropagator :
+    """
+    Provides the metadata of a `GenericProject` to its declarations in one pass, then keeps them up to date.
+
+    `provide_metadata` walks a tree eagerly: every group, block and declaration asks its metadata for its entry,
+    and providing again walks everything again. The propagator visits the project once (the `build.gradle.kts` of
+    every module with the module's metadata, the plugins of `settings.gradle.kts` with the project metadata) and only
+    keeps the declarations that have a replace callback, the others never change. Their lookups are batched per
+    scope: the `dependencies` and `plugins` scopes are resolved once per metadata object, each declaration then
+    being a dictionary lookup in its scope.
+
+    The scopes are watched (see `MetadataDict.watch`), so after a metadata edit `propagate` only re-resolves the
+    declarations bound to the changed keys: a version bump costs the handful of declarations using it, not a walk
+    of the project. Declarations are bound to their key as declared and restored to their declared state before
+    being resolved again, so the result is the same as providing metadata to a freshly built project. Replacing a
+    parent or a whole metadata dictionary re-resolves everything; identifiers are assumed not to change.
+
+    Declarations added to the project after the first pass are only bound by `rebind`. Modules that do not list
+    their files (see `lists_output_files`) are provided with their metadata eagerly by `module.provide_metadata`,
+    without tracking; files of a module other than `build.gradle.kts` get `provide_metadata` once.
+
+    Example:
+        >>> propagator = MetadataPropagator(project)
+        >>> propagator.propagate()  # visits the whole project
+        >>> overrides.metadata["com.squareup.retrofit2:retrofit"] = "2.11.0"
+        >>> propagator.propagate().files  # only the build files declaring retrofit
+    """
+    project : 'GenericProject'
+
+    def __init__(self,project : 'GenericProject') -> None:
+        self.project = project
+        # id(node) -> binding, so walking the project again keeps the declared state recorded by the first walk
+        self._bindings : dict[int,MetadataBinding] = {}
+        # id(scope) -> key -> bindings resolved from it
+        self._index : dict[int,dict[str,list[MetadataBinding]]] = {}
+        # id(scope) -> keys changed since the last pass
+        self._dirty : dict[int,set[str]] = {}
+        # id(node) -> node of the untracked files already provided with metadata
+        self._provided : dict[int,Any] = {}
+        self._structure = -1
+
+    def metadata_changed(self,metadata : MetadataDict,keys : Iterable[str]) -> None :
+        self._dirty.setdefault(id(metadata),set()).update(keys)
+
+    def propagate(self) -> PropagationReport :
+        """
+        Resolves the declarations bound to metadata entries that changed since the last pass, or every declaration on
+        the first pass and after the hierarchy was restructured.
+
+        Returns:
+            PropagationReport: The declarations resolved and the files they changed.
+        """
+        if self._structure != structure_version() :
+            return self.rebind()
+
+        with trace("propagate_metadata","metadata") as span :
+            dirty, self._dirty = self._dirty, {}
+            report = PropagationReport(False)
+            for scope, keys in dirty.items() :
+                bindings = self._index.get(scope)
+                if bindings is None :
+                    continue
+                for key in keys :
+                    for binding in bindings.get(key,()) :
+                        self._resolve(binding,report)
+            if span :
+                span.set(objects=report.resolved,changed=report.changed,files=len(report.files))
+        return report
+
+    def rebind(self) -> PropagationReport :
+        """
+        Walks the whole project again, binding declarations added since the previous walk, and resolves every one.
+        """
+        with trace("propagate_metadata","metadata",full=True) as span :
+            self._structure = structure_version()
+            self._index = {}
+            self._dirty = {}
+            bindings : dict[int,MetadataBinding] = {}
+            # (id(metadata), identifier) -> scope, every scope is resolved once
+            scopes : dict[tuple[int,str],Optional[MetadataDict]] = {}
+
+            previous = self._bindings
+            for nodes, metadata, identifier, path, owner in self._declarations() :
+                scope_key = (id(metadata),identifier)
+                if scope_key in scopes :
+                    scope = scopes[scope_key]
+                else :
+                    scope = metadata.resolution_index().get(identifier)
+                    if isinstance(scope,MetadataDict) :
+                        scope.watch(self)
+                    else :
+                        scope = None
+                    scopes[scope_key] = scope
+                keys = None if scope is None else self._index.setdefault(id(scope),{})
+
+                for node, key, state in nodes :
+                    # A node bound by a previous walk keeps the key and state it was declared with, not those its callback set
+                    binding = previous.get(id(node))
+                    if binding is None or binding.node is not node :
+                        binding = MetadataBinding(node,metadata,key,path,owner,state)
+                    else :
+                        binding.metadata, binding.path, binding.owner = metadata, path, owner
+                    bindings[id(node)] = binding
+                    binding.scope = scope
+                    if keys is not None :
+                        same_key = keys.get(binding.key)
+                        if same_key is None :
+                            keys[binding.key] = [binding]
+                        else :
+                            same_key.append(binding)
+
+            self._bindings = bindings
+            report = PropagationReport(True)
+            for binding in bindings.values() :
+                self._resolve(binding,report)
+            if span :
+                span.set(objects=report.resolved,changed=report.changed,files=len(report.files))
+        return report
+
+    def _resolve(self,binding : MetadataBinding,report : PropagationReport) -> None :
+        report.resolved += 1
+        if binding.resolve() :
+            report.changed += 1
+            report.files[binding.path] = binding.owner
+
+    def _declarations(self) -> Iterator[tuple[list[tuple[Any,str,Optional[tuple]]],GradleMetadata,str,str,FileConvertible]] :
+        # The declarations with a replace callback, as `(node, key, declared state)` lists sharing their metadata,
+        # scope and file. A `build.gradle.kts` already provided with metadata keeps its declarations as declared.
+        project = self.project
+        root = Path()
+        settings_gradle = project.settings_gradle
+        if isinstance(settings_gradle,SettingsGradle) and settings_gradle.plugins.plugins is not None :
+            yield _plugins(settings_gradle.plugins.plugins.code), project.metadata, "plugins", settings_gradle.FILE_NAME, settings_gradle
+
+        for module in project.modules :
+            if not lists_output_files(module) :
+                module.provide_metadata(module.metadata)
+                continue
+            for filepath, node in module.output_files(module.directory(root)) :
+                if not isinstance(node,ModuleBuildGradle) :
+                    if id(node) not in self._provided :
+                        self._provided[id(node)] = node
+                        node.provide_metadata(module.metadata)
+                    continue
+                metadata = module.metadata if node.module_metadata is None else node.module_metadata
+                path = Path(filepath).as_posix()
+                yield _plugins(node.plugins.code,node.declared), metadata, "plugins", path, node
+                yield _declared([dependency for dependency in node.dependencies.code if isinstance(dependency,Dependency) and dependency.replace is not None],node.declared,attrgetter("dependency")), metadata, "dependencies", path, node
+
+def _plugins(plugins : Iterable[Any],declared : Optional[Callable[[Any],Any]] = None) -> list[tuple[Any,str,Optional[tuple]]] :
+    plugins = [plugin for plugin in plugins if isinstance(plugin,Plugin) and plugin.replace is not None]
+    if declared is None :
+        return [(plugin, plugin.identifier, None) for plugin in plugins]
+    return _declared(plugins,declared,attrgetter("identifier"))
+
+def _declared(nodes : list[Any],declared : Callable[[Any],Any],key : Callable[[Any],str]) -> list[tuple[Any,str,Optional[tuple]]] :
+    # Binds a node already rewritten by its replace callback to its key and state as declared
+    bound = []
+    for node in nodes :
+        original = declared(node)
+        bound.append((node, key(original), None if original is node else _state(type(node))[1](original)))
+    return bound
@@ -1,10 +1,42 @@
 
 
-from abc import abstractmethod
 from pathlib import Path
-from src.core import FileConvertible
+from src.core import FileConvertible, lists_output_files
+from src.gradle.buildgradle import ModuleBuildGradle
+from src.gradle.dependency import DependencyGroup
 from src.metadata import ModuleMetadata
 
 
 class Module(FileConvertible) :
-    metadata : ModuleMetadata
\ No newline at end of file
+    """
+    A Gradle module of a project.
+
+    Modules usually consist of several files (e.g. `build.gradle.kts` and sources). Writers other than
+    `generate_to_file` (incremental, transactional and archive output, plans) get them from `output_files`, which by
+    default generates the module into a staging directory; override it to list the files instead, e.g.
+    `yield from self.build_gradle.output_files(filepath)`.
+    """
+    metadata : ModuleMetadata
+
+    def directory(self,filepath : Path) -> Path :
+        """
+        Returns the directory of this module inside the project located at `filepath`.
+
+        Gradle project paths such as `:feature:login` are mapped to nested directories (`feature/login`).
+        """
+        return Path(filepath).joinpath(*[part for part in self.metadata.name().split(":") if part])
+
+    def build_gradle_files(self) -> list[ModuleBuildGradle] :
+        """
+        Returns the `ModuleBuildGradle` files of this module: those listed by `output_files` when the module lists its
+        files (see `lists_output_files`), otherwise its `ModuleBuildGradle` attributes.
+        """
+        if lists_output_files(self) :
+            return [node for _, node in self.output_files(Path()) if isinstance(node,ModuleBuildGradle)]
+        return [value for value in getattr(self,"__dict__",{}).values() if isinstance(value,ModuleBuildGradle)]
+
+    def dependency_groups(self) -> list[DependencyGroup]:
+        """
+        Returns the dependency groups declared by this module, those of its `build_gradle_files`.
+        """
+        return [node.dependencies for node in self.build_gradle_files()]
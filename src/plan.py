@@ -0,0 +1,259 @@
+import hashlib
+import json
+import os
+import tempfile
+import warnings
+from functools import lru_cache
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, BinaryIO, Callable, Iterator, Optional
+
+from src.tracing import trace
+from src.utils import cache_directory, open_output, render_to_string, split_reference
+
+if TYPE_CHECKING :
+    from src.archive import ArchiveFormat
+    from src.assets import AssetStore, StaticAsset
+    from src.project.incremental import IncrementalReport
+    from src.project.transaction import PublishMode
+
+class PlanCacheError(Exception):
+    pass
+
+@lru_cache(maxsize=1)
+def generator_version() -> str :
+    """
+    Returns a digest of the generator's own sources (the `src` package), so cached plans are invalidated by any
+    change to the generator, released or not.
+    """
+    digest = hashlib.sha256()
+    package = Path(__file__).resolve().parent.parent
+    for path in sorted(package.rglob("*.py")) :
+        digest.update(path.relative_to(package).as_posix().encode("utf-8"))
+        digest.update(path.read_bytes())
+    return digest.hexdigest()[:16]
+
+def reference_digest(reference : str) -> Optional[str] :
+    """
+    Returns a digest of the source file `reference` (`path/to/script.py:name` or `package.module:name`, see
+    `load_reference`) points at, or `None` if it has no source file. Files imported by that script are not included.
+    """
+    import importlib.util
+
+    location, _, is_path = split_reference(reference)
+    if is_path :
+        path = Path(location)
+    else :
+        try :
+            spec = importlib.util.find_spec(location)
+        except (ImportError, ValueError) :
+            return None
+        if spec is None or spec.origin is None or not os.path.isfile(spec.origin) :
+            return None
+        path = Path(spec.origin)
+
+    try :
+        return hashlib.sha256(path.read_bytes()).hexdigest()
+    except OSError :
+        return None
+
+def spec_digest(spec : Any,salt : str = "") -> str :
+    """
+    Returns a SHA-256 of the canonical JSON of `spec` (sorted keys, no whitespace), `salt` and the generator version,
+    so equal specs give the same digest whatever the order of their keys.
+
+    Raises:
+        PlanCacheError: If `spec` is not JSON-compatible.
+    """
+    try :
+        canonical = json.dumps(spec,sort_keys=True,separators=(",",":"),default=_reject)
+    except (TypeError, ValueError) as error :
+        raise PlanCacheError(f"Project specs must be JSON-compatible: {error}") from error
+    digest = hashlib.sha256(f"{salt}:{generator_version()}:".encode("utf-8"))
+    digest.update(canonical.encode("utf-8"))
+    return digest.hexdigest()
+
+class ProjectPlan :
+    """
+    The compiled, immutable form of a project: every output file with its content fully resolved (metadata provided
+    and replace callbacks applied).
+
+    A plan is what is left of a `GenericProject` once nothing about it can change anymore, so it can be cached (see
+    `PlanCache`) and generated again without rebuilding the object tree. It exposes the same `output_files` extension
+    point as `FileConvertible`, and the generation methods of `GenericProject`, so callers can use either.
+
+    Loading and generating a plan only needs this module: the object model (`src.gradle`, `src.project`) is not
+    imported unless the plan has to be compiled.
+
+    Attributes:
+        files (tuple[tuple[str,str],...]): `(relative path, content)` of every file, in generation order.
+        assets (tuple[StaticAsset,...]): The static files of the project (see `GenericProject.assets`).
+    """
+    __slots__ = ("files","assets")
+
+    files : tuple[tuple[str,str],...]
+    assets : tuple['StaticAsset',...]
+
+    def __init__(self,files : tuple[tuple[str,str],...],assets : tuple['StaticAsset',...] = ()) -> None:
+        object.__setattr__(self,"files",tuple(files))
+        object.__setattr__(self,"assets",tuple(assets))
+
+    def __setattr__(self,name : str,value : Any) -> None :
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    @classmethod
+    def compile(cls,project : Any) -> 'ProjectPlan' :
+        """
+        Compiles `project` (a `GenericProject`) by rendering every file it produces, once prepared for generation
+        (see `GenericProject.prepare`).
+        """
+        with trace("compile_plan","project") as span :
+            project.prepare()
+            files = tuple((path.as_posix(),render_to_string(node)) for path, node in project.output_files(Path()))
+            if span :
+                span.set(objects=len(files),bytes=sum(len(content) for _, content in files))
+        return cls(files,project.assets)
+
+    def output_files(self,filepath : Path) -> Iterator[tuple[Path,str]] :
+        root = Path(filepath)
+        for relative, content in self.files :
+            yield root / relative, content
+
+    def generate_to_file(self,filepath : Path) -> None :
+        with trace("generate_plan","project",path=str(filepath),objects=len(self.files)) :
+            directories = set()
+            for path, content in self.output_files(filepath) :
+                if path.parent not in directories :
+                    os.makedirs(path.parent,exist_ok=True)
+                    directories.add(path.parent)
+                with open_output(path) as file :
+                    file.write(content)
+            self.materialize_assets(filepath)
+
+    def extend_generate_to_file(self,filepath : Path) -> None :
+        self.generate_to_file(filepath)
+
+    def materialize_assets(self,filepath : Path,store : Optional['AssetStore'] = None) -> None :
+        """
+        See `GenericProject.materialize_assets`.
+        """
+        if not self.assets :
+            return
+        if store is None :
+            from src.assets import copy_assets
+            copy_assets(self.assets,filepath)
+        else :
+            store.materialize_all(self.assets,filepath)
+
+    def incremental_generate_to_file(self,filepath : Path,delete_stale : bool = True) -> 'IncrementalReport' :
+        """
+        See `GenericProject.incremental_generate_to_file`.
+        """
+        from src.project.incremental import IncrementalWriter
+        report = IncrementalWriter(filepath,delete_stale).write_all(self.output_files(filepath))
+        self.materialize_assets(filepath)
+        return report
+
+    def transactional_generate_to_file(self,filepath : Path,publish : 'PublishMode' = "files",durable : bool = True) -> list[Path] :
+        """
+        See `GenericProject.transactional_generate_to_file`.
+        """
+        from src.project.transaction import StagedWriter
+        return StagedWriter(filepath,publish,durable).write_all(self.output_files(filepath),self.assets)
+
+    def write_archive(self,sink : BinaryIO,format : 'ArchiveFormat' = "zip",prefix : str = "",timestamp : Optional[float] = None) -> int :
+        """
+        See `GenericProject.write_archive`.
+        """
+        from src.archive import write_archive
+        return write_archive(self.output_files(Path()),self.assets,sink,format,prefix,timestamp)
+
+    def to_json(self) -> dict[str,Any] :
+        return {"files" : [list(file) for file in self.files],"assets" : [asset.to_json() for asset in self.assets]}
+
+    @classmethod
+    def from_json(cls,data : dict[str,Any]) -> 'ProjectPlan' :
+        from src.assets import StaticAsset
+        return cls(tuple((relative, content) for relative, content in data["files"]),tuple(StaticAsset.from_json(asset) for asset in data.get("assets",[])))
+
+def default_cache_directory() -> Path :
+    return cache_directory("plans")
+
+class PlanCache :
+    """
+    On-disk cache of compiled `ProjectPlan`s, keyed by a hash of the project spec and the generator version.
+
+    The spec is any JSON-compatible value that fully determines the project (e.g. the parameters of a batch entry
+    together with `reference_digest` of its builder); whatever the spec does not capture is not checked, so a
+    builder reading other inputs must include them in the spec.
+
+    Example:
+        >>> cache = PlanCache()
+        >>> spec = {"builder" : reference_digest("templates/starter.py:build"),"modules" : 12}
+        >>> plan = cache.get_or_compile(spec,lambda : build_project(12))
+        >>> plan.generate_to_file(Path("out"))
+    """
+    FORMAT = 2
+
+    directory : Path
+
+    def __init__(self,directory : Optional[Path] = None) -> None:
+        self.directory = Path(directory) if directory is not None else default_cache_directory()
+
+    def key(self,spec : Any) -> str :
+        """
+        Returns the cache key of `spec`.
+
+        Raises:
+            PlanCacheError: If `spec` is not JSON-compatible.
+        """
+        return spec_digest(spec,str(self.FORMAT))
+
+    def path(self,key : str) -> Path :
+        return self.directory / key[:2] / f"{key}.json"
+
+    def load(self,key : str) -> Optional[ProjectPlan] :
+        """
+        Returns the cached plan of `key`, or `None` if there is none (or it is unreadable, it is then recompiled).
+        """
+        with trace("load_plan","cache") as span :
+            try :
+                with open(self.path(key),encoding="utf-8") as file :
+                    plan = ProjectPlan.from_json(json.load(file))
+            except (OSError, ValueError, KeyError, TypeError) :
+                plan = None
+            if span :
+                span.set(hit=plan is not None)
+        return plan
+
+    def store(self,key : str,plan : ProjectPlan) -> None :
+        path = self.path(key)
+        path.parent.mkdir(parents=True,exist_ok=True)
+        # Written next to the target and renamed, concurrent readers never see a partial plan
+        fd, temporary = tempfile.mkstemp(prefix=f".{key[:8]}-",suffix=".tmp",dir=path.parent)
+        try :
+            with os.fdopen(fd,"w",encoding="utf-8") as file :
+                json.dump(plan.to_json(),file,separators=(",",":"))
+            os.replace(temporary,path)
+        except BaseException :
+            try :
+                os.remove(temporary)
+            except OSError :
+                pass
+            raise
+
+    def get_or_compile(self,spec : Any,build : Callable[[],Any]) -> ProjectPlan :
+        """
+        Returns the cached plan of `spec`, or builds the project with `build`, compiles and caches it.
+        """
+        key = self.key(spec)
+        plan = self.load(key)
+        if plan is None :
+            plan = ProjectPlan.compile(build())
+            try :
+                self.store(key,plan)
+            except OSError as error :
+                warnings.warn(f"Could not cache the project plan: {error}")
+        return plan
+
+def _reject(value : Any) -> Any :
+    raise TypeError(f"{type(value).__name__} is not JSON-compatible")
@@ -1,41 +1,407 @@
 
 
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
 from pathlib import Path
-from typing import Self
-import os 
-import shutil
-from sys import platform
+from typing import TYPE_CHECKING, BinaryIO, Iterator, Optional, Self
+import os
+import warnings
 
+from src.assets import WRAPPER_ASSETS, AssetStore, Materialization, StaticAsset, copy_assets
+from src.core import FileConvertible
+from src.gradle.catalog import VersionCatalog
+from src.gradle.dependency import Dependency
+from src.gradle.plugin import Plugin
+from src.gradle.resolution import DependencyResolver, Resolution
+from src.gradle.rules import RewriteReport, RewriteRules
 from src.gradle.properties import GradleProperties
 from src.gradle.settingsgradle import SettingsGradle
 from src.metadata import ProjectMetadata
+from src.metadata.propagation import MetadataPropagator, PropagationReport
 from src.module import Module
+from src.project.graph import ModuleGraph
+from src.project.incremental import IncrementalReport, IncrementalWriter
 from src.project.local import LocalProperties
+from src.project.transaction import PublishMode, StagedWriter
+from src.tracing import trace
+
+if TYPE_CHECKING :
+    from src.aio import AsyncWriter
+    from src.archive import ArchiveFormat
+    from src.gradle.localrepository import LocalRepositoryIndex, VersionFill
+
+class GenerationResult :
+    """
+    Outcome of generating a single `FileConvertible` of a project.
+
+    Attributes:
+        target (FileConvertible): The object that was generated.
+        directory (Path): The directory the object was generated into.
+        error (Optional[Exception]): The exception raised while generating, or `None` on success.
+    """
+    target : FileConvertible
+    directory : Path
+    error : Optional[Exception]
+
+    def __init__(self,target : FileConvertible,directory : Path,error : Optional[Exception] = None) -> None:
+        self.target = target
+        self.directory = directory
+        self.error = error
+
+    def succeeded(self) -> bool :
+        return self.error is None
+
+class GenerationReport :
+    """
+    Collects the `GenerationResult` of every file of a project generation run.
+
+    Results are kept in the order the targets were scheduled (see `GenericProject.generation_targets`),
+    independently of the order in which the workers finished them.
+    """
+    results : list[GenerationResult]
+
+    def __init__(self,results : list[GenerationResult]) -> None:
+        self.results = results
+
+    def errors(self) -> list[GenerationResult] :
+        return [result for result in self.results if result.error is not None]
+
+    def succeeded(self) -> bool :
+        return all(result.error is None for result in self.results)
+
+    def raise_for_errors(self) -> None :
+        """
+        Re-raises the error of the first failed target (in scheduling order), if any.
+        """
+        for result in self.results :
+            if result.error is not None :
+                raise result.error
 
 class GenericProject :
     metadata : ProjectMetadata
     settings_gradle : SettingsGradle
     properties : GradleProperties
     local_properties : LocalProperties
+    version_catalog : Optional[VersionCatalog]
 
     modules : list[Module]
 
-    def __init__(self,metadata : ProjectMetadata,settings_gradle : SettingsGradle,properties : GradleProperties,local_properties : LocalProperties,modules : list[Module]) -> None:
+    # Static files of every project, copied or materialized from an `AssetStore` (see `materialize_assets`)
+    assets : tuple[StaticAsset,...] = WRAPPER_ASSETS
+
+    # Created by the first `propagate_metadata`
+    _propagator : Optional[MetadataPropagator] = None
+
+    # Fills in the dependency versions left out or declared as `latest` when the project is generated (see `fill_versions`)
+    version_index : Optional['LocalRepositoryIndex'] = None
+
+    def __init__(self,metadata : ProjectMetadata,settings_gradle : SettingsGradle,properties : GradleProperties,local_properties : LocalProperties,modules : list[Module],version_catalog : Optional[VersionCatalog] = None) -> None:
         self.metadata = metadata
         self.settings_gradle = settings_gradle
         self.properties = properties
         self.local_properties = local_properties
         self.modules = modules
+        self.version_catalog = version_catalog
+
+    def generation_targets(self, filepath: Path) -> Iterator[tuple[FileConvertible,Path]] :
+        """
+        Yields every `FileConvertible` of the project together with the directory it is generated into.
+
+        The top-level files come first, followed by the modules in the order of `modules`. The module graph is
+        checked first (see `module_graph`), so a dependency cycle fails the generation instead of Gradle's
+        configuration. When modules depend on each other, a copy of `settings_gradle` with its `include(...)` lines
+        ordered after the graph (dependencies first) is yielded instead of it.
+
+        The project is left as it is, so this is safe for read-only uses such as validating or diffing a project;
+        the generation methods call `prepare` first.
+        """
+        levels = self.module_graph().levels()
+        settings_gradle = self.settings_gradle
+        if len(levels) > 1 :
+            settings_gradle = settings_gradle.ordered(path for level in levels for path in level)
+        filepath = Path(filepath)
+        yield settings_gradle, filepath
+        yield self.properties, filepath
+        yield self.local_properties, filepath
+        if self.version_catalog is not None :
+            yield self.version_catalog, filepath
+
+        for module in self.modules :
+            yield module, module.directory(filepath)
+
+    def prepare(self) -> Optional['VersionFill'] :
+        """
+        Makes the changes to the project that generating it implies, which `generation_targets` leaves out: the
+        dependency versions left out or declared as `latest` are filled in from `version_index` if it is set (see
+        `fill_versions`), with a warning for the modules it has no version of.
+
+        Called by every generation method and by `ProjectPlan.compile`; calling it again is harmless.
+
+        Returns:
+            Optional[VersionFill]: The versions filled in, `None` without `version_index`.
+        """
+        if self.version_index is None :
+            return None
+        filled = self.fill_versions(self.version_index)
+        if filled.missing :
+            warnings.warn(f"No version of {', '.join(filled.missing)} in {self.version_index.repository}")
+        return filled
+
+    def output_files(self, filepath: Path) -> Iterator[tuple[Path,FileConvertible]] :
+        """
+        Yields every file of the project as `(path, node)` pairs, in the order of `generation_targets`.
+        """
+        for target, directory in self.generation_targets(filepath) :
+            yield from target.output_files(directory)
+
+    def module_graph(self) -> ModuleGraph :
+        """
+        Builds the graph of the project dependencies between `modules` and checks it, without changing the project.
+
+        Use `ModuleGraph.levels` to process independent modules in parallel waves.
+
+        Raises:
+            ModuleGraphError: If a module depends on a module that is not part of the project.
+            ModuleCycleError: If project dependencies form a cycle.
+        """
+        with trace("module_graph","project") as span :
+            graph = ModuleGraph.from_modules(self.modules)
+            levels = graph.levels()
+            if span :
+                span.set(objects=len(graph),edges=sum(len(dependencies) for dependencies in graph.edges.values()),levels=len(levels))
+        return graph
+
+    def propagate_metadata(self) -> PropagationReport :
+        """
+        Provides metadata to every declaration of the project with a replace callback, in a single pass over the
+        project the first time and then only to the declarations whose metadata entries changed since the previous
+        call (see `MetadataPropagator`). Call `metadata_propagator().rebind()` after adding declarations.
+
+        Returns:
+            PropagationReport: The declarations resolved and the files whose content changed.
+        """
+        return self.metadata_propagator().propagate()
+
+    def metadata_propagator(self) -> MetadataPropagator :
+        if self._propagator is None :
+            self._propagator = MetadataPropagator(self)
+        return self._propagator
+
+    def refresh_generated_files(self, filepath: Path) -> IncrementalReport :
+        """
+        Propagates the metadata edits made since the previous call (see `propagate_metadata`) and rewrites only the
+        files they changed in the project previously generated into `filepath` (e.g. with
+        `incremental_generate_to_file`), so a version bump re-renders a few build files instead of the project.
+
+        Returns:
+            IncrementalReport: The files that were rewritten, other files are neither rendered nor reported.
+        """
+        with trace("refresh_generated_files","project",path=str(filepath)) :
+            changes = self.propagate_metadata()
+            root = Path(filepath)
+            files = changes.files
+            if any(node is self.settings_gradle for node in files.values()) :
+                # Written with its modules ordered, like `generation_targets` does
+                settings_gradle, _ = next(self.generation_targets(root))
+                files = {path : settings_gradle if node is self.settings_gradle else node for path, node in files.items()}
+            return IncrementalWriter(root,delete_stale=False).write_all((root / path, node) for path, node in files.items())
+
+    def use_version_catalog(self) -> list[Dependency | Plugin] :
+        """
+        Rewrites the dependencies and plugins of every module that are in `version_catalog` to their catalog
+        accessors (see `VersionCatalog.apply`).
+
+        Returns:
+            list: The declarations of catalog entries kept as they are because the accessor would change their
+            version (or drop their classifier).
+        """
+        kept : list[Dependency | Plugin] = []
+        if self.version_catalog is None :
+            return kept
+        for module in self.modules :
+            for node in module.build_gradle_files() :
+                kept += self.version_catalog.apply(node.plugins)
+                kept += self.version_catalog.apply(node.dependencies)
+        return kept
+
+    def apply_rewrite_rules(self,rules : RewriteRules) -> RewriteReport :
+        """
+        Applies a compiled rule table to the dependencies and plugins of every module and to the plugins of
+        `settings.gradle.kts`, in one pass. Module declarations look `MetadataVersion` rules up in their module's
+        metadata, settings plugins in the project's; `Catalog` rules use `version_catalog`. Rewritten declarations are
+        new objects, call `metadata_propagator().rebind()` afterwards if metadata is propagated.
+
+        Returns:
+            RewriteReport: The rule that fired on every rewritten declaration.
+        """
+        report = RewriteReport()
+        with trace("apply_rewrite_rules","project",rules=len(rules.rules)) as span :
+            settings_gradle = self.settings_gradle
+            if isinstance(settings_gradle,SettingsGradle) and settings_gradle.plugins.plugins is not None :
+                rules.apply(settings_gradle.plugins.plugins,self.metadata,self.version_catalog,report)
+            for module in self.modules :
+                for node in module.build_gradle_files() :
+                    rules.apply(node.plugins,module.metadata,self.version_catalog,report)
+                    rules.apply(node.dependencies,module.metadata,self.version_catalog,report)
+            if span :
+                span.set(rewritten=len(report))
+        return report
+
+    def resolve_dependencies(self,resolver : Optional[DependencyResolver] = None) -> Resolution :
+        """
+        Resolves version conflicts across the dependency groups of every module and rewrites them in place, so all
+        modules agree on one version per `group:artifact`.
+
+        Raises:
+            DependencyConflictError: If the resolver's strategy is `ConflictStrategy.Fail` and modules disagree.
+        """
+        resolver = resolver if resolver is not None else DependencyResolver()
+        with trace("resolve_dependencies","project") as span :
+            groups = [group for module in self.modules for group in module.dependency_groups()]
+
+            resolution = resolver.resolve(groups)
+            for group in groups :
+                resolution.apply(group)
+            if span :
+                span.set(objects=sum(len(group.code) for group in groups),conflicts=len(resolution.conflicts),dropped=len(resolution.dropped))
+        return resolution
+
+    def fill_versions(self,index : 'LocalRepositoryIndex',include_snapshots : bool = False) -> 'VersionFill' :
+        """
+        Gives the dependencies of every module declared without a version, or with the version `latest`, the highest
+        version installed in the local Maven repository of `index` (see `LocalRepositoryIndex.fill_versions`).
+        """
+        return index.fill_all((group for module in self.modules for group in module.dependency_groups()),include_snapshots)
+
+    def materialize_assets(self, filepath: Path,store : Optional[AssetStore] = None) -> dict[str,Materialization] :
+        """
+        Puts the static `assets` of the project (the Gradle wrapper scripts by default) into `filepath`: copied from
+        their sources, or materialized from `store` if one is given (see `AssetStore`, e.g. to hard link them).
+        """
+        if store is None :
+            return copy_assets(self.assets,filepath)
+        return store.materialize_all(self.assets,filepath)
+
+    def extend_generate_to_file(self, filepath: Path,store : Optional[AssetStore] = None) -> None:
+        with trace("extend_generate_to_file","project",path=str(filepath),modules=len(self.modules)) :
+            self.prepare()
+            for target, directory in self.generation_targets(filepath) :
+                os.makedirs(directory,exist_ok=True)
+                target.generate_to_file(directory)
+            self.materialize_assets(filepath,store)
+
+    def incremental_generate_to_file(self, filepath: Path,delete_stale : bool = True,store : Optional[AssetStore] = None) -> IncrementalReport :
+        """
+        Generates the project, only rewriting files whose content changed since the previous run.
+
+        A manifest of content hashes is kept in the project root (see `GenerationManifest`), unchanged files keep
+        their mtime and files generated by a previous run that are no longer produced are deleted (unless
+        `delete_stale` is `False`).
+
+        Returns:
+            IncrementalReport: The files that were written, skipped and deleted.
+        """
+        with trace("incremental_generate_to_file","project",path=str(filepath),modules=len(self.modules)) :
+            self.prepare()
+            report = IncrementalWriter(filepath,delete_stale).write_all(self.output_files(filepath))
+            self.materialize_assets(filepath,store)
+            return report
+
+    def transactional_generate_to_file(self, filepath: Path,publish : PublishMode = "files",durable : bool = True,store : Optional[AssetStore] = None) -> list[Path] :
+        """
+        Generates the whole project into a staging directory and publishes it only if every file rendered.
+
+        A failure while generating leaves `filepath` untouched, and readers such as a running Gradle daemon never
+        observe a partially written file (`publish="files"`) or project (`publish="directory"`). See `StagedWriter`.
+        The static `assets` are materialized into the staging directory (from `store` if one is given) and published
+        with the generated files.
+
+        Returns:
+            list[Path]: The published files, assets included.
+        """
+        with trace("transactional_generate_to_file","project",path=str(filepath),modules=len(self.modules)) :
+            self.prepare()
+            return StagedWriter(filepath,publish,durable).write_all(self.output_files(filepath),self.assets,store)
+
+    def parallel_generate_to_file(self, filepath: Path,max_workers : Optional[int] = None,executor : Optional[Executor] = None,store : Optional[AssetStore] = None) -> GenerationReport :
+        """
+        Generates the settings, properties, local properties and every module of the project concurrently.
+
+        Every target is generated independently, so a failing file does not stop the others; the errors are
+        collected in the returned `GenerationReport` instead of being raised.
+
+        Args:
+            filepath (Path): The root directory of the project.
+            max_workers (Optional[int]): Upper bound of files generated at the same time when no `executor` is given
+                (defaults to the `ThreadPoolExecutor` default).
+            executor (Optional[Executor]): An existing pool to run the generation on. It is not shut down afterwards.
+            store (Optional[AssetStore]): Where the static `assets` are materialized from, see `materialize_assets`.
+
+        Returns:
+            GenerationReport: One result per target, in the order of `generation_targets`.
+        """
+        with trace("parallel_generate_to_file","project",path=str(filepath),modules=len(self.modules)) :
+            self.prepare()
+            targets = list(self.generation_targets(filepath))
+
+            # Create the directories up-front so workers never race on shared parents
+            for directory in dict.fromkeys(directory for _, directory in targets) :
+                os.makedirs(directory,exist_ok=True)
+
+            if executor is None :
+                with ThreadPoolExecutor(max_workers=max_workers,thread_name_prefix="gradle-generator") as pool :
+                    report = self._collect(pool,targets)
+            else :
+                report = self._collect(executor,targets)
+
+            self.materialize_assets(filepath,store)
+            return report
+
+    def write_archive(self,sink : BinaryIO,format : 'ArchiveFormat' = "zip",prefix : Optional[str] = None,timestamp : Optional[float] = None) -> int :
+        """
+        Streams the whole project, static `assets` included, into a zip or tar archive written to `sink` (a file,
+        pipe or response body opened in binary mode) without touching the file system, see `src.archive.ArchiveWriter`.
+
+        Args:
+            format (ArchiveFormat): `"zip"`, `"tar"` or `"tar.gz"`.
+            prefix (Optional[str]): Directory the project is put in inside the archive, the project name by default.
+            timestamp (Optional[float]): Modification time of every entry, the current time by default. Pass a fixed
+                one for archives that are byte for byte identical across runs.
+
+        Returns:
+            int: The number of files written.
+        """
+        from src.archive import write_archive
+
+        prefix = prefix if prefix is not None else self.metadata.name()
+        with trace("write_archive","project",format=format,modules=len(self.modules)) :
+            self.prepare()
+            return write_archive(self.output_files(Path()),self.assets,sink,format,prefix,timestamp)
+
+    async def generate_to_file_async(self, filepath: Path,writer : Optional['AsyncWriter'] = None,store : Optional[AssetStore] = None) -> None :
+        """
+        Generates the project without blocking the event loop: files are rendered on the loop and written on an
+        executor through `writer` (see `src.aio.AsyncWriter`), which bounds the writes in flight. Pass the same
+        writer to concurrent generations to bound them together:
+
+            writer = AsyncWriter(max_pending=32)
+            await asyncio.gather(*(project.generate_to_file_async(root / name,writer) for name, project in projects.items()))
+
+        Cancelling the call stops it from submitting more writes; writes already running finish, so the project
+        may be left partially generated.
+        """
+        from src.aio import AsyncWriter, generate_async
+
+        writer = writer if writer is not None else AsyncWriter()
+        with trace("generate_to_file_async","project",path=str(filepath),modules=len(self.modules)) :
+            self.prepare()
+            await generate_async(self.generation_targets(filepath),writer)
+            await (await writer.submit(self.materialize_assets,filepath,store))
+
+    def _collect(self,executor : Executor,targets : list[tuple[FileConvertible,Path]]) -> GenerationReport :
+        futures : list[Future] = [executor.submit(target.generate_to_file,directory) for target, directory in targets]
+
+        results = []
+        for (target, directory), future in zip(targets,futures) :
+            results.append(GenerationResult(target,directory,future.exception()))
 
-    def extend_generate_to_file(self, filepath: Path) -> None:
-        self.settings_gradle.generate_to_file(filepath)
-        self.properties.generate_to_file(filepath)
-        self.local_properties.generate_to_file(filepath)
-
-        # https://stackoverflow.com/a/66577910/20243803
-        if platform.startswith('win32') or platform.startswith('win64'):
-            # https://stackoverflow.com/a/48374171/20243803
-            # https://www.quora.com/When-should-I-use-shutil.copyfile-vs.-shutil.copy-in-Python
-            shutil.copyfile("gradlew",filepath)
-            shutil.copyfile("gradlew.bat",filepath)
-        pass
\ No newline at end of file
+        return GenerationReport(results)
@@ -0,0 +1,229 @@
+import json
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Any, Callable, Literal, Optional
+
+from src.plan import PlanCache, reference_digest
+from src.utils import load_reference
+
+BatchMode = Literal["plain", "incremental", "transactional"]
+
+class BatchSpecError(Exception):
+    pass
+
+class BatchSpec :
+    """
+    A list of projects to generate in one batch.
+
+    Every project is described by a JSON-compatible dictionary holding its `output` directory (relative to the batch
+    root) and any parameters understood by the `builder`, a function `builder(project, template)` returning the
+    `GenericProject`. `template` is the result of the optional `template` function, called once per worker process
+    to load the read-only data shared by every project (e.g. a base version catalog or common plugin blocks).
+
+    Functions are referenced as `path/to/script.py:name` or `package.module:name`, so worker processes can load them
+    on their own.
+
+    A spec is either a JSON file:
+
+    ```json
+    {
+        "builder": "templates/starter.py:build",
+        "template": "templates/starter.py:load_template",
+        "projects": [{"output": "team-a", "name": "team-a"}, {"output": "team-b", "name": "team-b"}]
+    }
+    ```
+
+    or a Python manifest defining `build(project, template)`, optionally `load_template()`, and `PROJECTS`.
+
+    Attributes:
+        builder (str): Reference of the builder function.
+        template (Optional[str]): Reference of the template loading function.
+        projects (list[dict[str,Any]]): The projects to generate.
+    """
+    builder : str
+    template : Optional[str]
+    projects : list[dict[str,Any]]
+
+    def __init__(self,builder : str,projects : list[dict[str,Any]],template : Optional[str] = None) -> None:
+        for index, project in enumerate(projects) :
+            if "output" not in project :
+                raise BatchSpecError(f"Project {index} has no output directory")
+        self.builder = builder
+        self.template = template
+        self.projects = projects
+
+    @classmethod
+    def from_file(cls,filepath : Path) -> 'BatchSpec' :
+        filepath = Path(filepath)
+        if filepath.suffix == ".py" :
+            manifest = str(filepath)
+            try :
+                projects = load_reference(manifest,"PROJECTS")
+            except ImportError as error :
+                raise BatchSpecError(str(error)) from error
+            try :
+                load_reference(manifest,"load_template")
+                template = f"{manifest}:load_template"
+            except ImportError :
+                template = None
+            return cls(f"{manifest}:build",list(projects),template)
+
+        try :
+            with open(filepath,encoding="utf-8") as file :
+                data = json.load(file)
+        except (OSError, ValueError) as error :
+            raise BatchSpecError(f"Could not read {filepath}: {error}") from error
+
+        if "builder" not in data :
+            raise BatchSpecError(f"{filepath} does not name a builder")
+        # Relative script paths are relative to the spec file
+        base = filepath.parent
+        def locate(reference : Optional[str]) -> Optional[str] :
+            if reference is None :
+                return None
+            location, _, name = reference.rpartition(":")
+            return f"{base / location}:{name}" if location.endswith(".py") and not os.path.isabs(location) else reference
+
+        return cls(locate(data["builder"]),list(data.get("projects",[])),locate(data.get("template")))
+
+class BatchResult :
+    """
+    Outcome of generating one project of a batch.
+
+    Errors are kept as formatted tracebacks, exceptions raised in worker processes are not always picklable.
+
+    Attributes:
+        index (int): Position of the project in the spec.
+        output (Path): The directory the project was generated into.
+        error (Optional[str]): The formatted traceback of the failure, or `None` on success.
+        duration (float): Seconds spent building and generating the project.
+        worker (int): Process id of the worker that generated it.
+    """
+    index : int
+    output : Path
+    error : Optional[str]
+    duration : float
+    worker : int
+
+    def __init__(self,index : int,output : Path,error : Optional[str],duration : float,worker : int) -> None:
+        self.index = index
+        self.output = output
+        self.error = error
+        self.duration = duration
+        self.worker = worker
+
+    def succeeded(self) -> bool :
+        return self.error is None
+
+class BatchReport :
+    """
+    The `BatchResult` of every project of a batch, in the order of the spec.
+    """
+    results : list[BatchResult]
+    duration : float
+
+    def __init__(self,results : list[BatchResult],duration : float) -> None:
+        self.results = results
+        self.duration = duration
+
+    def failures(self) -> list[BatchResult] :
+        return [result for result in self.results if result.error is not None]
+
+    def succeeded(self) -> bool :
+        return all(result.error is None for result in self.results)
+
+    def __str__(self) -> str :
+        failures = self.failures()
+        workers = len({result.worker for result in self.results})
+        lines = [f"{len(self.results) - len(failures)} projects generated, {len(failures)} failed in {self.duration:.2f}s on {workers} workers"]
+        for result in failures :
+            lines.append(f"[{result.index}] {result.output}: {result.error.strip().splitlines()[-1]}")
+        return "\n".join(lines)
+
+# Per worker process state, set once by `_initialize_worker`
+_builder : Optional[Callable[[dict[str,Any],Any],Any]] = None
+_template : Any = None
+_root : Path = Path()
+_mode : BatchMode = "plain"
+_plan_cache : Optional[PlanCache] = None
+_sources : dict[str,Optional[str]] = {}
+
+def _initialize_worker(builder : str,template : Optional[str],root : Path,mode : BatchMode,plan_cache : Optional[Path] = None) -> None :
+    global _builder, _template, _root, _mode, _plan_cache, _sources
+    _builder = load_reference(builder)
+    _template = load_reference(template)() if template is not None else None
+    _root = Path(root)
+    _mode = mode
+    _plan_cache = PlanCache(plan_cache) if plan_cache is not None else None
+    _sources = {"builder" : reference_digest(builder),"template" : None if template is None else reference_digest(template)}
+
+def _generate(item : tuple[int,dict[str,Any]]) -> BatchResult :
+    index, project_spec = item
+    output = _root / project_spec["output"]
+    start = time.perf_counter()
+    try :
+        if _plan_cache is not None :
+            project = _plan_cache.get_or_compile({"sources" : _sources,"project" : project_spec},lambda : _builder(project_spec,_template))
+        else :
+            project = _builder(project_spec,_template)
+        if _mode == "incremental" :
+            project.incremental_generate_to_file(output)
+        elif _mode == "transactional" :
+            project.transactional_generate_to_file(output)
+        else :
+            project.extend_generate_to_file(output)
+        error = None
+    except Exception :
+        error = traceback.format_exc()
+    return BatchResult(index,output,error,time.perf_counter() - start,os.getpid())
+
+def generate_batch(spec : BatchSpec,root : Path,max_workers : Optional[int] = None,chunksize : Optional[int] = None,mode : BatchMode = "plain",plan_cache : Optional[Path] = None) -> BatchReport :
+    """
+    Generates every project of `spec` into `root` across a pool of processes.
+
+    Every worker loads the builder and the shared template once, when it starts, and then receives the projects in
+    chunks of `chunksize` (by default four chunks per worker, which keeps the workers busy without paying an
+    inter-process round-trip per project). A failing project does not stop the others, its traceback is reported
+    in the returned `BatchReport`.
+
+    Args:
+        spec (BatchSpec): The projects to generate.
+        root (Path): The directory the `output` of every project is relative to.
+        max_workers (Optional[int]): Number of worker processes, defaults to the number of CPUs. With `1` the batch
+            runs in the calling process.
+        chunksize (Optional[int]): Projects sent to a worker at once.
+        mode (BatchMode): Generate with `extend_generate_to_file`, `incremental_generate_to_file` or
+            `transactional_generate_to_file`.
+        plan_cache (Optional[Path]): Directory of a `PlanCache`. Projects whose parameters, builder and template
+            sources are unchanged since a previous batch are generated from their cached plan without being built.
+
+    Raises:
+        BatchSpecError: If the builder or template function cannot be loaded.
+    """
+    items = list(enumerate(spec.projects))
+    workers = max_workers if max_workers is not None else (os.cpu_count() or 1)
+    workers = max(1,min(workers,len(items)))
+    if chunksize is None :
+        chunksize = max(1,len(items) // (workers * 4))
+
+    start = time.perf_counter()
+    initializer = (spec.builder,spec.template,Path(root),mode,plan_cache)
+    try :
+        if workers == 1 :
+            _initialize_worker(*initializer)
+            results = [_generate(item) for item in items]
+        else :
+            # Fail early instead of in every worker
+            load_reference(spec.builder)
+            with ProcessPoolExecutor(max_workers=workers,initializer=_initialize_worker,initargs=initializer) as pool :
+                results = list(pool.map(_generate,items,chunksize=chunksize))
+    except ImportError as error :
+        raise BatchSpecError(str(error)) from error
+    except BrokenProcessPool as error :
+        raise BatchSpecError(f"A worker could not load {spec.builder} or its template") from error
+
+    return BatchReport(results,time.perf_counter() - start)
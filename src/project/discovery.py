@@ -0,0 +1,249 @@
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterable, Optional
+
+from src.metadata import ModuleMetadata, ProjectMetadata
+from src.tracing import trace
+
+# Files marking the root of a Gradle module
+MODULE_MARKERS = ("build.gradle.kts", "build.gradle")
+
+# Files marking the root of another build (e.g. an included `build-logic`), whose modules are not ours
+BUILD_MARKERS = ("settings.gradle.kts", "settings.gradle")
+
+# Directories that never contain modules: build outputs, Gradle caches and version control metadata
+PRUNED_DIRECTORIES = frozenset({"build", ".gradle", ".git", ".hg", ".svn", ".bzr"})
+
+# Directories modified this close to a scan may change again within the resolution of their mtime, their cache
+# entries are not trusted by the next scan
+_RACY_NS = 2_000_000_000
+
+class DirectoryEntry :
+    """
+    What a scan saw in a directory: its mtime, its subdirectories (after pruning) and whether it is a module root.
+
+    Adding, removing or renaming an entry of a directory changes its mtime, so while the mtime is unchanged the
+    listing can be reused without reading the directory again.
+    """
+    __slots__ = ("mtime_ns","subdirectories","module")
+
+    mtime_ns : int
+    subdirectories : tuple[str,...]
+    module : bool
+
+    def __init__(self,mtime_ns : int,subdirectories : tuple[str,...],module : bool) -> None:
+        self.mtime_ns = mtime_ns
+        self.subdirectories = subdirectories
+        self.module = module
+
+class DiscoveryCache :
+    """
+    The `DirectoryEntry` of every directory of a source tree, keyed by their path relative to the root (using
+    forward slashes, `""` being the root), optionally stored as JSON between runs.
+    """
+    VERSION = 1
+
+    entries : dict[str,DirectoryEntry]
+
+    def __init__(self,entries : Optional[dict[str,DirectoryEntry]] = None) -> None:
+        self.entries = entries if entries is not None else {}
+
+    @classmethod
+    def load(cls,filepath : Path) -> 'DiscoveryCache' :
+        """
+        Loads a cache saved by `save`, returning an empty cache if there is none or it is unreadable.
+        """
+        try :
+            with open(filepath,"r",encoding="utf-8") as file :
+                data = json.load(file)
+        except (OSError, ValueError) :
+            return cls()
+
+        if data.get("version") != cls.VERSION :
+            return cls()
+
+        return cls({path : DirectoryEntry(mtime_ns,tuple(subdirectories),module) for path, (mtime_ns, subdirectories, module) in data.get("directories",{}).items()})
+
+    def save(self,filepath : Path) -> None :
+        """
+        Writes the cache to `filepath`, replacing the previous one atomically.
+        """
+        filepath = Path(filepath)
+        temporary_path = filepath.with_name(filepath.name + ".tmp")
+        data = {
+            "version" : self.VERSION,
+            "directories" : {path : [entry.mtime_ns,list(entry.subdirectories),entry.module] for path, entry in self.entries.items()},
+        }
+        os.makedirs(filepath.parent,exist_ok=True)
+        with open(temporary_path,"w",encoding="utf-8") as file :
+            json.dump(data,file,separators=(",",":"))
+        os.replace(temporary_path,filepath)
+
+class DiscoveryReport :
+    """
+    Outcome of a `ModuleScanner.scan`: the module names found, and how many directories were read (`scanned`)
+    or only checked against the cache (`reused`).
+    """
+    modules : list[str]
+    scanned : int
+    reused : int
+    duration : float
+
+    def __init__(self,modules : list[str],scanned : int,reused : int,duration : float) -> None:
+        self.modules = modules
+        self.scanned = scanned
+        self.reused = reused
+        self.duration = duration
+
+    def __str__(self) -> str :
+        return f"{len(self.modules)} modules in {self.scanned + self.reused} directories ({self.scanned} scanned, {self.reused} cached) in {self.duration:.3f}s"
+
+class ModuleScanner :
+    """
+    Finds the Gradle modules of a source tree, e.g. to populate `SettingsGradle` for a large repository:
+
+        scanner = ModuleScanner(root)
+        settings_gradle = SettingsGradle(plugins,dependency_resolution_management,scanner.module_metadata(project_metadata))
+
+    Every directory holding one of `MODULE_MARKERS` (except the root, which is the root project) is a module, named
+    after its path relative to the root (`feature/login` -> `feature:login`). `PRUNED_DIRECTORIES`, symbolic links
+    and nested builds (directories holding one of `BUILD_MARKERS`) are not descended into.
+
+    The tree is walked breadth first, each level being read with `os.scandir` across a thread pool (file system
+    calls release the GIL). The listing of every directory is cached with its mtime: a rescan only `stat`s the
+    directories whose mtime did not change and reads the changed ones again, so a watch loop or a CI job with a
+    persisted cache (see `cache_file`) pays one `stat` per directory instead of a full walk.
+
+    Attributes:
+        root (Path): The root directory of the build.
+        max_workers (Optional[int]): Threads reading directories, `1` to walk in the calling thread.
+        cache (DiscoveryCache): Listings of the previous scan.
+        cache_file (Optional[Path]): Where the cache is loaded from and saved to after every scan.
+    """
+    root : Path
+    markers : frozenset[str]
+    pruned : frozenset[str]
+    max_workers : Optional[int]
+    cache : DiscoveryCache
+    cache_file : Optional[Path]
+
+    # Directories read by one task, so small directories do not pay a thread pool round-trip each
+    BATCH_SIZE = 64
+
+    def __init__(self,root : Path,markers : Iterable[str] = MODULE_MARKERS,pruned : Iterable[str] = PRUNED_DIRECTORIES,max_workers : Optional[int] = None,cache_file : Optional[Path] = None) -> None:
+        self.root = Path(root)
+        self.markers = frozenset(markers)
+        self.pruned = frozenset(pruned)
+        self.max_workers = max_workers
+        self.cache_file = cache_file
+        self.cache = DiscoveryCache.load(cache_file) if cache_file is not None else DiscoveryCache()
+
+    def _read(self,relative : str,started_ns : int) -> tuple[DirectoryEntry,bool] :
+        """
+        Returns the entry of the directory at `relative`, and whether it was read (`False` if the cached entry was reused).
+        """
+        path = os.path.join(self.root,relative)
+        try :
+            mtime_ns = os.stat(path).st_mtime_ns
+        except (FileNotFoundError, NotADirectoryError) :
+            return DirectoryEntry(-1,(),False), True
+
+        cached = self.cache.entries.get(relative)
+        if cached is not None and cached.mtime_ns == mtime_ns :
+            return cached, False
+
+        subdirectories = []
+        module = False
+        build = False
+        try :
+            with os.scandir(path) as iterator :
+                for entry in iterator :
+                    name = entry.name
+                    if name in self.markers :
+                        module = True
+                    elif name in BUILD_MARKERS :
+                        build = True
+                    elif name not in self.pruned and entry.is_dir(follow_symlinks=False) :
+                        subdirectories.append(name)
+        except (FileNotFoundError, NotADirectoryError, PermissionError) :
+            return DirectoryEntry(-1,(),False), True
+
+        if build and relative :
+            # Another build, its modules are included through `includeBuild`
+            module = False
+            subdirectories = []
+        if mtime_ns >= started_ns - _RACY_NS :
+            mtime_ns = -1
+        return DirectoryEntry(mtime_ns,tuple(sorted(subdirectories)),module), True
+
+    def _read_batch(self,directories : list[str],started_ns : int) -> list[tuple[DirectoryEntry,bool]] :
+        return [self._read(relative,started_ns) for relative in directories]
+
+    def scan(self) -> DiscoveryReport :
+        """
+        Walks the tree, refreshing the cache, and returns the module names in path order.
+        """
+        start = time.perf_counter()
+        started_ns = time.time_ns()
+        entries : dict[str,DirectoryEntry] = {}
+        modules : list[str] = []
+        scanned = reused = 0
+
+        with trace("discover_modules","project",path=str(self.root)) as span :
+            executor = ThreadPoolExecutor(self.max_workers) if self.max_workers != 1 else None
+            try :
+                level = [""]
+                while level :
+                    batches = [level[index:index + self.BATCH_SIZE] for index in range(0,len(level),self.BATCH_SIZE)]
+                    if executor is None or len(batches) == 1 :
+                        results = map(self._read_batch,batches,[started_ns] * len(batches))
+                    else :
+                        results = executor.map(self._read_batch,batches,[started_ns] * len(batches))
+
+                    next_level = []
+                    for batch, batch_results in zip(batches,results) :
+                        for relative, (entry, read) in zip(batch,batch_results) :
+                            entries[relative] = entry
+                            if read :
+                                scanned += 1
+                            else :
+                                reused += 1
+                            if entry.module and relative :
+                                modules.append(relative.replace("/",":"))
+                            prefix = f"{relative}/" if relative else ""
+                            next_level.extend(prefix + name for name in entry.subdirectories)
+                    level = next_level
+            finally :
+                if executor is not None :
+                    executor.shutdown()
+
+            if span :
+                span.set(objects=len(modules),scanned=scanned,reused=reused)
+
+        self.cache = DiscoveryCache(entries)
+        if self.cache_file is not None :
+            self.cache.save(self.cache_file)
+
+        modules.sort()
+        return DiscoveryReport(modules,scanned,reused,time.perf_counter() - start)
+
+    def modules(self) -> list[str] :
+        """
+        Scans the tree and returns the module names, e.g. for `SettingsGradle(..., modules=scanner.modules())`.
+        """
+        return self.scan().modules
+
+    def module_metadata(self,project_metadata : ProjectMetadata) -> list[ModuleMetadata] :
+        """
+        Scans the tree and returns a `ModuleMetadata` per module, its namespace derived with `ModuleMetadata.namespace_from`.
+        """
+        return [ModuleMetadata(name,ModuleMetadata.namespace_from(project_metadata,name),project_metadata) for name in self.modules()]
+
+def discover_modules(root : Path,project_metadata : ProjectMetadata,max_workers : Optional[int] = None,cache_file : Optional[Path] = None) -> list[ModuleMetadata] :
+    """
+    Returns the `ModuleMetadata` of every module under `root`, see `ModuleScanner`.
+    """
+    return ModuleScanner(root,max_workers=max_workers,cache_file=cache_file).module_metadata(project_metadata)
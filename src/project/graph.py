@@ -0,0 +1,179 @@
+from typing import Iterable, Optional
+
+from src.gradle.dependency import ProjectDependency
+from src.module import Module
+
+def project_path(name : str) -> str :
+    """
+    Returns the absolute Gradle path of a module name (`core` and `:core` both give `:core`).
+    """
+    return name if name.startswith(":") else f":{name}"
+
+class ModuleGraphError(Exception):
+    """Exception raised when modules depend on a module that is not part of the project."""
+    pass
+
+class ModuleCycleError(ModuleGraphError):
+    """
+    Exception raised when project dependencies form a cycle, which Gradle would only report while configuring the build.
+
+    Attributes:
+        cycle (list[str]): The module paths of the cycle, the first one being repeated at the end.
+    """
+    def __init__(self,cycle : list[str]) -> None:
+        self.cycle = cycle
+        super().__init__(f"Project dependency cycle: {' -> '.join(cycle)}")
+
+class ModuleGraph :
+    """
+    The project dependencies (`implementation(project(":core"))`) between the modules of a project.
+
+    Modules are keyed by their absolute Gradle path (see `project_path`) and edges go from a module to the modules it
+    depends on. `levels` sorts the graph into waves of modules that only depend on earlier waves (Kahn's algorithm,
+    O(V+E) plus sorting each wave); modules of a wave are independent of each other and can be processed in parallel. Orders are stable:
+    without dependencies between them, modules keep the order they were added in.
+
+    Attributes:
+        modules (dict[str,Optional[Module]]): Path -> module, in the order they were added.
+        edges (dict[str,list[str]]): Path -> paths of the modules it depends on, without duplicates.
+    """
+    modules : dict[str,Optional[Module]]
+    edges : dict[str,list[str]]
+
+    def __init__(self) -> None:
+        self.modules = {}
+        self.edges = {}
+
+    @classmethod
+    def from_modules(cls,modules : Iterable[Module]) -> 'ModuleGraph' :
+        """
+        Builds the graph of `modules` from the `ProjectDependency`s of their dependency groups.
+
+        Dependency groups are those of `Module.build_gradle_files`.
+        """
+        graph = cls()
+        for module in modules :
+            path = graph.add_module(module.metadata.name(),module)
+            for group in module.dependency_groups() :
+                for dependency in group.code :
+                    if isinstance(dependency,ProjectDependency) :
+                        graph.add_dependency(path,dependency.path)
+        return graph
+
+    def add_module(self,name : str,module : Optional[Module] = None) -> str :
+        path = project_path(name)
+        self.modules[path] = module
+        self.edges.setdefault(path,[])
+        return path
+
+    def add_dependency(self,dependent : str,dependency : str) -> None :
+        """
+        Records that `dependent` depends on `dependency`, both being module names or paths.
+        """
+        dependent = project_path(dependent)
+        self.modules.setdefault(dependent,None)
+        dependencies = self.edges.setdefault(dependent,[])
+        dependency = project_path(dependency)
+        if dependency not in dependencies :
+            dependencies.append(dependency)
+
+    def dependencies(self,name : str) -> list[str] :
+        return self.edges.get(project_path(name),[])
+
+    def dependents(self,name : str) -> list[str] :
+        path = project_path(name)
+        return [dependent for dependent, dependencies in self.edges.items() if path in dependencies]
+
+    def missing(self) -> list[tuple[str,str]] :
+        """
+        Returns the `(dependent, dependency)` pairs whose dependency is not a module of the graph.
+        """
+        return [(dependent,dependency) for dependent, dependencies in self.edges.items() for dependency in dependencies if dependency not in self.modules]
+
+    def find_cycle(self) -> Optional[list[str]] :
+        """
+        Returns a cycle of the graph (its first module repeated at the end), or `None` if there is none.
+        """
+        remaining = self._kahn()[1]
+        if not remaining :
+            return None
+        return self._cycle(remaining)
+
+    def levels(self) -> list[list[str]] :
+        """
+        Returns the modules in waves: the first holds the modules without project dependencies, every following one
+        the modules whose dependencies are all in earlier waves.
+
+        Raises:
+            ModuleGraphError: If a module depends on a module that is not part of the graph.
+            ModuleCycleError: If the dependencies form a cycle.
+        """
+        missing = self.missing()
+        if missing :
+            dependent, dependency = missing[0]
+            raise ModuleGraphError(f"{dependent} depends on {dependency}, which is not a module of the project")
+
+        levels, remaining = self._kahn()
+        if remaining :
+            raise ModuleCycleError(self._cycle(remaining))
+        return levels
+
+    def topological_order(self) -> list[str] :
+        """
+        Returns every module after the modules it depends on, wave by wave (see `levels`).
+        """
+        return [path for level in self.levels() for path in level]
+
+    def check(self) -> None :
+        """
+        Raises `ModuleGraphError` or `ModuleCycleError` if the graph cannot be configured by Gradle.
+        """
+        self.levels()
+
+    def _kahn(self) -> tuple[list[list[str]],set[str]] :
+        # Number of unprocessed dependencies of every module, and the reverse edges to update them
+        pending = {path : 0 for path in self.edges}
+        dependents : dict[str,list[str]] = {path : [] for path in self.edges}
+        for path, dependencies in self.edges.items() :
+            for dependency in dependencies :
+                if dependency in dependents :
+                    pending[path] += 1
+                    dependents[dependency].append(path)
+
+        position = {path : index for index, path in enumerate(self.edges)}
+        levels = []
+        level = [path for path, count in pending.items() if count == 0]
+        processed = 0
+        while level :
+            levels.append(level)
+            processed += len(level)
+            next_level = []
+            for path in level :
+                for dependent in dependents[path] :
+                    pending[dependent] -= 1
+                    if pending[dependent] == 0 :
+                        next_level.append(dependent)
+            # Keep the insertion order within a wave, not the order in which dependencies completed
+            if len(next_level) > 1 :
+                next_level.sort(key=position.__getitem__)
+            level = next_level
+
+        remaining = {path for path, count in pending.items() if count > 0} if processed < len(pending) else set()
+        return levels, remaining
+
+    def _cycle(self,remaining : set[str]) -> list[str] :
+        # Every module left by Kahn's algorithm has a dependency that was left too, so following those from any of
+        # them must come back to a module already visited
+        path = next(path for path in self.edges if path in remaining)
+        visited : dict[str,int] = {}
+        walk : list[str] = []
+        while path not in visited :
+            visited[path] = len(walk)
+            walk.append(path)
+            path = next(dependency for dependency in self.edges[path] if dependency in remaining)
+        cycle = walk[visited[path]:]
+        cycle.append(path)
+        return cycle
+
+    def __len__(self) -> int :
+        return len(self.modules)
@@ -0,0 +1,175 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Iterable, Optional
+
+from src.core import FileConvertible
+from src.tracing import trace
+from src.utils import render_to_string
+
+class ManifestEntry :
+    """
+    What the generator last wrote to a file: the content hash plus the size and mtime the file had right after writing.
+
+    The size and mtime let a later run notice files that were edited by hand without reading them back.
+    """
+    digest : str
+    size : int
+    mtime_ns : int
+
+    def __init__(self,digest : str,size : int,mtime_ns : int) -> None:
+        self.digest = digest
+        self.size = size
+        self.mtime_ns = mtime_ns
+
+    def matches(self,stat : os.stat_result) -> bool :
+        return self.size == stat.st_size and self.mtime_ns == stat.st_mtime_ns
+
+class GenerationManifest :
+    """
+    Content hashes of every file generated into a project, stored as JSON in the project root.
+
+    Paths are stored relative to the project root using forward slashes.
+    """
+    FILE_NAME = ".gradle-generator-manifest.json"
+    VERSION = 1
+
+    entries : dict[str,ManifestEntry]
+
+    def __init__(self,entries : Optional[dict[str,ManifestEntry]] = None) -> None:
+        self.entries = entries if entries is not None else {}
+
+    @classmethod
+    def load(cls,root : Path) -> 'GenerationManifest' :
+        """
+        Loads the manifest of the project at `root`, returning an empty manifest if there is none or it is unreadable
+        or malformed.
+        """
+        try :
+            with open(Path(root) / cls.FILE_NAME,"r",encoding="utf-8") as file :
+                data = json.load(file)
+        except (OSError, ValueError) :
+            return cls()
+
+        if not isinstance(data,dict) or data.get("version") != cls.VERSION or not isinstance(data.get("files",{}),dict) :
+            return cls()
+
+        try :
+            return cls({path : ManifestEntry(*entry) for path, entry in data.get("files",{}).items() if isinstance(entry,list)})
+        except TypeError :
+            return cls()
+
+    def save(self,root : Path) -> None :
+        """
+        Writes the manifest next to the generated files, replacing the previous one atomically.
+        """
+        manifest_path = Path(root) / self.FILE_NAME
+        temporary_path = manifest_path.with_name(manifest_path.name + ".tmp")
+        data = {
+            "version" : self.VERSION,
+            "files" : {path : [entry.digest,entry.size,entry.mtime_ns] for path, entry in sorted(self.entries.items())},
+        }
+        with open(temporary_path,"w",encoding="utf-8") as file :
+            json.dump(data,file,indent=1)
+        os.replace(temporary_path,manifest_path)
+
+class IncrementalReport :
+    """
+    Relative paths of the files an incremental generation run wrote, left untouched and deleted.
+    """
+    written : list[str]
+    skipped : list[str]
+    deleted : list[str]
+
+    def __init__(self) -> None:
+        self.written = []
+        self.skipped = []
+        self.deleted = []
+
+    def counts(self) -> dict[str,int] :
+        return {"written" : len(self.written),"skipped" : len(self.skipped),"deleted" : len(self.deleted)}
+
+    def __str__(self) -> str :
+        return f"{len(self.written)} written, {len(self.skipped)} skipped, {len(self.deleted)} deleted"
+
+class IncrementalWriter :
+    """
+    Writes generated files only when their content changed since the previous run.
+
+    Every file is rendered in memory and hashed. A file is left alone (keeping its mtime, so Gradle's up-to-date checks
+    and configuration cache stay valid) when its hash matches the manifest and the file on disk was not modified
+    since, or, without a manifest entry, when the bytes on disk are already identical. Files that were generated by
+    a previous run but are no longer produced are deleted, as long as they are inside `root`. Content is written as
+    UTF-8 with `\n` newlines, like `generate_to_file` (see `open_output`).
+    """
+    root : Path
+    manifest : GenerationManifest
+    delete_stale : bool
+
+    def __init__(self,root : Path,delete_stale : bool = True) -> None:
+        self.root = Path(root)
+        self.manifest = GenerationManifest.load(self.root)
+        self.delete_stale = delete_stale
+
+    def write_all(self,files : Iterable[tuple[Path,FileConvertible]]) -> IncrementalReport :
+        report = IncrementalReport()
+        previous = self.manifest.entries
+        current : dict[str,ManifestEntry] = {}
+
+        for path, node in files :
+            relative = Path(path).relative_to(self.root).as_posix()
+            with trace(Path(path).name,"render") as span :
+                data = render_to_string(node).encode("utf-8")
+                if span :
+                    span.set(path=relative,bytes=len(data))
+            with trace(Path(path).name,"write") as span :
+                entry = self._write(Path(path),data,previous.get(relative),report,relative)
+                if span :
+                    span.set(path=relative,bytes=len(data))
+            current[relative] = entry
+
+        root = self.root.resolve()
+        for relative in previous.keys() - current.keys() :
+            if not self.delete_stale :
+                current[relative] = previous[relative]
+                continue
+            # The manifest is a file of the output directory, paths leading out of it (`../`, absolute) are not ours
+            path = (root / relative).resolve()
+            if path == root or not path.is_relative_to(root) :
+                continue
+            try :
+                os.remove(path)
+            except (FileNotFoundError, IsADirectoryError) :
+                pass
+            report.deleted.append(relative)
+        report.deleted.sort()
+
+        self.manifest = GenerationManifest(current)
+        self.manifest.save(self.root)
+        return report
+
+    def _write(self,path : Path,data : bytes,entry : Optional[ManifestEntry],report : IncrementalReport,relative : str) -> ManifestEntry :
+        digest = hashlib.sha256(data).hexdigest()
+
+        try :
+            stat = os.stat(path)
+        except FileNotFoundError :
+            stat = None
+
+        if stat is not None :
+            if entry is not None and entry.digest == digest and entry.matches(stat) :
+                report.skipped.append(relative)
+                return entry
+
+            if stat.st_size == len(data) and path.read_bytes() == data :
+                report.skipped.append(relative)
+                return ManifestEntry(digest,stat.st_size,stat.st_mtime_ns)
+
+        os.makedirs(path.parent,exist_ok=True)
+        with open(path,"wb") as file :
+            file.write(data)
+        stat = os.stat(path)
+
+        report.written.append(relative)
+        return ManifestEntry(digest,stat.st_size,stat.st_mtime_ns)
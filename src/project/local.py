@@ -1,21 +1,26 @@
-from typing import OrderedDict, Self
+from typing import Optional, OrderedDict, Self, TextIO
 from pathlib import Path
 import os 
 from src.core import FileConvertible
 from src.metadata import GradleMetadata
+from src.utils import open_output
 
 class LocalProperties(GradleMetadata,FileConvertible) :
-    FILE_NAME= "gradle.properties"
-    values : OrderedDict[str,str] = OrderedDict()
+    FILE_NAME= "local.properties"
+    values : OrderedDict[str,str]
 
-    def get_identifier() :
-        "local.properties"
+    def __init__(self,values : Optional[dict[str,str]] = None) -> None:
+        GradleMetadata.__init__(self)
+        self.values = OrderedDict(values or {})
 
-    def generate_to_file(self, filepath: Path) -> None: 
-        file_directory = os.path.join(filepath,Self.FILE_NAME)
+    def get_identifier(self) -> str :
+        return "local.properties"
+
+    def provide_metadata(self, metadata: 'GradleMetadata') -> None:
+        pass
 
-        with open(file_directory,"w") as file:
-            file.write(
+    def write_to(self, sink: TextIO) -> None:
+        sink.write(
 """
 ## This file must *NOT* be checked into Version Control Systems,
 # as it contains information specific to your local configuration.
@@ -23,10 +28,14 @@ class LocalProperties(GradleMetadata,FileConvertible) :
 # For customization when using a Version Control System, please read the
 # header note.
 """
-            )
-            
-            for key, value in self.values.items():
-                file.write(f"{key}={value}\n")
-            
-        pass
+        )
+
+        for key, value in self.values.items():
+            sink.write(f"{key}={value}\n")
+
+    def generate_to_file(self, filepath: Path) -> None: 
+        file_directory = os.path.join(filepath,self.FILE_NAME)
+
+        with open_output(file_directory) as file:
+            self.write_to(file)
 
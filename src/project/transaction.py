@@ -0,0 +1,163 @@
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Iterable, Literal, Optional
+
+from src.assets import AssetStore, StaticAsset, copy_assets
+from src.core import FileConvertible
+from src.tracing import trace
+from src.utils import open_output, render_to
+
+PublishMode = Literal["files", "directory"]
+
+class TransactionError(Exception):
+    pass
+
+# https://man7.org/linux/man-pages/man2/rename.2.html
+_AT_FDCWD = -100
+_RENAME_EXCHANGE = 2
+
+def _exchange(source : Path,target : Path) -> bool :
+    """
+    Atomically swaps two paths with `renameat2(RENAME_EXCHANGE)`, returning `False` when the platform does not support it.
+    """
+    # ctypes is slow to import and only needed to publish whole directories
+    import ctypes
+    import ctypes.util
+
+    library = ctypes.util.find_library("c")
+    if library is None :
+        return False
+    try :
+        renameat2 = ctypes.CDLL(library,use_errno=True).renameat2
+    except (OSError, AttributeError) :
+        return False
+
+    result = renameat2(_AT_FDCWD,os.fsencode(source),_AT_FDCWD,os.fsencode(target),_RENAME_EXCHANGE)
+    return result == 0
+
+def _fsync_path(path : Path,directory : bool = False) -> None :
+    flags = os.O_RDONLY | (getattr(os,"O_DIRECTORY",0) if directory else 0)
+    try :
+        fd = os.open(path,flags)
+    except OSError :
+        # Directories cannot be opened on every platform (e.g. Windows)
+        if directory :
+            return
+        raise
+    try :
+        os.fsync(fd)
+    finally :
+        os.close(fd)
+
+class StagedWriter :
+    """
+    Generates files into a staging directory next to `root` and publishes them only once everything rendered.
+
+    If rendering fails, the staging directory is removed and `root` is left exactly as it was. Files are written
+    without syncing; when `durable` is set all of them are synced in one pass right before publishing.
+
+    Two publish modes are supported:
+
+    * `"files"`: every staged file is moved over its target with an atomic `os.replace`. Files in `root` that are not
+      generated (e.g. module sources) are kept, readers never see a partially written file.
+    * `"directory"`: the staging directory replaces `root` as a whole. On Linux both directories are exchanged
+      atomically with `renameat2(RENAME_EXCHANGE)`, elsewhere `root` is briefly renamed aside. Anything in `root`
+      that is not generated is discarded.
+    """
+    root : Path
+    publish : PublishMode
+    durable : bool
+
+    def __init__(self,root : Path,publish : PublishMode = "files",durable : bool = True) -> None:
+        if publish not in ("files", "directory") :
+            raise ValueError(f"Unknown publish mode {publish!r}")
+        self.root = Path(root).absolute()
+        self.publish = publish
+        self.durable = durable
+
+    def write_all(self,files : Iterable[tuple[Path,FileConvertible]],assets : Iterable[StaticAsset] = (),store : Optional[AssetStore] = None) -> list[Path] :
+        """
+        Stages and publishes `files` and the static `assets` (copied, or materialized from `store`, see
+        `AssetStore`), returning the published paths (inside `root`): the files in the order they were given, then
+        the assets.
+        """
+        self.root.parent.mkdir(parents=True,exist_ok=True)
+        staging = Path(tempfile.mkdtemp(prefix=f".{self.root.name}.staging-",dir=self.root.parent))
+
+        try :
+            relatives = self._stage(staging,files)
+            relatives.extend(self._stage_assets(staging,assets,store))
+            if self.durable :
+                with trace("fsync","io",objects=len(relatives)) :
+                    self._sync(staging,relatives)
+
+            with trace("publish","io",mode=self.publish,objects=len(relatives)) :
+                if self.publish == "files" :
+                    self._publish_files(staging,relatives)
+                else :
+                    self._publish_directory(staging)
+                    staging = None
+        finally :
+            if staging is not None :
+                shutil.rmtree(staging,ignore_errors=True)
+
+        return [self.root / relative for relative in relatives]
+
+    def _stage(self,staging : Path,files : Iterable[tuple[Path,FileConvertible]]) -> list[Path] :
+        relatives = []
+        for path, node in files :
+            relative = Path(path).absolute().relative_to(self.root)
+            staged = staging / relative
+            staged.parent.mkdir(parents=True,exist_ok=True)
+            with trace(staged.name,"write") as span :
+                with open_output(staged) as file :
+                    render_to(node,file)
+                if span :
+                    span.set(path=relative.as_posix(),bytes=os.path.getsize(staged))
+            relatives.append(relative)
+        return relatives
+
+    def _stage_assets(self,staging : Path,assets : Iterable[StaticAsset],store : Optional[AssetStore]) -> list[Path] :
+        # Published with the files, so the project never appears without its wrapper scripts
+        materialized = copy_assets(assets,staging) if store is None else store.materialize_all(assets,staging)
+        return [Path(target) for target in materialized]
+
+    def _sync(self,staging : Path,relatives : list[Path]) -> None :
+        for relative in relatives :
+            _fsync_path(staging / relative)
+        for directory in dict.fromkeys((staging / relative).parent for relative in relatives) :
+            _fsync_path(directory,directory=True)
+
+    def _publish_files(self,staging : Path,relatives : list[Path]) -> None :
+        directories = {}
+        for relative in relatives :
+            target = self.root / relative
+            if target.parent not in directories :
+                target.parent.mkdir(parents=True,exist_ok=True)
+                directories[target.parent] = None
+            os.replace(staging / relative,target)
+
+        if self.durable :
+            for directory in directories :
+                _fsync_path(directory,directory=True)
+
+    def _publish_directory(self,staging : Path) -> None :
+        if not self.root.exists() :
+            os.rename(staging,self.root)
+        elif _exchange(staging,self.root) :
+            # `staging` now holds the previous project
+            shutil.rmtree(staging,ignore_errors=True)
+        else :
+            backup = staging.with_name(staging.name + ".previous")
+            os.rename(self.root,backup)
+            try :
+                os.rename(staging,self.root)
+            except OSError as error :
+                os.rename(backup,self.root)
+                raise TransactionError(f"Could not publish {self.root}") from error
+            shutil.rmtree(backup,ignore_errors=True)
+
+        if self.durable :
+            _fsync_path(self.root.parent,directory=True)
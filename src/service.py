@@ -0,0 +1,467 @@
+import asyncio
+import io
+import json
+import math
+import re
+import time
+import traceback
+from collections import OrderedDict, deque
+from concurrent.futures import Executor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Optional
+from urllib.parse import parse_qs, urlsplit
+
+from src.archive import ARCHIVE_FORMATS, ArchiveError, check_prefix
+from src.plan import PlanCache, PlanCacheError, ProjectPlan, reference_digest, spec_digest
+from src.tracing import trace
+from src.utils import load_reference
+
+# Largest request body accepted, project specs are small JSON documents
+MAX_BODY = 1 << 20
+
+# Seconds a client gets to send the headers and body of a request
+REQUEST_TIMEOUT = 30.0
+
+_CONTENT_TYPES = {"zip" : "application/zip", "tar" : "application/x-tar", "tar.gz" : "application/gzip"}
+
+_REASONS = {200 : "OK", 400 : "Bad Request", 404 : "Not Found", 405 : "Method Not Allowed", 408 : "Request Timeout", 411 : "Length Required", 413 : "Content Too Large", 500 : "Internal Server Error"}
+
+_UNSAFE_FILENAME = re.compile(r'[^A-Za-z0-9._-]')
+
+class ServiceError(Exception):
+    """
+    Exception raised for a request the service cannot answer, reported to the client with `status`.
+
+    Attributes:
+        status (int): The HTTP status of the response.
+    """
+    def __init__(self,status : int,message : str) -> None:
+        self.status = status
+        super().__init__(message)
+
+class ArtifactCache :
+    """
+    In-memory LRU cache of rendered artifacts (compiled `ProjectPlan`s and archives), bounded by the total size of
+    its entries.
+
+    Storing an entry evicts the least recently used ones until the cache fits in `max_bytes`; an entry larger than the
+    whole cache is not stored. The cache is not thread-safe, the service only uses it from its event loop.
+
+    Attributes:
+        max_bytes (int): The size the entries may take in total.
+        size (int): The size of the entries currently stored.
+        hits (int): Lookups that found their entry.
+        misses (int): Lookups that did not.
+        evictions (int): Entries removed to make room for others.
+    """
+    max_bytes : int
+    size : int
+    hits : int
+    misses : int
+    evictions : int
+
+    def __init__(self,max_bytes : int = 256 << 20) -> None:
+        if max_bytes < 0 :
+            raise ValueError("max_bytes must not be negative")
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries : OrderedDict[str,tuple[Any,int]] = OrderedDict()
+
+    def get(self,key : str) -> Optional[Any] :
+        entry = self._entries.get(key)
+        if entry is None :
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self,key : str,value : Any,size : int) -> None :
+        """
+        Stores `value` (taking `size` bytes) as the most recently used entry, evicting older entries if needed.
+        """
+        previous = self._entries.pop(key,None)
+        if previous is not None :
+            self.size -= previous[1]
+        if size > self.max_bytes :
+            return
+        while self._entries and self.size + size > self.max_bytes :
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self.size -= evicted
+            self.evictions += 1
+        self._entries[key] = (value,size)
+        self.size += size
+
+    def clear(self) -> None :
+        self._entries.clear()
+        self.size = 0
+
+    def stats(self) -> dict[str,Any] :
+        lookups = self.hits + self.misses
+        return {
+            "entries" : len(self._entries),
+            "bytes" : self.size,
+            "max_bytes" : self.max_bytes,
+            "hits" : self.hits,
+            "misses" : self.misses,
+            "evictions" : self.evictions,
+            "hit_rate" : self.hits / lookups if lookups else 0.0,
+        }
+
+    def __contains__(self,key : str) -> bool :
+        return key in self._entries
+
+    def __len__(self) -> int :
+        return len(self._entries)
+
+class LatencyRecorder :
+    """
+    Durations of the last `window` requests, summarized as percentiles.
+
+    Attributes:
+        window (int): Number of recent samples kept.
+        count (int): Samples recorded since the start, including those no longer in the window.
+    """
+    PERCENTILES = (50, 90, 99)
+
+    window : int
+    count : int
+
+    def __init__(self,window : int = 1024) -> None:
+        self.window = window
+        self.count = 0
+        self._samples : deque[float] = deque(maxlen=window)
+
+    def record(self,seconds : float) -> None :
+        self._samples.append(seconds)
+        self.count += 1
+
+    def percentile(self,percent : float) -> Optional[float] :
+        """
+        Returns the `percent` percentile (nearest rank) of the samples in the window in seconds, `None` without samples.
+        """
+        if not self._samples :
+            return None
+        return _nearest_rank(sorted(self._samples),percent)
+
+    def stats(self) -> dict[str,Any] :
+        if not self._samples :
+            return {"count" : self.count}
+        ordered = sorted(self._samples)
+        stats : dict[str,Any] = {"count" : self.count}
+        for percent in self.PERCENTILES :
+            stats[f"p{percent}_ms"] = round(_nearest_rank(ordered,percent) * 1000,3)
+        stats["max_ms"] = round(ordered[-1] * 1000,3)
+        return stats
+
+def _nearest_rank(ordered : list[float],percent : float) -> float :
+    return ordered[max(0,min(len(ordered) - 1,math.ceil(len(ordered) * percent / 100) - 1))]
+
+class GenerationService :
+    """
+    Builds projects from JSON specs and returns them as archives, caching what it renders.
+
+    A spec is the JSON object a batch entry would be (see `BatchSpec`, without `output`): it is passed to the
+    `builder(spec, template)` function, `template` being loaded once when the service starts. Specs are keyed by a
+    canonical hash (see `spec_digest`) of the spec and the sources of the builder and template, so equal specs share
+    their cache entries whatever the order of their keys. Edits to the builder while the service runs are not seen.
+
+    Two kinds of entries share the `ArtifactCache`: the compiled `ProjectPlan` of a spec, which every archive format
+    is written from without building the project again, and the archives themselves, so a warm request only copies
+    bytes. Projects are built, compiled and archived on `executor` (a thread pool by default, the builder must be
+    thread-safe), and concurrent requests for the same artifact wait for a single build instead of each building it.
+
+    Attributes:
+        builder (str): Reference of the builder function (`path/to/script.py:name` or `package.module:name`).
+        template (Optional[str]): Reference of the template loading function.
+        cache (ArtifactCache): The rendered plans and archives.
+        plan_cache (Optional[PlanCache]): On-disk cache the plans are also loaded from and stored in.
+        latency (dict[str,LatencyRecorder]): Durations of `/generate` requests answered from the cache (`"hit"`),
+            by rendering (`"miss"`), and failed (`"error"`).
+    """
+    builder : str
+    template : Optional[str]
+    cache : ArtifactCache
+    plan_cache : Optional[PlanCache]
+    latency : dict[str,LatencyRecorder]
+
+    def __init__(self,builder : str,template : Optional[str] = None,cache : Optional[ArtifactCache] = None,plan_cache : Optional[PlanCache] = None,executor : Optional[Executor] = None) -> None:
+        self.builder = builder
+        self.template = template
+        self.cache = cache if cache is not None else ArtifactCache()
+        self.plan_cache = plan_cache
+        self.latency = {"hit" : LatencyRecorder(), "miss" : LatencyRecorder(), "error" : LatencyRecorder()}
+        self._executor = executor if executor is not None else ThreadPoolExecutor(thread_name_prefix="generation")
+        self._build : Callable[[dict[str,Any],Any],Any] = load_reference(builder)
+        self._template = load_reference(template)() if template is not None else None
+        self._sources = {"builder" : reference_digest(builder),"template" : None if template is None else reference_digest(template)}
+        self._pending : dict[str,asyncio.Future] = {}
+        self._started = time.monotonic()
+
+    def key(self,spec : dict[str,Any]) -> str :
+        """
+        Returns the cache key of the project `spec`.
+
+        Raises:
+            ServiceError: If `spec` is not JSON-compatible.
+        """
+        try :
+            return spec_digest({"sources" : self._sources,"project" : spec},"service")
+        except PlanCacheError as error :
+            raise ServiceError(400,str(error)) from error
+
+    async def archive(self,spec : dict[str,Any],format : str = "zip",prefix : str = "") -> tuple[bytes,bool] :
+        """
+        Returns the archive of the project `spec` and whether it came from the cache.
+
+        Raises:
+            ServiceError: If the format is unknown or the prefix is not a safe relative path (400), or if the
+                project cannot be built (500).
+        """
+        if format not in ARCHIVE_FORMATS :
+            raise ServiceError(400,f"Unknown archive format {format!r}, expected one of {', '.join(ARCHIVE_FORMATS)}")
+        try :
+            prefix = check_prefix(prefix)
+        except ArchiveError as error :
+            raise ServiceError(400,str(error)) from error
+        key = self.key(spec)
+        archive_key = f"archive:{key}:{format}:{prefix}"
+        archive = self.cache.get(archive_key)
+        if archive is not None :
+            return archive, True
+
+        async def render() -> bytes :
+            plan = await self.plan(spec,key)
+            data = await self._run(_write_archive,plan,format,prefix)
+            self.cache.put(archive_key,data,len(data))
+            return data
+
+        return await self._single(archive_key,render), False
+
+    async def plan(self,spec : dict[str,Any],key : Optional[str] = None) -> ProjectPlan :
+        """
+        Returns the compiled plan of the project `spec`, building it if it is in neither cache.
+        """
+        key = key if key is not None else self.key(spec)
+        plan_key = f"plan:{key}"
+        plan = self.cache.get(plan_key)
+        if plan is not None :
+            return plan
+
+        async def compile() -> ProjectPlan :
+            plan = await self._run(self._compile,spec)
+            self.cache.put(plan_key,plan,sum(len(path) + len(content) for path, content in plan.files))
+            return plan
+
+        return await self._single(plan_key,compile)
+
+    def _compile(self,spec : dict[str,Any]) -> ProjectPlan :
+        with trace("build_project","service") :
+            if self.plan_cache is not None :
+                return self.plan_cache.get_or_compile({"sources" : self._sources,"project" : spec},lambda : self._build(spec,self._template))
+            return ProjectPlan.compile(self._build(spec,self._template))
+
+    async def _run(self,function : Callable[...,Any],*args : Any) -> Any :
+        try :
+            return await asyncio.get_running_loop().run_in_executor(self._executor,function,*args)
+        except (ServiceError, asyncio.CancelledError) :
+            raise
+        except ArchiveError as error :
+            raise ServiceError(400,str(error)) from error
+        except Exception as error :
+            raise ServiceError(500,"".join(traceback.format_exception_only(error)).strip()) from error
+
+    async def _single(self,key : str,produce : Callable[[],Awaitable[Any]]) -> Any :
+        # Requests for an artifact being rendered wait for that rendering instead of starting their own
+        pending = self._pending.get(key)
+        if pending is not None :
+            return await asyncio.shield(pending)
+        pending = self._pending[key] = asyncio.ensure_future(produce())
+        try :
+            return await asyncio.shield(pending)
+        finally :
+            if pending.done() :
+                self._pending.pop(key,None)
+            else :
+                pending.add_done_callback(lambda _ : self._pending.pop(key,None))
+
+    def stats(self) -> dict[str,Any] :
+        return {
+            "uptime" : round(time.monotonic() - self._started,3),
+            "cache" : self.cache.stats(),
+            "latency" : {name : recorder.stats() for name, recorder in self.latency.items()},
+            "rendering" : len(self._pending),
+        }
+
+    def close(self) -> None :
+        self._executor.shutdown(wait=False,cancel_futures=True)
+
+def _write_archive(plan : ProjectPlan,format : str,prefix : str) -> bytes :
+    sink = io.BytesIO()
+    # A fixed timestamp, so cached and freshly rendered archives of a spec are byte for byte identical
+    plan.write_archive(sink,format,prefix,timestamp=0.0)
+    return sink.getvalue()
+
+class GenerationServer :
+    """
+    A minimal HTTP/1.1 server (standard library `asyncio` streams, keep-alive, no chunked requests) in front of a
+    `GenerationService`.
+
+    Routes:
+        `POST /generate?format=zip&prefix=NAME`: the body is the project spec as JSON, the response the archive
+        (`X-Cache: hit` or `miss`, `ETag` being the spec key). `NAME` must be a relative path (400 otherwise). `GET /stats`: cache counters and request latency
+        percentiles as JSON. `GET /health`: `ok`.
+
+    Example:
+        >>> service = GenerationService("templates/starter.py:build")
+        >>> asyncio.run(GenerationServer(service).serve_forever("127.0.0.1",8080))
+    """
+    service : GenerationService
+
+    def __init__(self,service : GenerationService) -> None:
+        self.service = service
+        self._server : Optional[asyncio.Server] = None
+
+    async def start(self,host : str = "127.0.0.1",port : int = 8080) -> asyncio.Server :
+        self._server = await asyncio.start_server(self._connection,host,port)
+        return self._server
+
+    async def serve_forever(self,host : str = "127.0.0.1",port : int = 8080) -> None :
+        server = await self.start(host,port)
+        async with server :
+            await server.serve_forever()
+
+    async def _connection(self,reader : asyncio.StreamReader,writer : asyncio.StreamWriter) -> None :
+        try :
+            while True :
+                try :
+                    async with asyncio.timeout(REQUEST_TIMEOUT) :
+                        request = await _read_request(reader)
+                except TimeoutError :
+                    await _respond(writer,*_error(408,"Request timed out"),keep_alive=False)
+                    break
+                except ServiceError as error :
+                    await _respond(writer,*_error(error.status,str(error)),keep_alive=False)
+                    break
+                if request is None :
+                    break
+                method, target, headers, body, keep_alive = request
+                status, response_headers, payload = await self.handle(method,target,body)
+                await _respond(writer,status,response_headers,payload,keep_alive=keep_alive)
+                if not keep_alive :
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError) :
+            pass
+        finally :
+            writer.close()
+
+    async def handle(self,method : str,target : str,body : bytes) -> tuple[int,dict[str,str],bytes] :
+        """
+        Answers one request.
+
+        Returns:
+            The status, headers and body of the response.
+        """
+        url = urlsplit(target)
+        if url.path == "/generate" :
+            if method != "POST" :
+                return _error(405,"Use POST")
+            return await self._generate(parse_qs(url.query),body)
+        if url.path == "/stats" :
+            return 200, {"Content-Type" : "application/json"}, json.dumps(self.service.stats()).encode("utf-8")
+        if url.path == "/health" :
+            return 200, {"Content-Type" : "text/plain"}, b"ok"
+        return _error(404,f"No route {url.path}")
+
+    async def _generate(self,query : dict[str,list[str]],body : bytes) -> tuple[int,dict[str,str],bytes] :
+        start = time.perf_counter()
+        format = query.get("format",["zip"])[-1]
+        prefix = query.get("prefix",[""])[-1]
+        try :
+            try :
+                spec = json.loads(body) if body else {}
+            except ValueError as error :
+                raise ServiceError(400,f"The body is not a JSON project spec: {error}") from error
+            if not isinstance(spec,dict) :
+                raise ServiceError(400,"The project spec must be a JSON object")
+            archive, hit = await self.service.archive(spec,format,prefix)
+        except ServiceError as error :
+            self.service.latency["error"].record(time.perf_counter() - start)
+            return _error(error.status,str(error))
+
+        self.service.latency["hit" if hit else "miss"].record(time.perf_counter() - start)
+        return 200, {
+            "Content-Type" : _CONTENT_TYPES[format],
+            "Content-Disposition" : f'attachment; filename="{_filename(prefix,format)}"',
+            "ETag" : f'"{self.service.key(spec)[:32]}"',
+            "X-Cache" : "hit" if hit else "miss",
+        }, archive
+
+async def _read_request(reader : asyncio.StreamReader) -> Optional[tuple[str,str,dict[str,str],bytes,bool]] :
+    """
+    Reads the next request of a connection, `None` if the client closed it.
+
+    Raises:
+        ServiceError: If the request is malformed or too large.
+    """
+    line = await reader.readline()
+    if not line :
+        return None
+    try :
+        method, target, version = line.decode("latin-1").split()
+    except ValueError :
+        raise ServiceError(400,"Malformed request line")
+
+    headers : dict[str,str] = {}
+    while True :
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b"") :
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    if "chunked" in headers.get("transfer-encoding","").lower() :
+        raise ServiceError(411,"Chunked request bodies are not supported, send a Content-Length")
+    try :
+        length = int(headers.get("content-length","0"))
+    except ValueError :
+        raise ServiceError(400,"Invalid Content-Length")
+    if length > MAX_BODY :
+        raise ServiceError(413,f"Request bodies are limited to {MAX_BODY} bytes")
+    body = await reader.readexactly(length) if length > 0 else b""
+
+    connection = headers.get("connection","").lower()
+    keep_alive = connection == "keep-alive" if version == "HTTP/1.0" else connection != "close"
+    return method.upper(), target, headers, body, keep_alive
+
+def _filename(prefix : str,format : str) -> str :
+    # Only the last directory of the prefix, restricted to characters that need no quoting in a header
+    name = _UNSAFE_FILENAME.sub("_",prefix.rstrip("/").rpartition("/")[2]).strip(".")
+    return f"{name or 'project'}.{format}"
+
+def _error(status : int,message : str) -> tuple[int,dict[str,str],bytes] :
+    return status, {"Content-Type" : "application/json"}, json.dumps({"error" : message}).encode("utf-8")
+
+async def _respond(writer : asyncio.StreamWriter,status : int,headers : dict[str,str],body : bytes,keep_alive : bool = True) -> None :
+    head = [f"HTTP/1.1 {status} {_REASONS.get(status,'')}"]
+    head.extend(f"{name}: {value}" for name, value in headers.items())
+    head.append(f"Content-Length: {len(body)}")
+    head.append("Connection: keep-alive" if keep_alive else "Connection: close")
+    writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1"))
+    writer.write(body)
+    await writer.drain()
+
+def serve(builder : str,template : Optional[str] = None,host : str = "127.0.0.1",port : int = 8080,cache_bytes : int = 256 << 20,plan_cache : Optional[Path] = None) -> None :
+    """
+    Runs a `GenerationServer` for `builder` until interrupted.
+    """
+    service = GenerationService(builder,template,ArtifactCache(cache_bytes),PlanCache(plan_cache) if plan_cache is not None else None)
+    try :
+        asyncio.run(GenerationServer(service).serve_forever(host,port))
+    except KeyboardInterrupt :
+        pass
+    finally :
+        service.close()
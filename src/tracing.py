@@ -0,0 +1,166 @@
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+class Span :
+    """
+    A timed phase of a generation run (e.g. rendering or writing a file), with free-form `args` such as the number
+    of bytes written, the number of objects visited or the module it belongs to.
+    """
+    __slots__ = ("tracer","name","category","args","start_ns","end_ns","thread_id")
+
+    def __init__(self,tracer : 'Tracer',name : str,category : str,args : dict[str,Any]) -> None:
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.args = args
+        self.start_ns = 0
+        self.end_ns = 0
+        self.thread_id = 0
+
+    def set(self,**args : Any) -> None :
+        self.args.update(args)
+
+    def duration_ns(self) -> int :
+        return self.end_ns - self.start_ns
+
+    def __bool__(self) -> bool :
+        return True
+
+    def __enter__(self) -> 'Span' :
+        self.thread_id = threading.get_ident()
+        self.start_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self,*exc_info) -> None :
+        self.end_ns = time.perf_counter_ns()
+        if exc_info[0] is not None :
+            self.args["error"] = exc_info[0].__name__
+        # list.append is atomic, spans may finish on several worker threads
+        self.tracer.spans.append(self)
+
+class _DisabledSpan :
+    """Returned by `trace` while tracing is disabled, every operation is a no-op and it is falsy."""
+    __slots__ = ()
+
+    def __bool__(self) -> bool :
+        return False
+
+    def set(self,**args : Any) -> None :
+        pass
+
+    def __enter__(self) -> '_DisabledSpan' :
+        return self
+
+    def __exit__(self,*exc_info) -> None :
+        pass
+
+_DISABLED_SPAN = _DisabledSpan()
+
+class Tracer :
+    """
+    Collects the spans recorded while it is enabled (see `enable_tracing`) and exports them as Chrome trace-event
+    JSON (viewable in `chrome://tracing` or Perfetto) or as a flat summary table.
+    """
+    spans : list[Span]
+
+    def __init__(self) -> None:
+        self.spans = []
+        self.origin_ns = time.perf_counter_ns()
+
+    def span(self,name : str,category : str,**args : Any) -> Span :
+        return Span(self,name,category,args)
+
+    def to_chrome_trace(self) -> dict[str,Any] :
+        pid = os.getpid()
+        events = []
+        for span in sorted(self.spans,key=lambda span : span.start_ns) :
+            events.append({
+                "name" : span.name,
+                "cat" : span.category,
+                "ph" : "X",
+                "ts" : (span.start_ns - self.origin_ns) / 1000,
+                "dur" : span.duration_ns() / 1000,
+                "pid" : pid,
+                "tid" : span.thread_id,
+                "args" : {key : value if isinstance(value,(int,float,bool,type(None))) else str(value) for key, value in span.args.items()},
+            })
+        return {"traceEvents" : events,"displayTimeUnit" : "ms"}
+
+    def write_chrome_trace(self,filepath : Path) -> None :
+        with open(filepath,"w",encoding="utf-8") as file :
+            json.dump(self.to_chrome_trace(),file)
+
+    def summary(self,key : str = "name") -> list[dict[str,Any]] :
+        """
+        Aggregates the spans by category and `key`, which is either `"name"` or the name of a span argument such as
+        `"module"` (spans without it are skipped). Rows are sorted by total time, slowest first.
+        """
+        rows : dict[tuple[str,Any],dict[str,Any]] = {}
+        for span in self.spans :
+            group = span.name if key == "name" else span.args.get(key)
+            if group is None :
+                continue
+            row = rows.get((span.category,group))
+            if row is None :
+                row = rows[(span.category,group)] = {"category" : span.category,key : group,"count" : 0,"total_ms" : 0.0,"max_ms" : 0.0,"bytes" : 0,"objects" : 0}
+            duration = span.duration_ns() / 1e6
+            row["count"] += 1
+            row["total_ms"] += duration
+            row["max_ms"] = max(row["max_ms"],duration)
+            row["bytes"] += span.args.get("bytes",0)
+            row["objects"] += span.args.get("objects",0)
+
+        return sorted(rows.values(),key=lambda row : row["total_ms"],reverse=True)
+
+    def format_summary(self,key : str = "name",limit : Optional[int] = None) -> str :
+        rows = self.summary(key)[:limit]
+        header = f"{'category':<10} {key:<40} {'count':>7} {'total ms':>10} {'mean ms':>9} {'max ms':>9} {'bytes':>12} {'objects':>9}"
+        lines = [header,"-" * len(header)]
+        for row in rows :
+            lines.append(
+                f"{row['category']:<10} {str(row[key]):<40} {row['count']:>7} {row['total_ms']:>10.2f} "
+                f"{row['total_ms'] / row['count']:>9.3f} {row['max_ms']:>9.3f} {row['bytes']:>12} {row['objects']:>9}"
+            )
+        return "\n".join(lines)
+
+_tracer : Optional[Tracer] = None
+
+def enable_tracing(tracer : Optional[Tracer] = None) -> Tracer :
+    """
+    Starts recording spans into `tracer` (a new one by default) and returns it.
+    """
+    global _tracer
+    _tracer = tracer if tracer is not None else Tracer()
+    return _tracer
+
+def disable_tracing() -> Optional[Tracer] :
+    """
+    Stops recording spans and returns the tracer that was active.
+    """
+    global _tracer
+    tracer, _tracer = _tracer, None
+    return tracer
+
+def tracing_enabled() -> bool :
+    return _tracer is not None
+
+def trace(name : str,category : str,**args : Any) -> Span | _DisabledSpan :
+    """
+    Returns a span context manager for a phase of the generation, or a shared no-op one while tracing is disabled,
+    so instrumented code only pays for a function call and an empty `with`. Spans are truthy and the disabled span
+    is not, which lets callers skip computing expensive arguments.
+
+    Example:
+        >>> with trace("build.gradle.kts","render") as span :
+        ...     render()
+        ...     if span :
+        ...         span.set(module=":app",objects=42)
+    """
+    tracer = _tracer
+    if tracer is None :
+        return _DISABLED_SPAN
+    return Span(tracer,name,category,args)
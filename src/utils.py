@@ -1,8 +1,52 @@
 
-from typing import Any, Generic, Optional, TypeVar
+import importlib
+import importlib.util
+import os
+import sys
+from io import StringIO
+from pathlib import Path
+from typing import Any, Generic, Optional, TextIO, TypeVar
 
 T = TypeVar("T")
 
+def render_to(node : Any,sink : TextIO) -> None :
+    """
+    Streams the textual representation of `node` into `sink` without building the full string in memory.
+
+    Nodes that know how to stream themselves (they define `write_to(sink)`, e.g. `CodeBlock`, `PluginGroup`,
+    `ModuleBuildGradle`) are asked to do so, every other object is written using `str()`.
+
+    **Arguments:**
+
+    * `node` (Any): The node to render (e.g. a `CodeBlock`, `Dependency` or plain string).
+    * `sink` (TextIO): Any text sink with a `write` method, such as an open file or `io.StringIO`.
+    """
+    write_to = getattr(node,"write_to",None)
+    if write_to is not None :
+        write_to(sink)
+    else :
+        sink.write(node if isinstance(node,str) else str(node))
+
+def open_output(path : str | os.PathLike) -> TextIO :
+    """
+    Opens the generated file `path` for writing. Every writer of the generator (`generate_to_file`, incremental,
+    staged and archive output) writes UTF-8 with `\n` newlines, so all of them produce the same bytes on every
+    platform.
+
+    **Arguments:**
+
+    * `path` (str | os.PathLike): The file to create or truncate.
+    """
+    return open(path,"w",encoding="utf-8",newline="\n")
+
+def render_to_string(node : Any) -> str :
+    """
+    Renders `node` into a string using the streaming renderer (see `render_to`).
+    """
+    sink = StringIO()
+    render_to(node,sink)
+    return sink.getvalue()
+
 class CodeBlock(Generic[T]) :
     """
     This class, `CodeBlock`, represents a structured code block similar to Kotlin code blocks with names, optional arguments, and inner code content.
@@ -26,13 +70,117 @@ class CodeBlock(Generic[T]) :
         self.arguments = arguments
         self.code = code
 
-    def __str__(self) -> str:
-        string = f"{self.name}"
+    def write_to(self,sink : TextIO) -> None :
+        """
+        Streams the code block into `sink`, rendering nested nodes in place instead of concatenating strings.
+        """
+        write = sink.write
+        write(self.name)
         if self.arguments is not None and self.arguments: 
-            string += ','.join(self.arguments)
-        string += " {\n\t" 
+            write(','.join(self.arguments))
+        write(" {\n\t")
         if isinstance(self.code,list) :
-            string += "\n\t".join([str(v) for v in self.code]) + "\n}"
+            first = True
+            for value in self.code :
+                if not first :
+                    write("\n\t")
+                first = False
+                render_to(value,sink)
+            write("\n}")
         else :
-            string += str(self.code)
-        return string
+            render_to(self.code,sink)
+
+    def __str__(self) -> str:
+        return render_to_string(self)
+
+class RawCode :
+    """
+    Verbatim source text, such as a block of a build script the object model does not know (e.g. `android {}`).
+
+    It renders exactly as given and takes no part in metadata or version catalog rewrites, so it can be placed among
+    plugins, dependencies, repositories or the `other` content of a script.
+
+    **Attributes:**
+
+    * `text` (str): The source text.
+    """
+    __slots__ = ("text",)
+
+    def __init__(self,text : str) -> None :
+        self.text = text
+
+    def write_to(self,sink : TextIO) -> None :
+        sink.write(self.text)
+
+    def __str__(self) -> str :
+        return self.text
+
+    def __repr__(self) -> str :
+        return f"RawCode({self.text!r})"
+
+    def provide_metadata(self,metadata : Any) -> None :
+        pass
+
+    def use_catalog(self,catalog : Any) -> 'RawCode' :
+        return self
+
+def split_reference(reference : str) -> tuple[str,Optional[str],bool] :
+    """
+    Splits a reference to a Python object (`path/to/script.py:name` or `package.module:name`).
+
+    **Returns:**
+
+    * The script path or module name, the object name (`None` if omitted) and whether the location is a script path.
+    """
+    location, separator, name = reference.rpartition(":")
+    # No name, or the colon of a Windows drive (`C:\\project.py`)
+    if not separator or "/" in name or "\\" in name :
+        location, name = reference, ""
+    return location, name or None, location.endswith(".py") or os.sep in location or "/" in location
+
+def load_reference(reference : str,default_name : Optional[str] = None) -> Any :
+    """
+    Loads the object `reference` points at, written `path/to/script.py:name` or `package.module:name`.
+
+    **Arguments:**
+
+    * `reference` (str): The reference to load, `:name` may be omitted when `default_name` is given.
+    * `default_name` (Optional[str]): The name looked up when the reference does not contain one.
+
+    **Raises:**
+
+    * `ImportError`: If the script or module cannot be found or does not define the name.
+    """
+    location, name, is_path = split_reference(reference)
+    name = name or default_name
+    if name is None :
+        raise ImportError(f"{reference} does not name an object (expected {reference}:name)")
+
+    if is_path :
+        path = Path(location).resolve()
+        if not path.is_file() :
+            raise ImportError(f"No such script: {location}")
+        module_name = f"_gradle_generator_{path.stem}_{abs(hash(str(path)))}"
+        module = sys.modules.get(module_name)
+        if module is None :
+            spec = importlib.util.spec_from_file_location(module_name,path)
+            module = importlib.util.module_from_spec(spec)
+            sys.modules[module_name] = module
+            spec.loader.exec_module(module)
+    else :
+        try :
+            module = importlib.import_module(location)
+        except ModuleNotFoundError as error :
+            raise ImportError(f"No such module: {location}") from error
+
+    try :
+        return getattr(module,name)
+    except AttributeError :
+        raise ImportError(f"{location} does not define {name!r}") from None
+
+def cache_directory(name : str) -> Path :
+    """
+    Returns the directory of the generator's `name` cache (e.g. `plans`) under `$XDG_CACHE_HOME` (or `~/.cache`).
+    """
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"),".cache")
+    return Path(base) / "gradle-generator" / name
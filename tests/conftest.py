@@ -0,0 +1,71 @@
+import os
+from pathlib import Path
+from typing import Callable, Iterator
+
+import pytest
+
+from src.gradle.buildgradle import ModuleBuildGradle
+from src.gradle.dependency import Dependency, DependencyGroup, DependencyType
+from src.gradle.plugin import PluginGroup, id
+from src.gradle.properties import GradleProperties
+from src.gradle.repository import MavenCentral, Repositories
+from src.gradle.settingsgradle import DependencyResolutionManagement, PluginManagement, SettingsGradle
+from src.metadata import ModuleMetadata, ProjectMetadata
+from src.module import Module
+from src.project import GenericProject
+from src.project.local import LocalProperties
+
+class ListedModule(Module) :
+    """A module listing its single `build.gradle.kts`."""
+    def __init__(self,project_metadata : ProjectMetadata,name : str,dependencies : list[Dependency]) -> None:
+        self.metadata = ModuleMetadata(name,ModuleMetadata.namespace_from(project_metadata,name),project_metadata)
+        self.build_gradle = ModuleBuildGradle(PluginGroup([id("org.jetbrains.kotlin.jvm","2.0.0")]),DependencyGroup(dependencies))
+
+    def provide_metadata(self,metadata) -> None :
+        self.build_gradle.provide_metadata(metadata)
+
+    def generate_to_file(self,filepath : Path) -> None :
+        self.build_gradle.generate_to_file(filepath)
+
+    def output_files(self,filepath : Path) -> Iterator :
+        yield from self.build_gradle.output_files(filepath)
+
+class PlainModule(Module) :
+    """A module only implementing `generate_to_file`, with a source file next to its build script."""
+    def __init__(self,project_metadata : ProjectMetadata,name : str,dependencies : list[Dependency]) -> None:
+        self.metadata = ModuleMetadata(name,ModuleMetadata.namespace_from(project_metadata,name),project_metadata)
+        self.build_gradle = ModuleBuildGradle(PluginGroup([]),DependencyGroup(dependencies))
+
+    def provide_metadata(self,metadata) -> None :
+        self.build_gradle.provide_metadata(metadata)
+
+    def generate_to_file(self,filepath : Path) -> None :
+        self.build_gradle.generate_to_file(filepath)
+        os.makedirs(Path(filepath) / "src",exist_ok=True)
+        with open(Path(filepath) / "src" / "Main.kt","w",encoding="utf-8") as file :
+            file.write("fun main() {}\n")
+
+def build_project(modules : int = 2,module_type : type = ListedModule,dependencies : Callable[[int],list[Dependency]] | None = None) -> GenericProject :
+    project_metadata = ProjectMetadata("demo","com.demo","1.0","com.demo")
+    if dependencies is None :
+        dependencies = lambda index : [Dependency(DependencyType.Api,f"com.example:lib{index}:1.{index}")]
+    members = [module_type(project_metadata,f":m{index}",dependencies(index)) for index in range(modules)]
+    settings_gradle = SettingsGradle(
+        PluginManagement(Repositories([MavenCentral()])),
+        DependencyResolutionManagement(Repositories([MavenCentral()])),
+        [module.metadata for module in members],
+        project_metadata,
+    )
+    return GenericProject(project_metadata,settings_gradle,GradleProperties({"org.gradle.jvmargs" : "-Xmx2g"}),LocalProperties(),members)
+
+def install_artifact(repository : Path,group : str,artifact : str,version : str,extension : str = "pom") -> Path :
+    """Puts `artifact-version.extension` into the Maven layout of `repository`."""
+    directory = Path(repository,*group.split("."),artifact,version)
+    directory.mkdir(parents=True,exist_ok=True)
+    path = directory / f"{artifact}-{version}.{extension}"
+    path.write_text("<project/>\n",encoding="utf-8")
+    return path
+
+@pytest.fixture
+def make_project() -> Callable[...,GenericProject] :
+    return build_project
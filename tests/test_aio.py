@@ -0,0 +1,69 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from conftest import PlainModule, build_project
+from src.aio import AsyncWriter, generate_async
+
+def tree(root : Path) -> dict[str,str] :
+    return {path.relative_to(root).as_posix() : path.read_text(encoding="utf-8") for path in root.rglob("*") if path.is_file()}
+
+class Concurrency :
+    def __init__(self) -> None :
+        self.lock = threading.Lock()
+        self.running = 0
+        self.peak = 0
+
+    def __call__(self,index : int) -> int :
+        with self.lock :
+            self.running += 1
+            self.peak = max(self.peak,self.running)
+        time.sleep(0.01)
+        with self.lock :
+            self.running -= 1
+        return index
+
+class Broken :
+    def output_files(self,directory : Path) :
+        yield Path(directory) / "broken.txt", "content"
+
+@pytest.mark.parametrize("module_type",["listed","plain"])
+def test_async_output_matches_sync(tmp_path,module_type) :
+    project = build_project(3) if module_type == "listed" else build_project(3,PlainModule)
+    project.extend_generate_to_file(tmp_path / "sync")
+    asyncio.run(project.generate_to_file_async(tmp_path / "async",AsyncWriter(max_pending=2)))
+    assert tree(tmp_path / "async") == tree(tmp_path / "sync")
+
+def test_single_files_generate_asynchronously(tmp_path) :
+    build_gradle = build_project(1).modules[0].build_gradle
+    asyncio.run(build_gradle.generate_to_file_async(tmp_path))
+    assert (tmp_path / "build.gradle.kts").read_text(encoding="utf-8") == str(build_gradle)
+
+def test_writer_bounds_operations_in_flight() :
+    concurrency = Concurrency()
+
+    async def run() -> list[int] :
+        writer = AsyncWriter(max_pending=2,executor=executor)
+        pending = [await writer.submit(concurrency,index) for index in range(8)]
+        return await asyncio.gather(*pending)
+
+    with ThreadPoolExecutor(max_workers=8) as executor :
+        assert asyncio.run(run()) == list(range(8))
+    assert concurrency.peak == 2
+
+def test_writer_needs_a_slot() :
+    with pytest.raises(ValueError) :
+        AsyncWriter(max_pending=0)
+
+def test_failed_writes_are_raised(tmp_path) :
+    (tmp_path / "blocked").write_text("",encoding="utf-8")
+
+    async def run() -> None :
+        await generate_async([(Broken(),tmp_path / "blocked"),(build_project(1).modules[0],tmp_path / "m0")],AsyncWriter(max_pending=1))
+
+    with pytest.raises(OSError) :
+        asyncio.run(run())
@@ -0,0 +1,91 @@
+import io
+import tarfile
+import zipfile
+from pathlib import Path
+
+import pytest
+
+from conftest import build_project
+from src.archive import ArchiveError, ArchiveWriter
+
+class Pipe(io.RawIOBase) :
+    """A write-only, non-seekable sink."""
+    def __init__(self) -> None :
+        self.buffer = io.BytesIO()
+
+    def writable(self) -> bool :
+        return True
+
+    def write(self,data) -> int :
+        return self.buffer.write(data)
+
+def tree(root : Path) -> dict[str,str] :
+    return {path.relative_to(root).as_posix() : path.read_text(encoding="utf-8") for path in root.rglob("*") if path.is_file()}
+
+def zip_entries(data : bytes) -> dict[str,tuple[str,int]] :
+    with zipfile.ZipFile(io.BytesIO(data)) as archive :
+        return {info.filename : (archive.read(info).decode("utf-8"), (info.external_attr >> 16) & 0o777) for info in archive.infolist()}
+
+def tar_entries(data : bytes) -> dict[str,tuple[str,int]] :
+    with tarfile.open(fileobj=io.BytesIO(data)) as archive :
+        return {member.name : (archive.extractfile(member).read().decode("utf-8"), member.mode) for member in archive.getmembers()}
+
+@pytest.fixture
+def generated(tmp_path) -> dict[str,str] :
+    build_project(2).extend_generate_to_file(tmp_path)
+    return {f"demo/{path}" : content for path, content in tree(tmp_path).items()}
+
+def test_zip_matches_generated_files(generated) :
+    sink = io.BytesIO()
+    count = build_project(2).write_archive(sink)
+    entries = zip_entries(sink.getvalue())
+    assert count == len(entries)
+    assert {name : content for name, (content, _) in entries.items()} == generated
+    assert entries["demo/gradlew"][1] == 0o755
+    assert entries["demo/settings.gradle.kts"][1] == 0o644
+
+@pytest.mark.parametrize("format",["tar","tar.gz"])
+def test_tar_matches_generated_files(generated,format) :
+    sink = io.BytesIO()
+    build_project(2).write_archive(sink,format,prefix="demo")
+    entries = tar_entries(sink.getvalue())
+    assert {name : content for name, (content, _) in entries.items()} == generated
+    assert entries["demo/gradlew"][1] == 0o755
+
+@pytest.mark.parametrize("format",["zip","tar","tar.gz"])
+def test_fixed_timestamps_give_identical_archives(format) :
+    archives = []
+    for _ in range(2) :
+        sink = io.BytesIO()
+        build_project(2).write_archive(sink,format,timestamp=1_700_000_000)
+        archives.append(sink.getvalue())
+    assert archives[0] == archives[1]
+
+def test_archives_stream_into_unseekable_sinks() :
+    pipe = Pipe()
+    build_project(1).write_archive(pipe,"zip",prefix="")
+    entries = zip_entries(pipe.buffer.getvalue())
+    assert "m0/build.gradle.kts" in entries and "settings.gradle.kts" in entries
+
+def test_writer_entries_and_formats() :
+    sink = io.BytesIO()
+    with ArchiveWriter(sink,"tar",prefix="out/",timestamp=0) as archive :
+        archive.add("/notes.txt","hello")
+        assert archive.count == 1
+    with tarfile.open(fileobj=io.BytesIO(sink.getvalue())) as result :
+        member = result.getmember("out/notes.txt")
+        # Timestamps are clamped to the zip epoch for every format
+        assert member.mtime == 315532800
+    with pytest.raises(ArchiveError) :
+        ArchiveWriter(io.BytesIO(),"rar")
+
+@pytest.mark.parametrize("prefix",["../evil","demo/../../evil","/etc","C:/evil","demo\\..\\evil","demo\r\nSet-Cookie: x=1"])
+def test_unsafe_prefixes_are_rejected(prefix) :
+    with pytest.raises(ArchiveError) :
+        ArchiveWriter(io.BytesIO(),"zip",prefix=prefix)
+
+def test_entries_stay_inside_the_prefix() :
+    with ArchiveWriter(io.BytesIO(),"zip",prefix="demo/") as archive :
+        assert archive.prefix == "demo"
+        with pytest.raises(ArchiveError) :
+            archive.add("../../evil.txt","content")
@@ -0,0 +1,70 @@
+import os
+import stat
+
+import pytest
+
+from src.assets import AssetStore, StaticAsset, WRAPPER_ASSETS, copy_assets
+
+from conftest import build_project
+
+def mode(path) -> int :
+    return stat.S_IMODE(os.stat(path).st_mode)
+
+@pytest.fixture(autouse=True)
+def cache_home(tmp_path,monkeypatch) :
+    cache = tmp_path / "cache"
+    monkeypatch.setenv("XDG_CACHE_HOME",str(cache))
+    return cache
+
+def test_generation_copies_assets_without_a_store(tmp_path,cache_home) :
+    build_project(1).extend_generate_to_file(tmp_path / "out")
+
+    gradlew = tmp_path / "out" / "gradlew"
+    assert gradlew.read_bytes() == WRAPPER_ASSETS[0].source.read_bytes()
+    assert os.stat(gradlew).st_nlink == 1
+    assert not cache_home.exists()
+    if os.name == "posix" :
+        assert mode(gradlew) == 0o755
+        assert mode(tmp_path / "out" / "gradlew.bat") == 0o644
+
+def test_copies_are_skipped_when_unchanged_and_repaired_otherwise(tmp_path) :
+    root = tmp_path / "out"
+    assert copy_assets(WRAPPER_ASSETS,root) == {"gradlew" : "copied","gradlew.bat" : "copied"}
+    assert copy_assets(WRAPPER_ASSETS,root) == {"gradlew" : "unchanged","gradlew.bat" : "unchanged"}
+
+    (root / "gradlew.bat").write_text("edited")
+    assert copy_assets(WRAPPER_ASSETS,root)["gradlew.bat"] == "copied"
+    assert (root / "gradlew.bat").read_bytes() == WRAPPER_ASSETS[1].source.read_bytes()
+
+def test_store_copies_by_default(tmp_path) :
+    store = AssetStore(tmp_path / "store")
+    results = store.materialize_all(WRAPPER_ASSETS,tmp_path / "out")
+
+    assert set(results.values()) == {"copied"}
+    assert os.stat(tmp_path / "out" / "gradlew").st_nlink == 1
+    assert any((tmp_path / "store").rglob("*.x"))
+
+@pytest.mark.skipif(os.name != "posix",reason="hard links and modes are POSIX")
+def test_store_links_when_asked(tmp_path) :
+    store = AssetStore(tmp_path / "store",link=True)
+    first = store.materialize_all(WRAPPER_ASSETS,tmp_path / "a")
+    store.materialize_all(WRAPPER_ASSETS,tmp_path / "b")
+
+    assert set(first.values()) == {"linked"}
+    assert os.path.samefile(tmp_path / "a" / "gradlew",tmp_path / "b" / "gradlew")
+    assert mode(tmp_path / "a" / "gradlew") == 0o555
+    assert store.materialize_all(WRAPPER_ASSETS,tmp_path / "a") == {"gradlew" : "unchanged","gradlew.bat" : "unchanged"}
+
+    # Switching back to copies replaces the read-only links
+    assert AssetStore(tmp_path / "store").materialize_all(WRAPPER_ASSETS,tmp_path / "a")["gradlew"] == "copied"
+    assert mode(tmp_path / "a" / "gradlew") == 0o755
+
+def test_identical_sources_share_one_object(tmp_path) :
+    sources = [tmp_path / "one.txt",tmp_path / "two.txt"]
+    for source in sources :
+        source.write_text("same content")
+    store = AssetStore(tmp_path / "store")
+
+    assert store.add(sources[0]) == store.add(sources[1])
+    assert store.add(sources[0]) != store.add(sources[0],executable=True)
+    assert copy_assets([StaticAsset(sources[0],"nested/file.txt")],tmp_path / "out") == {"nested/file.txt" : "copied"}
@@ -0,0 +1,80 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from src.project.batch import BatchSpec, BatchSpecError, generate_batch
+from src.utils import load_reference, split_reference
+
+TESTS = Path(__file__).parent
+
+MANIFEST = f"""\
+import sys
+sys.path[:0] = [{str(TESTS.parent)!r}, {str(TESTS)!r}]
+from conftest import build_project
+
+PROJECTS = [{{"output" : "a","modules" : 1}},{{"output" : "b","modules" : 2}},{{"output" : "broken","modules" : -1}}]
+
+def load_template() :
+    return "template"
+
+def build(project, template) :
+    assert template == "template"
+    if project["modules"] < 0 :
+        raise ValueError("no modules")
+    return build_project(project["modules"])
+"""
+
+@pytest.mark.parametrize("reference, expected",[
+    ("path/to/script.py:build",("path/to/script.py","build",True)),
+    ("script.py",("script.py",None,True)),
+    ("package.module:name",("package.module","name",False)),
+    ("package.module",("package.module",None,False)),
+    ("C:\\project\\script.py",("C:\\project\\script.py",None,True)),
+])
+def test_split_reference(reference : str,expected : tuple) :
+    assert split_reference(reference) == expected
+
+def test_load_reference(tmp_path) :
+    script = tmp_path / "script.py"
+    script.write_text("VALUE = 42\n")
+
+    assert load_reference(f"{script}:VALUE") == 42
+    assert load_reference(str(script),"VALUE") == 42
+    assert load_reference("json:dumps") is json.dumps
+    for reference in (f"{script}:MISSING",str(tmp_path / "missing.py:VALUE"),"no_such_module:name",str(script)) :
+        with pytest.raises(ImportError) :
+            load_reference(reference)
+
+@pytest.mark.parametrize("workers",[1,2])
+def test_python_manifest(tmp_path,workers : int) :
+    manifest = tmp_path / "manifest.py"
+    manifest.write_text(MANIFEST)
+
+    report = generate_batch(BatchSpec.from_file(manifest),tmp_path / "out",max_workers=workers)
+
+    assert [result.succeeded() for result in report.results] == [True,True,False]
+    assert "ValueError: no modules" in report.results[2].error
+    assert (tmp_path / "out" / "a" / "settings.gradle.kts").is_file()
+    assert (tmp_path / "out" / "b" / "m1").is_dir()
+    assert not report.succeeded()
+
+def test_json_spec_resolves_scripts_next_to_it(tmp_path) :
+    (tmp_path / "manifest.py").write_text(MANIFEST)
+    spec_file = tmp_path / "spec.json"
+    spec_file.write_text(json.dumps({"builder" : "manifest.py:build","template" : "manifest.py:load_template","projects" : [{"output" : "c","modules" : 1}]}))
+
+    report = generate_batch(BatchSpec.from_file(spec_file),tmp_path,max_workers=1,mode="transactional")
+
+    assert report.succeeded()
+    assert (tmp_path / "c" / "gradle.properties").is_file()
+
+def test_invalid_specs(tmp_path) :
+    with pytest.raises(BatchSpecError) :
+        BatchSpec("builder.py:build",[{"name" : "no output"}])
+    spec_file = tmp_path / "spec.json"
+    spec_file.write_text("{}")
+    with pytest.raises(BatchSpecError) :
+        BatchSpec.from_file(spec_file)
+    with pytest.raises(BatchSpecError) :
+        generate_batch(BatchSpec(str(tmp_path / "missing.py:build"),[{"output" : "x"}]),tmp_path)
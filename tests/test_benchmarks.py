@@ -0,0 +1,59 @@
+import pytest
+
+from benchmarks.suite import BASELINE_VERSION, STAGES, Regression, compare, format_results, load_baseline, main, run_suite, save_results
+from benchmarks.synthetic import SyntheticParameters, provide_project_metadata, synthetic_project
+from src.utils import render_to_string
+
+TINY = SyntheticParameters(modules=2,dependencies=4,plugin_block_lines=3,metadata_depth=3)
+
+def results(**stages : float) -> dict :
+    return {"version" : BASELINE_VERSION,"scenarios" : {"tiny" : {"parameters" : TINY.to_json(),"stages" : {
+        stage : {"min_s" : value,"median_s" : value,"peak_bytes" : 1000} for stage, value in stages.items()
+    }}}}
+
+def test_synthetic_projects_are_deterministic() :
+    first, second = synthetic_project(TINY), synthetic_project(TINY)
+    for project in (first, second) :
+        provide_project_metadata(project)
+    assert len(first.modules) == 2
+    assert [render_to_string(module.build_gradle) for module in first.modules] == [render_to_string(module.build_gradle) for module in second.modules]
+    build_gradle = render_to_string(first.modules[0].build_gradle)
+    assert build_gradle.count("com.synthetic:") == 4
+    # Common artifacts are pinned by the overrides at the top of the metadata hierarchy
+    assert 'api("com.synthetic:common0:1.0.1")' in build_gradle
+    assert "option2" in build_gradle
+
+def test_parameters_round_trip_through_json() :
+    parameters = SyntheticParameters.from_json(TINY.to_json())
+    assert parameters.to_json() == {"modules" : 2,"dependencies" : 4,"plugin_block_lines" : 3,"metadata_depth" : 3}
+    assert SyntheticParameters(metadata_depth=0).metadata_depth == 1
+
+def test_suite_measures_every_stage(tmp_path) :
+    suite = run_suite({"tiny" : TINY},repeat=1)
+    stages = suite["scenarios"]["tiny"]["stages"]
+    assert tuple(stages) == STAGES
+    assert all(values["min_s"] <= values["median_s"] and values["peak_bytes"] >= 0 for values in stages.values())
+    save_results(suite,tmp_path / "baseline.json")
+    assert load_baseline(tmp_path / "baseline.json") == suite
+    assert "tiny" in format_results(suite,suite)
+
+def test_compare_reports_stages_beyond_the_threshold() :
+    baseline = results(construct=1.0,write=1.0,render_plugins=0.0)
+    current = results(construct=1.05,write=1.5,render_plugins=2.0)
+    current["scenarios"]["tiny"]["stages"]["write"]["peak_bytes"] = 2000
+    assert [(regression.stage, regression.metric) for regression in compare(baseline,current,threshold=10)] == [("write","min_s")]
+    assert [(regression.stage, regression.metric) for regression in compare(baseline,current,threshold=60,memory_threshold=50)] == [("write","peak_bytes")]
+    assert str(Regression("tiny","write","min_s",1.0,1.5)) == "tiny/write: min_s 1 -> 1.5 (+50.0%)"
+
+def test_baselines_of_another_version_are_rejected(tmp_path) :
+    save_results({"version" : BASELINE_VERSION + 1},tmp_path / "old.json")
+    with pytest.raises(ValueError) :
+        load_baseline(tmp_path / "old.json")
+
+def test_compare_command_fails_on_regressions(tmp_path,capsys) :
+    save_results(results(**{stage : 1e-12 for stage in STAGES}),tmp_path / "baseline.json")
+    assert main(["compare",str(tmp_path / "baseline.json"),"--repeat","1","--no-memory","--output",str(tmp_path / "current.json")]) == 1
+    assert "REGRESSION tiny/" in capsys.readouterr().err
+    save_results(results(**{stage : 1e6 for stage in STAGES}),tmp_path / "baseline.json")
+    assert main(["compare",str(tmp_path / "baseline.json"),"--repeat","1","--no-memory"]) == 0
+    assert load_baseline(tmp_path / "current.json")["scenarios"]["tiny"]["parameters"] == TINY.to_json()
@@ -0,0 +1,76 @@
+from src.gradle.catalog import VersionCatalog
+from src.gradle.dependency import CatalogDependency, Dependency, DependencyGroup, DependencyType
+from src.gradle.kotlindsl import parse_dependency
+from src.gradle.plugin import PluginGroup, id
+
+from conftest import build_project
+
+CATALOG = """\
+[versions]
+kotlin = "2.0.0"
+
+[libraries]
+retrofit = { module = "com.squareup.retrofit2:retrofit", version = "2.9.0" }
+core-ktx = "androidx.core:core-ktx:1.13.0"
+lib1 = { module = "com.example:lib1", version.ref = "kotlin" }
+
+[plugins]
+kotlin-jvm = { id = "org.jetbrains.kotlin.jvm", version.ref = "kotlin" }
+"""
+
+def test_round_trip_and_index() :
+    catalog = VersionCatalog.from_string(CATALOG)
+
+    assert catalog.library_alias("androidx.core:core-ktx") == "core-ktx"
+    assert catalog.library_accessor("androidx.core:core-ktx") == "libs.core.ktx"
+    assert catalog.plugin_accessor("org.jetbrains.kotlin.jvm") == "libs.plugins.kotlin.jvm"
+
+    parsed = VersionCatalog.from_string(str(catalog))
+    assert str(parsed) == str(catalog)
+
+def test_accessors_of_any_catalog_name_are_unquoted() :
+    catalog = VersionCatalog.from_string(CATALOG,name="deps")
+    dependency = Dependency(DependencyType.Implementation,"com.squareup.retrofit2:retrofit:2.9.0").use_catalog(catalog)
+
+    assert isinstance(dependency,CatalogDependency)
+    assert str(dependency) == "implementation(deps.retrofit)"
+    assert str(parse_dependency("implementation(deps.retrofit)")) == "implementation(deps.retrofit)"
+    assert str(Dependency(DependencyType.Api,"libsodium:libsodium:1.0")) == 'api("libsodium:libsodium:1.0")'
+
+def test_differing_versions_and_classifiers_are_kept() :
+    catalog = VersionCatalog.from_string(CATALOG)
+    group = DependencyGroup([
+        Dependency(DependencyType.Implementation,"com.squareup.retrofit2:retrofit:2.11.0"),
+        Dependency(DependencyType.Implementation,"com.squareup.retrofit2:retrofit:2.9.0:sources"),
+        Dependency(DependencyType.Implementation,"androidx.core:core-ktx"),
+        Dependency(DependencyType.Implementation,"com.example:lib1:2.0.0"),
+    ])
+    kept = catalog.apply(group)
+
+    assert [str(dependency) for dependency in group.code] == [
+        'implementation("com.squareup.retrofit2:retrofit:2.11.0")',
+        'implementation("com.squareup.retrofit2:retrofit:2.9.0:sources")',
+        "implementation(libs.core.ktx)",
+        "implementation(libs.lib1)",
+    ]
+    assert kept == group.code[:2]
+
+def test_plugins_use_the_catalog_unless_versions_differ() :
+    catalog = VersionCatalog.from_string(CATALOG)
+    group = PluginGroup([id("org.jetbrains.kotlin.jvm","2.0.0"),id("com.android.library","8.0.0")])
+    assert catalog.apply(group) == []
+    assert [str(plugin) for plugin in group.code] == ['alias(libs.plugins.kotlin.jvm)','id("com.android.library") version "8.0.0"']
+
+    group = PluginGroup([id("org.jetbrains.kotlin.jvm","1.9.0")])
+    assert catalog.apply(group) == group.code
+
+def test_project_rewrites_dependencies_and_plugins() :
+    project = build_project(2)
+    project.version_catalog = VersionCatalog.from_string(CATALOG)
+
+    kept = project.use_version_catalog()
+
+    build_gradle = project.modules[1].build_gradle
+    assert [str(plugin) for plugin in build_gradle.plugins.code] == ["alias(libs.plugins.kotlin.jvm)"]
+    # lib1 is declared with 1.1, the catalog has 2.0.0
+    assert [str(dependency) for dependency in kept] == ['api("com.example:lib1:1.1")']
@@ -0,0 +1,33 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import main
+
+ROOT = Path(main.__file__).parent
+SPEC = f"{Path(__file__).parent / 'conftest.py'}:build_project"
+
+def test_import_loads_no_lazy_module() :
+    script = "import sys; before = set(sys.modules); import main; print(' '.join(sorted(set(sys.modules) - before)))"
+    completed = subprocess.run([sys.executable,"-c",script],capture_output=True,text=True,check=True,cwd=ROOT)
+
+    imported = completed.stdout.split()
+    assert [module for module in imported if module.split(".")[0] in main.LAZY_PACKAGES] == []
+
+def test_startup_fits_the_default_budget() :
+    milliseconds, eager = main.measure_startup(repeat=3)
+
+    assert eager == []
+    assert milliseconds <= main.IMPORT_BUDGET_MS
+
+def test_validate_renders_a_project(capsys) :
+    assert main.main(["validate",SPEC]) == 0
+    assert "0 failed" in capsys.readouterr().out
+
+def test_diff_lists_files_to_add(tmp_path,capsys) :
+    assert main.main(["diff",SPEC,str(tmp_path),"--stat"]) == 1
+    assert "added    settings.gradle.kts" in capsys.readouterr().out.splitlines()
+
+def test_unknown_spec_is_reported(capsys) :
+    assert main.main(["validate","missing/script.py"]) == 2
+    assert capsys.readouterr().err.startswith("error:")
@@ -0,0 +1,86 @@
+import gc
+import tracemalloc
+from weakref import WeakValueDictionary
+
+import pytest
+
+from src.gradle.dependency import Coordinate, Dependency, DependencyGroup, DependencyType, SharedDependency
+
+# 200 declarations, each repeated by 100 modules
+REPEATED = [(DependencyType.Implementation,f"com.g{index % 50}",f"a{index % 200}",f"1.{index % 10}") for index in range(20000)]
+# No two declarations alike, nothing to share
+DISTINCT = [(DependencyType.Implementation,f"com.g{index % 50}",f"a{index}",f"1.{index % 10}") for index in range(5000)]
+
+class DictDependency :
+    # The representation used before declarations were slotted and shared
+    def __init__(self,type,dependency,replace=None) -> None :
+        self.type = type
+        self.dependency = dependency
+        self.replace = replace
+
+# Hash tables double when full, the interpreter's table of interned strings is reallocated by whichever measurement
+# fills it. Blocks this large are left out of the measurements, the tables of the caches stay well below.
+LARGE_BLOCK = 512 << 10
+
+def bytes_per_row(rows,build) -> float :
+    # Empty caches, their tables never shrink and would otherwise depend on the previous measurements
+    caches = Coordinate._cache, SharedDependency._cache
+    Coordinate._cache, SharedDependency._cache = WeakValueDictionary(), WeakValueDictionary()
+    try :
+        gc.collect()
+        tracemalloc.start()
+        kept = build(rows)
+        gc.collect()
+        snapshot = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        del kept
+    finally :
+        Coordinate._cache, SharedDependency._cache = caches
+    return sum(trace.size for trace in snapshot.traces if trace.size < LARGE_BLOCK) / len(rows)
+
+def dictionaries(rows) :
+    return [DictDependency(type,f"{group}:{artifact}:{version}") for type, group, artifact, version in rows]
+
+def plain(rows) :
+    return DependencyGroup([Dependency(type,f"{group}:{artifact}:{version}") for type, group, artifact, version in rows])
+
+def shared(rows) :
+    return DependencyGroup([Dependency(type,f"{group}:{artifact}:{version}") for type, group, artifact, version in rows],share=True)
+
+def columns(rows) :
+    return DependencyGroup.from_columns(*zip(*rows))
+
+def test_groups_share_plain_declarations() :
+    first = Dependency(DependencyType.Api,"com.example:lib:1.0")
+    second = Dependency(DependencyType.Api,"com.example:lib:1.0")
+    group = DependencyGroup([first,second],share=True)
+
+    assert isinstance(group.code[0],SharedDependency)
+    assert group.code[0] is group.code[1]
+    with pytest.raises(AttributeError) :
+        group.code[0].dependency = "com.example:lib:2.0"
+
+def test_groups_keep_callbacks_and_only_share_on_request() :
+    replace = lambda dependency, metadata, value : None
+    with_callback = Dependency(DependencyType.Api,"com.example:lib:1.0",replace)
+    plain = Dependency(DependencyType.Api,"com.example:lib:1.0")
+
+    assert DependencyGroup([with_callback],share=True).code[0] is with_callback
+    assert DependencyGroup([plain]).code[0] is plain
+
+def test_repeated_declarations_are_five_times_smaller() :
+    baseline = bytes_per_row(REPEATED,dictionaries)
+
+    assert bytes_per_row(REPEATED,shared) * 5 <= baseline
+    assert bytes_per_row(REPEATED,columns) * 5 <= baseline
+    assert bytes_per_row(REPEATED,plain) * 2 <= baseline
+
+def test_distinct_declarations() :
+    baseline = bytes_per_row(DISTINCT,dictionaries)
+    unshared = bytes_per_row(DISTINCT,plain)
+
+    # Every notation is parsed and cached once: the slotted representation is larger than a dict and a string
+    assert baseline < unshared <= 3 * baseline
+    # Sharing adds a cached declaration per row and only pays off when rows repeat
+    assert bytes_per_row(DISTINCT,shared) > unshared
+    assert bytes_per_row(DISTINCT,columns) > unshared
@@ -0,0 +1,74 @@
+import os
+import time
+from pathlib import Path
+
+import pytest
+
+from src.metadata import ProjectMetadata
+from src.project.discovery import DiscoveryCache, ModuleScanner, discover_modules
+
+def touch(path : Path) -> None :
+    path.parent.mkdir(parents=True,exist_ok=True)
+    path.write_text("",encoding="utf-8")
+
+def age(root : Path) -> None :
+    # Directories changed within the last seconds are not trusted by the cache
+    past = time.time() - 3600
+    for directory in [root,*(path for path in root.rglob("*") if path.is_dir() and not path.is_symlink())] :
+        os.utime(directory,(past,past))
+
+@pytest.fixture
+def tree(tmp_path) -> Path :
+    root = tmp_path / "repo"
+    touch(root / "settings.gradle.kts")
+    touch(root / "build.gradle.kts")
+    touch(root / "app" / "build.gradle.kts")
+    touch(root / "app" / "src" / "main" / "Main.kt")
+    touch(root / "feature" / "login" / "build.gradle")
+    touch(root / "feature" / "profile" / "build.gradle.kts")
+    touch(root / "feature" / "profile" / "build" / "generated" / "build.gradle.kts")
+    touch(root / ".gradle" / "cache" / "build.gradle.kts")
+    touch(root / "build-logic" / "settings.gradle.kts")
+    touch(root / "build-logic" / "convention" / "build.gradle.kts")
+    (root / "linked").symlink_to(root / "app",target_is_directory=True)
+    return root
+
+@pytest.mark.parametrize("max_workers",[1,4])
+def test_modules_are_found_and_pruned(tree,max_workers,monkeypatch) :
+    monkeypatch.setattr(ModuleScanner,"BATCH_SIZE",1)
+    report = ModuleScanner(tree,max_workers=max_workers).scan()
+    assert report.modules == ["app","feature:login","feature:profile"]
+    assert report.reused == 0 and report.scanned > 0
+
+def test_unchanged_directories_are_reused(tree) :
+    age(tree)
+    scanner = ModuleScanner(tree,max_workers=1)
+    first = scanner.scan()
+    second = scanner.scan()
+    assert second.modules == first.modules
+    assert (second.scanned, second.reused) == (0, first.scanned)
+
+    touch(tree / "feature" / "search" / "build.gradle.kts")
+    third = scanner.scan()
+    assert third.modules == ["app","feature:login","feature:profile","feature:search"]
+    # Only `feature` (its mtime changed) and the new directory are read again
+    assert third.scanned == 2
+
+def test_cache_files_persist_between_scanners(tree,tmp_path) :
+    age(tree)
+    cache_file = tmp_path / "discovery.json"
+    first = ModuleScanner(tree,max_workers=1,cache_file=cache_file).scan()
+    second = ModuleScanner(tree,max_workers=1,cache_file=cache_file).scan()
+    assert (second.modules, second.scanned) == (first.modules, 0)
+    cache_file.write_text("{broken",encoding="utf-8")
+    assert DiscoveryCache.load(cache_file).entries == {}
+    assert DiscoveryCache.load(tmp_path / "missing.json").entries == {}
+
+def test_module_metadata(tree) :
+    project = ProjectMetadata("demo","com.demo","1.0","com.demo")
+    metadata = discover_modules(tree,project,max_workers=1)
+    assert [module.name() for module in metadata] == ["app","feature:login","feature:profile"]
+    assert all(module.parent is project for module in metadata)
+
+def test_missing_roots_have_no_modules(tmp_path) :
+    assert ModuleScanner(tmp_path / "missing",max_workers=1).modules() == []
@@ -0,0 +1,85 @@
+from pathlib import Path
+
+import pytest
+
+from src.core import ErrorContext, catch_exception_in_all_methods, error_contexts
+from src.gradle.buildgradle import ModuleBuildGradle, ModuleBuildGradleError
+from src.gradle.dependency import DependencyGroup
+from src.gradle.plugin import PluginGroup
+from src.metadata import ModuleMetadata, ProjectMetadata
+
+class NodeError(Exception):
+    pass
+
+@catch_exception_in_all_methods(NodeError)
+class Node :
+    FILE_NAME = "node.txt"
+
+    def __init__(self,error : Exception) -> None:
+        self.error = error
+
+    def generate_to_file(self,filepath : Path) -> None:
+        raise self.error
+
+    def render(self) -> None:
+        raise self.error
+
+    @classmethod
+    def from_file(cls,filepath : Path) -> 'Node':
+        with open(filepath,encoding="utf-8") as file :
+            return cls(Exception(file.read()))
+
+@catch_exception_in_all_methods(NodeError,methods=None)
+class EveryMethod :
+    def render(self) -> None:
+        raise KeyError("missing")
+
+def test_errors_are_wrapped_with_their_context(tmp_path) :
+    project = ProjectMetadata("demo","com.demo","1.0","com.demo")
+    build_gradle = ModuleBuildGradle(PluginGroup([]),DependencyGroup([]),module_metadata=ModuleMetadata(":app","com.demo.app",project))
+    with pytest.raises(ModuleBuildGradleError) as raised :
+        build_gradle.generate_to_file(tmp_path / "missing")
+    context = raised.value.context
+    assert (context.node, context.method, context.module) == (build_gradle, "generate_to_file", ":app")
+    assert context.filepath == tmp_path / "missing" / "build.gradle.kts"
+    assert isinstance(raised.value.__cause__,FileNotFoundError)
+    assert str(raised.value).startswith("ModuleBuildGradle.generate_to_file of module :app (")
+
+def test_class_methods_are_wrapped(tmp_path) :
+    with pytest.raises(NodeError) as raised :
+        Node.from_file(tmp_path / "node.txt")
+    assert raised.value.context.method == "from_file"
+    assert raised.value.context.filepath == tmp_path / "node.txt"
+
+def test_own_errors_only_gain_a_context(tmp_path) :
+    error = NodeError("already wrapped")
+    with pytest.raises(NodeError) as raised :
+        Node(error).generate_to_file(tmp_path)
+    assert raised.value is error
+    assert raised.value.context.filepath == tmp_path / "node.txt"
+
+def test_type_errors_pass_through(tmp_path) :
+    with pytest.raises(TypeError) :
+        Node(TypeError("bad argument")).generate_to_file(tmp_path)
+
+def test_only_entry_points_are_wrapped_by_default() :
+    with pytest.raises(ValueError) :
+        Node(ValueError("raw")).render()
+    with pytest.raises(NodeError) as raised :
+        EveryMethod().render()
+    assert raised.value.context.filepath is None
+
+def test_contexts_are_collected_along_the_chain(tmp_path) :
+    try :
+        try :
+            Node(OSError("disk full")).generate_to_file(tmp_path)
+        except NodeError as inner :
+            outer = NodeError("outer")
+            outer.context = ErrorContext(ModuleBuildGradle,"generate_to_file",None,":app")
+            raise outer from inner
+    except NodeError as error :
+        contexts = error_contexts(error)
+    assert [str(context) for context in contexts] == [
+        "ModuleBuildGradle.generate_to_file of module :app",
+        f"Node.generate_to_file ({tmp_path / 'node.txt'})",
+    ]
@@ -0,0 +1,63 @@
+import io
+
+import pytest
+
+from src.gradle.dependency import Dependency, DependencyType, project
+from src.gradle.localrepository import LocalRepositoryIndex
+from src.project.graph import ModuleCycleError, ModuleGraph, ModuleGraphError
+from src.utils import render_to_string
+
+from conftest import build_project, install_artifact
+
+def chain(index : int) -> list :
+    # m0 -> m1 -> m2: every module depends on the next one
+    return [project(f":m{index + 1}")] if index < 2 else []
+
+def settings_text(project) -> str :
+    return next(render_to_string(node) for path, node in project.output_files(".") if path.name == "settings.gradle.kts")
+
+def test_levels_put_dependencies_first() :
+    graph = build_project(3,dependencies=chain).module_graph()
+
+    assert graph.levels() == [[":m2"],[":m1"],[":m0"]]
+    assert graph.edges[":m0"] == [":m1"]
+
+def test_cycles_and_unknown_modules_are_errors() :
+    cyclic = build_project(2,dependencies=lambda index : [project(f":m{1 - index}")])
+    with pytest.raises(ModuleCycleError) as error :
+        cyclic.module_graph()
+    assert error.value.cycle[0] == error.value.cycle[-1]
+
+    with pytest.raises(ModuleGraphError) :
+        build_project(1,dependencies=lambda index : [project(":missing")]).module_graph()
+
+def test_generation_targets_leave_the_project_as_it_is() :
+    ordered = build_project(3,dependencies=chain)
+
+    text = settings_text(ordered)
+    assert text.index('":m2"') < text.index('":m1"') < text.index('":m0"')
+    assert ordered.settings_gradle.modules == [":m0",":m1",":m2"]
+    targets = list(ordered.generation_targets("."))
+    assert targets[0][0] is not ordered.settings_gradle
+
+    independent = build_project(2)
+    assert next(independent.generation_targets("."))[0] is independent.settings_gradle
+
+def test_versions_are_only_filled_by_prepare(tmp_path) :
+    install_artifact(tmp_path / "repository","com.example","lib0","2.0")
+    project = build_project(2,dependencies=lambda index : [Dependency(DependencyType.Api,f"com.example:lib{index}")])
+
+    with LocalRepositoryIndex(tmp_path / "repository",tmp_path / "index.sqlite") as index :
+        project.version_index = index
+        list(project.output_files("."))
+        assert project.modules[0].build_gradle.dependencies.code[0].coordinate.version is None
+
+        with pytest.warns(UserWarning,match="com.example:lib1") :
+            filled = project.prepare()
+        assert filled.filled == {"com.example:lib0" : "2.0"}
+        assert project.modules[0].build_gradle.dependencies.code[0].coordinate.version == "2.0"
+
+        generated = build_project(1,dependencies=lambda index : [Dependency(DependencyType.Api,"com.example:lib0:latest")])
+        generated.version_index = index
+        generated.write_archive(io.BytesIO())
+        assert str(generated.modules[0].build_gradle.dependencies.code[0]) == 'api("com.example:lib0:2.0")'
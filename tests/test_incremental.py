@@ -0,0 +1,52 @@
+import json
+
+from src.project.incremental import GenerationManifest, IncrementalWriter
+
+from conftest import build_project
+
+def _files(root) :
+    return {path.relative_to(root).as_posix() : path.read_bytes() for path in sorted(root.rglob("*")) if path.is_file() and path.name != GenerationManifest.FILE_NAME}
+
+def test_second_run_skips_unchanged_files(tmp_path) :
+    project = build_project(2)
+    first = project.incremental_generate_to_file(tmp_path)
+    second = project.incremental_generate_to_file(tmp_path)
+    assert first.written and not first.skipped
+    assert second.written == [] and sorted(second.skipped) == sorted(first.written)
+
+def test_changed_and_stale_files(tmp_path) :
+    project = build_project(2)
+    project.incremental_generate_to_file(tmp_path)
+    project.modules[1].build_gradle.dependencies.code.clear()
+    project.modules.pop(0)
+    report = project.incremental_generate_to_file(tmp_path)
+    assert "m1/build.gradle.kts" in report.written
+    assert report.deleted == ["m0/build.gradle.kts"]
+    assert not (tmp_path / "m0" / "build.gradle.kts").exists()
+
+def test_stale_paths_outside_the_root_are_not_deleted(tmp_path) :
+    root = tmp_path / "project"
+    outside = tmp_path / "precious.txt"
+    outside.write_text("keep")
+    root.mkdir()
+    (root / GenerationManifest.FILE_NAME).write_text(json.dumps({
+        "version" : GenerationManifest.VERSION,
+        "files" : {"../precious.txt" : ["0",4,0], str(outside) : ["0",4,0]},
+    }))
+    report = IncrementalWriter(root).write_all([])
+    assert outside.read_text() == "keep"
+    assert report.deleted == []
+
+def test_malformed_manifests_load_empty(tmp_path) :
+    for content in ("[1, 2]", "42", '"text"', '{"version": 1, "files": []}', '{"version": 1, "files": {"a": [1]}}', "{not json") :
+        (tmp_path / GenerationManifest.FILE_NAME).write_text(content)
+        assert GenerationManifest.load(tmp_path).entries == {}
+
+def test_incremental_output_matches_generate_to_file(tmp_path) :
+    project = build_project(2)
+    project.extend_generate_to_file(tmp_path / "plain")
+    project.incremental_generate_to_file(tmp_path / "incremental")
+    plain, incremental = _files(tmp_path / "plain"), _files(tmp_path / "incremental")
+    plain = {path : data for path, data in plain.items() if path in incremental}
+    assert plain == incremental
+    assert all(b"\r\n" not in data for data in incremental.values())
@@ -0,0 +1,124 @@
+import time
+
+import pytest
+
+from src.gradle.buildgradle import ModuleBuildGradle
+from src.gradle.dependency import CatalogDependency, ProjectDependency, RawDependency
+from src.gradle.kotlindsl import KotlinScriptSyntaxError, parse_build_gradle, parse_settings_gradle
+from src.gradle.plugin import PluginType, RawPlugin
+from src.gradle.settingsgradle import SettingsGradle
+from src.utils import RawCode, render_to_string
+
+BUILD = """\
+plugins {
+    id("com.android.library")
+    kotlin("android") version "2.0.0" apply false
+    alias(libs.plugins.ksp)
+    `kotlin-dsl`
+}
+
+android {
+    namespace = "com.demo.core"
+}
+
+dependencies {
+    // A comment
+    implementation("com.squareup.retrofit2:retrofit:2.9.0")
+    api(libs.androidx.core)
+    implementation(project(":common"))
+    testImplementation("junit:junit:4.13.2") {
+        exclude(group = "org.hamcrest")
+    }
+}
+"""
+
+SETTINGS = """\
+pluginManagement {
+    includeBuild("build-logic")
+    repositories {
+        google()
+    }
+}
+dependencyResolutionManagement {
+    repositoriesMode.set(RepositoriesMode.FAIL_ON_PROJECT_REPOS)
+    repositories {
+        mavenCentral()
+    }
+    versionCatalogs {
+        create("deps") {
+            from(files("gradle/deps.versions.toml"))
+        }
+    }
+}
+rootProject.name = "demo"
+include(":app", ":core")
+"""
+
+def test_build_script_declarations() :
+    build_gradle = parse_build_gradle(BUILD)
+
+    plugins = build_gradle.plugins.code
+    assert [plugin.type for plugin in plugins[:3]] == [PluginType.Id,PluginType.Kotlin,PluginType.Alias]
+    assert (plugins[1].version,plugins[1].apply) == ("2.0.0",False)
+    assert isinstance(plugins[3],RawPlugin)
+
+    dependencies = build_gradle.dependencies.code
+    assert isinstance(dependencies[0],RawDependency) and str(dependencies[0]) == "// A comment"
+    assert dependencies[1].coordinate.module == "com.squareup.retrofit2:retrofit"
+    assert isinstance(dependencies[2],CatalogDependency)
+    assert isinstance(dependencies[3],ProjectDependency) and dependencies[3].path == ":common"
+    assert isinstance(dependencies[4],RawDependency)
+
+def test_build_script_round_trip_is_stable() :
+    rendered = render_to_string(ModuleBuildGradle.from_string(BUILD))
+    assert render_to_string(ModuleBuildGradle.from_string(rendered)) == rendered
+    assert 'namespace = "com.demo.core"' in rendered
+
+def test_comments_inside_blocks_are_kept() :
+    source = BUILD.replace('    alias(libs.plugins.ksp)\n','    /* Code generation */\n    alias(libs.plugins.ksp)\n',1)
+    source = source.replace('api(libs.androidx.core)','api(libs.androidx.core) // Exposed to consumers',1)
+    build_gradle = parse_build_gradle(source)
+    assert str(build_gradle.plugins.code[2]) == "/* Code generation */"
+    assert [str(dependency) for dependency in build_gradle.dependencies.code[2:4]] == ["api(libs.androidx.core)","// Exposed to consumers"]
+
+    rendered = render_to_string(build_gradle)
+    assert "/* Code generation */" in rendered and "// A comment" in rendered and "// Exposed to consumers" in rendered
+    assert render_to_string(ModuleBuildGradle.from_string(rendered)) == rendered
+
+def test_large_dependency_blocks_parse_quickly() :
+    lines = [f'    implementation("com.example.g{index % 300}:artifact{index}:1.{index % 10}.0")' for index in range(50000)]
+    source = "plugins {\n    id(\"com.android.library\")\n}\n\ndependencies {\n" + "\n".join(lines) + "\n}\n"
+
+    start = time.perf_counter()
+    build_gradle = parse_build_gradle(source)
+    assert time.perf_counter() - start < 1.5
+    assert len(build_gradle.dependencies.code) == 50000
+
+def test_settings_keep_statement_positions() :
+    settings = parse_settings_gradle(SETTINGS)
+
+    management = settings.dependencyResolutionManagement.code
+    assert isinstance(management[0],RawCode) and str(management[0]).startswith("repositoriesMode.set")
+    assert management[1] is settings.dependencyResolutionManagement.repositories
+    assert str(management[2]).startswith("versionCatalogs")
+    assert str(settings.plugins.code[0]) == 'includeBuild("build-logic")'
+    assert settings.modules == [":app",":core"]
+
+    rendered = render_to_string(settings)
+    assert rendered.index("repositoriesMode") < rendered.index("mavenCentral()") < rendered.index("versionCatalogs")
+    assert render_to_string(SettingsGradle.from_string(rendered)) == rendered
+
+def test_settings_plugins_stay_after_plugin_management() :
+    source = SETTINGS.replace("dependencyResolutionManagement {",'plugins {\n    id("org.gradle.toolchains.foojay-resolver-convention") version "0.8.0"\n}\ndependencyResolutionManagement {',1)
+    settings = parse_settings_gradle(source)
+    assert settings.other is None
+    assert [plugin.identifier for plugin in settings.settings_plugins.code] == ["org.gradle.toolchains.foojay-resolver-convention"]
+
+    rendered = render_to_string(settings)
+    # Only `pluginManagement {}` may come before the `plugins {}` of a settings script
+    assert rendered.index("}\nplugins {") < rendered.index("dependencyResolutionManagement") < rendered.index("include(")
+    assert render_to_string(SettingsGradle.from_string(rendered)) == rendered
+
+def test_unbalanced_script_is_an_error() :
+    with pytest.raises(KotlinScriptSyntaxError) :
+        parse_build_gradle("dependencies {\n    implementation(\"a:b:1\")\n")
@@ -0,0 +1,85 @@
+import shutil
+import threading
+
+import pytest
+
+from conftest import install_artifact
+from src.gradle.dependency import Dependency, DependencyGroup, DependencyType, SharedDependency
+from src.gradle.localrepository import LATEST, LocalRepositoryIndex
+
+@pytest.fixture
+def repository(tmp_path) :
+    root = tmp_path / "m2"
+    for version in ("2.9.0","2.11.0","2.10.0-rc1","3.0.0-SNAPSHOT") :
+        install_artifact(root,"com.squareup.retrofit2","retrofit",version)
+    install_artifact(root,"com.squareup.okhttp3","okhttp","4.12.0","jar")
+    return root
+
+@pytest.fixture
+def index(repository,tmp_path) :
+    with LocalRepositoryIndex(repository,tmp_path / "index.sqlite") as index :
+        yield index
+
+def test_versions_are_ordered(index) :
+    assert index.versions("com.squareup.retrofit2","retrofit") == ["2.9.0","2.10.0-rc1","2.11.0","3.0.0-SNAPSHOT"]
+    assert index.latest("com.squareup.retrofit2","retrofit") == "2.11.0"
+    assert index.latest("com.squareup.retrofit2","retrofit",include_snapshots=True) == "3.0.0-SNAPSHOT"
+    assert index.latest("com.example","missing") is None
+
+def test_refresh_picks_up_changes(index,repository) :
+    assert index.latest("com.squareup.okhttp3","okhttp") == "4.12.0"
+    install_artifact(repository,"com.squareup.okhttp3","okhttp","5.0.0","jar")
+    shutil.rmtree(repository / "com" / "squareup" / "retrofit2" / "retrofit" / "2.11.0")
+    revision = index.revision()
+    report = index.refresh()
+    assert (report.added, report.removed) == (1, 1)
+    assert index.revision() == revision + 1
+    assert index.latest("com.squareup.okhttp3","okhttp") == "5.0.0"
+    assert index.latest("com.squareup.retrofit2","retrofit") == "2.10.0-rc1"
+
+def test_reopened_index_lists_nothing(index,repository,tmp_path) :
+    index.refresh()
+    with LocalRepositoryIndex(repository,tmp_path / "index.sqlite") as reopened :
+        report = reopened.refresh()
+        assert report.added == report.removed == 0
+        assert reopened.latest("com.squareup.retrofit2","retrofit") == "2.11.0"
+
+def test_fill_versions(index) :
+    declared = Dependency(DependencyType.Implementation,"com.squareup.retrofit2:retrofit",print)
+    group = DependencyGroup([
+        declared,
+        Dependency(DependencyType.Api,f"com.squareup.okhttp3:okhttp:{LATEST}"),
+        Dependency(DependencyType.Api,"com.example:missing"),
+        Dependency(DependencyType.Api,"com.squareup.retrofit2:retrofit:1.0"),
+    ],share=True)
+    report = index.fill_versions(group)
+    assert report.filled == {"com.squareup.retrofit2:retrofit" : "2.11.0", "com.squareup.okhttp3:okhttp" : "4.12.0"}
+    assert list(report.missing) == ["com.example:missing"]
+    assert [dependency.dependency for dependency in group.code] == [
+        "com.squareup.retrofit2:retrofit:2.11.0",
+        "com.squareup.okhttp3:okhttp:4.12.0",
+        "com.example:missing",
+        "com.squareup.retrofit2:retrofit:1.0",
+    ]
+    assert group.code[0].replace is print and declared.dependency == "com.squareup.retrofit2:retrofit"
+    assert isinstance(group.code[1],SharedDependency)
+
+def test_with_version_keeps_sharing() :
+    shared = Dependency.shared(DependencyType.Api,"com.example:lib:1.0")
+    assert shared.with_version("2.0") is Dependency.shared(DependencyType.Api,"com.example:lib:2.0")
+    plain = Dependency(DependencyType.Api,"com.example:lib:1.0:sources",print)
+    copy = plain.with_version("2.0")
+    assert (copy.dependency, copy.replace, plain.dependency) == ("com.example:lib:2.0:sources", print, "com.example:lib:1.0:sources")
+
+def test_latest_from_many_threads(index,repository) :
+    results = []
+    def look_up() :
+        for _ in range(50) :
+            results.append(index.latest("com.squareup.retrofit2","retrofit"))
+    threads = [threading.Thread(target=look_up) for _ in range(4)]
+    for thread in threads :
+        thread.start()
+    index.refresh()
+    for thread in threads :
+        thread.join()
+    assert set(results) == {"2.11.0"}
@@ -0,0 +1,91 @@
+import pickle
+
+import pytest
+
+from src.metadata import ModuleMetadata, ProjectMetadata
+
+class Recorder :
+    def __init__(self) -> None :
+        self.changes = []
+
+    def metadata_changed(self,metadata,keys) -> None :
+        self.changes.append(sorted(keys))
+
+@pytest.fixture
+def hierarchy() :
+    project = ProjectMetadata("demo","com.demo","1.0","com.demo")
+    module = ModuleMetadata(":app","com.demo.app",project)
+    return project, module
+
+def test_scoped_keys_resolve_up_the_parent_chain(hierarchy) :
+    project, module = hierarchy
+    assert module.get_property("project-metadata/version") == "1.0"
+    assert module.get_property(":app/namespace") == "com.demo.app"
+    assert module.get_property("namespace") == "com.demo.app"
+    assert module.get_property("missing/key") is None
+
+def test_value_writes_keep_the_index(hierarchy) :
+    project, module = hierarchy
+    index = module.resolution_index()
+    project.metadata["version"] = "2.0"
+    assert module.get_property("project-metadata/version") == "2.0"
+    assert module._index is index
+
+def test_writes_to_another_hierarchy_keep_the_index(hierarchy) :
+    _, module = hierarchy
+    index = module.resolution_index()
+    other = ProjectMetadata("other","com.other","1.0","com.other")
+    ModuleMetadata(":lib","com.other.lib",other).parent = other
+    other.metadata = {"name" : "renamed"}
+    module.get_property("project-metadata/version")
+    assert module._index is index
+
+@pytest.mark.parametrize("mutate, expected",[
+    (lambda metadata : metadata.__ior__({"version" : "3.0"}), "3.0"),
+    (lambda metadata : metadata.update(version="4.0"), "4.0"),
+    (lambda metadata : metadata.pop("version"), None),
+    (lambda metadata : metadata.clear(), None),
+    (lambda metadata : metadata.__delitem__("version"), None),
+])
+def test_every_mutation_is_seen(hierarchy,mutate,expected) :
+    project, module = hierarchy
+    recorder = Recorder()
+    project.metadata.watch(recorder)
+    assert module.get_property("project-metadata/version") == "1.0"
+    mutate(project.metadata)
+    assert module.get_property("project-metadata/version") == expected
+    assert recorder.changes and "version" in recorder.changes[-1]
+
+def test_in_place_or_notifies_watchers(hierarchy) :
+    project, _ = hierarchy
+    recorder = Recorder()
+    project.metadata.watch(recorder)
+    metadata = project.metadata
+    metadata |= {"extra" : 1}
+    metadata.setdefault("other",2)
+    assert recorder.changes == [["extra"],["other"]]
+    assert project.metadata is metadata
+
+def test_renamed_identifier_is_resolved_again(hierarchy) :
+    _, module = hierarchy
+    assert module.get_property(":app/name") == ":app"
+    module.metadata["name"] = ":core"
+    assert module.get_property(":app/name") is None
+    assert module.get_property(":core/name") == ":core"
+
+def test_new_parent_reaches_descendants(hierarchy) :
+    project, module = hierarchy
+    child = ModuleMetadata(":app:child","com.demo.app.child",module)
+    assert child.get_property("project-metadata/name") == "demo"
+    other = ProjectMetadata("other","com.other","1.0","com.other")
+    module.parent = other
+    assert child.get_property("project-metadata/name") == "other"
+
+def test_hierarchies_survive_pickling(hierarchy) :
+    project, module = hierarchy
+    module.get_property("project-metadata/name")
+    copy = pickle.loads(pickle.dumps(module))
+    assert copy.get_property("project-metadata/name") == "demo"
+    copy.parent.metadata = {"name" : "copied"}
+    assert copy.get_property("project-metadata/name") == "copied"
+    assert module.get_property("project-metadata/name") == "demo"
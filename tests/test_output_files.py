@@ -0,0 +1,70 @@
+import io
+from pathlib import Path
+
+import pytest
+
+from src.core import FileConvertible, lists_output_files
+from src.gradle.dependency import Dependency, DependencyType, ProjectDependency
+from src.project.graph import ModuleGraph
+
+from conftest import ListedModule, PlainModule, build_project
+
+class NamedFile(FileConvertible) :
+    FILE_NAME = "notes.txt"
+
+    def provide_metadata(self,metadata) -> None :
+        pass
+
+    def generate_to_file(self,filepath : Path) -> None :
+        with open(Path(filepath) / self.FILE_NAME,"w",encoding="utf-8") as file :
+            file.write("hello\n")
+
+class TwoFiles(FileConvertible) :
+    def provide_metadata(self,metadata) -> None :
+        pass
+
+    def generate_to_file(self,filepath : Path) -> None :
+        for name in ("a.txt","b.txt") :
+            with open(Path(filepath) / name,"w",encoding="utf-8") as file :
+                file.write(name)
+
+def test_write_to_defaults_to_the_generated_file() :
+    sink = io.StringIO()
+    NamedFile().write_to(sink)
+    assert sink.getvalue() == "hello\n"
+
+def test_write_to_needs_a_single_file() :
+    with pytest.raises(ValueError) :
+        TwoFiles().write_to(io.StringIO())
+
+def test_plain_module_lists_the_files_it_generates(tmp_path) :
+    project = build_project(1,PlainModule)
+    module = project.modules[0]
+    assert not lists_output_files(module)
+    files = {path.relative_to(tmp_path).as_posix() : content for path, content in module.output_files(tmp_path)}
+    assert set(files) == {"build.gradle.kts","src/Main.kt"}
+    assert files["src/Main.kt"] == "fun main() {}\n"
+    assert "com.example:lib0:1.0" in files["build.gradle.kts"]
+
+def test_plain_module_dependency_groups_come_from_its_attributes() :
+    project = build_project(1,PlainModule)
+    module = project.modules[0]
+    assert module.build_gradle_files() == [module.build_gradle]
+    assert module.dependency_groups() == [module.build_gradle.dependencies]
+
+def test_listed_module_uses_output_files() :
+    project = build_project(1,ListedModule)
+    assert lists_output_files(project.modules[0])
+    assert project.modules[0].build_gradle_files() == [project.modules[0].build_gradle]
+
+def test_plain_modules_take_part_in_incremental_and_archive_output(tmp_path) :
+    project = build_project(2,PlainModule)
+    report = project.incremental_generate_to_file(tmp_path / "out")
+    assert "m1/src/Main.kt" in report.written
+    assert (tmp_path / "out" / "m1" / "src" / "Main.kt").read_text(encoding="utf-8") == "fun main() {}\n"
+    assert project.write_archive(io.BytesIO(),"zip") > 0
+
+def test_plain_module_graph_has_edges() :
+    project = build_project(2,PlainModule,lambda index : [ProjectDependency(DependencyType.Api,":m0")] if index else [])
+    graph = ModuleGraph.from_modules(project.modules)
+    assert graph.edges[":m1"] == [":m0"]
@@ -0,0 +1,37 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from conftest import ListedModule, build_project
+
+class BrokenModule(ListedModule) :
+    def generate_to_file(self,filepath : Path) -> None :
+        raise RuntimeError(f"cannot generate {self.metadata.name()}")
+
+def tree(root : Path) -> dict[str,str] :
+    return {path.relative_to(root).as_posix() : path.read_text(encoding="utf-8") for path in root.rglob("*") if path.is_file()}
+
+def test_parallel_output_matches_sequential(tmp_path) :
+    project = build_project(6)
+    project.extend_generate_to_file(tmp_path / "sequential")
+    report = project.parallel_generate_to_file(tmp_path / "parallel",max_workers=4)
+    assert report.succeeded()
+    assert tree(tmp_path / "parallel") == tree(tmp_path / "sequential")
+
+def test_failures_are_collected_in_scheduling_order(tmp_path) :
+    project = build_project(4)
+    project.modules[1] = BrokenModule(project.metadata,":m1",[])
+    report = project.parallel_generate_to_file(tmp_path,max_workers=4)
+    assert [result.target for result in report.results] == [target for target, _ in project.generation_targets(tmp_path)]
+    assert [result.target for result in report.errors()] == [project.modules[1]]
+    assert not report.succeeded()
+    assert (tmp_path / "m0" / "build.gradle.kts").is_file() and (tmp_path / "m3" / "build.gradle.kts").is_file()
+    with pytest.raises(RuntimeError,match=":m1") :
+        report.raise_for_errors()
+
+def test_given_executor_is_left_running(tmp_path) :
+    project = build_project(3)
+    with ThreadPoolExecutor(max_workers=2) as executor :
+        assert project.parallel_generate_to_file(tmp_path,executor=executor).succeeded()
+        assert executor.submit(lambda : "still running").result() == "still running"
@@ -0,0 +1,69 @@
+from pathlib import Path
+
+import pytest
+
+from conftest import build_project
+from src.plan import PlanCache, PlanCacheError, ProjectPlan, reference_digest, spec_digest
+
+def tree(root : Path) -> dict[str,str] :
+    return {path.relative_to(root).as_posix() : path.read_text(encoding="utf-8") for path in root.rglob("*") if path.is_file()}
+
+class Builds :
+    def __init__(self) -> None :
+        self.count = 0
+
+    def __call__(self) :
+        self.count += 1
+        return build_project(2)
+
+def test_spec_digests_are_canonical() :
+    assert spec_digest({"a" : 1,"b" : [1,2]}) == spec_digest({"b" : [1,2],"a" : 1})
+    assert spec_digest({"a" : 1}) != spec_digest({"a" : 2})
+    assert spec_digest({"a" : 1}) != spec_digest({"a" : 1},salt="2")
+    with pytest.raises(PlanCacheError) :
+        spec_digest({"path" : Path("x")})
+
+def test_compiled_plans_generate_the_same_files(tmp_path) :
+    project = build_project(3)
+    project.extend_generate_to_file(tmp_path / "project")
+    plan = ProjectPlan.compile(build_project(3))
+    plan.generate_to_file(tmp_path / "plan")
+    assert tree(tmp_path / "plan") == tree(tmp_path / "project")
+    assert ProjectPlan.from_json(plan.to_json()).files == plan.files
+    with pytest.raises(AttributeError) :
+        plan.files = ()
+
+def test_cached_plans_are_not_rebuilt(tmp_path) :
+    cache, build = PlanCache(tmp_path / "cache"), Builds()
+    first = cache.get_or_compile({"modules" : 2},build)
+    second = PlanCache(tmp_path / "cache").get_or_compile({"modules" : 2},build)
+    assert build.count == 1
+    assert second.files == first.files
+    cache.get_or_compile({"modules" : 3},build)
+    assert build.count == 2
+
+def test_unreadable_plans_are_recompiled(tmp_path) :
+    cache, build = PlanCache(tmp_path / "cache"), Builds()
+    cache.get_or_compile("spec",build)
+    cache.path(cache.key("spec")).write_text("{not json",encoding="utf-8")
+    assert cache.load(cache.key("spec")) is None
+    cache.get_or_compile("spec",build)
+    assert build.count == 2
+    assert cache.load(cache.key("spec")) is not None
+
+def test_unwritable_caches_only_warn(tmp_path) :
+    (tmp_path / "cache").write_text("",encoding="utf-8")
+    with pytest.warns(UserWarning,match="Could not cache") :
+        plan = PlanCache(tmp_path / "cache").get_or_compile("spec",Builds())
+    assert plan.files
+
+def test_reference_digests(tmp_path) :
+    script = tmp_path / "builder.py"
+    script.write_text("def build() : pass\n",encoding="utf-8")
+    digest = reference_digest(f"{script}:build")
+    assert digest is not None and digest == reference_digest(str(script))
+    script.write_text("def build() : return 1\n",encoding="utf-8")
+    assert reference_digest(f"{script}:build") != digest
+    assert reference_digest("src.plan:PlanCache") is not None
+    assert reference_digest(f"{tmp_path / 'missing.py'}:build") is None
+    assert reference_digest("no.such.module:build") is None
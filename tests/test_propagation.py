@@ -0,0 +1,95 @@
+from pathlib import Path
+
+from conftest import build_project
+from src.gradle.buildgradle import ModuleBuildGradle
+from src.gradle.dependency import Dependency, DependencyGroup, DependencyType
+from src.gradle.plugin import PluginGroup
+from src.metadata import GradleMetadata, ModuleMetadata, ProjectMetadata
+from src.module import Module
+from src.utils import render_to_string
+
+class Overrides(GradleMetadata) :
+    def get_identifier(self) -> str :
+        return "dependencies"
+
+def pin_version(dependency : Dependency,metadata : GradleMetadata,version : str) -> None :
+    coordinate = dependency.coordinate
+    dependency.dependency = f"{coordinate.group}:{coordinate.artifact}:{version}"
+
+class EagerModule(Module) :
+    """A module whose `build.gradle.kts` is given its metadata by the constructor."""
+    def __init__(self,project_metadata : ProjectMetadata,name : str,dependencies : list[Dependency]) -> None:
+        self.metadata = ModuleMetadata(name,ModuleMetadata.namespace_from(project_metadata,name),project_metadata)
+        self.build_gradle = ModuleBuildGradle(PluginGroup([]),DependencyGroup(dependencies),module_metadata=self.metadata)
+
+    def provide_metadata(self,metadata) -> None :
+        self.build_gradle.provide_metadata(metadata)
+
+    def generate_to_file(self,filepath : Path) -> None :
+        self.build_gradle.generate_to_file(filepath)
+
+    def output_files(self,filepath : Path) -> list :
+        return self.build_gradle.output_files(filepath)
+
+def pinned_project() :
+    return build_project(2,EagerModule,lambda index : [
+        Dependency(DependencyType.Api,"com.example:core:1.0",pin_version),
+        Dependency(DependencyType.Implementation,f"com.example:lib{index}:1.{index}",pin_version),
+    ])
+
+def overrides_for(project) -> Overrides :
+    overrides = Overrides(project.metadata)
+    for module in project.modules :
+        module.metadata.parent = overrides
+    return overrides
+
+def test_constructor_metadata_is_applied_eagerly() :
+    project_metadata = ProjectMetadata("demo","com.demo","1.0","com.demo")
+    overrides = Overrides(project_metadata)
+    overrides.metadata["com.example:core:1.0"] = "1.5"
+    metadata = ModuleMetadata(":app","com.demo.app",overrides)
+    build_gradle = ModuleBuildGradle(PluginGroup([]),DependencyGroup([Dependency(DependencyType.Api,"com.example:core:1.0",pin_version)]),module_metadata=metadata)
+    assert build_gradle.dependencies.code[0].dependency == "com.example:core:1.5"
+    assert 'api("com.example:core:1.5")' in render_to_string(build_gradle)
+
+def test_propagator_re_resolves_from_the_declared_state() :
+    project = pinned_project()
+    overrides = overrides_for(project)
+    overrides.metadata["com.example:core:1.0"] = "1.5"
+    for module in project.modules :
+        module.provide_metadata(module.metadata)
+    assert "com.example:core:1.5" in str(project.modules[0].build_gradle)
+
+    project.propagate_metadata()
+    overrides.metadata["com.example:core:1.0"] = "1.6"
+    report = project.propagate_metadata()
+    assert report.changed == 2
+    for module in project.modules :
+        assert 'api("com.example:core:1.6")' in str(module.build_gradle)
+
+    del overrides.metadata["com.example:core:1.0"]
+    project.propagate_metadata()
+    for module in project.modules :
+        assert 'api("com.example:core:1.0")' in str(module.build_gradle)
+
+def test_declared_keeps_the_original_declaration() :
+    project = pinned_project()
+    overrides = overrides_for(project)
+    overrides.metadata["com.example:lib1:1.1"] = "2.0"
+    build_gradle = project.modules[1].build_gradle
+    build_gradle.provide_metadata(project.modules[1].metadata)
+    dependency = build_gradle.dependencies.code[1]
+    assert dependency.dependency == "com.example:lib1:2.0"
+    assert build_gradle.declared(dependency).dependency == "com.example:lib1:1.1"
+    added = Dependency(DependencyType.Api,"com.example:extra:1.0",pin_version)
+    assert build_gradle.declared(added) is added
+
+def test_refresh_rewrites_only_changed_files(tmp_path) :
+    project = pinned_project()
+    overrides = overrides_for(project)
+    project.incremental_generate_to_file(tmp_path)
+    overrides.metadata["com.example:lib0:1.0"] = "1.9"
+    report = project.refresh_generated_files(tmp_path)
+    assert report.written == ["m0/build.gradle.kts"]
+    assert 'implementation("com.example:lib0:1.9")' in (tmp_path / "m0" / "build.gradle.kts").read_text(encoding="utf-8")
+    assert 'implementation("com.example:lib1:1.1")' in (tmp_path / "m1" / "build.gradle.kts").read_text(encoding="utf-8")
@@ -0,0 +1,41 @@
+import pytest
+
+from src.gradle.properties import GradleProperties, IncorrectFormatError, escape_property, load_properties, parse_properties
+
+def parse(text : str) -> dict[str,str] :
+    return dict(parse_properties(text.splitlines(keepends=True)))
+
+def test_escapes_keys_and_values() :
+    assert escape_property("a key=b","x\ty") == "a\\ key\\=b=x\\ty"
+    assert escape_property("key"," leading") == "key=\\ leading"
+    assert escape_property("key","caf\u00e9") == "key=caf\\u00E9"
+
+def test_characters_outside_the_bmp_are_surrogate_pairs() :
+    assert escape_property("emoji","\U0001F600") == "emoji=\\uD83D\\uDE00"
+    assert parse("emoji=\\uD83D\\uDE00\n") == {"emoji" : "\U0001F600"}
+    assert parse("lone=\\uD83D\n") == {"lone" : "\ud83d"}
+
+@pytest.mark.parametrize("key, value",[
+    ("plain","value"),
+    ("with spaces:and=separators#!","  spaced \\ value\n"),
+    ("unicode\u00e9","\u4e2d\u6587 \U0001F600 \U00010348"),
+    ("empty",""),
+])
+def test_round_trip(key : str,value : str) :
+    assert parse(escape_property(key,value) + "\n") == {key : value}
+
+def test_parses_continuations_comments_and_separators() :
+    text = "# comment\n! other\nkey1 = one \\\n    two\nkey2:value\nkey3 value\nkey4\n"
+    assert parse(text) == {"key1" : "one two","key2" : "value","key3" : "value","key4" : ""}
+
+def test_malformed_unicode_escape_reports_its_position() :
+    with pytest.raises(IncorrectFormatError) as error :
+        parse("ok=1\nkey=\\u12G4\n")
+    assert error.value.line_number == 2
+
+def test_file_round_trip(tmp_path) :
+    values = {"org.gradle.jvmargs" : "-Xmx2g","name" : "d\u00e9mo \U0001F600"}
+    GradleProperties(values).generate_to_file(tmp_path)
+
+    assert dict(load_properties(tmp_path / "gradle.properties")) == values
+    assert GradleProperties.from_file(tmp_path / "gradle.properties").values == values
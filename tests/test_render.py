@@ -0,0 +1,44 @@
+from io import StringIO
+
+from conftest import build_project
+from src.gradle.plugin import PluginGroup, id
+from src.utils import CodeBlock, RawCode, render_to, render_to_string
+
+class Recorder(StringIO) :
+    """A sink keeping every chunk written to it."""
+    def __init__(self) -> None :
+        super().__init__()
+        self.chunks = []
+
+    def write(self,text : str) -> int :
+        self.chunks.append(text)
+        return super().write(text)
+
+class Unprintable(CodeBlock) :
+    def __str__(self) -> str :
+        raise AssertionError("nested blocks are streamed, not converted to strings")
+
+def test_nested_blocks_render_in_place() :
+    block = CodeBlock("android",[Unprintable("defaultConfig",["minSdk = 24","targetSdk = 34"]),'namespace = "x"'])
+    assert render_to_string(block) == 'android {\n\tdefaultConfig {\n\tminSdk = 24\n\ttargetSdk = 34\n}\n\tnamespace = "x"\n}'
+
+def test_render_to_writes_chunks_into_the_sink() :
+    sink = Recorder()
+    render_to(CodeBlock("repositories",["mavenCentral()","google()"]),sink)
+    assert sink.chunks[:2] == ["repositories"," {\n\t"]
+    assert "".join(sink.chunks) == sink.getvalue() == "repositories {\n\tmavenCentral()\n\tgoogle()\n}"
+
+def test_plain_objects_and_raw_code_render_with_str() :
+    assert render_to_string(42) == "42"
+    assert render_to_string(RawCode("android {}\n")) == "android {}\n"
+    assert render_to_string(PluginGroup([id("a","1"),id("b")])) == 'plugins {\n\tid("a") version "1"\n\tid("b")\n}\n'
+
+def test_streamed_files_match_their_string_form() :
+    project = build_project(2)
+    for module in project.modules :
+        build_gradle = module.build_gradle
+        sink = StringIO()
+        build_gradle.write_to(sink)
+        assert sink.getvalue() == str(build_gradle)
+        assert 'api("com.example:lib' in sink.getvalue()
+    assert render_to_string(project.settings_gradle) == str(project.settings_gradle)
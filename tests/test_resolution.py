@@ -0,0 +1,106 @@
+import time
+
+import pytest
+
+from src.gradle.dependency import Configuration, Dependency, DependencyGroup, DependencyType
+from src.gradle.resolution import ConflictStrategy, DependencyConflictError, DependencyResolver, version_key
+
+from conftest import build_project
+
+def group(*declarations : tuple) -> DependencyGroup :
+    return DependencyGroup([Dependency(type,notation) for type, notation in declarations])
+
+def notations(group : DependencyGroup) -> list[str] :
+    return [str(dependency) for dependency in group.code]
+
+@pytest.mark.parametrize("lower, higher",[
+    ("1.0","1.1"),
+    ("1.1","1.1.0"),
+    ("1.1-rc","1.1"),
+    ("1.1-rc1","1.1-SNAPSHOT"),
+    ("1.1-SNAPSHOT","1.1-final"),
+    ("1.1-alpha","1.1-rc"),
+    ("1.1-dev","1.1-alpha"),
+    ("1.9","1.10"),
+])
+def test_version_ordering(lower : str,higher : str) :
+    assert version_key(lower) < version_key(higher)
+
+def test_highest_version_wins_and_duplicates_are_dropped() :
+    dependencies = group(
+        (DependencyType.Api,"com.example:lib:1.0"),
+        (DependencyType.Api,"com.example:lib:1.2"),
+        (DependencyType.Implementation,"com.example:other:2.0"),
+    )
+    resolution = DependencyResolver().resolve_group(dependencies)
+
+    assert notations(dependencies) == ['api("com.example:lib:1.2")','implementation("com.example:other:2.0")']
+    assert [(conflict.module,conflict.selected) for conflict in resolution.conflicts] == [("com.example:lib","1.2")]
+
+def test_fail_and_pin_strategies() :
+    declarations = ((DependencyType.Api,"com.example:lib:1.0"),(DependencyType.Api,"com.example:lib:2.0"))
+    with pytest.raises(DependencyConflictError) :
+        DependencyResolver(ConflictStrategy.Fail).resolve_group(group(*declarations))
+
+    dependencies = group(*declarations)
+    DependencyResolver(ConflictStrategy.Pin,{"com.example:lib" : "1.5"}).resolve_group(dependencies)
+    assert notations(dependencies) == ['api("com.example:lib:1.5")']
+
+def test_configurations_are_kept_unless_subsumed_types_are_given() :
+    declarations = ((DependencyType.Api,"com.example:lib:1.0"),(DependencyType.Implementation,"com.example:lib:1.0"))
+
+    dependencies = group(*declarations)
+    resolution = DependencyResolver().resolve_group(dependencies)
+    assert len(dependencies.code) == 2
+    assert resolution.dropped == []
+
+    dependencies = group(*declarations)
+    resolution = DependencyResolver(subsumed_types={DependencyType.Implementation : DependencyType.Api}).resolve_group(dependencies)
+    assert notations(dependencies) == ['api("com.example:lib:1.0")']
+    assert [str(dependency) for dependency in resolution.dropped] == ['implementation("com.example:lib:1.0")']
+
+def test_classifiers_are_not_versions() :
+    dependencies = group(
+        (DependencyType.Implementation,"com.example:lib:1.0"),
+        (DependencyType.Implementation,"com.example:lib:1.0:sources"),
+        (Configuration.of("testImplementation"),"com.example:lib:1.2@aar"),
+    )
+    resolution = DependencyResolver().resolve_group(dependencies)
+
+    assert [conflict.versions for conflict in resolution.conflicts] == [["1.0","1.2"]]
+    assert notations(dependencies) == [
+        'implementation("com.example:lib:1.2")',
+        'implementation("com.example:lib:1.2:sources")',
+        'testImplementation("com.example:lib:1.2@aar")',
+    ]
+
+def test_unversioned_declarations_are_left_alone() :
+    dependencies = group(
+        (DependencyType.Implementation,"com.example:lib"),
+        (DependencyType.Api,"com.example:lib:1.0"),
+        (DependencyType.Api,"com.example:lib:1.2"),
+        (DependencyType.Implementation,"com.example:managed"),
+    )
+    # The BOM or platform() providing these versions stays in charge, even of a pinned module
+    DependencyResolver(ConflictStrategy.Pin,{"com.example:managed" : "3.0"}).resolve_group(dependencies)
+    assert notations(dependencies) == [
+        'implementation("com.example:lib")',
+        'api("com.example:lib:1.2")',
+        'implementation("com.example:managed")',
+    ]
+
+def test_resolves_across_modules() :
+    project = build_project(3)
+    resolution = project.resolve_dependencies(DependencyResolver(ConflictStrategy.Pin,{"com.example:lib1" : "9.0"}))
+
+    assert resolution.selected["com.example:lib1"] == "9.0"
+    versions = [dependency.coordinate.version for module in project.modules for group in module.dependency_groups() for dependency in group.code]
+    assert versions == ["1.0","9.0","1.2"]
+
+def test_resolves_100k_declarations_quickly() :
+    types = (DependencyType.Api,DependencyType.Implementation)
+    dependencies = group(*((types[index % 2],f"com.example{index % 500}:lib{index % 50}:1.{index % 7}") for index in range(100000)))
+
+    start = time.perf_counter()
+    DependencyResolver().resolve_group(dependencies)
+    assert time.perf_counter() - start < 1.0
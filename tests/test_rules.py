@@ -0,0 +1,137 @@
+import time
+
+import pytest
+
+from benchmarks.rewrite_rules import rule_table
+from conftest import build_project
+from src.gradle.dependency import Dependency, DependencyGroup, DependencyType, SharedDependency
+from src.gradle.plugin import PluginGroup, PluginWithCodeBlock, id, kotlin
+from src.gradle.rules import RewriteRule, RewriteRuleError, RewriteRules, RuleTarget
+from src.metadata import GradleMetadata, ModuleMetadata, ProjectMetadata
+
+class Versions(GradleMetadata) :
+    def get_identifier(self) -> str :
+        return "versions"
+
+def group_of(*notations : str) -> DependencyGroup :
+    return DependencyGroup([Dependency(DependencyType.Implementation,notation) for notation in notations],share=True)
+
+def test_the_most_specific_rule_wins() :
+    rules = RewriteRules.from_table([
+        {"match" : "*","action" : "remove","name" : "any"},
+        {"match" : "com.*","action" : "remove","name" : "com"},
+        {"match" : "com.squareup.*","action" : "remove","name" : "squareup"},
+        {"match" : "com.squareup.*:retro*","action" : "remove","name" : "retro"},
+        {"match" : "com.squareup.retrofit2","action" : "remove","name" : "retrofit2"},
+        {"match" : "com.squareup.retrofit2:converter-*","action" : "remove","name" : "converters"},
+        {"match" : "com.squareup.retrofit2:converter-*","action" : "remove","name" : "shadowed"},
+    ])
+    def name(group : str,artifact : str) -> str :
+        return rules.match(RuleTarget.Dependency,group,artifact).name
+    assert name("com.squareup.retrofit2","converter-gson") == "converters"
+    assert name("com.squareup.retrofit2","retrofit") == "retrofit2"
+    assert name("com.squareup.okhttp3","retrofit-like") == "retro"
+    assert name("com.squareup.okhttp3","okhttp") == "squareup"
+    assert name("com.squareup","okio") == "squareup"
+    assert name("com.google","gson") == "com"
+    assert name("org.jetbrains","annotations") == "any"
+    assert rules.match(RuleTarget.Plugin,"com.android.application") is None
+
+@pytest.mark.parametrize("row",[
+    {"match" : "a*b","action" : "remove"},
+    {"match" : "com.*.x","action" : "remove"},
+    {"match" : "x:a*b","action" : "remove"},
+    {"match" : "x","action" : "version"},
+    {"match" : "x","action" : "rename","value" : "y"},
+    {"match" : "x","action" : "relocate","value" : "y","target" : "plugin"},
+    {"match" : "x:y","action" : "remove","target" : "plugin"},
+    {"action" : "remove"},
+])
+def test_invalid_rules_are_rejected(row) :
+    with pytest.raises(RewriteRuleError) :
+        RewriteRules.from_table([row])
+
+def test_dependency_actions() :
+    project = ProjectMetadata("demo","com.demo","1.0","com.demo")
+    versions = Versions(project)
+    versions.metadata["androidx.core"] = "1.13.1"
+    metadata = ModuleMetadata(":app","com.demo.app",versions)
+    rules = RewriteRules.from_table([
+        {"match" : "com.squareup.*","action" : "catalog","value" : "libs.squareup.{artifact}"},
+        {"match" : "androidx.*","action" : "metadata-version","value" : "versions/{group}"},
+        {"match" : "junit","action" : "remove"},
+        {"match" : "io.reactivex","action" : "relocate","value" : "io.reactivex.rxjava3"},
+        {"match" : "org.jetbrains.kotlinx:*","action" : "version","value" : "1.9.0"},
+    ])
+    group = group_of(
+        "com.squareup.retrofit2:retrofit:2.9.0",
+        "androidx.core:core-ktx:1.0.0",
+        "androidx.appcompat:appcompat:1.6.1",
+        "junit:junit:4.13.2",
+        "io.reactivex:rxjava:2.2.21",
+        "org.jetbrains.kotlinx:kotlinx-coroutines-core:1.9.0",
+        "com.google.code.gson:gson:2.11.0",
+    )
+    report = rules.apply(group,metadata)
+    assert [str(dependency) for dependency in group.code] == [
+        "implementation(libs.squareup.retrofit)",
+        'implementation("androidx.core:core-ktx:1.13.1")',
+        'implementation("androidx.appcompat:appcompat:1.6.1")',
+        'implementation("io.reactivex.rxjava3:rxjava:2.2.21")',
+        'implementation("org.jetbrains.kotlinx:kotlinx-coroutines-core:1.9.0")',
+        'implementation("com.google.code.gson:gson:2.11.0")',
+    ]
+    # Declarations already in the requested state are not reported
+    assert [match.rule.pattern for match in report.matches] == ["com.squareup.*","androidx.*","junit","io.reactivex"]
+    assert report.matches[2].after is None and "(removed)" in str(report.matches[2])
+    assert isinstance(group.code[3],SharedDependency)
+    assert rules.apply(group_of("androidx.core:core:1.0.0")).matches == []
+
+def test_plugin_actions() :
+    multiplatform = PluginWithCodeBlock(kotlin("multiplatform","1.9.0"))
+    multiplatform.code = "jvmToolchain(17)"
+    group = PluginGroup([multiplatform,id("com.android.library","8.0.0"),id("io.gitlab.arturbosch.detekt","1.0")])
+    rules = RewriteRules([
+        RewriteRule("org.jetbrains.kotlin.*","version","2.0.21",target="plugin"),
+        RewriteRule("com.android.*","catalog","libs.plugins.android",target="plugin"),
+        RewriteRule("io.gitlab.*","remove",target="plugin"),
+    ])
+    report = rules.apply(group)
+    assert len(report) == 3 and report.counts() == {"org.jetbrains.kotlin.* version" : 1,"com.android.* catalog" : 1,"io.gitlab.* remove" : 1}
+    rewritten, android = group.code
+    assert isinstance(rewritten,PluginWithCodeBlock) and rewritten.code == "jvmToolchain(17)"
+    assert 'kotlin("multiplatform") version "2.0.21"' in str(rewritten)
+    assert str(android) == "alias(libs.plugins.android)"
+
+def test_rules_from_toml(tmp_path) :
+    path = tmp_path / "rules.toml"
+    path.write_text('[[rules]]\nmatch = "com.example.*"\naction = "version"\nvalue = "2.0"\n\n[[rules]]\ntarget = "plugin"\nmatch = "*"\naction = "remove"\n',encoding="utf-8")
+    rules = RewriteRules.from_file(path)
+    assert [(rule.pattern, rule.target, rule.index) for rule in rules.rules] == [("com.example.*",RuleTarget.Dependency,0),("*",RuleTarget.Plugin,1)]
+    path.write_text("[[rules]\n",encoding="utf-8")
+    with pytest.raises(RewriteRuleError) :
+        RewriteRules.from_file(path)
+
+def test_project_rewrites_every_module() :
+    project = build_project(3)
+    rules = RewriteRules.from_table([
+        {"match" : "com.example","action" : "version","value" : "9.9"},
+        {"match" : "org.jetbrains.kotlin.jvm","action" : "version","value" : "2.1.0","target" : "plugin"},
+    ])
+    report = project.apply_rewrite_rules(rules)
+    assert len(report) == 6
+    for index, module in enumerate(project.modules) :
+        rendered = str(module.build_gradle)
+        assert f'api("com.example:lib{index}:9.9")' in rendered
+        assert 'id("org.jetbrains.kotlin.jvm") version "2.1.0"' in rendered
+
+def test_compiling_scales_linearly() :
+    def compile_time(count : int) -> float :
+        rows = rule_table(count)
+        start = time.perf_counter()
+        RewriteRules.from_table(rows)
+        return time.perf_counter() - start
+
+    small = min(compile_time(5_000) for _ in range(3))
+    # 10 times the rules, a quadratic compilation would take 100 times longer
+    assert compile_time(50_000) < 30 * small
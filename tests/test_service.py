@@ -0,0 +1,152 @@
+import asyncio
+import io
+import json
+import zipfile
+
+import pytest
+
+from src.service import ArtifactCache, GenerationServer, GenerationService, LatencyRecorder, ServiceError
+from src.utils import load_reference
+
+BUILDER = """
+from conftest import build_project
+
+CALLS = []
+
+def build(spec,template) :
+    CALLS.append(spec)
+    if spec.get("fail") :
+        raise RuntimeError("builder failed")
+    return build_project(spec.get("modules",1))
+"""
+
+@pytest.fixture
+def builder(tmp_path) -> str :
+    script = tmp_path / "builder.py"
+    script.write_text(BUILDER,encoding="utf-8")
+    return f"{script}:build"
+
+@pytest.fixture
+def service(builder) :
+    service = GenerationService(builder)
+    yield service
+    service.close()
+
+def calls(builder : str) -> list :
+    return load_reference(builder.rpartition(":")[0] + ":CALLS")
+
+def names(archive : bytes) -> list[str] :
+    with zipfile.ZipFile(io.BytesIO(archive)) as result :
+        return sorted(result.namelist())
+
+async def request(port : int,raw : bytes) -> list[tuple[int,dict[str,str],bytes]] :
+    reader, writer = await asyncio.open_connection("127.0.0.1",port)
+    writer.write(raw)
+    await writer.drain()
+    responses = []
+    while True :
+        line = await reader.readline()
+        if not line :
+            break
+        status = int(line.split()[1])
+        headers = {}
+        while (line := await reader.readline()) not in (b"\r\n", b"") :
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        responses.append((status,headers,await reader.readexactly(int(headers["content-length"]))))
+        if headers.get("connection") == "close" :
+            break
+    writer.close()
+    return responses
+
+def post(spec : str,query : str = "",connection : str = "keep-alive") -> bytes :
+    body = spec.encode("utf-8")
+    return f"POST /generate{query} HTTP/1.1\r\nHost: test\r\nConnection: {connection}\r\nContent-Length: {len(body)}\r\n\r\n".encode("latin-1") + body
+
+def test_artifact_cache_evicts_least_recently_used() :
+    cache = ArtifactCache(max_bytes=10)
+    cache.put("a",1,4)
+    cache.put("b",2,4)
+    assert cache.get("a") == 1
+    cache.put("c",3,4)
+    assert ("a" in cache, "b" in cache, "c" in cache) == (True, False, True)
+    cache.put("huge",4,11)
+    assert "huge" not in cache and cache.size == 8
+    cache.put("a",5,2)
+    assert (cache.get("a"), cache.size) == (5, 6)
+    assert cache.get("b") is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"], stats["hit_rate"]) == (2, 1, 1, 2 / 3)
+    with pytest.raises(ValueError) :
+        ArtifactCache(-1)
+
+def test_latency_percentiles() :
+    recorder = LatencyRecorder(window=100)
+    assert recorder.percentile(50) is None and recorder.stats() == {"count" : 0}
+    for milliseconds in range(1,101) :
+        recorder.record(milliseconds / 1000)
+    assert (recorder.percentile(50), recorder.percentile(99)) == (0.05, 0.099)
+    assert recorder.stats()["max_ms"] == 100.0
+
+def test_archives_are_built_once_and_cached(service,builder) :
+    async def run() :
+        first = await asyncio.gather(*(service.archive({"modules" : 2,"name" : "demo"}) for _ in range(5)))
+        second = await service.archive({"name" : "demo","modules" : 2})
+        tar = await service.archive({"modules" : 2,"name" : "demo"},"tar")
+        return first, second, tar
+
+    first, second, tar = asyncio.run(run())
+    assert len(calls(builder)) == 1
+    assert {archive for archive, _ in first} == {second[0]} and second[1]
+    assert "m1/build.gradle.kts" in names(second[0])
+    assert not tar[1] and tar[0] != second[0]
+
+def test_service_errors(service) :
+    with pytest.raises(ServiceError) as unknown :
+        asyncio.run(service.archive({},"rar"))
+    assert unknown.value.status == 400
+    with pytest.raises(ServiceError) as failed :
+        asyncio.run(service.archive({"fail" : True}))
+    assert failed.value.status == 500 and "builder failed" in str(failed.value)
+    with pytest.raises(ServiceError) as invalid :
+        service.key({"value" : object()})
+    assert invalid.value.status == 400
+    with pytest.raises(ServiceError) as escaping :
+        asyncio.run(service.archive({},"zip","../../evil"))
+    assert escaping.value.status == 400
+
+def test_http_routes(service) :
+    async def run() :
+        server = await GenerationServer(service).start("127.0.0.1",0)
+        port = server.sockets[0].getsockname()[1]
+        try :
+            generated = await request(port,post('{"modules" : 1}',"?prefix=demo") + post('{"modules" : 1}',"?prefix=demo",connection="close"))
+            routes = await request(port,b"GET /health HTTP/1.1\r\n\r\nGET /generate HTTP/1.1\r\n\r\nGET /missing HTTP/1.1\r\n\r\nGET /stats HTTP/1.1\r\nConnection: close\r\n\r\n")
+            invalid = await request(port,post("[1, 2]") + post("{not json",connection="close"))
+            chunked = await request(port,b"POST /generate HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\n")
+            injected = await request(port,post('{"modules" : 1}',"?prefix=..%2F..%2Fevil%0D%0ASet-Cookie:%20x%3D1",connection="close"))
+            nested = await request(port,post('{"modules" : 1}','?prefix=out/my%20"demo"',connection="close"))
+        finally :
+            server.close()
+            await server.wait_closed()
+        return generated, routes, invalid, chunked, injected, nested
+
+    generated, routes, invalid, chunked, injected, nested = asyncio.run(run())
+    (miss_status, miss, archive), (hit_status, hit, cached) = generated
+    assert (miss_status, miss["x-cache"], hit_status, hit["x-cache"]) == (200, "miss", 200, "hit")
+    assert archive == cached and "demo/m0/build.gradle.kts" in names(archive)
+    assert miss["content-type"] == "application/zip" and miss["etag"] == hit["etag"]
+    assert 'filename="demo.zip"' in miss["content-disposition"]
+
+    assert [status for status, _, _ in routes] == [200, 405, 404, 200]
+    assert routes[0][2] == b"ok"
+    stats = json.loads(routes[3][2])
+    assert stats["latency"]["hit"]["count"] == 1 and stats["latency"]["miss"]["count"] == 1
+    assert [status for status, _, _ in invalid] == [400, 400]
+    assert chunked[0][0] == 411
+
+    (status, headers, _), = injected
+    assert status == 400 and "set-cookie" not in headers
+    (status, headers, archive), = nested
+    assert status == 200 and headers["content-disposition"] == 'attachment; filename="my__demo_.zip"'
+    assert "out/my \"demo\"/m0/build.gradle.kts" in names(archive)
@@ -0,0 +1,55 @@
+import json
+
+import pytest
+
+from conftest import build_project
+from src.tracing import Tracer, disable_tracing, enable_tracing, trace, tracing_enabled
+
+@pytest.fixture
+def tracer() :
+    tracer = enable_tracing()
+    yield tracer
+    disable_tracing()
+
+def test_disabled_spans_record_nothing() :
+    assert not tracing_enabled()
+    with trace("phase","test",bytes=1) as span :
+        span.set(objects=2)
+    assert not span
+
+def test_generation_phases_are_traced(tracer,tmp_path) :
+    build_project(2).extend_generate_to_file(tmp_path)
+    names = {span.name for span in tracer.spans}
+    assert {"extend_generate_to_file","build.gradle.kts","settings.gradle.kts"} <= names
+    writes = [span for span in tracer.spans if span.name == "build.gradle.kts" and span.category == "write"]
+    assert sorted(span.args["path"] for span in writes) == [str(tmp_path / "m0" / "build.gradle.kts"),str(tmp_path / "m1" / "build.gradle.kts")]
+    assert all(span.args["bytes"] > 0 and span.duration_ns() >= 0 for span in writes)
+
+def test_failed_spans_keep_the_error(tracer) :
+    with pytest.raises(KeyError) :
+        with trace("lookup","test") :
+            raise KeyError("missing")
+    assert tracer.spans[-1].args["error"] == "KeyError"
+
+def test_chrome_trace_export(tracer,tmp_path) :
+    with trace("outer","test",path=tmp_path) as outer :
+        with trace("inner","test") :
+            pass
+        outer.set(objects=3)
+    tracer.write_chrome_trace(tmp_path / "trace.json")
+    events = json.loads((tmp_path / "trace.json").read_text(encoding="utf-8"))["traceEvents"]
+    assert [event["name"] for event in events] == ["outer","inner"]
+    assert all(event["ph"] == "X" and event["dur"] >= 0 for event in events)
+    assert events[0]["args"] == {"path" : str(tmp_path),"objects" : 3}
+    assert events[0]["ts"] <= events[1]["ts"]
+
+def test_summary_groups_by_name_and_argument() :
+    tracer = Tracer()
+    for module, size in ((":a",10),(":a",5),(":b",1)) :
+        with tracer.span("build.gradle.kts","write",module=module,bytes=size) :
+            pass
+    by_name = tracer.summary()
+    assert [(row["name"], row["count"], row["bytes"]) for row in by_name] == [("build.gradle.kts",3,16)]
+    by_module = {row["module"] : row for row in tracer.summary("module")}
+    assert (by_module[":a"]["count"], by_module[":a"]["bytes"], by_module[":b"]["bytes"]) == (2, 15, 1)
+    assert tracer.format_summary("module",limit=1).count("\n") == 2
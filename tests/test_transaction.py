@@ -0,0 +1,78 @@
+from pathlib import Path
+
+import pytest
+
+from conftest import build_project
+from src.assets import AssetStoreError, StaticAsset
+from src.project.transaction import StagedWriter
+from src.utils import RawCode
+
+class Broken :
+    def write_to(self,sink) -> None :
+        sink.write("half")
+        raise RuntimeError("render failed")
+
+def tree(root : Path) -> dict[str,str] :
+    return {path.relative_to(root).as_posix() : path.read_text(encoding="utf-8") for path in root.rglob("*") if path.is_file()}
+
+def leftovers(root : Path) -> list[str] :
+    return [path.name for path in root.parent.iterdir() if path.name.startswith(f".{root.name}.staging-")]
+
+@pytest.fixture
+def root(tmp_path) -> Path :
+    root = tmp_path / "project"
+    (root / "app" / "src").mkdir(parents=True)
+    (root / "app" / "build.gradle.kts").write_text("old\n",encoding="utf-8")
+    (root / "app" / "src" / "Main.kt").write_text("fun main() {}\n",encoding="utf-8")
+    return root
+
+@pytest.mark.parametrize("durable",[True,False])
+def test_files_are_published_next_to_other_files(root,durable) :
+    published = StagedWriter(root,"files",durable).write_all([(root / "app" / "build.gradle.kts",RawCode("new\n")),(root / "settings.gradle.kts",RawCode("settings\n"))])
+    assert published == [root / "app" / "build.gradle.kts",root / "settings.gradle.kts"]
+    assert tree(root) == {"app/build.gradle.kts" : "new\n","app/src/Main.kt" : "fun main() {}\n","settings.gradle.kts" : "settings\n"}
+    assert leftovers(root) == []
+
+@pytest.mark.parametrize("publish",["files","directory"])
+def test_failures_leave_the_root_untouched(root,publish) :
+    before = tree(root)
+    with pytest.raises(RuntimeError,match="render failed") :
+        StagedWriter(root,publish).write_all([(root / "settings.gradle.kts",RawCode("settings\n")),(root / "app" / "build.gradle.kts",Broken())])
+    assert tree(root) == before
+    assert leftovers(root) == []
+
+def test_directory_mode_replaces_the_whole_root(root) :
+    StagedWriter(root,"directory").write_all([(root / "app" / "build.gradle.kts",RawCode("new\n"))])
+    assert tree(root) == {"app/build.gradle.kts" : "new\n"}
+    assert sorted(path.name for path in root.parent.iterdir()) == ["project"]
+
+def test_directory_mode_creates_a_missing_root(tmp_path) :
+    root = tmp_path / "fresh"
+    StagedWriter(root,"directory",durable=False).write_all([(root / "gradle.properties",RawCode("a=b\n"))])
+    assert tree(root) == {"gradle.properties" : "a=b\n"}
+
+def test_assets_are_published_with_the_files(root,tmp_path) :
+    script = tmp_path / "gradlew"
+    script.write_text("#!/bin/sh\n",encoding="utf-8")
+    published = StagedWriter(root,"directory").write_all([(root / "settings.gradle.kts",RawCode("settings\n"))],[StaticAsset(script,"gradlew",executable=True)])
+    assert published == [root / "settings.gradle.kts",root / "gradlew"]
+    assert tree(root) == {"settings.gradle.kts" : "settings\n","gradlew" : "#!/bin/sh\n"}
+    assert (root / "gradlew").stat().st_mode & 0o111
+
+    # An asset that cannot be materialized fails the whole transaction
+    before = tree(root)
+    with pytest.raises(AssetStoreError) :
+        StagedWriter(root).write_all([(root / "settings.gradle.kts",RawCode("changed\n"))],[StaticAsset(tmp_path / "missing","gradlew")])
+    assert tree(root) == before
+    assert leftovers(root) == []
+
+def test_unknown_publish_modes_are_rejected(tmp_path) :
+    with pytest.raises(ValueError) :
+        StagedWriter(tmp_path,"atomic")
+
+def test_project_output_matches_plain_generation(tmp_path) :
+    project = build_project(3)
+    project.extend_generate_to_file(tmp_path / "plain")
+    published = project.transactional_generate_to_file(tmp_path / "staged",publish="directory")
+    assert tree(tmp_path / "staged") == tree(tmp_path / "plain")
+    assert all(path.is_file() for path in published) and tmp_path / "staged" / "gradlew" in published